@@ -0,0 +1,238 @@
+import os
+import time
+import queue
+import logging
+import threading
+from datetime import timedelta
+
+from sqlalchemy import insert, delete, select
+from sqlalchemy.exc import IntegrityError, DataError
+
+import metrics
+from database import SessionLocal, AuditLog, usar_pool, now_brazil
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 📋 GRAVAÇÃO ASSÍNCRONA DOS LOGS DE AUDITORIA
+# =========================================================
+# log_action() fazia db.add(AuditLog) + db.commit() na sessão da requisição:
+# um commit (e um fsync no Postgres) a mais em cada login, edição de bot,
+# plano, remarketing...
+#
+# Agora log_action() só monta o registro (com o created_at do momento da ação)
+# e o coloca numa fila em memória. Uma thread daemon esvazia a fila em lotes:
+# um INSERT multi-linhas por lote, a cada AUDIT_FLUSH_INTERVAL segundos ou
+# quando juntar AUDIT_BATCH_SIZE registros, numa sessão do pool de background.
+# - Fila limitada (AUDIT_BUFFER_MAX): se encher (banco fora do ar/lento), quem
+#   chamou grava o próprio registro na hora, como era antes. Nada é descartado
+#   por falta de espaço.
+# - Lote recusado por erro de dado (FK de usuário apagado, NOT NULL...) é
+#   regravado linha a linha, cada uma na sua transação: só a linha ruim é
+#   descartada, as outras 199 do lote entram.
+# - Lote que falha por outro motivo (banco fora do ar) volta a ser tentado no
+#   próximo ciclo, até AUDIT_MAX_TENTATIVAS; depois é descartado com log de erro.
+# - parar() (shutdown do FastAPI) esvazia o que sobrou antes de sair.
+#
+# Retenção: limpar_antigos() apaga em lotes os registros com mais de
+# AUDIT_RETENCAO_DIAS (job diário do scheduler), para a tabela não crescer sem
+# limite e o get_audit_logs (COUNT + ORDER BY created_at) continuar rápido.
+
+AUDIT_BUFFER_MAX = int(os.getenv("AUDIT_BUFFER_MAX", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2"))
+AUDIT_MAX_TENTATIVAS = int(os.getenv("AUDIT_MAX_TENTATIVAS", "3"))
+AUDIT_RETENCAO_DIAS = int(os.getenv("AUDIT_RETENCAO_DIAS", "180"))
+AUDIT_LIMPEZA_LOTE = int(os.getenv("AUDIT_LIMPEZA_LOTE", "5000"))
+
+_fila = queue.Queue(maxsize=AUDIT_BUFFER_MAX)
+_parar = threading.Event()
+_lock = threading.Lock()
+_thread = None
+
+metrics.instrumentar_fila_auditoria(_fila)
+eventos = metrics.audit_eventos
+
+# Erros em que repetir não adianta: o problema é a linha, não o banco
+_ERROS_DE_DADO = (IntegrityError, DataError)
+
+
+@usar_pool("background")
+def _gravar(lote: list):
+    db = SessionLocal()
+    try:
+        db.execute(insert(AuditLog.__table__), lote)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _gravar_sincrono(registro: dict):
+    """Fila cheia: grava na hora, no pool da requisição (comportamento antigo)."""
+    db = SessionLocal()
+    try:
+        db.execute(insert(AuditLog.__table__), [registro])
+        db.commit()
+        eventos.inc("sincrono")
+    except Exception as e:
+        db.rollback()
+        eventos.inc("descartado")
+        logger.error(f"❌ [AUDIT] Erro ao gravar log de auditoria (fila cheia): {e}")
+    finally:
+        db.close()
+
+
+def _drenar(limite: int) -> list:
+    lote = []
+    while len(lote) < limite:
+        try:
+            lote.append(_fila.get_nowait())
+        except queue.Empty:
+            break
+    return lote
+
+
+def _gravar_linha_a_linha(lote: list):
+    """
+    Lote recusado por erro de dado: grava cada registro na sua transação e
+    descarta só os que o banco rejeita. No primeiro erro de outro tipo (banco
+    fora do ar) para e devolve (restantes, erro) para a retentativa normal.
+    """
+    for i, registro in enumerate(lote):
+        try:
+            _gravar([registro])
+            eventos.inc("gravado")
+        except _ERROS_DE_DADO as e:
+            eventos.inc("descartado")
+            logger.error(
+                f"❌ [AUDIT] Log de auditoria descartado ({registro.get('action')} "
+                f"user_id={registro.get('user_id')}): {getattr(e, 'orig', e)}"
+            )
+        except Exception as e:
+            return lote[i:], e
+    return [], None
+
+
+def _descarregar(pendente: list, tentativas: int):
+    """Grava o lote; retorna (pendente, tentativas) para o próximo ciclo."""
+    try:
+        _gravar(pendente)
+        eventos.inc("gravado", valor=len(pendente))
+        return [], 0
+    except _ERROS_DE_DADO as e:
+        # Uma linha ruim derruba o INSERT do lote inteiro: separa a culpada
+        logger.warning(f"⚠️ [AUDIT] Lote de {len(pendente)} logs recusado ({getattr(e, 'orig', e)}). Gravando linha a linha...")
+        pendente, erro = _gravar_linha_a_linha(pendente)
+        if not pendente:
+            return [], 0
+    except Exception as e:
+        erro = e
+
+    tentativas += 1
+    if tentativas >= AUDIT_MAX_TENTATIVAS:
+        eventos.inc("descartado", valor=len(pendente))
+        logger.error(f"❌ [AUDIT] {len(pendente)} logs de auditoria descartados após {tentativas} tentativas: {erro}")
+        return [], 0
+    logger.warning(f"⚠️ [AUDIT] Falha ao gravar lote de {len(pendente)} logs (tentativa {tentativas}): {erro}")
+    return pendente, tentativas
+
+
+def _loop():
+    pendente, tentativas = [], 0
+    while not _parar.is_set():
+        if not pendente:
+            # Espera o primeiro registro e dá a janela para juntar o resto do lote
+            try:
+                pendente.append(_fila.get(timeout=AUDIT_FLUSH_INTERVAL))
+            except queue.Empty:
+                continue
+            limite = time.monotonic() + AUDIT_FLUSH_INTERVAL
+            while len(pendente) < AUDIT_BATCH_SIZE and not _parar.is_set():
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pendente.append(_fila.get(timeout=min(restante, 0.5)))
+                except queue.Empty:
+                    pass
+        else:
+            # Retentativa: espera um ciclo antes de bater no banco de novo
+            if _parar.wait(AUDIT_FLUSH_INTERVAL):
+                break
+        pendente, tentativas = _descarregar(pendente, tentativas)
+
+    # Encerrando: grava o que sobrou, sem esperar a janela
+    while True:
+        pendente += _drenar(AUDIT_BATCH_SIZE - len(pendente))
+        if not pendente:
+            break
+        pendente, tentativas = _descarregar(pendente, tentativas)
+
+
+def _garantir_writer():
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    with _lock:
+        if (_thread is None or not _thread.is_alive()) and not _parar.is_set():
+            _thread = threading.Thread(target=_loop, name="audit-writer", daemon=True)
+            _thread.start()
+
+
+def registrar(registro: dict):
+    """Enfileira um registro (colunas de audit_logs). Nunca levanta exceção."""
+    registro.setdefault("created_at", now_brazil())
+    if _parar.is_set():
+        _gravar_sincrono(registro)
+        return
+    _garantir_writer()
+    try:
+        _fila.put_nowait(registro)
+        eventos.inc("enfileirado")
+    except queue.Full:
+        _gravar_sincrono(registro)
+
+
+def parar(timeout: float = 10.0):
+    """Shutdown: para a thread depois de gravar o que está na fila."""
+    _parar.set()
+    thread = _thread
+    if thread is not None and thread.is_alive():
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"⚠️ [AUDIT] Writer não terminou em {timeout}s ({_fila.qsize()} logs na fila)")
+            return
+    # Writer nunca iniciado (ou já morto): grava o resto aqui mesmo
+    restante = _drenar(_fila.qsize() + 1)
+    for i in range(0, len(restante), AUDIT_BATCH_SIZE):
+        _descarregar(restante[i:i + AUDIT_BATCH_SIZE], AUDIT_MAX_TENTATIVAS - 1)
+    logger.info("✅ [AUDIT] Fila de auditoria gravada")
+
+
+def limpar_antigos(dias: int = None) -> int:
+    """Apaga (em lotes) os logs com mais de `dias` (padrão AUDIT_RETENCAO_DIAS)."""
+    dias = AUDIT_RETENCAO_DIAS if dias is None else dias
+    if dias <= 0:
+        return 0
+    corte = now_brazil().replace(tzinfo=None) - timedelta(days=dias)
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            ids = select(AuditLog.id).where(AuditLog.created_at < corte).limit(AUDIT_LIMPEZA_LOTE).scalar_subquery()
+            apagados = db.execute(delete(AuditLog).where(AuditLog.id.in_(ids)).execution_options(synchronize_session=False)).rowcount
+            db.commit()
+            total += apagados or 0
+            if not apagados or apagados < AUDIT_LIMPEZA_LOTE:
+                break
+        if total:
+            logger.info(f"🧹 [AUDIT] {total} logs de auditoria com mais de {dias} dias removidos")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [AUDIT] Erro na limpeza de logs antigos: {e}")
+    finally:
+        db.close()
+    return total
@@ -0,0 +1,220 @@
+import os
+import hmac
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import telebot
+
+from database import (
+    SessionLocal, Bot, BotSetupState, BotGroup, CanalFreeConfig, LaunchStrategyConfig, now_brazil
+)
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# ⚙️ RECONCILIAÇÃO DA CONFIGURAÇÃO DOS BOTS NO TELEGRAM
+# =========================================================
+# O menu de comandos era reenviado ao Telegram em uma thread nova a cada /start.
+# Agora o que foi aplicado fica em BotSetupState e só chamamos a API quando
+# o estado desejado muda: criação/edição do bot ou sync no startup.
+
+MENU_COMANDOS = [
+    ("start", "🚀 Iniciar"),
+    ("suporte", "💬 Falar com Suporte"),
+    ("status", "⭐ Minha Assinatura"),
+    ("denunciar", "🚨 Fazer Denúncia"),
+]
+
+SYNC_MAX_WORKERS = 8
+
+# =========================================================
+# 🔗 WEBHOOK: URL, ALLOWED_UPDATES, MAX_CONNECTIONS E SECRET
+# =========================================================
+# Conexões simultâneas que o Telegram abre por bot. O padrão do Telegram (40)
+# é alto demais para um pool de 15 conexões no banco compartilhado por todos.
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "20"))
+
+# Segredo mestre para derivar o secret_token de cada bot (HMAC do token)
+_WEBHOOK_SECRET_MESTRE = (
+    os.getenv("TELEGRAM_WEBHOOK_SECRET")
+    or os.getenv("SECRET_KEY", "zenyx-secret-key-change-in-production-2026")
+)
+
+# Enquanto houver bots registrados sem secret, aceitamos update sem o header.
+# Depois do resync completo, ligue WEBHOOK_SECRET_OBRIGATORIO=true.
+WEBHOOK_SECRET_OBRIGATORIO = os.getenv("WEBHOOK_SECRET_OBRIGATORIO", "false").lower() == "true"
+
+
+def montar_webhook_url(token: str) -> str:
+    """URL pública do webhook do bot (domínio do Railway sem protocolo/barra)."""
+    public_url = os.getenv("RAILWAY_PUBLIC_DOMAIN", "https://zenyx-gbs-testesv1-production.up.railway.app")
+    public_url = public_url.replace("https://", "").replace("http://", "").strip("/")
+    return f"https://{public_url}/webhook/{token}"
+
+
+def secret_token_do_bot(token: str) -> str:
+    """secret_token determinístico por bot (apenas [0-9a-f], aceito pelo Telegram)."""
+    return hmac.new(_WEBHOOK_SECRET_MESTRE.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def secret_valido(token: str, header_secret: str) -> bool:
+    """
+    Confere o header X-Telegram-Bot-Api-Secret-Token SEM tocar no banco.
+    Header ausente só é aceito enquanto WEBHOOK_SECRET_OBRIGATORIO estiver desligado.
+    """
+    if not header_secret:
+        return not WEBHOOK_SECRET_OBRIGATORIO
+    return hmac.compare_digest(header_secret, secret_token_do_bot(token))
+
+
+def allowed_updates_do_bot(db, bot) -> list:
+    """
+    Tipos de update que o bot realmente usa. Mensagens e cliques sempre;
+    chat_join_request só se o bot aprova entradas (VIP, canal free, lançamento, grupos).
+    """
+    tipos = ["message", "callback_query"]
+
+    usa_join_request = bool(bot.id_canal_vip)
+    if not usa_join_request:
+        usa_join_request = db.query(CanalFreeConfig.id).filter(
+            CanalFreeConfig.bot_id == bot.id, CanalFreeConfig.is_active == True
+        ).first() is not None
+    if not usa_join_request:
+        usa_join_request = db.query(LaunchStrategyConfig.id).filter(
+            LaunchStrategyConfig.bot_id == bot.id, LaunchStrategyConfig.ativo == True
+        ).first() is not None
+    if not usa_join_request:
+        usa_join_request = db.query(BotGroup.id).filter(BotGroup.bot_id == bot.id).first() is not None
+
+    if usa_join_request:
+        tipos.append("chat_join_request")
+    return tipos
+
+
+def reconciliar_webhook_bot(db, bot, forcar: bool = False) -> bool:
+    """
+    Garante webhook com URL, allowed_updates mínimos, max_connections e secret_token.
+    Só chama o Telegram se URL/allowed_updates salvos divergirem (ou forcar=True).
+    Faz commit na sessão recebida. Retorna True se chamou a API.
+    """
+    if not bot or not bot.token:
+        return False
+
+    url = montar_webhook_url(bot.token)
+    tipos = json.dumps(allowed_updates_do_bot(db, bot))
+    estado = obter_estado(db, bot.id)
+    if not forcar and estado.webhook_url == url and estado.allowed_updates == tipos:
+        return False
+
+    try:
+        tb = telebot.TeleBot(bot.token, threaded=False)
+        tb.set_webhook(
+            url=url,
+            allowed_updates=json.loads(tipos),
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            secret_token=secret_token_do_bot(bot.token)
+        )
+        estado.webhook_url = url
+        estado.allowed_updates = tipos
+        estado.updated_at = now_brazil()
+        db.commit()
+        logger.info(f"🔗 Webhook do bot {bot.id} configurado ({tipos})")
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Erro ao configurar webhook do bot {bot.id}: {e}")
+        return False
+
+
+def hash_comandos(token: str) -> str:
+    """Hash do menu desejado para ESTE token (trocar o token exige reaplicar)."""
+    bruto = token + "|" + "|".join(f"{c}={d}" for c, d in MENU_COMANDOS)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def obter_estado(db, bot_id: int) -> BotSetupState:
+    """Retorna (criando se preciso) o registro de estado do bot."""
+    estado = db.query(BotSetupState).filter(BotSetupState.bot_id == bot_id).first()
+    if not estado:
+        estado = BotSetupState(bot_id=bot_id)
+        db.add(estado)
+    return estado
+
+
+def aplicar_menu_comandos(token: str):
+    """Chama set_my_commands no Telegram (levanta exceção em caso de erro)."""
+    tb = telebot.TeleBot(token, threaded=False)
+    tb.set_my_commands([telebot.types.BotCommand(c, d) for c, d in MENU_COMANDOS])
+
+
+def reconciliar_menu_bot(db, bot, forcar: bool = False) -> bool:
+    """
+    Garante que o menu de comandos do bot está aplicado.
+    Só chama o Telegram se o hash salvo for diferente do desejado (ou se forcar=True).
+    Faz commit na sessão recebida. Retorna True se chamou a API.
+    """
+    if not bot or not bot.token:
+        return False
+
+    desejado = hash_comandos(bot.token)
+    estado = obter_estado(db, bot.id)
+    if not forcar and estado.commands_hash == desejado:
+        return False
+
+    try:
+        aplicar_menu_comandos(bot.token)
+        estado.commands_hash = desejado
+        estado.updated_at = now_brazil()
+        db.commit()
+        logger.info(f"✅ Menu de comandos configurado para o bot {bot.id}")
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Erro ao configurar menu do bot {bot.id}: {e}")
+        return False
+
+
+def _reconciliar_bot_id(bot_id: int, forcar: bool = False) -> tuple:
+    db = SessionLocal()
+    try:
+        bot = db.query(Bot).filter(Bot.id == bot_id).first()
+        menu = reconciliar_menu_bot(db, bot, forcar=forcar)
+        webhook = reconciliar_webhook_bot(db, bot, forcar=forcar)
+        return menu, webhook
+    except Exception as e:
+        logger.error(f"❌ [SETUP BOTS] Erro ao reconciliar bot {bot_id}: {e}")
+        return False, False
+    finally:
+        db.close()
+
+
+def sincronizar_setup_bots(forcar: bool = False) -> dict:
+    """
+    Reconcilia menu e webhook de todos os bots ativos, em paralelo.
+    Usado no startup (forcar=False: só quem divergiu chama o Telegram) e pelo
+    superadmin (forcar=True: reaplica tudo, ex: após trocar o domínio ou o segredo).
+    """
+    db = SessionLocal()
+    try:
+        bot_ids = [
+            bot_id for (bot_id,) in db.query(Bot.id).filter(Bot.status == "ativo", Bot.token.isnot(None)).all()
+        ]
+    finally:
+        db.close()
+
+    if not bot_ids:
+        return {"bots": 0, "menus": 0, "webhooks": 0}
+
+    logger.info(f"⚙️ [SETUP BOTS] Reconciliando {len(bot_ids)} bots (forcar={forcar})...")
+    with ThreadPoolExecutor(max_workers=SYNC_MAX_WORKERS, thread_name_prefix="zenyx-setup") as pool:
+        resultados = list(pool.map(lambda bid: _reconciliar_bot_id(bid, forcar), bot_ids))
+
+    resumo = {
+        "bots": len(bot_ids),
+        "menus": sum(1 for menu, _ in resultados if menu),
+        "webhooks": sum(1 for _, webhook in resultados if webhook),
+    }
+    logger.info(f"✅ [SETUP BOTS] Concluído: {resumo}")
+    return resumo
@@ -0,0 +1,171 @@
+import html
+import logging
+import threading
+
+from sqlalchemy import func, or_, case, literal, text
+
+from database import JornadaContato
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 🔎 BUSCA DE CONTATOS (NOME, @USERNAME, TELEGRAM ID)
+# =========================================================
+# Buscar um contato significava carregar todos os leads/pedidos dos bots
+# (get_contacts, listar_leads) e filtrar na tela.
+#
+# A busca roda numa única query sobre a projeção jornada_contatos (jornada.py),
+# que já tem uma linha por (bot, contato) juntando leads e pedidos:
+# - Postgres: índices GIN de trigramas (pg_trgm, migração V12) atendem
+#   LIKE '%termo%' e o operador de similaridade (%), que tolera erro de
+#   digitação; o ranking é pela maior similarity() entre os três campos.
+# - SQLite (local): LIKE 'termo%' por prefixo, que usa os índices NOCASE;
+#   ranking: igual > começa com > resto.
+# - Postgres sem pg_trgm (CREATE EXTENSION sem permissão: a migração V12
+#   falha e similarity() não existe): mesma busca por prefixo, com lower().
+#   A presença da extensão é consultada uma vez por processo.
+#
+# Os destaques (<mark>) são montados em Python só para os contatos retornados.
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+_trgm = None   # pg_trgm instalado? (None = ainda não consultado)
+_trgm_lock = threading.Lock()
+
+
+def _normalizar(termo: str) -> str:
+    return (termo or "").strip().lstrip("@").lower()
+
+
+def _escapar_like(termo: str) -> str:
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _query_postgres(query, termo: str):
+    nome = func.lower(JornadaContato.first_name)
+    usuario = func.lower(JornadaContato.username)
+    contem = f"%{_escapar_like(termo)}%"
+    score = func.greatest(
+        func.coalesce(func.similarity(nome, termo), 0),
+        func.coalesce(func.similarity(usuario, termo), 0),
+        case((JornadaContato.telegram_id == termo, 1.0), else_=0.0),
+    )
+    query = query.filter(or_(
+        nome.like(contem, escape="\\"),
+        usuario.like(contem, escape="\\"),
+        JornadaContato.telegram_id.like(contem, escape="\\"),
+        nome.op("%")(termo),
+        usuario.op("%")(termo),
+    ))
+    return query, score
+
+
+def _tem_trgm(db) -> bool:
+    global _trgm
+    if _trgm is None:
+        with _trgm_lock:
+            if _trgm is None:
+                try:
+                    _trgm = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+                except Exception as e:
+                    logger.error(f"❌ [BUSCA] Falha ao consultar pg_extension: {e}")
+                    db.rollback()
+                    return False
+                if not _trgm:
+                    logger.warning("⚠️ [BUSCA] pg_trgm não instalado. Busca de contatos por prefixo.")
+    return _trgm
+
+
+def _query_prefixo(query, termo: str, minusculo: bool = False):
+    prefixo = f"{_escapar_like(termo)}%"
+    campos = (JornadaContato.first_name, JornadaContato.username, JornadaContato.telegram_id)
+    if minusculo:
+        # Postgres: LIKE diferencia maiúsculas (no SQLite é o índice NOCASE)
+        campos = tuple(func.lower(c) for c in campos)
+    query = query.filter(or_(*[c.like(prefixo, escape="\\") for c in campos]))
+    score = case(
+        (or_(*[func.lower(c) == termo for c in campos]), 1.0),
+        else_=literal(0.5),
+    )
+    return query, score
+
+
+def _destacar(valor, termo: str):
+    """Valor com as ocorrências do termo entre <mark> (HTML escapado), ou None se não casar."""
+    if not valor:
+        return None
+    texto = str(valor)
+    minusculo = texto.lower()
+    pos = minusculo.find(termo)
+    if pos < 0:
+        return None
+    partes, inicio = [], 0
+    while pos >= 0:
+        partes.append(html.escape(texto[inicio:pos]))
+        partes.append(f"<mark>{html.escape(texto[pos:pos + len(termo)])}</mark>")
+        inicio = pos + len(termo)
+        pos = minusculo.find(termo, inicio)
+    partes.append(html.escape(texto[inicio:]))
+    return "".join(partes)
+
+
+def buscar(db, bot_ids: list, termo: str, limite: int = LIMITE_PADRAO) -> list:
+    """Melhores contatos para o termo nos bots informados, com destaques."""
+    termo = _normalizar(termo)
+    if not termo or not bot_ids:
+        return []
+    limite = max(1, min(int(limite or LIMITE_PADRAO), LIMITE_MAXIMO))
+
+    query = db.query(JornadaContato).filter(JornadaContato.bot_id.in_(bot_ids))
+    if db.get_bind().dialect.name == "postgresql":
+        if _tem_trgm(db):
+            query, score = _query_postgres(query, termo)
+        else:
+            query, score = _query_prefixo(query, termo, minusculo=True)
+    else:
+        query, score = _query_prefixo(query, termo)
+
+    linhas = query.add_columns(score.label("score")).order_by(
+        score.desc(), JornadaContato.primeiro_contato.desc().nulls_last(), JornadaContato.id.desc()
+    ).limit(limite).all()
+
+    resultado = []
+    for contato, relevancia in linhas:
+        destaques = {
+            campo: marcado for campo, marcado in (
+                ("first_name", _destacar(contato.first_name, termo)),
+                ("username", _destacar(contato.username, termo)),
+                ("telegram_id", _destacar(contato.telegram_id, termo)),
+            ) if marcado
+        }
+        resultado.append({
+            "bot_id": contato.bot_id,
+            "telegram_id": contato.telegram_id,
+            "first_name": contato.first_name or "Sem nome",
+            "username": contato.username,
+            "status": contato.status,
+            "total_gasto": float(contato.total_gasto or 0),
+            "primeiro_contato": contato.primeiro_contato.isoformat() if contato.primeiro_contato else None,
+            "score": round(float(relevancia or 0), 3),
+            "destaques": destaques,
+        })
+    return resultado
+
+
+def resolver_destinatario(db, bot_id: int, termo: str):
+    """
+    Telegram ID do contato para um envio individual a partir do termo buscado.
+    Retorna (telegram_id, candidatos): telegram_id só quando o termo é o ID ou
+    o @username exato de um único contato. Busca por nome, mesmo com um só
+    resultado, não resolve sozinha: quem chamou confirma na lista de candidatos.
+    """
+    candidatos = buscar(db, [bot_id], termo, limite=10)
+    termo = _normalizar(termo)
+    exatos = [
+        c for c in candidatos
+        if c["telegram_id"] == termo or (c["username"] or "").lower() == termo
+    ]
+    if len(exatos) == 1:
+        return exatos[0]["telegram_id"], candidatos
+    return None, candidatos
@@ -0,0 +1,142 @@
+import os
+import time
+import logging
+import threading
+import functools
+
+import invalidacao
+import metrics
+from database import Bot
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 🧊 CACHE CURTO DE RESPOSTAS DO DASHBOARD (POR USUÁRIO)
+# =========================================================
+# O dashboard React faz polling das rotas de estatísticas o dia todo e cada
+# chamada recalculava tudo do zero. Aqui a resposta fica guardada por alguns
+# segundos, com chave (usuário, endpoint, parâmetros).
+#
+# - Coalescência: requests idênticos e simultâneos esperam o primeiro terminar
+#   e recebem o mesmo resultado, em vez de rodar N vezes as mesmas queries.
+# - Invalidação dirigida: quando uma venda de um bot é aprovada chamamos
+#   invalidar_usuario(owner_id). O evento passa pelo barramento do
+#   invalidacao.py (chega às outras réplicas por NOTIFY) e muda a geração
+#   ("dashboard", owner_id); as entradas desse usuário deixam de valer na hora.
+#   Superadmin enxerga todos os bots, então suas entradas dependem da geração
+#   global da entidade (qualquer venda aprovada invalida).
+#
+# Só para rotas síncronas com `current_user` e `db` como dependências.
+
+ENTIDADE = "dashboard"
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "20"))
+DASHBOARD_CACHE_MAX = int(os.getenv("DASHBOARD_CACHE_MAX", "5000"))
+
+# Dependências injetadas pelo FastAPI que não fazem parte da chave
+_IGNORADOS = ("db", "current_user")
+
+_entradas = {}   # {chave: (expira_em, geracao, valor)}
+_em_voo = {}     # {chave: _Voo}
+_lock = threading.Lock()
+
+
+class _Voo:
+    """Cálculo em andamento para uma chave; os demais requests esperam o evento."""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.ok = False
+
+
+def _geracao_usuario(usuario) -> int:
+    if getattr(usuario, "is_superuser", False):
+        return invalidacao.geracao(ENTIDADE)
+    return invalidacao.geracao(ENTIDADE, usuario.id)
+
+
+def _podar(agora: float):
+    """Remove entradas vencidas quando o dicionário passa do limite (chamado com _lock)."""
+    if len(_entradas) < DASHBOARD_CACHE_MAX:
+        return
+    for chave in [c for c, (expira, _, _) in _entradas.items() if expira <= agora]:
+        del _entradas[chave]
+    if len(_entradas) >= DASHBOARD_CACHE_MAX:
+        _entradas.clear()
+
+
+def cache_por_usuario(endpoint: str, ttl: float = None):
+    """Decorator: guarda a resposta da rota por `ttl` segundos por (usuário, parâmetros)."""
+    ttl = DASHBOARD_CACHE_TTL if ttl is None else ttl
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            usuario = kwargs.get("current_user")
+            if ttl <= 0 or usuario is None or args:
+                return func(*args, **kwargs)
+
+            params = tuple(sorted((k, v) for k, v in kwargs.items() if k not in _IGNORADOS))
+            chave = (usuario.id, endpoint, params)
+            geracao = _geracao_usuario(usuario)
+
+            with _lock:
+                agora = time.monotonic()
+                entrada = _entradas.get(chave)
+                if entrada and entrada[0] > agora and entrada[1] == geracao:
+                    metrics.cache_respostas.inc(endpoint, "hit")
+                    return entrada[2]
+                voo = _em_voo.get(chave)
+                lider = voo is None
+                if lider:
+                    voo = _em_voo[chave] = _Voo()
+
+            if not lider:
+                voo.evento.wait()
+                if voo.ok:
+                    metrics.cache_respostas.inc(endpoint, "coalesced")
+                    return voo.valor
+                # O primeiro falhou: cada um tenta por conta própria
+                return func(*args, **kwargs)
+
+            metrics.cache_respostas.inc(endpoint, "miss")
+            try:
+                valor = func(*args, **kwargs)
+                voo.valor, voo.ok = valor, True
+                with _lock:
+                    # Se uma venda foi aprovada durante o cálculo, não guarda o resultado
+                    if _geracao_usuario(usuario) == geracao:
+                        agora = time.monotonic()
+                        _podar(agora)
+                        _entradas[chave] = (agora + ttl, geracao, valor)
+                return valor
+            finally:
+                with _lock:
+                    _em_voo.pop(chave, None)
+                voo.evento.set()
+
+        return wrapper
+
+    return decorator
+
+
+def invalidar_usuario(owner_id):
+    """Invalida o dashboard do dono do bot (e o do superadmin) em todas as réplicas."""
+    if owner_id is None:
+        return
+    try:
+        invalidacao.publicar(ENTIDADE, owner_id)
+    except Exception as e:
+        logger.error(f"❌ [CACHE DASHBOARD] Falha ao invalidar usuário {owner_id}: {e}")
+
+
+def invalidar_dono_do_bot(db, bot_id):
+    """Atalho para os pontos de aprovação de venda, que só têm o bot_id do pedido."""
+    if not bot_id:
+        return
+    try:
+        dono = db.query(Bot.owner_id).filter(Bot.id == bot_id).scalar()
+    except Exception as e:
+        logger.error(f"❌ [CACHE DASHBOARD] Falha ao buscar dono do bot {bot_id}: {e}")
+        return
+    invalidar_usuario(dono)
@@ -0,0 +1,392 @@
+import os
+import json
+import time
+import socket
+import select
+import asyncio
+import logging
+import functools
+import threading
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from database import engine, SessionLocal, TarefaAgendada, now_brazil
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 🌐 MODO CLUSTER: COORDENAÇÃO ENTRE RÉPLICAS VIA POSTGRES
+# =========================================================
+# Todo o estado de agendamento vive no processo (scheduler em memória,
+# remarketing_timers, alternating_tasks). Com duas réplicas ou vários workers
+# do uvicorn, cada job periódico roda N vezes e um cancelamento feito na
+# réplica que recebeu o webhook de pagamento não chega à réplica que tem a
+# task do usuário. Com CLUSTER_MODE=true (só Postgres):
+#
+#   - Liderança: uma conexão dedicada segura pg_try_advisory_lock. Só a réplica
+#     líder roda os jobs decorados com @somente_lider. Se ela cair, o Postgres
+#     solta o lock e outra assume em até COORD_INTERVALO segundos.
+#   - Tarefas por usuário (disparo de remarketing) vão para a tabela
+#     tarefas_agendadas. Todas as réplicas consultam a fila e reivindicam o que
+#     venceu com FOR UPDATE SKIP LOCKED, sem executar duas vezes.
+#   - Cancelamentos (usuário pagou) viram UPDATE na fila + NOTIFY. Cada réplica
+#     escuta o canal (LISTEN) e cancela as tasks locais daquele chat.
+#
+# Sem CLUSTER_MODE tudo se comporta como antes: esta réplica é sempre líder e
+# nada passa pela fila.
+#
+# A mesma conexão dedicada também escuta os canais registrados com escutar()
+# (barramento de invalidação de cache), esses sim ativos em qualquer Postgres.
+
+CLUSTER_MODE = os.getenv("CLUSTER_MODE", "false").lower() == "true"
+REPLICA_ID = os.getenv("REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}"
+COORD_INTERVALO = float(os.getenv("COORD_INTERVALO", "5"))
+CANAL_CANCELAMENTOS = "zenyx_cancelamentos"
+
+# Advisory lock de liderança na forma (int4, int4). O ledger de migrações usa a
+# forma bigint; no Postgres os dois espaços de chaves não se sobrepõem.
+_NAMESPACE_LOCK = 0x5A43
+_CHAVE_LIDER = 1
+
+# Tarefa presa em "executando" por mais que isso = réplica morreu no meio
+TAREFA_TIMEOUT_MIN = int(os.getenv("TAREFA_TIMEOUT_MIN", "10"))
+
+_estado = {"lider": False, "conectado": False, "desde": None}
+_executores = {}          # {tipo: func(payload)}
+_ao_cancelar = []         # [func(chat_id)] — cancelamento local
+_canais_extras = {}       # {canal: func(payload)} — ex: invalidacao.py
+_loop = None
+_thread = None
+_parar = threading.Event()
+
+
+def ativo() -> bool:
+    return CLUSTER_MODE and engine.dialect.name == "postgresql"
+
+
+def usa_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def eh_lider() -> bool:
+    """Fora do modo cluster a réplica é sempre líder."""
+    return _estado["lider"] if ativo() else True
+
+
+# =========================================================
+# 👑 JOBS SÓ NO LÍDER
+# =========================================================
+def somente_lider(nome: str):
+    """
+    Decorator para jobs do scheduler que não podem rodar em paralelo em
+    várias réplicas (vencimentos, polling de gateway, retry de webhooks...).
+    Nas réplicas que não são líder a execução vira no-op.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper_async(*args, **kwargs):
+                if not eh_lider():
+                    logger.debug(f"👑 [CLUSTER] {nome} ignorado: réplica {REPLICA_ID} não é líder")
+                    return None
+                return await func(*args, **kwargs)
+            return wrapper_async
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not eh_lider():
+                logger.debug(f"👑 [CLUSTER] {nome} ignorado: réplica {REPLICA_ID} não é líder")
+                return None
+            return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# =========================================================
+# 📡 CONEXÃO DEDICADA: LIDERANÇA + LISTEN
+# =========================================================
+def _dsn() -> str:
+    # psycopg2 não entende "postgresql+psycopg2://"
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def _canais() -> dict:
+    canais = dict(_canais_extras)
+    if ativo():
+        canais[CANAL_CANCELAMENTOS] = _despachar
+    return canais
+
+
+def escutar(canal: str, handler):
+    """
+    Registra um canal extra de NOTIFY na conexão dedicada (chamar antes do
+    startup). O handler recebe o payload na thread de coordenação, ou None
+    após uma reconexão (eventos podem ter sido perdidos no intervalo).
+    """
+    _canais_extras[canal] = handler
+
+
+def _conectar():
+    import psycopg2
+    conn = psycopg2.connect(_dsn())
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        for canal in _canais():
+            cur.execute(f"LISTEN {canal}")
+    return conn
+
+
+def _tentar_lideranca(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (_NAMESPACE_LOCK, _CHAVE_LIDER))
+        if cur.fetchone()[0]:
+            _estado["lider"] = True
+            _estado["desde"] = time.time()
+            logger.info(f"👑 [CLUSTER] Réplica {REPLICA_ID} assumiu a liderança")
+
+
+def _despachar(payload: str):
+    try:
+        dados = json.loads(payload)
+    except ValueError:
+        return
+    if dados.get("origem") == REPLICA_ID:
+        return  # Já cancelado localmente por quem publicou
+    chat_id = dados.get("chat_id")
+    if chat_id is None or _loop is None:
+        return
+    for handler in _ao_cancelar:
+        # Tasks asyncio só podem ser canceladas de dentro do event loop
+        _loop.call_soon_threadsafe(handler, chat_id)
+
+
+def _loop_coordenador():
+    conn = None
+    canais = _canais()
+    reconexao = False
+    while not _parar.is_set():
+        try:
+            if conn is None:
+                conn = _conectar()
+                _estado["conectado"] = True
+                logger.info(f"📡 [CLUSTER] Réplica {REPLICA_ID} escutando {sorted(canais)}")
+                if reconexao:
+                    for handler in _canais_extras.values():
+                        handler(None)
+                reconexao = True
+
+            if ativo() and not _estado["lider"]:
+                _tentar_lideranca(conn)
+
+            if select.select([conn], [], [], COORD_INTERVALO) != ([], [], []):
+                conn.poll()
+                while conn.notifies:
+                    notificacao = conn.notifies.pop(0)
+                    handler = canais.get(notificacao.channel)
+                    if handler is not None:
+                        try:
+                            handler(notificacao.payload)
+                        except Exception as e:
+                            logger.error(f"❌ [CLUSTER] Erro ao tratar NOTIFY em '{notificacao.channel}': {e}")
+            else:
+                # Sem notificações: confirma que a conexão (e o lock) seguem vivos
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+        except Exception as e:
+            if _estado["lider"]:
+                logger.warning(f"👑 [CLUSTER] Liderança perdida em {REPLICA_ID}: {e}")
+            else:
+                logger.warning(f"📡 [CLUSTER] Conexão de coordenação falhou: {e}")
+            _estado.update({"lider": False, "conectado": False, "desde": None})
+            try:
+                if conn is not None:
+                    conn.close()
+            except Exception:
+                pass
+            conn = None
+            _parar.wait(COORD_INTERVALO)
+
+    if conn is not None:
+        try:
+            conn.close()  # Fecha a sessão: o Postgres solta o lock de liderança
+        except Exception:
+            pass
+    _estado.update({"lider": False, "conectado": False, "desde": None})
+
+
+def iniciar(loop=None):
+    """
+    Sobe a thread de coordenação (startup). Só roda no Postgres e quando há
+    o que fazer: modo cluster ou algum canal extra (barramento de invalidação).
+    """
+    global _thread, _loop
+    if not usa_postgres() or not _canais():
+        return
+    _loop = loop or asyncio.get_event_loop()
+    if _thread is not None and _thread.is_alive():
+        return
+    _parar.clear()
+    _thread = threading.Thread(target=_loop_coordenador, name="zenyx-coordenacao", daemon=True)
+    _thread.start()
+
+
+def parar():
+    """Para a thread e libera a liderança para outra réplica (shutdown)."""
+    _parar.set()
+    if _thread is not None:
+        _thread.join(timeout=COORD_INTERVALO + 1)
+
+
+def status() -> dict:
+    return {
+        "cluster_mode": ativo(),
+        "replica": REPLICA_ID,
+        "lider": eh_lider(),
+        "lider_desde": _estado["desde"],
+        "conectado": _estado["conectado"],
+    }
+
+
+# =========================================================
+# 🛑 CANCELAMENTOS ENTRE RÉPLICAS
+# =========================================================
+def ao_cancelar(handler):
+    """Registra a função que cancela as tasks LOCAIS de um chat (não deve propagar)."""
+    _ao_cancelar.append(handler)
+    return handler
+
+
+def propagar_cancelamento(chat_id: int):
+    """
+    Cancela as tarefas duráveis do chat e avisa as outras réplicas para
+    cancelarem as tasks locais. Chamar depois do cancelamento local.
+    """
+    if not ativo():
+        return
+    cancelar_tarefas(f"remarketing:{chat_id}")
+    try:
+        payload = json.dumps({"chat_id": chat_id, "origem": REPLICA_ID})
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": CANAL_CANCELAMENTOS, "payload": payload})
+            conn.commit()
+    except Exception as e:
+        logger.error(f"❌ [CLUSTER] Falha ao publicar cancelamento de {chat_id}: {e}")
+
+
+# =========================================================
+# 🗂️ FILA DURÁVEL (FOR UPDATE SKIP LOCKED)
+# =========================================================
+def registrar_executor(tipo: str):
+    """Decorator: função (sync ou async) que executa o payload de um tipo de tarefa."""
+    def decorator(func):
+        _executores[tipo] = func
+        return func
+    return decorator
+
+
+def agendar_tarefa(tipo: str, chave: str, payload: dict, executar_em):
+    """Agenda a tarefa substituindo qualquer pendente com a mesma chave."""
+    db = SessionLocal()
+    try:
+        db.query(TarefaAgendada).filter(
+            TarefaAgendada.chave == chave,
+            TarefaAgendada.status == 'pendente'
+        ).update({"status": "cancelada"}, synchronize_session=False)
+        db.add(TarefaAgendada(tipo=tipo, chave=chave, payload=payload, executar_em=executar_em))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def cancelar_tarefas(chave: str) -> int:
+    db = SessionLocal()
+    try:
+        total = db.query(TarefaAgendada).filter(
+            TarefaAgendada.chave == chave,
+            TarefaAgendada.status == 'pendente'
+        ).update({"status": "cancelada"}, synchronize_session=False)
+        db.commit()
+        return total
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [CLUSTER] Erro ao cancelar tarefas '{chave}': {e}")
+        return 0
+    finally:
+        db.close()
+
+
+def _reivindicar(limite: int) -> list:
+    """Marca até `limite` tarefas vencidas como desta réplica. Outras réplicas pulam as linhas travadas."""
+    db = SessionLocal()
+    try:
+        agora = now_brazil()
+        # Réplica que morreu no meio da execução: não reenviamos (evita duplicar mensagem)
+        db.query(TarefaAgendada).filter(
+            TarefaAgendada.status == 'executando',
+            TarefaAgendada.updated_at < agora - timedelta(minutes=TAREFA_TIMEOUT_MIN)
+        ).update({"status": "erro", "ultimo_erro": "Abandonada (réplica parou durante a execução)"}, synchronize_session=False)
+
+        consulta = db.query(TarefaAgendada).filter(
+            TarefaAgendada.status == 'pendente',
+            TarefaAgendada.executar_em <= agora
+        ).order_by(TarefaAgendada.executar_em).limit(limite)
+        if engine.dialect.name == "postgresql":
+            consulta = consulta.with_for_update(skip_locked=True)
+        tarefas = consulta.all()
+
+        for tarefa in tarefas:
+            tarefa.status = 'executando'
+            tarefa.replica = REPLICA_ID
+        db.commit()
+        return [(t.id, t.tipo, t.payload or {}) for t in tarefas]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _finalizar(tarefa_id: int, status: str, erro: str = None):
+    db = SessionLocal()
+    try:
+        db.query(TarefaAgendada).filter(TarefaAgendada.id == tarefa_id).update(
+            {"status": status, "ultimo_erro": erro}, synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [CLUSTER] Erro ao finalizar tarefa {tarefa_id}: {e}")
+    finally:
+        db.close()
+
+
+async def processar_tarefas_vencidas(limite: int = 50):
+    """Job de todas as réplicas: reivindica e executa as tarefas que venceram."""
+    if not ativo():
+        return
+    try:
+        tarefas = _reivindicar(limite)
+    except Exception as e:
+        logger.error(f"❌ [CLUSTER] Erro ao reivindicar tarefas: {e}")
+        return
+
+    async def _executar(tarefa_id, tipo, payload):
+        executor = _executores.get(tipo)
+        if executor is None:
+            _finalizar(tarefa_id, "erro", f"Sem executor para '{tipo}'")
+            return
+        try:
+            resultado = executor(payload)
+            if asyncio.iscoroutine(resultado):
+                await resultado
+            _finalizar(tarefa_id, "concluida")
+        except Exception as e:
+            logger.error(f"❌ [CLUSTER] Tarefa {tarefa_id} ({tipo}) falhou: {e}")
+            _finalizar(tarefa_id, "erro", str(e)[:1000])
+
+    await asyncio.gather(*(_executar(*t) for t in tarefas))
@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON
+import asyncio
+import functools
+import contextvars
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, Session
 from sqlalchemy.pool import QueuePool
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -20,26 +23,129 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-if DATABASE_URL:
-    engine = create_engine(
-        DATABASE_URL,
+# =========================================================
+# 🏊 POOLS DE CONEXÃO SEPARADOS POR CARGA
+# =========================================================
+# Um único pool (5 + 10) era dividido entre webhooks do Telegram, webhooks de
+# pagamento, dashboards, jobs e remarketing em massa: um superadmin abrindo
+# estatísticas de "todo o período" segurava conexões até o webhook estourar o
+# pool_timeout. Agora cada carga tem o seu pool:
+#
+#   realtime   -> webhooks, checkout, painel do dono (engine / SessionLocal)
+#   background -> jobs do scheduler e disparos em massa
+#   analytics  -> relatórios pesados; vai para DATABASE_READ_URL se existir
+#
+# Tamanhos por env: DB_POOL_<CARGA>_SIZE / _OVERFLOW / _TIMEOUT.
+# No SQLite (local) as três cargas compartilham o mesmo engine.
+
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+
+# Relatório que passa disso é cancelado pelo Postgres em vez de segurar a conexão
+ANALYTICS_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_ANALYTICS_STATEMENT_TIMEOUT_MS", "30000"))
+
+
+def _criar_engine(url: str, carga: str, pool_size: int, max_overflow: int, pool_timeout: int, connect_args: dict = None):
+    return create_engine(
+        url,
         poolclass=QueuePool,
-        pool_size=5,            # 🔧 Railway: 5 conexões base
-        max_overflow=10,        # 🔧 Total máx: 15 conexões
-        pool_timeout=20,        # 🔧 Fail-fast em vez de travar
+        pool_size=int(os.getenv(f"DB_POOL_{carga.upper()}_SIZE", pool_size)),
+        max_overflow=int(os.getenv(f"DB_POOL_{carga.upper()}_OVERFLOW", max_overflow)),
+        pool_timeout=int(os.getenv(f"DB_POOL_{carga.upper()}_TIMEOUT", pool_timeout)),  # 🔧 Fail-fast em vez de travar
         pool_recycle=120,       # 🔧 REDUZIDO: De 180 para 120s (Railway dropa conexões idle rápido)
         pool_pre_ping=True,     # 🔧 CRÍTICO: Testa conexão antes de usar (evita "connection closed")
-        pool_reset_on_return='rollback'  # 🔧 NOVO: Garante reset limpo ao devolver conexão ao pool
+        pool_reset_on_return='rollback',  # 🔧 NOVO: Garante reset limpo ao devolver conexão ao pool
+        connect_args=connect_args or {},
+    )
+
+
+if DATABASE_URL and not DATABASE_URL.startswith("sqlite"):
+    # 🔧 Railway: realtime mantém o 5 + 10 de antes; os outros pools são extras
+    engine = _criar_engine(DATABASE_URL, "realtime", pool_size=5, max_overflow=10, pool_timeout=20)
+    engine_background = _criar_engine(DATABASE_URL, "background", pool_size=3, max_overflow=5, pool_timeout=30)
+    engine_analytics = _criar_engine(
+        DATABASE_READ_URL or DATABASE_URL, "analytics", pool_size=2, max_overflow=3, pool_timeout=10,
+        connect_args={"options": f"-c statement_timeout={ANALYTICS_STATEMENT_TIMEOUT_MS}"},
     )
 else:
-    engine = create_engine("sqlite:///./sql_app.db")
+    # SQLite local (ou o banco descartável do loadtest.py): um engine só
+    engine = create_engine(
+        DATABASE_URL or "sqlite:///./sql_app.db",
+        pool_size=int(os.getenv("DB_POOL_REALTIME_SIZE", 5)),
+        max_overflow=int(os.getenv("DB_POOL_REALTIME_OVERFLOW", 10)),
+    )
+    engine_background = engine
+    engine_analytics = engine
+
+ENGINES = {"realtime": engine, "background": engine_background, "analytics": engine_analytics}
+
+# Carga da execução atual. Jobs marcados com usar_pool("background") fazem o
+# SessionLocal() chamado lá dentro pegar conexão do pool de background.
+_carga_atual = contextvars.ContextVar("zenyx_carga_db", default="realtime")
+
+
+class SessaoRoteada(Session):
+    """Session que escolhe o engine pela carga do contexto (realtime/background)."""
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if _carga_atual.get() == "background":
+            return engine_background
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def usar_pool(carga: str):
+    """
+    Decorator para jobs: tudo que abrir SessionLocal() dentro da execução usa
+    o pool da carga indicada. Threads do thread_pool não herdam o contexto.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper_async(*args, **kwargs):
+                token = _carga_atual.set(carga)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _carga_atual.reset(token)
+            return wrapper_async
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _carga_atual.set(carga)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _carga_atual.reset(token)
+        return wrapper
+
+    return decorator
+
+
+SessionLocal = sessionmaker(class_=SessaoRoteada, autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+# Somente leitura: pode apontar para a réplica (DATABASE_READ_URL)
+SessionAnalytics = sessionmaker(autocommit=False, autoflush=False, bind=engine_analytics, expire_on_commit=False)
 Base = declarative_base()
 
 def init_db():
     Base.metadata.create_all(bind=engine)
 
+def get_db():
+    """Gera conexão com o banco de dados (dependency do FastAPI)"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_db_analytics():
+    """Dependency para relatórios pesados (somente leitura, pool/réplica de analytics)"""
+    db = SessionAnalytics()
+    try:
+        yield db
+    finally:
+        db.close()
+
 # =========================================================
 # 👤 USUÁRIOS
 # =========================================================
@@ -771,6 +877,12 @@ class AuditLog(Base):
     # Relacionamento
     user = relationship("User", back_populates="audit_logs")
 
+    # get_audit_logs: vendedor vê só os próprios logs, mais novos primeiro
+    __table_args__ = (
+        Index('ix_audit_logs_user_created', 'user_id', 'created_at'),
+        Index('ix_audit_logs_action_created', 'action', 'created_at'),
+    )
+
 # =========================================================
 # 🔔 NOTIFICAÇÕES REAIS (NOVA TABELA - ATUALIZAÇÃO)
 # =========================================================
@@ -790,6 +902,30 @@ class Notification(Base):
     # Relacionamento com Usuário
     user = relationship("User", back_populates="notifications")
 
+
+class NotificationBroadcast(Base):
+    """
+    Notificação enviada a todos os usuários, gravada uma única vez. Cada
+    usuário vê os broadcasts criados depois do seu cadastro; lido/não lido
+    vem do cursor em NotificationRead. Ver notificacoes.py.
+    """
+    __tablename__ = "notification_broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    type = Column(String, default="info")
+    criado_por = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=now_brazil, index=True)
+
+
+class NotificationRead(Base):
+    """Cursor de leitura dos broadcasts: tudo criado até last_read_at está lido."""
+    __tablename__ = "notification_reads"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_read_at = Column(DateTime, nullable=False)
+
 # =========================================================
 # 🎯 REMARKETING AUTOMÁTICO
 # =========================================================
@@ -1223,4 +1359,171 @@ class InviteCode(Base):
     used_at = Column(DateTime, nullable=True)
 
     def __repr__(self):
-        return f"<InviteCode(code='{self.code}', is_used={self.is_used})>"
\ No newline at end of file
+        return f"<InviteCode(code='{self.code}', is_used={self.is_used})>"
+# =========================================================
+# ⚙️ ESTADO DE CONFIGURAÇÃO DO BOT NO TELEGRAM
+# =========================================================
+class BotSetupState(Base):
+    """
+    Guarda o que já foi configurado no Telegram para cada bot (menu de comandos,
+    webhook, allowed_updates). Permite reconciliar só quando algo
+    mudou, em vez de chamar a API a cada /start.
+    """
+    __tablename__ = "bot_setup_state"
+    
+    bot_id = Column(Integer, ForeignKey('bots.id', ondelete='CASCADE'), primary_key=True)
+    commands_hash = Column(String(64), nullable=True)     # sha256(token + comandos)
+    webhook_url = Column(String, nullable=True)
+    allowed_updates = Column(Text, nullable=True)         # JSON: ["message", "callback_query", ...]
+    updated_at = Column(DateTime, default=now_brazil, onupdate=now_brazil)
+
+    def __repr__(self):
+        return f"<BotSetupState(bot_id={self.bot_id}, webhook='{self.webhook_url}')>"
+
+# =========================================================
+# 🗂️ TAREFAS AGENDADAS (MODO CLUSTER)
+# =========================================================
+class TarefaAgendada(Base):
+    """
+    Fila durável de tarefas por usuário (ex: disparo de remarketing) usada
+    quando há mais de uma réplica. Qualquer réplica pode reivindicar a tarefa
+    vencida com SELECT ... FOR UPDATE SKIP LOCKED; cancelar é um UPDATE.
+    """
+    __tablename__ = "tarefas_agendadas"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(50), nullable=False)                 # "remarketing"
+    chave = Column(String(120), nullable=False, index=True)   # "remarketing:<chat_id>"
+    payload = Column(JSON, nullable=True)
+    executar_em = Column(DateTime, nullable=False)
+    status = Column(String(20), default='pendente')           # pendente, executando, concluida, cancelada, erro
+    replica = Column(String(120), nullable=True)              # Quem reivindicou
+    ultimo_erro = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=now_brazil)
+    updated_at = Column(DateTime, default=now_brazil, onupdate=now_brazil)
+
+    __table_args__ = (
+        Index('ix_tarefas_agendadas_status_executar_em', 'status', 'executar_em'),
+    )
+
+    def __repr__(self):
+        return f"<TarefaAgendada(id={self.id}, tipo='{self.tipo}', chave='{self.chave}', status='{self.status}')>"
+
+# =========================================================
+# 🏆 RECEITA MENSAL POR DONO (RANKING E METAS PRIME)
+# =========================================================
+class ReceitaMensalDono(Base):
+    """
+    Resumo materializado das vendas aprovadas por dono de bot e mês
+    (mês de data_aprovacao). Incrementado a cada aprovação e reconciliado
+    periodicamente a partir dos pedidos; ver receita_dono.py.
+    """
+    __tablename__ = "receita_mensal_dono"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    ano = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    vendas = Column(Integer, default=0, nullable=False)
+    valor = Column(Float, default=0.0, nullable=False)       # Reais (soma de Pedido.valor)
+    atualizado_em = Column(DateTime, default=now_brazil, onupdate=now_brazil)
+
+    __table_args__ = (
+        Index('ux_receita_mensal_dono_owner_ano_mes', 'owner_id', 'ano', 'mes', unique=True),
+        Index('ix_receita_mensal_dono_ano_mes_valor', 'ano', 'mes', 'valor'),
+    )
+
+    def __repr__(self):
+        return f"<ReceitaMensalDono(owner_id={self.owner_id}, {self.mes:02d}/{self.ano}, vendas={self.vendas}, valor={self.valor})>"
+
+# =========================================================
+# 📈 SÉRIE TEMPORAL DOS LINKS DE TRACKING
+# =========================================================
+class TrackingSerie(Base):
+    """
+    Buckets por link de tracking: cliques, leads, vendas e faturamento por
+    hora e por dia (horário de Brasília). Preenchidos no /start e na aprovação
+    do pagamento; os gráficos leem só o intervalo pedido. Ver tracking_series.py.
+    """
+    __tablename__ = "tracking_series"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tracking_id = Column(Integer, ForeignKey("tracking_links.id", ondelete="CASCADE"), nullable=False)
+    granularidade = Column(String(4), nullable=False)         # "hora" ou "dia"
+    inicio = Column(DateTime, nullable=False)                 # Início do bucket
+    clicks = Column(Integer, default=0, nullable=False)
+    leads = Column(Integer, default=0, nullable=False)
+    vendas = Column(Integer, default=0, nullable=False)
+    faturamento = Column(Float, default=0.0, nullable=False)
+
+    __table_args__ = (
+        Index('ux_tracking_series_link_gran_inicio', 'tracking_id', 'granularidade', 'inicio', unique=True),
+    )
+
+    def __repr__(self):
+        return f"<TrackingSerie(tracking_id={self.tracking_id}, {self.granularidade} {self.inicio}, vendas={self.vendas})>"
+
+
+# =========================================================
+# 🗺️ JORNADA DO CLIENTE (LOG DE EVENTOS DO FUNIL)
+# =========================================================
+class FunilEvento(Base):
+    """
+    Log append-only dos pontos de contato do funil por (bot, telegram_id):
+    start, plano escolhido, order bump, PIX gerado, pagamento, upsell,
+    downsell, remarketing e expiração. A timeline da Jornada do Cliente lê só
+    os eventos do contato. Ver jornada.py.
+    """
+    __tablename__ = "funil_eventos"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    bot_id = Column(Integer, ForeignKey("bots.id", ondelete="CASCADE"), nullable=False)
+    telegram_id = Column(String, nullable=False)
+    tipo = Column(String(30), nullable=False)                  # "start", "pix_gerado", "pago"...
+    ocorrido_em = Column(DateTime, default=now_brazil, nullable=False)
+    pedido_id = Column(Integer, nullable=True)
+    valor = Column(Float, nullable=True)
+    dados = Column(JSON, nullable=True)                        # Plano, origem, nome do produto...
+
+    __table_args__ = (
+        Index('ix_funil_eventos_bot_contato', 'bot_id', 'telegram_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<FunilEvento(bot={self.bot_id}, tg={self.telegram_id}, {self.tipo})>"
+
+
+class JornadaContato(Base):
+    """
+    Projeção dos eventos do funil: uma linha por contato com o status atual e
+    os totais que a listagem da Jornada do Cliente mostra. Atualizada na mesma
+    transação em que o evento é gravado.
+    """
+    __tablename__ = "jornada_contatos"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    bot_id = Column(Integer, ForeignKey("bots.id", ondelete="CASCADE"), nullable=False)
+    telegram_id = Column(String, nullable=False)
+    first_name = Column(String, nullable=True)
+    username = Column(String, nullable=True)
+    status = Column(String(20), default="lead", nullable=False)  # lead, pendente, pagante, expirado
+    primeiro_contato = Column(DateTime, nullable=True)
+    origem_entrada = Column(String, default="bot_direto")
+    plano_principal = Column(String, nullable=True)
+    valor_principal = Column(Float, default=0.0)
+    tem_order_bump = Column(Boolean, default=False)
+    tem_upsell = Column(Boolean, default=False)
+    tem_downsell = Column(Boolean, default=False)
+    total_gasto = Column(Float, default=0.0)
+    pedidos_count = Column(Integer, default=0)
+    pedidos_ativos = Column(Integer, default=0)                # Pagos ainda não expirados
+    atualizado_em = Column(DateTime, default=now_brazil)
+
+    __table_args__ = (
+        Index('ux_jornada_contatos_bot_contato', 'bot_id', 'telegram_id', unique=True),
+        Index('ix_jornada_contatos_bot_status_contato', 'bot_id', 'status', 'primeiro_contato', 'id'),
+        Index('ix_jornada_contatos_bot_contato_data', 'bot_id', 'primeiro_contato', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<JornadaContato(bot={self.bot_id}, tg={self.telegram_id}, {self.status})>"
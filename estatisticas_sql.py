@@ -0,0 +1,329 @@
+from datetime import date, datetime
+
+from sqlalchemy import func, case, cast, extract, desc, or_, Integer
+
+from database import Pedido, Lead, Bot, TrackingLink
+
+# =========================================================
+# 📊 MOTOR SQL DAS ESTATÍSTICAS AVANÇADAS
+# =========================================================
+# O /api/admin/statistics carregava todos os pedidos aprovados do período
+# (com period=all, a vida inteira do vendedor) mais os pendentes e calculava
+# tudo em loops Python. Com vendedores grandes isso virava dezenas de milhares
+# de objetos por request.
+#
+# Aqui cada bloco do relatório é um GROUP BY que devolve só linhas agregadas:
+# por dia (date_trunc), por hora/dia da semana (extract), por plano, bot,
+# gateway, origem, tracking... e as métricas de recompra (LTV, recorrentes,
+# tempo de retorno) saem de window functions (count/lag OVER PARTITION BY
+# comprador). O custo da resposta passa a depender do número de grupos, não
+# do número de pedidos.
+#
+# Funciona no Postgres e no SQLite local (que também tem window functions);
+# as poucas diferenças de dialeto ficam nos helpers _dia e _segundos_entre.
+
+STATUS_APROVADOS = ('approved', 'paid', 'active', 'expired')
+
+DIAS_SEMANA = {0: "Segunda", 1: "Terça", 2: "Quarta", 3: "Quinta", 4: "Sexta", 5: "Sábado", 6: "Domingo"}
+
+
+def _como_data(valor):
+    """Normaliza a chave de dia (timestamp no Postgres, 'YYYY-MM-DD' no SQLite)."""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _soma_se(condicao):
+    return func.coalesce(func.sum(case((condicao, 1), else_=0)), 0)
+
+
+class MotorEstatisticas:
+    """
+    Consultas agregadas sobre os pedidos dos bots `bots_ids` (vazio = todos,
+    visão do superadmin). Com `modo_taxa`, a receita de cada venda é a taxa
+    fixa da plataforma em vez do valor do pedido (superadmin com split).
+    """
+
+    def __init__(self, db, bots_ids: list, modo_taxa: bool = False, taxa_centavos: int = 60):
+        self.db = db
+        self.bots_ids = list(bots_ids or [])
+        self.modo_taxa = modo_taxa
+        self.taxa_centavos = taxa_centavos
+        self.dialeto = db.get_bind().dialect.name
+
+    # -------------------------------------------------
+    # Helpers
+    # -------------------------------------------------
+    def receita(self, vendas: int, soma_valor) -> int:
+        """Receita em centavos a partir de (quantidade, soma dos valores em reais)."""
+        if self.modo_taxa:
+            return int(vendas or 0) * self.taxa_centavos
+        return int(round(float(soma_valor or 0) * 100))
+
+    def _dia(self, coluna):
+        if self.dialeto == "postgresql":
+            return func.date_trunc('day', coluna)
+        return func.date(coluna)
+
+    def _segundos_entre(self, fim, inicio):
+        if self.dialeto == "postgresql":
+            # data_aprovacao é gravada sem fuso (horário de Brasília); primeiro_contato tem fuso
+            fim, inicio = (
+                c if getattr(c.type, "timezone", False) else func.timezone('America/Sao_Paulo', c)
+                for c in (fim, inicio)
+            )
+            return extract('epoch', fim) - extract('epoch', inicio)
+        return (func.julianday(fim) - func.julianday(inicio)) * 86400
+
+    def _dias_inteiros(self, segundos):
+        if self.dialeto == "postgresql":
+            return func.floor(segundos / 86400)
+        return cast(segundos / 86400, Integer)
+
+    def _filtrar_bots(self, query, coluna=None):
+        if self.bots_ids:
+            return query.filter((coluna if coluna is not None else Pedido.bot_id).in_(self.bots_ids))
+        return query
+
+    def _aprovadas(self, query, inicio=None, fim=None):
+        query = query.filter(Pedido.status.in_(STATUS_APROVADOS))
+        if inicio is not None:
+            query = query.filter(Pedido.data_aprovacao >= inicio)
+        if fim is not None:
+            query = query.filter(Pedido.data_aprovacao <= fim)
+        return self._filtrar_bots(query)
+
+    # -------------------------------------------------
+    # Vendas aprovadas
+    # -------------------------------------------------
+    def resumo(self, inicio=None, fim=None) -> dict:
+        """Totais das vendas aprovadas no intervalo (sem intervalo = histórico inteiro)."""
+        origem = Pedido.origem
+        linha = self._aprovadas(self.db.query(
+            func.count(Pedido.id),
+            func.coalesce(func.sum(Pedido.valor), 0),
+            func.count(func.distinct(func.nullif(Pedido.telegram_id, ''))),
+            _soma_se(origem == 'upsell'),
+            _soma_se(origem == 'downsell'),
+            _soma_se(origem == 'remarketing'),
+            _soma_se(Pedido.tem_order_bump == True),
+        ), inicio, fim).one()
+
+        vendas = int(linha[0] or 0)
+        return {
+            "vendas": vendas,
+            "receita": self.receita(vendas, linha[1]),
+            "compradores": int(linha[2] or 0),
+            "upsell": int(linha[3] or 0),
+            "downsell": int(linha[4] or 0),
+            "remarketing": int(linha[5] or 0),
+            "orderbump": int(linha[6] or 0),
+        }
+
+    def por_dia(self, inicio, fim) -> dict:
+        """{date: (vendas, receita_centavos, valor_reais)} via date_trunc('day')."""
+        dia = self._dia(Pedido.data_aprovacao)
+        linhas = self._aprovadas(self.db.query(
+            dia, func.count(Pedido.id), func.coalesce(func.sum(Pedido.valor), 0)
+        ), inicio, fim).filter(Pedido.data_aprovacao != None).group_by(dia).all()
+
+        resultado = {}
+        for d, n, soma in linhas:
+            if d is None:
+                continue
+            resultado[_como_data(d)] = (int(n), self.receita(n, soma), float(soma or 0))
+        return resultado
+
+    def por_dia_hora(self, inicio, fim) -> dict:
+        """{(weekday, hora): vendas} com weekday no padrão Python (0 = segunda)."""
+        dow = extract('dow', Pedido.data_aprovacao)
+        hora = extract('hour', Pedido.data_aprovacao)
+        linhas = self._aprovadas(self.db.query(
+            dow, hora, func.count(Pedido.id)
+        ), inicio, fim).filter(Pedido.data_aprovacao != None).group_by(dow, hora).all()
+
+        # extract(dow) começa no domingo (0) nos dois bancos
+        return {((int(d) + 6) % 7, int(h)): int(n) for d, h, n in linhas if d is not None and h is not None}
+
+    def _agrupar(self, chave, inicio, fim, limite=None, por_receita=False, ignorar_nulos=False):
+        soma = func.coalesce(func.sum(Pedido.valor), 0)
+        contagem = func.count(Pedido.id)
+        query = self._aprovadas(self.db.query(chave, contagem, soma), inicio, fim)
+        if ignorar_nulos:
+            query = query.filter(chave != None)
+        query = query.group_by(chave)
+        if por_receita and not self.modo_taxa:
+            query = query.order_by(desc(soma))
+        else:
+            query = query.order_by(desc(contagem))
+        if limite:
+            query = query.limit(limite)
+        return [(k, int(n), self.receita(n, s)) for k, n, s in query.all()]
+
+    def por_plano(self, inicio, fim, limite=10) -> list:
+        nome = func.coalesce(Pedido.plano_nome, 'Sem Plano')
+        return [{"name": k, "count": n, "revenue": r} for k, n, r in self._agrupar(nome, inicio, fim, limite)]
+
+    def por_gateway(self, inicio, fim) -> list:
+        gateway = func.coalesce(func.nullif(Pedido.gateway_usada, ''), 'desconhecido')
+        return [{"name": k, "count": n, "receita": r} for k, n, r in self._agrupar(gateway, inicio, fim, por_receita=True)]
+
+    def por_origem(self, inicio, fim) -> list:
+        origem = func.coalesce(func.nullif(Pedido.origem, ''), 'bot')
+        return [(k, n) for k, n, _ in self._agrupar(origem, inicio, fim)]
+
+    def por_bot(self, inicio, fim, limite=5) -> list:
+        linhas = self._agrupar(Pedido.bot_id, inicio, fim, limite, ignorar_nulos=True)
+        nomes = dict(self.db.query(Bot.id, Bot.nome).filter(Bot.id.in_([l[0] for l in linhas])).all()) if linhas else {}
+        return [{"name": nomes.get(bid) or f"Bot #{bid}", "count": n, "revenue": r} for bid, n, r in linhas]
+
+    def por_tracking(self, inicio, fim, limite=5) -> list:
+        linhas = self._agrupar(Pedido.tracking_id, inicio, fim, limite, por_receita=True, ignorar_nulos=True)
+        codigos = dict(
+            self.db.query(TrackingLink.id, TrackingLink.codigo).filter(TrackingLink.id.in_([l[0] for l in linhas])).all()
+        ) if linhas else {}
+        return [{"name": codigos.get(tid) or f"Link #{tid}", "count": n, "revenue": r} for tid, n, r in linhas]
+
+    def campanhas_remarketing(self, inicio, fim, limite=5) -> list:
+        rmk = func.coalesce(Pedido.total_remarketings, 0)
+        contagem = func.count(Pedido.id)
+        linhas = self._aprovadas(self.db.query(rmk, contagem), inicio, fim).filter(
+            Pedido.origem == 'remarketing'
+        ).group_by(rmk).order_by(desc(contagem)).limit(limite).all()
+        return [
+            {"name": f"Remarketing #{rmk_id}" if rmk_id else "Remarketing", "count": int(n)}
+            for rmk_id, n in linhas
+        ]
+
+    def tempo_ate_pagamento(self, inicio, fim) -> tuple:
+        """(média em segundos, amostras) entre o /start e a aprovação, ignorando > 30 dias."""
+        segundos = self._segundos_entre(Pedido.data_aprovacao, Pedido.primeiro_contato)
+        valido = (segundos > 0) & (segundos < 86400 * 30)
+        linha = self._aprovadas(self.db.query(
+            func.avg(case((valido, segundos))),
+            func.count(case((valido, 1))),
+        ), inicio, fim).filter(
+            Pedido.data_aprovacao != None, Pedido.primeiro_contato != None
+        ).one()
+        return float(linha[0] or 0), int(linha[1] or 0)
+
+    # -------------------------------------------------
+    # Compradores (histórico inteiro, window functions)
+    # -------------------------------------------------
+    def compradores(self) -> dict:
+        """
+        Recorrência e tempo de retorno por comprador. Cada pedido recebe, via
+        OVER (PARTITION BY comprador), o total de compras do comprador e a data
+        da compra anterior; o agregado externo devolve uma única linha.
+        """
+        comprador = func.coalesce(Pedido.telegram_id, 'unknown')
+        janela = {"partition_by": comprador}
+        por_pedido = self._aprovadas(self.db.query(
+            comprador.label("comprador"),
+            Pedido.data_aprovacao.label("data"),
+            func.row_number().over(**janela, order_by=Pedido.id).label("ordem"),
+            func.count(Pedido.id).over(**janela).label("compras"),
+            func.max(case((Pedido.origem == 'upsell', 1), else_=0)).over(**janela).label("fez_upsell"),
+            func.max(case((Pedido.origem == 'downsell', 1), else_=0)).over(**janela).label("fez_downsell"),
+            func.max(case((Pedido.origem == 'remarketing', 1), else_=0)).over(**janela).label("fez_remarketing"),
+        )).subquery()
+
+        # Uma linha por comprador (ordem = 1) com as flags da janela
+        primeira = por_pedido.c.ordem == 1
+        linha = self.db.query(
+            _soma_se(primeira),
+            _soma_se(primeira & (por_pedido.c.compras > 1)),
+            _soma_se(primeira & (por_pedido.c.fez_upsell == 1)),
+            _soma_se(primeira & (por_pedido.c.fez_downsell == 1)),
+            _soma_se(primeira & (por_pedido.c.fez_remarketing == 1)),
+        ).one()
+
+        # Intervalo entre compras consecutivas do mesmo comprador (lag)
+        sequencia = self._aprovadas(self.db.query(
+            Pedido.data_aprovacao.label("data"),
+            func.lag(Pedido.data_aprovacao).over(
+                partition_by=comprador, order_by=Pedido.data_aprovacao
+            ).label("anterior"),
+        )).filter(Pedido.data_aprovacao != None).subquery()
+        dias = self._dias_inteiros(self._segundos_entre(sequencia.c.data, sequencia.c.anterior))
+        retorno = self.db.query(
+            func.avg(dias), func.count(sequencia.c.anterior)
+        ).filter(sequencia.c.anterior != None).one()
+
+        return {
+            "total": int(linha[0] or 0),
+            "recorrentes": int(linha[1] or 0),
+            "upsellers": int(linha[2] or 0),
+            "downsellers": int(linha[3] or 0),
+            "remarketing": int(linha[4] or 0),
+            "avg_retorno_dias": round(float(retorno[0] or 0), 1) if retorno[1] else 0,
+        }
+
+    def expirados_unicos(self, referencia) -> int:
+        """Compradores distintos com assinatura expirada antes de `referencia`."""
+        return self._filtrar_bots(self.db.query(
+            func.count(func.distinct(func.nullif(Pedido.telegram_id, '')))
+        ).filter(
+            Pedido.status == 'expired',
+            Pedido.data_expiracao != None,
+            Pedido.data_expiracao < referencia,
+        )).scalar() or 0
+
+    # -------------------------------------------------
+    # Pendentes, leads e assinantes ativos
+    # -------------------------------------------------
+    def pendentes(self, inicio, fim) -> tuple:
+        """(quantidade, receita_centavos) dos PIX gerados e não pagos no intervalo."""
+        linha = self._filtrar_bots(self.db.query(
+            func.count(Pedido.id), func.coalesce(func.sum(Pedido.valor), 0)
+        ).filter(
+            Pedido.status == 'pending',
+            Pedido.created_at >= inicio,
+            Pedido.created_at <= fim,
+        )).one()
+        n = int(linha[0] or 0)
+        return n, self.receita(n, linha[1])
+
+    def leads(self, inicio, fim) -> int:
+        query = self.db.query(func.count(Lead.id)).filter(Lead.created_at >= inicio, Lead.created_at <= fim)
+        return self._filtrar_bots(query, Lead.bot_id).scalar() or 0
+
+    def ativos(self, referencia) -> int:
+        """Assinaturas não expiradas em `referencia` (ou vitalícias)."""
+        return self._aprovadas(self.db.query(func.count(Pedido.id))).filter(
+            or_(Pedido.data_expiracao > referencia, Pedido.data_expiracao == None)
+        ).scalar() or 0
+
+
+# =========================================================
+# 👑 TOTAIS POR DONO (PAINEL SUPER ADMIN)
+# =========================================================
+def totais_por_dono(db, owner_ids: list, status=STATUS_APROVADOS) -> dict:
+    """
+    {owner_id: {"bots", "vendas", "valor"}} para uma página de usuários em
+    duas queries agrupadas (bots por dono e vendas por dono via JOIN), em vez
+    de três queries por usuário.
+    """
+    owner_ids = [o for o in owner_ids if o is not None]
+    totais = {o: {"bots": 0, "vendas": 0, "valor": 0.0} for o in owner_ids}
+    if not owner_ids:
+        return totais
+
+    for owner_id, bots in db.query(Bot.owner_id, func.count(Bot.id)).filter(
+        Bot.owner_id.in_(owner_ids)
+    ).group_by(Bot.owner_id).all():
+        totais[owner_id]["bots"] = int(bots)
+
+    for owner_id, vendas, valor in db.query(
+        Bot.owner_id, func.count(Pedido.id), func.coalesce(func.sum(Pedido.valor), 0)
+    ).join(Pedido, Pedido.bot_id == Bot.id).filter(
+        Bot.owner_id.in_(owner_ids),
+        Pedido.status.in_(list(status)),
+    ).group_by(Bot.owner_id).all():
+        totais[owner_id]["vendas"] = int(vendas)
+        totais[owner_id]["valor"] = float(valor or 0)
+
+    return totais
@@ -0,0 +1,215 @@
+import io
+import os
+import csv
+import json
+import zlib
+import logging
+from datetime import datetime, date
+
+from sqlalchemy import select
+
+from database import (
+    SessionAnalytics, JornadaContato, Pedido, TrackingLink, TrackingSerie,
+    RemarketingLog, RemarketingCampaign, now_brazil,
+)
+from jornada import STATUS_ABAS, STATUS_PAGOS
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 📤 EXPORTAÇÃO EM STREAMING (CSV / JSONL)
+# =========================================================
+# Não havia como exportar: o vendedor paginava /api/admin/contacts de 50 em 50
+# e cada página relia a tabela inteira.
+#
+# Cada export é um gerador lido pelo StreamingResponse. As linhas vêm em lotes
+# por keyset (WHERE id > último ORDER BY id LIMIT n), cada lote numa sessão
+# curta do pool de analytics que é devolvida antes de o lote ser escrito no
+# socket. Assim a memória fica em um lote, qualquer que seja o tamanho do
+# export, e um cliente lento não prende conexão do pool (nem transação na
+# réplica) durante o download, como aconteceria com um único cursor aberto.
+#
+# gzip opcional: os pedaços passam por um compressobj incremental (arquivo
+# .gz, não Content-Encoding, para o navegador salvar compactado).
+#
+# CSV injection: nome/username/first_name vêm do Telegram, ou seja, do lead.
+# Texto que começa com = + - @ (ou TAB/CR) viraria fórmula ao abrir o CSV no
+# Excel/Sheets, então recebe um ' na frente. O JSONL sai sem alteração.
+
+EXPORT_LOTE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+FORMATOS = ("csv", "jsonl")
+_INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _status_pedido(status):
+    if status in ("pagantes", "fundo"):
+        return Pedido.status.in_(STATUS_PAGOS)
+    if status in ("pendentes", "meio"):
+        return Pedido.status == "pending"
+    if status in ("expirados", "expirado"):
+        return Pedido.status == "expired"
+    return None
+
+
+# Cada conjunto: tabela com id crescente (keyset), colunas exportadas e filtros
+CONJUNTOS = {
+    "contatos": {
+        "modelo": JornadaContato,
+        "colunas": [
+            "bot_id", "telegram_id", "first_name", "username", "status", "primeiro_contato",
+            "origem_entrada", "plano_principal", "valor_principal", "tem_order_bump",
+            "tem_upsell", "tem_downsell", "total_gasto", "pedidos_count",
+        ],
+        "data": JornadaContato.primeiro_contato,
+        "status": lambda s: JornadaContato.status == STATUS_ABAS[s] if s in STATUS_ABAS else None,
+    },
+    "pedidos": {
+        "modelo": Pedido,
+        "colunas": [
+            "id", "bot_id", "telegram_id", "first_name", "username", "plano_nome", "valor", "status",
+            "gateway_usada", "origem", "tracking_id", "tem_order_bump", "created_at",
+            "data_aprovacao", "data_expiracao",
+        ],
+        "data": Pedido.created_at,
+        "status": _status_pedido,
+    },
+    "tracking": {
+        "modelo": TrackingSerie,
+        "colunas": ["tracking_id", "granularidade", "inicio", "clicks", "leads", "vendas", "faturamento"],
+        "extras": [TrackingLink.nome.label("link_nome"), TrackingLink.codigo.label("link_codigo"), TrackingLink.bot_id.label("bot_id")],
+        "join": (TrackingLink, TrackingLink.id == TrackingSerie.tracking_id),
+        "bot": TrackingLink.bot_id,
+        "data": TrackingSerie.inicio,
+        # status aqui é a granularidade do bucket ("dia" por padrão)
+        "status": lambda s: TrackingSerie.granularidade == (s if s in ("hora", "dia") else "dia"),
+    },
+    "remarketing": {
+        "modelo": RemarketingLog,
+        "colunas": ["id", "bot_id", "user_id", "campaign_id", "sent_at", "status", "error_message", "converted", "converted_at"],
+        "data": RemarketingLog.sent_at,
+        "status": lambda s: RemarketingLog.status == s if s and s != "todos" else None,
+    },
+    "campanhas": {
+        "modelo": RemarketingCampaign,
+        "colunas": [
+            "id", "bot_id", "campaign_id", "target", "type", "status", "data_envio",
+            "total_leads", "sent_success", "blocked_count", "promo_price", "plano_id",
+        ],
+        "data": RemarketingCampaign.data_envio,
+        "status": lambda s: RemarketingCampaign.status == s if s and s != "todos" else None,
+    },
+}
+
+
+def montar_consulta(conjunto: str, bot_ids: list, status: str = None, desde: datetime = None, ate: datetime = None):
+    """SELECT do conjunto já filtrado pelos bots do dono (sem ordem/limite)."""
+    spec = CONJUNTOS[conjunto]
+    modelo = spec["modelo"]
+    consulta = select(modelo.id.label("_id"), *[getattr(modelo, c) for c in spec["colunas"]], *spec.get("extras", []))
+    if "join" in spec:
+        consulta = consulta.join(*spec["join"])
+    consulta = consulta.where(spec.get("bot", getattr(modelo, "bot_id", None)).in_(bot_ids))
+
+    filtro = spec["status"](status)
+    if filtro is not None:
+        consulta = consulta.where(filtro)
+    if desde is not None:
+        consulta = consulta.where(spec["data"] >= desde)
+    if ate is not None:
+        consulta = consulta.where(spec["data"] <= ate)
+    return consulta, modelo.id
+
+
+def _lotes(consulta, coluna_id, tamanho: int):
+    """Lotes por keyset, cada um numa sessão curta do pool de analytics."""
+    ultimo = None
+    while True:
+        pagina = consulta if ultimo is None else consulta.where(coluna_id > ultimo)
+        db = SessionAnalytics()
+        try:
+            linhas = db.execute(pagina.order_by(coluna_id).limit(tamanho)).mappings().all()
+        finally:
+            db.close()
+        if not linhas:
+            return
+        yield linhas
+        if len(linhas) < tamanho:
+            return
+        ultimo = linhas[-1]["_id"]
+
+
+def _valor(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+
+def _celula_csv(v):
+    if v is None:
+        return ""
+    v = _valor(v)
+    if isinstance(v, str) and v.startswith(_INICIO_FORMULA):
+        return "'" + v
+    return v
+
+
+def _csv(lotes, campos: list):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(campos)
+    for linhas in lotes:
+        for linha in linhas:
+            escritor.writerow([_celula_csv(linha[c]) for c in campos])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl(lotes, campos: list):
+    for linhas in lotes:
+        yield "".join(
+            json.dumps({c: _valor(linha[c]) for c in campos}, ensure_ascii=False, default=str) + "\n"
+            for linha in linhas
+        ).encode("utf-8")
+
+
+def _gzip(pedacos):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for pedaco in pedacos:
+        dado = compressor.compress(pedaco)
+        if dado:
+            yield dado
+    yield compressor.flush()
+
+
+def exportar(conjunto: str, bot_ids: list, formato: str = "csv", compactar: bool = False,
+             status: str = None, desde: datetime = None, ate: datetime = None, tamanho_lote: int = None):
+    """Gerador de bytes do arquivo exportado (para o StreamingResponse)."""
+    consulta, coluna_id = montar_consulta(conjunto, bot_ids, status, desde, ate)
+    spec = CONJUNTOS[conjunto]
+    campos = spec["colunas"] + [c.name for c in spec.get("extras", [])]
+
+    lotes = _lotes(consulta, coluna_id, tamanho_lote or EXPORT_LOTE)
+    pedacos = _csv(lotes, campos) if formato == "csv" else _jsonl(lotes, campos)
+    if compactar:
+        pedacos = _gzip(pedacos)
+
+    try:
+        for pedaco in pedacos:
+            yield pedaco
+    except Exception as e:
+        logger.error(f"❌ [EXPORT] Falha exportando '{conjunto}' ({formato}): {e}")
+        raise
+    logger.info(f"📤 [EXPORT] '{conjunto}' exportado ({formato}{'.gz' if compactar else ''}) para bots {bot_ids}")
+
+
+def nome_arquivo(conjunto: str, formato: str, compactar: bool) -> str:
+    return f"zenyx_{conjunto}_{now_brazil().strftime('%Y%m%d_%H%M')}.{formato}{'.gz' if compactar else ''}"
+
+
+def tipo_midia(formato: str, compactar: bool) -> str:
+    if compactar:
+        return "application/gzip"
+    return "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
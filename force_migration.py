@@ -15,6 +15,7 @@ def forcar_atualizacao_tabelas():
     print("🚀 Iniciando Migração Forçada de Colunas...")
     
     engine = create_engine(DATABASE_URL)
+    falhas = 0
     
     with engine.connect() as conn:
         # Habilita o commit automático
@@ -41,6 +42,7 @@ def forcar_atualizacao_tabelas():
             print("✅ Tabela 'users' verificada/criada")
         except Exception as e:
             print(f"⚠️ Erro ao criar tabela users: {e}")
+            falhas += 1
         
         # =========================================================
         # 🆕 ADICIONAR COLUNA owner_id NA TABELA bots
@@ -54,6 +56,7 @@ def forcar_atualizacao_tabelas():
             print("✅ Coluna 'owner_id' adicionada à tabela bots")
         except Exception as e:
             print(f"⚠️ Erro ao adicionar owner_id: {e}")
+            falhas += 1
         
         # =========================================================
         # COLUNAS EXISTENTES (MINIAPP CATEGORIES)
@@ -79,7 +82,11 @@ def forcar_atualizacao_tabelas():
                 print(f"✅ Coluna verificada/criada: {col_name}")
             except Exception as e:
                 print(f"⚠️ Erro ao criar {col_name}: {e}")
+                falhas += 1
 
+    if falhas:
+        # Comandos idempotentes: o ledger não grava a versão e repete no próximo boot
+        raise RuntimeError(f"Migração forçada: {falhas} comandos falharam")
     print("🎉 Migração Forçada Concluída!")
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# ⚡ CIRCUIT BREAKER POR GATEWAY (COMPARTILHADO ENTRE BOTS)
+# =========================================================
+# Cada gateway (pushinpay, wiinpay, syncpay, paradise, omegapay) tem UM
+# breaker global no processo. Quando a PushinPay degrada para um bot, ela
+# degradou para todos — então os próximos checkouts já vão direto para a
+# fallback em vez de esperar o timeout inteiro da principal.
+# Por isso só falhas da gateway (timeout, conexão, 5xx, 429) entram aqui; erros
+# de um vendedor (401/403, 4xx, resposta inválida) são filtrados no main.py.
+
+JANELA_SEGUNDOS = int(os.getenv("GATEWAY_CB_JANELA", "120"))           # Janela móvel de amostras
+MIN_AMOSTRAS = int(os.getenv("GATEWAY_CB_MIN_AMOSTRAS", "5"))           # Mínimo para avaliar taxa de erro
+TAXA_ERRO_MAX = float(os.getenv("GATEWAY_CB_TAXA_ERRO", "0.5"))         # 50% de falhas abre o circuito
+FALHAS_CONSECUTIVAS_MAX = int(os.getenv("GATEWAY_CB_FALHAS_SEGUIDAS", "3"))  # Abre rápido em falha total
+LATENCIA_P95_MAX = float(os.getenv("GATEWAY_CB_P95_MAX", "12"))         # Segundos: acima disso é "lenta"
+COOLDOWN_SEGUNDOS = int(os.getenv("GATEWAY_CB_COOLDOWN", "30"))         # Tempo aberto antes do half-open
+
+
+FECHADO = "closed"
+ABERTO = "open"
+MEIO_ABERTO = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Breaker de uma gateway com janela móvel de (timestamp, sucesso, latência).
+
+    - FECHADO: tráfego normal.
+    - ABERTO: gateway ignorada até passar o cooldown.
+    - MEIO_ABERTO: libera UMA requisição de teste; sucesso fecha, falha reabre.
+    """
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.estado = FECHADO
+        self.aberto_em = 0.0
+        self.falhas_seguidas = 0
+        self.sonda_em_andamento = False
+        self.amostras = deque()  # (ts, ok, latencia)
+        self._lock = threading.Lock()
+
+    def _limpar_janela(self, agora: float):
+        while self.amostras and agora - self.amostras[0][0] > JANELA_SEGUNDOS:
+            self.amostras.popleft()
+
+    def _abrir(self, agora: float, motivo: str):
+        if self.estado != ABERTO:
+            logger.warning(f"⚡ [CIRCUIT] {self.nome} ABERTO ({motivo}). Roteando para fallback por {COOLDOWN_SEGUNDOS}s.")
+        self.estado = ABERTO
+        self.aberto_em = agora
+        self.sonda_em_andamento = False
+
+    def pode_tentar(self) -> bool:
+        """Diz se uma nova requisição pode ir para esta gateway agora."""
+        with self._lock:
+            agora = time.monotonic()
+            if self.estado == FECHADO:
+                return True
+            if self.estado == ABERTO:
+                if agora - self.aberto_em < COOLDOWN_SEGUNDOS:
+                    return False
+                self.estado = MEIO_ABERTO
+                self.sonda_em_andamento = False
+                logger.info(f"🩺 [CIRCUIT] {self.nome} MEIO-ABERTO. Liberando requisição de teste.")
+            # MEIO_ABERTO: apenas uma sonda por vez
+            if self.sonda_em_andamento:
+                return False
+            self.sonda_em_andamento = True
+            return True
+
+    def registrar_sucesso(self, latencia: float):
+        with self._lock:
+            agora = time.monotonic()
+            self.amostras.append((agora, True, latencia))
+            self._limpar_janela(agora)
+            self.falhas_seguidas = 0
+            if self.estado == MEIO_ABERTO:
+                self.estado = FECHADO
+                self.sonda_em_andamento = False
+                logger.info(f"✅ [CIRCUIT] {self.nome} FECHADO novamente (sonda OK em {latencia:.2f}s).")
+
+    def registrar_falha(self, latencia: float):
+        with self._lock:
+            agora = time.monotonic()
+            self.amostras.append((agora, False, latencia))
+            self._limpar_janela(agora)
+            self.falhas_seguidas += 1
+
+            if self.estado == MEIO_ABERTO:
+                self._abrir(agora, "sonda falhou")
+                return
+
+            if self.falhas_seguidas >= FALHAS_CONSECUTIVAS_MAX:
+                self._abrir(agora, f"{self.falhas_seguidas} falhas seguidas")
+                return
+
+            total = len(self.amostras)
+            if total >= MIN_AMOSTRAS:
+                falhas = sum(1 for _, ok, _ in self.amostras if not ok)
+                if falhas / total >= TAXA_ERRO_MAX:
+                    self._abrir(agora, f"taxa de erro {falhas}/{total}")
+
+    def falha_intermediaria(self, latencia: float) -> bool:
+        """
+        Falha de uma tentativa dentro do retry interno da gateway (cada POST
+        conta como amostra). Retorna se ainda vale repetir: com o circuito
+        aberto, a gateway desiste e o orquestrador passa para a fallback.
+        """
+        self.registrar_falha(latencia)
+        with self._lock:
+            return self.estado == FECHADO
+
+    def disponivel(self) -> bool:
+        """Leitura sem efeito colateral: fechado, ou aberto com cooldown vencido (pronto para sonda)."""
+        with self._lock:
+            if self.estado == FECHADO:
+                return True
+            if self.estado == ABERTO:
+                return time.monotonic() - self.aberto_em >= COOLDOWN_SEGUNDOS
+            return not self.sonda_em_andamento
+
+    def liberar_sonda(self):
+        """Devolve a vaga de sonda quando a requisição foi cancelada sem resultado."""
+        with self._lock:
+            self.sonda_em_andamento = False
+
+    def taxa_erro(self) -> float:
+        with self._lock:
+            self._limpar_janela(time.monotonic())
+            if not self.amostras:
+                return 0.0
+            return sum(1 for _, ok, _ in self.amostras if not ok) / len(self.amostras)
+
+    def p95(self) -> float:
+        with self._lock:
+            self._limpar_janela(time.monotonic())
+            latencias = sorted(lat for _, _, lat in self.amostras)
+        if not latencias:
+            return 0.0
+        idx = min(len(latencias) - 1, int(round(0.95 * (len(latencias) - 1))))
+        return latencias[idx]
+
+    def lenta(self) -> bool:
+        """Gateway fechada mas com p95 acima do limite: vai para o fim da fila."""
+        with self._lock:
+            poucas = len(self.amostras) < MIN_AMOSTRAS
+        return not poucas and self.p95() > LATENCIA_P95_MAX
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._limpar_janela(time.monotonic())
+            total = len(self.amostras)
+            estado = self.estado
+            falhas_seguidas = self.falhas_seguidas
+        return {
+            "gateway": self.nome,
+            "estado": estado,
+            "amostras": total,
+            "taxa_erro": round(self.taxa_erro(), 3),
+            "p95_segundos": round(self.p95(), 3),
+            "falhas_seguidas": falhas_seguidas,
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(gateway: str) -> CircuitBreaker:
+    """Retorna (criando se preciso) o breaker global da gateway."""
+    with _breakers_lock:
+        cb = _breakers.get(gateway)
+        if cb is None:
+            cb = CircuitBreaker(gateway)
+            _breakers[gateway] = cb
+        return cb
+
+
+def ordenar_por_saude(gateways: list) -> list:
+    """
+    Reordena a lista de gateways do bot pela saúde atual:
+    1. Fechadas e rápidas, ou prontas para sonda half-open (na ordem configurada)
+    2. Fechadas porém lentas (p95 acima do limite)
+    3. Abertas em cooldown — só entram no fim, como último recurso
+
+    Nunca remove gateways: se todas estiverem abertas, a ordem original é mantida.
+    """
+    saudaveis, lentas, abertas = [], [], []
+    for gw in gateways:
+        cb = get_breaker(gw)
+        if not cb.disponivel():
+            abertas.append(gw)
+        elif cb.estado == FECHADO and cb.lenta():
+            lentas.append(gw)
+        else:
+            saudaveis.append(gw)
+    return saudaveis + lentas + abertas
+
+
+def status_gateways() -> list:
+    """Snapshot de todos os breakers (usado pelo painel do superadmin)."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [cb.snapshot() for cb in breakers]
@@ -0,0 +1,109 @@
+"""
+Orçamento de tempo de import do main.py (gate de CI).
+
+Cada worker do uvicorn paga o `import main` no boot. Este script mede esse
+custo com `python -X importtime` em um processo limpo, mostra os módulos mais
+caros e falha quando:
+  - o import passa de --max-ms (mediana de --rodadas execuções), ou
+  - algum módulo pesado que deveria ser carregado só no primeiro uso
+    (boto3 do upload B2, por exemplo) voltou a ser importado no boot.
+
+É um script, não um teste do pytest (o repo não tem suíte): no CI roda como
+passo próprio e o código de saída 1 reprova o build.
+
+Hoje o único carregamento adiado é o do boto3. As rotas de emojis, simulações
+e superadmin continuam no main.py, importadas no boot; o main.py sozinho é a
+maior parte do tempo medido aqui.
+
+Uso:
+    python import_budget.py                      # orçamento padrão
+    python import_budget.py --max-ms 1500 --top 30
+    IMPORT_BUDGET_MS=1200 python import_budget.py
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ORCAMENTO_PADRAO_MS = float(os.getenv("IMPORT_BUDGET_MS", "2500"))
+
+# Módulos que o main.py só deve importar no primeiro uso
+PROIBIDOS_NO_BOOT = ["boto3", "botocore"]
+
+
+def medir_import(modulo: str) -> tuple:
+    """Roda `import <modulo>` num processo novo. Retorna (total_ms, {pacote: (self_ms, acumulado_ms)})."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # o aquecimento precisa gravar os .pyc
+    with tempfile.TemporaryDirectory() as tmp:
+        # SQLite descartável: o import não pode depender de rede nem tocar no sql_app.db
+        env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'import_budget.db')}")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {modulo} falhou:\n{proc.stderr[-2000:]}")
+
+    modulos = {}
+    total_ms = 0.0
+    for linha in proc.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        partes = linha[len("import time:"):].split("|")
+        if len(partes) != 3:
+            continue
+        self_ms = int(partes[0]) / 1000
+        acumulado_ms = int(partes[1]) / 1000
+        nome = partes[2].strip()
+        modulos[nome] = (self_ms, acumulado_ms)
+        if nome == modulo:
+            total_ms = acumulado_ms
+    return total_ms, modulos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de import do main.py")
+    parser.add_argument("--modulo", default="main")
+    parser.add_argument("--max-ms", type=float, default=ORCAMENTO_PADRAO_MS)
+    parser.add_argument("--rodadas", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Quantos módulos mais caros listar")
+    args = parser.parse_args()
+
+    # Aquecimento: a primeira rodada paga a compilação dos .pyc
+    medir_import(args.modulo)
+
+    totais = []
+    modulos = {}
+    for _ in range(max(1, args.rodadas)):
+        total_ms, modulos = medir_import(args.modulo)
+        totais.append(total_ms)
+    mediana = statistics.median(totais)
+
+    print(f"⏱️  import {args.modulo}: mediana {mediana:.0f}ms em {len(totais)} rodadas "
+          f"({', '.join(f'{t:.0f}' for t in totais)}) | orçamento {args.max_ms:.0f}ms")
+    print(f"\n{'módulo':<50} {'próprio':>10} {'acumulado':>10}")
+    for nome, (self_ms, acumulado_ms) in sorted(modulos.items(), key=lambda i: -i[1][0])[:args.top]:
+        print(f"{nome[:50]:<50} {self_ms:>8.1f}ms {acumulado_ms:>8.1f}ms")
+
+    falhou = False
+    carregados = [m for m in PROIBIDOS_NO_BOOT if m in modulos]
+    if carregados:
+        print(f"\n❌ Importados no boot (deveriam ser lazy): {carregados}")
+        falhou = True
+    if mediana > args.max_ms:
+        print(f"\n❌ import {args.modulo} levou {mediana:.0f}ms > orçamento de {args.max_ms:.0f}ms")
+        falhou = True
+    if not falhou:
+        print("\n✅ Dentro do orçamento")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
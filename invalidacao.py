@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from sqlalchemy import text
+
+import coordenacao
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 📣 BARRAMENTO DE INVALIDAÇÃO DE CACHE ENTRE WORKERS/RÉPLICAS
+# =========================================================
+# Caches em memória (emojis premium hoje; bots, planos e fluxos depois) só eram
+# invalidados no processo que tratou o CRUD. Com vários workers, os outros
+# seguiam servindo configuração velha até o TTL vencer.
+#
+# Endpoints de escrita chamam publicar(entidade, id). O evento é aplicado na
+# hora no próprio processo e, no Postgres, vai por NOTIFY para os demais, que
+# escutam na conexão dedicada do coordenacao.py. Sem Postgres (SQLite local)
+# fica só o caminho em processo.
+#
+# Cada cache guarda a geração da entidade em que foi carregado e recarrega
+# quando geracao(entidade) muda. Assim o TTL pode ser longo.
+
+CANAL_INVALIDACAO = "zenyx_invalidacao"
+INVALIDACAO_PG = os.getenv("CACHE_BUS_PG", "true").lower() == "true"
+
+_assinantes = {}    # {entidade: [callback(id, versao)]}
+_geracoes = {}      # {(entidade, id): contador local de invalidações}
+_lock = threading.Lock()
+
+
+def geracao(entidade: str, entidade_id=None) -> int:
+    """
+    Contador local que muda a cada invalidação da entidade. Sem id, muda com
+    qualquer evento da entidade (para caches que guardam a tabela inteira).
+    """
+    # setdefault: a entidade passa a ser conhecida (reconexão do LISTEN invalida todas)
+    return _geracoes.setdefault((entidade, entidade_id), 0)
+
+
+def assinar(entidade: str):
+    """Decorator: callback(id, versao) chamado a cada evento da entidade."""
+    def decorator(func):
+        _assinantes.setdefault(entidade, []).append(func)
+        return func
+    return decorator
+
+
+def _aplicar(entidade: str, entidade_id, versao):
+    with _lock:
+        _geracoes[(entidade, None)] = _geracoes.get((entidade, None), 0) + 1
+        if entidade_id is not None:
+            _geracoes[(entidade, entidade_id)] = _geracoes.get((entidade, entidade_id), 0) + 1
+    for callback in _assinantes.get(entidade, []):
+        try:
+            callback(entidade_id, versao)
+        except Exception as e:
+            logger.error(f"❌ [CACHE BUS] Erro no assinante de '{entidade}': {e}")
+
+
+def publicar(entidade: str, entidade_id=None, versao=None):
+    """
+    Invalida a entidade em todos os processos. `versao` é informativa
+    (updated_at, hash...); sem ela usamos o relógio do publicador.
+    """
+    versao = versao if versao is not None else time.time_ns()
+    _aplicar(entidade, entidade_id, versao)
+
+    if not (INVALIDACAO_PG and coordenacao.usa_postgres()):
+        return
+    try:
+        payload = json.dumps({
+            "entidade": entidade,
+            "id": entidade_id,
+            "versao": versao,
+            "origem": coordenacao.REPLICA_ID,
+        }, default=str)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": CANAL_INVALIDACAO, "payload": payload})
+            conn.commit()
+    except Exception as e:
+        # Os outros processos ficam com o TTL como rede de segurança
+        logger.error(f"❌ [CACHE BUS] Falha ao publicar invalidação de '{entidade}': {e}")
+
+
+def _receber(payload):
+    if payload is None:
+        # Reconexão do LISTEN: algo pode ter passado; invalida tudo que já foi visto
+        for entidade in {e for e, _ in list(_geracoes)} | set(_assinantes):
+            _aplicar(entidade, None, None)
+        return
+    try:
+        dados = json.loads(payload)
+    except ValueError:
+        return
+    if dados.get("origem") == coordenacao.REPLICA_ID:
+        return  # Já aplicado localmente por publicar()
+    _aplicar(dados.get("entidade"), dados.get("id"), dados.get("versao"))
+
+
+if INVALIDACAO_PG:
+    coordenacao.escutar(CANAL_INVALIDACAO, _receber)
@@ -0,0 +1,483 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import event, text, select, update, insert, bindparam, and_, or_, DateTime
+from sqlalchemy.orm import attributes
+
+from database import SessionLocal, FunilEvento, JornadaContato, Lead, Pedido, RemarketingLog, now_brazil
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 🗺️ JORNADA DO CLIENTE (LOG DE EVENTOS DO FUNIL)
+# =========================================================
+# A listagem da Jornada do Cliente carregava todos os Pedidos e Leads dos bots
+# do vendedor a cada página, e o mapa de um contato remontava a timeline
+# cruzando Lead, Pedido, RemarketingLog e as configs de bump/upsell/downsell.
+#
+# Agora cada ponto de contato vira uma linha append-only em funil_eventos e,
+# na mesma transação, atualiza a projeção jornada_contatos (uma linha por
+# contato com status e totais). A regra de como um evento muda o contato fica
+# num lugar só, _dobrar(), usada tanto no tempo real quanto na reconstrução.
+#
+# De onde vêm os eventos:
+# - listeners do ORM (rodam no flush de quem grava, sem commit próprio):
+#   Lead criado → start; Pedido criado → pix_gerado; status do Pedido vira
+#   pago → pago/upsell_pago/downsell_pago (+ remarketing_convertido se a venda
+#   veio de remarketing); vira expired → expirado; RemarketingLog enviado →
+#   remarketing_enviado. Pegam todos os pontos que já gravam esses modelos.
+# - registrar(): o que não grava nenhum modelo (plano escolhido, order bump
+#   exibido/aceito/recusado, oferta de upsell/downsell enviada), numa
+#   transação curta própria.
+#
+# O histórico anterior é reconstruído uma vez pela migração 0016 do ledger.
+
+STATUS_PAGOS = ("approved", "paid", "active")
+TIPOS_PAGAMENTO = ("pago", "upsell_pago", "downsell_pago")
+ORIGENS_REMARKETING = ("remarketing", "disparo_auto")
+
+_EVENTOS = FunilEvento.__table__
+_CONTATOS = JornadaContato.__table__
+
+_SQL_GARANTIR_CONTATO = text(f"""
+INSERT INTO {_CONTATOS.name} (bot_id, telegram_id, status, origem_entrada, valor_principal, tem_order_bump,
+    tem_upsell, tem_downsell, total_gasto, pedidos_count, pedidos_ativos, atualizado_em)
+VALUES (:bot_id, :telegram_id, 'lead', 'bot_direto', 0, :falso, :falso, :falso, 0, 0, 0, :agora)
+ON CONFLICT (bot_id, telegram_id) DO NOTHING
+""").bindparams(bindparam("agora", type_=DateTime))  # Mesmo formato de data do ORM no SQLite
+
+
+def _hora_local(quando) -> datetime:
+    """Horário de Brasília sem fuso (como as demais colunas DateTime do sistema)."""
+    if quando is None:
+        quando = now_brazil()
+    if quando.tzinfo is not None:
+        quando = quando.astimezone(now_brazil().tzinfo)
+    return quando.replace(tzinfo=None)
+
+
+def _tipo_oferta(plano_nome) -> str:
+    nome = str(plano_nome or "").lower()
+    if "upsell:" in nome:
+        return "upsell"
+    if "downsell:" in nome:
+        return "downsell"
+    return "principal"
+
+
+def _novo_contato(bot_id, telegram_id) -> dict:
+    return {
+        "bot_id": bot_id, "telegram_id": telegram_id, "first_name": None, "username": None,
+        "status": "lead", "primeiro_contato": None, "origem_entrada": "bot_direto",
+        "plano_principal": None, "valor_principal": 0.0, "tem_order_bump": False,
+        "tem_upsell": False, "tem_downsell": False, "total_gasto": 0.0,
+        "pedidos_count": 0, "pedidos_ativos": 0,
+    }
+
+
+def _dobrar(c: dict, ev: dict) -> dict:
+    """Aplica um evento ao estado do contato (mesmas regras da listagem antiga)."""
+    tipo = ev["tipo"]
+    dados = ev.get("dados") or {}
+    quando = ev.get("ocorrido_em")
+
+    if dados.get("first_name") and dados["first_name"] != "Sem nome":
+        c["first_name"] = dados["first_name"]
+    if dados.get("username"):
+        c["username"] = dados["username"]
+    if quando and (c["primeiro_contato"] is None or quando < c["primeiro_contato"]):
+        c["primeiro_contato"] = quando
+
+    if tipo == "start":
+        c["origem_entrada"] = dados.get("origem_entrada") or c["origem_entrada"] or "bot_direto"
+    elif tipo in ("bump_aceito", "pix_gerado"):
+        if tipo == "bump_aceito" or dados.get("order_bump"):
+            c["tem_order_bump"] = True
+        if tipo == "pix_gerado" and c["status"] == "lead":
+            c["status"] = "pendente"
+    elif tipo in TIPOS_PAGAMENTO:
+        valor = float(ev.get("valor") or 0)
+        bump = bool(dados.get("order_bump"))
+        c["total_gasto"] = round(float(c["total_gasto"] or 0) + valor, 2)
+        # Order Bump conta como um pedido extra
+        c["pedidos_count"] = int(c["pedidos_count"] or 0) + (2 if bump else 1)
+        c["pedidos_ativos"] = int(c["pedidos_ativos"] or 0) + 1
+        if bump:
+            c["tem_order_bump"] = True
+        if tipo == "upsell_pago":
+            c["tem_upsell"] = True
+        elif tipo == "downsell_pago":
+            c["tem_downsell"] = True
+        elif not c["plano_principal"]:
+            c["plano_principal"] = dados.get("plano")
+            c["valor_principal"] = valor
+        c["status"] = "pagante"
+    elif tipo == "expirado":
+        if dados.get("estava_pago"):
+            c["pedidos_ativos"] = max(0, int(c["pedidos_ativos"] or 0) - 1)
+        if int(c["pedidos_ativos"] or 0) <= 0:
+            c["status"] = "expirado"
+    return c
+
+
+def _evento(bot_id, telegram_id, tipo: str, quando=None, pedido_id=None, valor=None, dados: dict = None) -> dict:
+    return {
+        "bot_id": bot_id,
+        "telegram_id": str(telegram_id).strip(),
+        "tipo": tipo,
+        "ocorrido_em": _hora_local(quando),
+        "pedido_id": pedido_id,
+        "valor": float(valor) if valor is not None else None,
+        "dados": {k: v for k, v in (dados or {}).items() if v is not None} or None,
+    }
+
+
+def _aplicar(conn, ev: dict):
+    """Grava o evento e dobra a projeção do contato (linha travada até o commit)."""
+    conn.execute(insert(_EVENTOS), [ev])
+    conn.execute(_SQL_GARANTIR_CONTATO, {
+        "bot_id": ev["bot_id"], "telegram_id": ev["telegram_id"], "falso": False, "agora": now_brazil().replace(tzinfo=None),
+    })
+    linha = conn.execute(
+        select(_CONTATOS).where(_CONTATOS.c.bot_id == ev["bot_id"], _CONTATOS.c.telegram_id == ev["telegram_id"]).with_for_update()
+    ).mappings().first()
+    atual = dict(linha)
+    novo = _dobrar(dict(atual), ev)
+    mudou = {k: v for k, v in novo.items() if atual.get(k) != v}
+    if mudou:
+        mudou["atualizado_em"] = now_brazil().replace(tzinfo=None)
+        conn.execute(update(_CONTATOS).where(_CONTATOS.c.id == atual["id"]).values(**mudou))
+
+
+def registrar(bot_id, telegram_id, tipo: str, valor=None, dados: dict = None, quando=None):
+    """
+    Evento de um ponto de contato que não grava nenhum modelo (plano escolhido,
+    order bump, oferta enviada). Commit próprio; falha só é logada.
+    """
+    if not bot_id or telegram_id is None:
+        return
+    db = SessionLocal()
+    try:
+        _aplicar(db.connection(), _evento(bot_id, telegram_id, tipo, quando=quando, valor=valor, dados=dados))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [JORNADA] Falha ao registrar '{tipo}' de {telegram_id} (bot {bot_id}): {e}")
+    finally:
+        db.close()
+
+
+# =========================================================
+# 🎧 LISTENERS DO ORM
+# =========================================================
+def _no_flush(conn, eventos: list):
+    """Grava no flush de quem chamou, num savepoint: erro aqui não derruba a venda."""
+    for ev in eventos:
+        try:
+            with conn.begin_nested():
+                _aplicar(conn, ev)
+        except Exception as e:
+            logger.error(f"❌ [JORNADA] Falha ao gravar '{ev['tipo']}' de {ev['telegram_id']} (bot {ev['bot_id']}): {e}")
+
+
+def _dados_pedido(pedido) -> dict:
+    return {
+        "plano": pedido.plano_nome,
+        "oferta": _tipo_oferta(pedido.plano_nome),
+        "order_bump": bool(pedido.tem_order_bump) or None,
+        "origem": pedido.origem,
+        "first_name": pedido.first_name,
+        "username": pedido.username,
+    }
+
+
+def _eventos_pagamento(pedido, quando=None) -> list:
+    oferta = _tipo_oferta(pedido.plano_nome)
+    tipo = "pago" if oferta == "principal" else f"{oferta}_pago"
+    quando = quando or pedido.data_aprovacao
+    eventos = [_evento(pedido.bot_id, pedido.telegram_id, tipo, quando, pedido.id, pedido.valor, _dados_pedido(pedido))]
+    if pedido.origem in ORIGENS_REMARKETING:
+        eventos.append(_evento(pedido.bot_id, pedido.telegram_id, "remarketing_convertido", quando, pedido.id, pedido.valor,
+                               {"origem": pedido.origem}))
+    return eventos
+
+
+def _lead_criado(mapper, conn, lead):
+    if not lead.bot_id or not lead.user_id:
+        return
+    # Agora: os server_default (primeiro_contato/created_at) voltam em UTC sem fuso no SQLite
+    _no_flush(conn, [_evento(lead.bot_id, lead.user_id, "start", None, dados={
+        "origem_entrada": lead.origem_entrada,
+        "first_name": lead.nome,
+        "username": lead.username,
+        "tracking_id": lead.tracking_id,
+    })])
+
+
+def _pedido_criado(mapper, conn, pedido):
+    if not pedido.bot_id or not pedido.telegram_id:
+        return
+    eventos = [_evento(pedido.bot_id, pedido.telegram_id, "pix_gerado", pedido.gerou_pix_em or pedido.created_at,
+                       pedido.id, pedido.valor, _dados_pedido(pedido))]
+    if pedido.status in STATUS_PAGOS:
+        eventos += _eventos_pagamento(pedido)
+    _no_flush(conn, eventos)
+
+
+def _pedido_alterado(mapper, conn, pedido):
+    historico = attributes.get_history(pedido, "status")
+    if not historico.has_changes() or not pedido.bot_id or not pedido.telegram_id:
+        return
+    anterior = historico.deleted[0] if historico.deleted else None
+    if pedido.status in STATUS_PAGOS and anterior not in STATUS_PAGOS and anterior != "expired":
+        _no_flush(conn, _eventos_pagamento(pedido))
+    elif pedido.status == "expired" and anterior != "expired":
+        _no_flush(conn, [_evento(pedido.bot_id, pedido.telegram_id, "expirado", None, pedido.id, pedido.valor, {
+            "plano": pedido.plano_nome,
+            "oferta": _tipo_oferta(pedido.plano_nome),
+            "estava_pago": anterior in STATUS_PAGOS,
+        })])
+
+
+def _remarketing_enviado(mapper, conn, log):
+    if log.status == "error" or not log.bot_id or not log.user_id:
+        return
+    _no_flush(conn, [_evento(log.bot_id, log.user_id, "remarketing_enviado", log.sent_at, dados={
+        "log_id": log.id, "status": log.status,
+    })])
+
+
+event.listen(Lead, "after_insert", _lead_criado)
+event.listen(Pedido, "after_insert", _pedido_criado)
+event.listen(Pedido, "after_update", _pedido_alterado)
+event.listen(RemarketingLog, "after_insert", _remarketing_enviado)
+
+
+# =========================================================
+# 🔁 RECONSTRUÇÃO (MIGRAÇÃO 0016)
+# =========================================================
+def _eventos_historicos(db):
+    """Eventos equivalentes ao que já está em Lead, Pedido e RemarketingLog."""
+    for lead in db.query(Lead).yield_per(1000):
+        if lead.bot_id and lead.user_id:
+            yield _evento(lead.bot_id, lead.user_id, "start", lead.primeiro_contato or lead.created_at, dados={
+                "origem_entrada": lead.origem_entrada, "first_name": lead.nome,
+                "username": lead.username, "tracking_id": lead.tracking_id,
+            })
+
+    for p in db.query(Pedido).yield_per(1000):
+        if not p.bot_id or not p.telegram_id:
+            continue
+        criado = p.created_at or p.data_aprovacao
+        dados = _dados_pedido(p)
+        if dados["oferta"] == "principal":
+            yield _evento(p.bot_id, p.telegram_id, "plano_escolhido", p.escolheu_plano_em or criado, p.id, dados={"plano": p.plano_nome})
+            if p.tem_order_bump:
+                yield _evento(p.bot_id, p.telegram_id, "bump_aceito", criado, p.id)
+        yield _evento(p.bot_id, p.telegram_id, "pix_gerado", p.gerou_pix_em or criado, p.id, p.valor, dados)
+        if p.status in STATUS_PAGOS or p.status == "expired":
+            aprovado = p.pagou_em or p.data_aprovacao or criado
+            yield from _eventos_pagamento(p, aprovado)
+            if p.status == "expired":
+                yield _evento(p.bot_id, p.telegram_id, "expirado", p.data_expiracao or aprovado, p.id, p.valor, {
+                    "plano": p.plano_nome, "oferta": dados["oferta"], "estava_pago": True,
+                })
+
+    for log in db.query(RemarketingLog).filter(RemarketingLog.status != "error").yield_per(1000):
+        if log.bot_id and log.user_id:
+            yield _evento(log.bot_id, log.user_id, "remarketing_enviado", log.sent_at, dados={
+                "log_id": log.id, "status": log.status,
+            })
+
+
+def _gravar_em_lotes(db, tabela, linhas, tamanho: int = 1000) -> int:
+    total, lote = 0, []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            db.execute(insert(tabela), lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        db.execute(insert(tabela), lote)
+        total += len(lote)
+    return total
+
+
+def _projetar(db):
+    """Dobra os eventos em ordem, contato a contato, e devolve as linhas da projeção."""
+    eventos = db.execute(
+        select(_EVENTOS).order_by(_EVENTOS.c.bot_id, _EVENTOS.c.telegram_id, _EVENTOS.c.ocorrido_em, _EVENTOS.c.id)
+        .execution_options(yield_per=1000)
+    ).mappings()
+    contato, agora = None, now_brazil().replace(tzinfo=None)
+    for ev in eventos:
+        if contato is None or (contato["bot_id"], contato["telegram_id"]) != (ev["bot_id"], ev["telegram_id"]):
+            if contato is not None:
+                yield contato
+            contato = _novo_contato(ev["bot_id"], ev["telegram_id"])
+            contato["atualizado_em"] = agora
+        _dobrar(contato, ev)
+    if contato is not None:
+        yield contato
+
+
+def reconstruir(db) -> int:
+    """
+    Recria funil_eventos e jornada_contatos a partir do histórico. Usado pela
+    migração 0016; rodar de novo descarta os eventos que só existem no log
+    (plano escolhido, order bump recusado, ofertas enviadas).
+    """
+    try:
+        db.query(JornadaContato).delete(synchronize_session=False)
+        db.query(FunilEvento).delete(synchronize_session=False)
+        eventos = _gravar_em_lotes(db, _EVENTOS, _eventos_historicos(db))
+        contatos = _gravar_em_lotes(db, _CONTATOS, _projetar(db))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(f"🗺️ [JORNADA] {eventos} eventos e {contatos} contatos reconstruídos")
+    return contatos
+
+
+# =========================================================
+# 📖 LEITURAS (LISTAGEM E TIMELINE)
+# =========================================================
+STATUS_ABAS = {"pagantes": "pagante", "pendentes": "pendente", "expirados": "expirado", "leads": "lead"}
+
+
+def _codificar_cursor(contato) -> str:
+    return f"{contato.primeiro_contato.isoformat() if contato.primeiro_contato else ''}|{contato.id}"
+
+
+def _decodificar_cursor(cursor: str):
+    data, _, contato_id = (cursor or "").partition("|")
+    try:
+        return (datetime.fromisoformat(data) if data else None), int(contato_id)
+    except ValueError:
+        return None
+
+
+def listar(db, bot_ids: list, aba: str = "todos", busca: str = None, limite: int = 50,
+           cursor: str = None, offset: int = 0):
+    """
+    Contatos da aba, mais recentes primeiro, direto da projeção.
+    Com `cursor` (next_cursor da página anterior) a paginação é por keyset
+    sobre (primeiro_contato, id); sem ele cai no offset da paginação antiga.
+    Retorna (contatos, total, next_cursor).
+    """
+    query = db.query(JornadaContato).filter(JornadaContato.bot_id.in_(bot_ids))
+    if aba in STATUS_ABAS:
+        query = query.filter(JornadaContato.status == STATUS_ABAS[aba])
+    if busca:
+        termo = f"%{busca.strip()}%"
+        query = query.filter(or_(
+            JornadaContato.first_name.ilike(termo),
+            JornadaContato.username.ilike(termo),
+            JornadaContato.telegram_id.like(termo),
+        ))
+    total = query.count()
+
+    posicao = _decodificar_cursor(cursor) if cursor else None
+    if posicao:
+        data, contato_id = posicao
+        if data is None:
+            # Contatos sem data ficam no fim (NULLS LAST)
+            query = query.filter(JornadaContato.primeiro_contato == None, JornadaContato.id < contato_id)
+        else:
+            query = query.filter(or_(
+                JornadaContato.primeiro_contato < data,
+                and_(JornadaContato.primeiro_contato == data, JornadaContato.id < contato_id),
+                JornadaContato.primeiro_contato == None,
+            ))
+    query = query.order_by(JornadaContato.primeiro_contato.desc().nulls_last(), JornadaContato.id.desc())
+    if not posicao and offset:
+        query = query.offset(offset)
+
+    contatos = query.limit(limite + 1).all()
+    proximo = _codificar_cursor(contatos[limite - 1]) if len(contatos) > limite else None
+    return contatos[:limite], total, proximo
+
+
+def buscar_contato(db, bot_id, telegram_id):
+    return db.query(JornadaContato).filter(
+        JornadaContato.bot_id == bot_id, JornadaContato.telegram_id == str(telegram_id).strip()
+    ).first()
+
+
+def eventos_do_contato(db, bot_id, telegram_id) -> list:
+    """Eventos do contato em ordem (índice bot_id, telegram_id, id)."""
+    return db.query(FunilEvento).filter(
+        FunilEvento.bot_id == bot_id, FunilEvento.telegram_id == str(telegram_id).strip()
+    ).order_by(FunilEvento.ocorrido_em, FunilEvento.id).all()
+
+
+def _reais(valor) -> str:
+    return f"R$ {float(valor or 0):.2f}"
+
+
+def timeline(eventos_contato: list) -> list:
+    """Etapas da timeline do mapa da jornada, uma por evento."""
+    itens, remarketings = [], 0
+    for ev in eventos_contato:
+        dados = ev.dados or {}
+        data = ev.ocorrido_em.isoformat() if ev.ocorrido_em else None
+        oferta = dados.get("oferta", "principal")
+        sufixo = "" if oferta == "principal" else f"_{oferta}"
+
+        if ev.tipo == "start":
+            item = ("lead_start", "Lead Startou", f"Entrou pelo {dados.get('origem_entrada') or 'bot direto'}", "completo", "#3b82f6")
+        elif ev.tipo == "plano_escolhido":
+            item = ("escolheu_plano", "Escolheu plano principal", f"Plano: {dados.get('plano') or 'N/A'}", "completo", "#8b5cf6")
+        elif ev.tipo == "bump_exibido":
+            item = ("order_bump_exibido", "Order Bump exibido", f"{dados.get('produto') or 'Produto extra'} — {_reais(ev.valor)}", "enviado", "#3b82f6")
+        elif ev.tipo == "bump_aceito":
+            item = ("order_bump", "Order Bump aceito ✅", f"{dados.get('produto') or 'Produto extra'} — {_reais(ev.valor)}", "completo", "#10b981")
+        elif ev.tipo == "bump_recusado":
+            item = ("order_bump", "Order Bump recusado ❌", "Não adicionou o produto", "recusado", "#6b7280")
+        elif ev.tipo == "pix_gerado":
+            rotulo = "Valor total do PIX" if oferta == "principal" else f"Valor {oferta.capitalize()}"
+            item = (f"gerou_pix{sufixo}", "Gerou PIX", f"{rotulo}: {_reais(ev.valor)}", "completo", "#f59e0b")
+        elif ev.tipo == "pago":
+            titulo = "Pagou plano principal + Order bump" if dados.get("order_bump") else "Pagou plano principal"
+            item = ("pagou_principal", titulo, f"Pagamento de {_reais(ev.valor)} confirmado", "completo", "#10b981")
+        elif ev.tipo in ("upsell_pago", "downsell_pago"):
+            nome = oferta.capitalize()
+            item = (oferta, f"{nome} pagou ✅", f"Pagamento de {_reais(ev.valor)} confirmado", "completo", "#10b981")
+        elif ev.tipo in ("upsell_enviado", "downsell_enviado"):
+            nome = ev.tipo.split("_")[0]
+            item = (ev.tipo, f"{nome.capitalize()} enviado", f"Oferta: {dados.get('produto') or nome.capitalize()} — {_reais(ev.valor)}", "completo", "#3b82f6")
+        elif ev.tipo == "remarketing_enviado":
+            remarketings += 1
+            item = (f"remarketing_{remarketings}", f"Remarketing #{remarketings}", f"Enviado em {data or 'N/A'}", "enviado", "#8b5cf6")
+        elif ev.tipo == "remarketing_convertido":
+            item = ("remarketing_convertido", "Remarketing converteu ✅", f"Venda de {_reais(ev.valor)}", "completo", "#10b981")
+        elif ev.tipo == "expirado":
+            if dados.get("estava_pago"):
+                item = (f"expirou{sufixo}", "Acesso expirado", f"Plano: {dados.get('plano') or 'N/A'}", "falhou", "#ef4444")
+            else:
+                item = (f"pix_expirado{sufixo}", "Pix Pendente/Expirado", "Gerou PIX mas não pagou", "falhou", "#ef4444")
+        else:
+            continue
+
+        etapa, titulo, descricao, status, cor = item
+        itens.append({"etapa": etapa, "titulo": titulo, "descricao": descricao, "data": data, "status": status, "cor": cor})
+    return itens
+
+
+def remarketing_logs(eventos_contato: list) -> list:
+    """Envios de remarketing do contato; a conversão marca o último envio anterior à venda."""
+    logs = []
+    for ev in eventos_contato:
+        if ev.tipo == "remarketing_enviado":
+            logs.append({
+                "sent_at": ev.ocorrido_em.isoformat() if ev.ocorrido_em else None,
+                "status": (ev.dados or {}).get("status", "sent"),
+                "converted": False,
+                "converted_at": None,
+            })
+        elif ev.tipo == "remarketing_convertido" and logs and not logs[-1]["converted"]:
+            logs[-1]["converted"] = True
+            logs[-1]["converted_at"] = ev.ocorrido_em.isoformat() if ev.ocorrido_em else None
+    return logs
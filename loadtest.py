@@ -0,0 +1,635 @@
+"""
+Harness de carga OFFLINE do Zenyx.
+
+Sobe o `app` do main.py em processo (ASGI, sem rede) contra SQLite ou um
+Postgres local, aponta o TeleBot para um Telegram falso (HTTP local, com
+latência e 429 + retry_after configuráveis) e o `http_client` das gateways
+para PushinPay/WiinPay/SyncPay falsas. Depois reproduz cenários roteirizados
+e reporta vazão, p50/p95/p99 e queries no banco por cenário.
+
+Uso:
+    python loadtest.py                          # perfil "ci" (rápido), SQLite em ./loadtest.db
+    python loadtest.py --perfil completo        # /start 2k, blast de 50k leads...
+    python loadtest.py --cenarios start,checkout --json resultado.json
+    DATABASE_URL=postgresql://localhost/zenyx_load python loadtest.py
+
+Nunca rode contra o banco de produção: o harness cria e apaga dados.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ARQUIVO_SQLITE = "./loadtest.db"
+
+# Conexões que uma requisição pode segurar ao mesmo tempo (sessão da rota +
+# sessões próprias de jornada/tracking/auditoria). O acesso ao banco é
+# síncrono dentro do event loop: se o pool esgota, o checkout bloqueia o loop
+# enquanto as corrotinas suspensas seguram as conexões, e tudo trava.
+CONEXOES_POR_REQUISICAO = 3
+
+PERFIS = {
+    # Pequeno o bastante para rodar em CI em poucos minutos
+    "ci": {"start": 200, "checkout": 100, "pix": 200, "leads": 500, "vencimentos": 200, "concorrencia": 20},
+    # Escala de incidente real
+    "completo": {"start": 2000, "checkout": 1000, "pix": 2000, "leads": 50000, "vencimentos": 5000, "concorrencia": 50},
+}
+
+TODOS_CENARIOS = ["start", "checkout", "pix", "remarketing", "vencimentos"]
+
+
+# =========================================================
+# 📡 TELEGRAM FALSO (HTTP LOCAL)
+# =========================================================
+class TelegramFalso:
+    """
+    Emula a Bot API em http://127.0.0.1:<porta>/bot<token>/<metodo>.
+    `taxa_429` é a fração de chamadas respondidas com 429 e retry_after.
+    """
+
+    def __init__(self, latencia_ms: float = 30, taxa_429: float = 0.0, retry_after: int = 1):
+        self.latencia = latencia_ms / 1000.0
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.chamadas = {}
+        self.respostas_429 = 0
+        self._lock = threading.Lock()
+        self._msg_id = 0
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.servidor.daemon_threads = True
+        self.porta = self.servidor.server_address[1]
+
+    def iniciar(self):
+        threading.Thread(target=self.servidor.serve_forever, name="telegram-falso", daemon=True).start()
+
+    def parar(self):
+        self.servidor.shutdown()
+
+    def zerar(self):
+        with self._lock:
+            self.chamadas = {}
+            self.respostas_429 = 0
+
+    def _proximo_msg_id(self) -> int:
+        with self._lock:
+            self._msg_id += 1
+            return self._msg_id
+
+    def _resultado(self, metodo: str, params: dict):
+        chat_id = params.get("chat_id", "1")
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+        usuario_bot = {"id": 999000, "is_bot": True, "first_name": "LoadBot", "username": "load_bot"}
+
+        if metodo == "getMe":
+            return usuario_bot
+        if metodo.startswith("send") or metodo in ("editMessageText", "editMessageCaption", "copyMessage"):
+            return {
+                "message_id": self._proximo_msg_id(),
+                "date": int(time.time()),
+                "from": usuario_bot,
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+        if metodo == "createChatInviteLink":
+            return {
+                "invite_link": f"https://t.me/+load{self._proximo_msg_id()}",
+                "creator": usuario_bot,
+                "creates_join_request": False,
+                "is_primary": False,
+                "is_revoked": False,
+            }
+        if metodo == "getChatMember":
+            return {"status": "member", "user": {"id": chat_id, "is_bot": False, "first_name": "Lead"}}
+        if metodo == "getChat":
+            return {"id": chat_id, "type": "supergroup", "title": "Canal Load"}
+        return True
+
+    def _handler(self):
+        telegram = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self):
+                url = urlparse(self.path)
+                metodo = url.path.rsplit("/", 1)[-1]
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = self.rfile.read(tamanho) if tamanho else b""
+                if corpo and "application/x-www-form-urlencoded" in (self.headers.get("Content-Type") or ""):
+                    params.update({k: v[0] for k, v in parse_qs(corpo.decode("utf-8", "ignore")).items()})
+                elif corpo and "application/json" in (self.headers.get("Content-Type") or ""):
+                    try:
+                        params.update(json.loads(corpo))
+                    except ValueError:
+                        pass
+
+                with telegram._lock:
+                    telegram.chamadas[metodo] = telegram.chamadas.get(metodo, 0) + 1
+
+                if telegram.latencia:
+                    time.sleep(telegram.latencia)
+
+                if telegram.taxa_429 and random.random() < telegram.taxa_429:
+                    with telegram._lock:
+                        telegram.respostas_429 += 1
+                    status, resposta = 429, {
+                        "ok": False, "error_code": 429,
+                        "description": f"Too Many Requests: retry after {telegram.retry_after}",
+                        "parameters": {"retry_after": telegram.retry_after},
+                    }
+                else:
+                    status, resposta = 200, {"ok": True, "result": telegram._resultado(metodo, params)}
+
+                dados = json.dumps(resposta).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            do_GET = _responder
+            do_POST = _responder
+
+        return Handler
+
+
+# =========================================================
+# 💳 GATEWAYS FALSAS (httpx.MockTransport NO http_client GLOBAL)
+# =========================================================
+class GatewaysFalsas:
+    """Responde PushinPay, WiinPay e SyncPay com latência e taxa de erro configuráveis."""
+
+    def __init__(self, latencia_ms: float = 150, taxa_erro: float = 0.0):
+        self.latencia = latencia_ms / 1000.0
+        self.taxa_erro = taxa_erro
+        self.chamadas = {}
+
+    def zerar(self):
+        self.chamadas = {}
+
+    async def handler(self, request):
+        import httpx
+
+        host = request.url.host
+        self.chamadas[host] = self.chamadas.get(host, 0) + 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        if self.taxa_erro and random.random() < self.taxa_erro:
+            return httpx.Response(503, json={"message": "indisponível (simulado)"})
+
+        tx = f"load-{int(time.time() * 1000)}-{random.randint(0, 10**9)}"
+        qr = f"00020126580014br.gov.bcb.pix0136{tx}5204000053039865802BR"
+
+        if "pushinpay" in host:
+            return httpx.Response(200, json={"id": tx, "qr_code": qr, "status": "created", "value": 1990})
+        if "wiinpay" in host:
+            return httpx.Response(201, json={"data": {"paymentId": tx, "qr_code": qr, "status": "pending"}})
+        if "syncpayments" in host:
+            if request.url.path.endswith("/auth-token"):
+                return httpx.Response(200, json={"access_token": "load-token", "expires_in": 3600})
+            if "/cash-in/" in request.url.path or request.method == "GET":
+                return httpx.Response(200, json={"data": {"status": "pending"}})
+            return httpx.Response(200, json={"identifier": tx, "pix_code": qr, "status": "pending"})
+        return httpx.Response(404, json={"message": f"host não simulado: {host}"})
+
+
+# =========================================================
+# 📊 MEDIÇÃO
+# =========================================================
+class ContadorQueries:
+    """Conta TODAS as queries do engine (requisições, background tasks e jobs)."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.total = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "after_cursor_execute", self._contar)
+
+    def _contar(self, *args):
+        with self._lock:
+            self.total += 1
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+
+class Resultado:
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.latencias = []
+        self.erros = 0
+        self.duracao = 0.0
+        self.queries = 0
+        self.telegram = {}
+        self.telegram_429 = 0
+        self.gateways = {}
+
+    def resumo(self) -> dict:
+        total = len(self.latencias)
+        return {
+            "cenario": self.nome,
+            "requisicoes": total,
+            "erros": self.erros,
+            "duracao_s": round(self.duracao, 3),
+            "vazao_rps": round(total / self.duracao, 1) if self.duracao else 0.0,
+            "p50_ms": round(percentil(self.latencias, 50) * 1000, 1),
+            "p95_ms": round(percentil(self.latencias, 95) * 1000, 1),
+            "p99_ms": round(percentil(self.latencias, 99) * 1000, 1),
+            "queries_db": self.queries,
+            "queries_por_req": round(self.queries / total, 1) if total else 0.0,
+            "chamadas_telegram": sum(self.telegram.values()),
+            "telegram_429": self.telegram_429,
+            "chamadas_gateway": sum(self.gateways.values()),
+        }
+
+
+# =========================================================
+# 🏗️ AMBIENTE (BANCO, APP, DUBLÊS)
+# =========================================================
+class Ambiente:
+    def __init__(self, args):
+        self.args = args
+        self.telegram = TelegramFalso(args.telegram_latencia_ms, args.taxa_429, args.retry_after)
+        self.gateways = GatewaysFalsas(args.gateway_latencia_ms, args.gateway_taxa_erro)
+        self.main = None
+        self.cliente = None
+        self.queries = None
+        self.bot = None
+        self.plano = None
+        self.token_admin = None
+
+    async def subir(self):
+        # Sem DATABASE_URL o database.py cairia no sql_app.db do desenvolvedor
+        if not os.getenv("DATABASE_URL"):
+            if os.path.exists(ARQUIVO_SQLITE):
+                os.remove(ARQUIVO_SQLITE)
+            os.environ["DATABASE_URL"] = f"sqlite:///{ARQUIVO_SQLITE}"
+        os.environ.setdefault("RAILWAY_PUBLIC_DOMAIN", "loadtest.local")
+
+        self.telegram.iniciar()
+        from telebot import apihelper
+        apihelper.API_URL = f"http://127.0.0.1:{self.telegram.porta}/bot{{0}}/{{1}}"
+
+        import httpx
+        import main
+        self.main = main
+
+        # Startup real do app (create_all, migrations, scheduler...)
+        for handler in main.app.router.on_startup:
+            try:
+                resultado = handler()
+                if asyncio.iscoroutine(resultado):
+                    await resultado
+            except Exception as e:
+                print(f"⚠️ Startup {getattr(handler, '__name__', handler)} falhou: {e}")
+        if main.scheduler.running:
+            main.scheduler.pause()  # Jobs só rodam quando o cenário pede
+
+        if main.http_client is not None:
+            await main.http_client.aclose()
+        main.http_client = httpx.AsyncClient(transport=httpx.MockTransport(self.gateways.handler))
+
+        self.queries = ContadorQueries(main.engine)
+        self.cliente = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app), base_url="http://loadtest.local", timeout=600
+        )
+        self._semear_base()
+
+    async def descer(self):
+        if self.cliente:
+            await self.cliente.aclose()
+        if self.main and self.main.http_client:
+            await self.main.http_client.aclose()
+        if self.main and self.main.scheduler.running:
+            self.main.scheduler.shutdown(wait=False)
+        self.telegram.parar()
+
+    def _semear_base(self):
+        from database import SessionLocal, User, Bot, PlanoConfig, BotFlow
+
+        db = SessionLocal()
+        try:
+            dono = User(
+                username="loadtest", email="loadtest@zenyx.local", password_hash="x",
+                full_name="Load Test", is_superuser=True
+            )
+            db.add(dono)
+            db.flush()
+
+            self.bot = Bot(
+                nome="Bot Load", token="100000001:LOADTEST_TOKEN_FAKE", username="load_bot",
+                id_canal_vip="-1001000000001", status="ativo", owner_id=dono.id,
+                pushin_token="fake-pushin", pushinpay_ativo=True, gateway_principal="pushinpay",
+                admin_principal_id="1"
+            )
+            db.add(self.bot)
+            db.flush()
+
+            self.plano = PlanoConfig(
+                bot_id=self.bot.id, nome_exibicao="VIP Mensal", descricao="Plano de carga",
+                preco_atual=19.90, preco_cheio=39.90, dias_duracao=30, key_id="load_vip_mensal"
+            )
+            db.add(self.plano)
+            db.add(BotFlow(bot_id=self.bot.id, msg_boas_vindas="Olá! Bem-vindo ao teste de carga."))
+            db.commit()
+
+            self.token_admin = self.main.create_access_token({"sub": dono.username, "user_id": dono.id})
+        finally:
+            db.close()
+
+    def zerar_contadores(self):
+        self.telegram.zerar()
+        self.gateways.zerar()
+        return self.queries.total
+
+    def fechar_resultado(self, resultado: Resultado, queries_inicio: int):
+        resultado.queries = self.queries.total - queries_inicio
+        resultado.telegram = dict(self.telegram.chamadas)
+        resultado.telegram_429 = self.telegram.respostas_429
+        resultado.gateways = dict(self.gateways.chamadas)
+
+
+# =========================================================
+# 🎬 CENÁRIOS
+# =========================================================
+_update_id = [0]
+
+
+def _update_mensagem(telegram_id: int, texto: str) -> dict:
+    _update_id[0] += 1
+    usuario = {"id": telegram_id, "is_bot": False, "first_name": f"Lead{telegram_id}", "username": f"lead{telegram_id}"}
+    return {
+        "update_id": _update_id[0],
+        "message": {
+            "message_id": _update_id[0], "date": int(time.time()), "text": texto,
+            "from": usuario, "chat": {"id": telegram_id, "type": "private", "first_name": usuario["first_name"]},
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(texto.split()[0])}] if texto.startswith("/") else [],
+        },
+    }
+
+
+def _update_callback(telegram_id: int, dados: str) -> dict:
+    _update_id[0] += 1
+    usuario = {"id": telegram_id, "is_bot": False, "first_name": f"Lead{telegram_id}", "username": f"lead{telegram_id}"}
+    return {
+        "update_id": _update_id[0],
+        "callback_query": {
+            "id": str(_update_id[0]), "from": usuario, "chat_instance": str(telegram_id), "data": dados,
+            "message": {
+                "message_id": _update_id[0], "date": int(time.time()), "text": "planos",
+                "chat": {"id": telegram_id, "type": "private"}, "from": usuario,
+            },
+        },
+    }
+
+
+async def _disparar(amb: Ambiente, resultado: Resultado, requisicoes: list, concorrencia: int):
+    """requisicoes: lista de (metodo, url, kwargs). Mede latência de cada uma."""
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def uma(metodo, url, kwargs):
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                resp = await amb.cliente.request(metodo, url, **kwargs)
+                if resp.status_code >= 400:
+                    resultado.erros += 1
+            except Exception:
+                resultado.erros += 1
+            resultado.latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma(m, u, k) for m, u, k in requisicoes))
+    resultado.duracao = time.perf_counter() - inicio
+
+
+async def cenario_start(amb: Ambiente, perfil: dict) -> Resultado:
+    """Tempestade de /start: leads novos chegando ao mesmo tempo."""
+    resultado = Resultado("start_storm")
+    url = f"/webhook/{amb.bot.token}"
+    reqs = [("POST", url, {"json": _update_mensagem(5_000_000 + i, "/start")}) for i in range(perfil["start"])]
+    await _disparar(amb, resultado, reqs, perfil["concorrencia"])
+    return resultado
+
+
+async def cenario_checkout(amb: Ambiente, perfil: dict) -> Resultado:
+    """Rajada de cliques em checkout: gera PIX na gateway falsa e cria Pedido."""
+    resultado = Resultado("checkout_burst")
+    url = f"/webhook/{amb.bot.token}"
+    reqs = [
+        ("POST", url, {"json": _update_callback(6_000_000 + i, f"checkout_{amb.plano.id}")})
+        for i in range(perfil["checkout"])
+    ]
+    await _disparar(amb, resultado, reqs, perfil["concorrencia"])
+    return resultado
+
+
+async def cenario_pix(amb: Ambiente, perfil: dict) -> Resultado:
+    """Enxurrada de webhooks de pagamento aprovando pedidos pendentes."""
+    from database import SessionLocal, Pedido
+
+    db = SessionLocal()
+    try:
+        txids = [f"loadpix{i:08d}" for i in range(perfil["pix"])]
+        db.bulk_insert_mappings(Pedido, [
+            {
+                "bot_id": amb.bot.id, "telegram_id": str(7_000_000 + i), "first_name": f"Lead{i}",
+                "plano_nome": amb.plano.nome_exibicao, "plano_id": amb.plano.id, "valor": 19.90,
+                "status": "pending", "txid": tx, "transaction_id": tx, "gateway_usada": "pushinpay",
+            }
+            for i, tx in enumerate(txids)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    resultado = Resultado("payment_webhook_flood")
+    reqs = [("POST", "/webhook/pix", {"json": {"id": tx, "status": "paid", "value": 1990}}) for tx in txids]
+    await _disparar(amb, resultado, reqs, perfil["concorrencia"])
+    return resultado
+
+
+async def cenario_remarketing(amb: Ambiente, perfil: dict) -> Resultado:
+    """Blast de remarketing para N leads (a requisição só termina após a background task)."""
+    from database import SessionLocal, Lead
+
+    db = SessionLocal()
+    try:
+        lote = 5000
+        for inicio in range(0, perfil["leads"], lote):
+            db.bulk_insert_mappings(Lead, [
+                {"user_id": str(8_000_000 + i), "nome": f"Lead{i}", "bot_id": amb.bot.id}
+                for i in range(inicio, min(inicio + lote, perfil["leads"]))
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+    resultado = Resultado("remarketing_blast")
+    reqs = [(
+        "POST", "/api/admin/remarketing/send",
+        {
+            "json": {"bot_id": amb.bot.id, "target": "todos", "mensagem": "Oferta de carga 🚀"},
+            "headers": {"Authorization": f"Bearer {amb.token_admin}"},
+        },
+    )]
+    await _disparar(amb, resultado, reqs, 1)
+    return resultado
+
+
+async def cenario_vencimentos(amb: Ambiente, perfil: dict) -> Resultado:
+    """Vencimento em massa: roda o job verificar_vencimentos sobre N assinaturas vencidas."""
+    from datetime import timedelta
+    from database import SessionLocal, Pedido, now_brazil
+
+    vencido = now_brazil() - timedelta(days=1)
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(Pedido, [
+            {
+                "bot_id": amb.bot.id, "telegram_id": str(9_000_000 + i), "first_name": f"Assinante{i}",
+                "plano_nome": amb.plano.nome_exibicao, "plano_id": amb.plano.id, "valor": 19.90,
+                "status": "approved", "txid": f"loadexp{i:08d}", "data_aprovacao": vencido - timedelta(days=30),
+                "data_expiracao": vencido,
+            }
+            for i in range(perfil["vencimentos"])
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    resultado = Resultado("mass_expiry")
+    inicio = time.perf_counter()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, amb.main.verificar_vencimentos)
+    except Exception:
+        resultado.erros += 1
+    resultado.duracao = time.perf_counter() - inicio
+    resultado.latencias.append(resultado.duracao)
+    return resultado
+
+
+CENARIOS = {
+    "start": cenario_start,
+    "checkout": cenario_checkout,
+    "pix": cenario_pix,
+    "remarketing": cenario_remarketing,
+    "vencimentos": cenario_vencimentos,
+}
+
+
+# =========================================================
+# ▶️ EXECUÇÃO
+# =========================================================
+def imprimir_tabela(resumos: list):
+    colunas = ["cenario", "requisicoes", "erros", "vazao_rps", "p50_ms", "p95_ms", "p99_ms",
+               "queries_db", "queries_por_req", "chamadas_telegram", "telegram_429", "chamadas_gateway"]
+    larguras = {c: max(len(c), *(len(str(r[c])) for r in resumos)) for c in colunas}
+    print(" | ".join(c.ljust(larguras[c]) for c in colunas))
+    print("-+-".join("-" * larguras[c] for c in colunas))
+    for r in resumos:
+        print(" | ".join(str(r[c]).ljust(larguras[c]) for c in colunas))
+
+
+def dimensionar_pool(concorrencia: int) -> int:
+    """
+    Pool realtime com folga para a concorrência pedida (antes do import do
+    main). Se DB_POOL_REALTIME_* já vier do ambiente, limita a concorrência.
+    """
+    os.environ.setdefault("DB_POOL_REALTIME_SIZE", str(concorrencia * CONEXOES_POR_REQUISICAO))
+    os.environ.setdefault("DB_POOL_REALTIME_OVERFLOW", "10")
+    capacidade = int(os.environ["DB_POOL_REALTIME_SIZE"]) + int(os.environ["DB_POOL_REALTIME_OVERFLOW"])
+    maximo = max(1, capacidade // CONEXOES_POR_REQUISICAO)
+    if concorrencia > maximo:
+        print(f"⚠️ Concorrência {concorrencia} não cabe no pool ({capacidade} conexões): usando {maximo}")
+        return maximo
+    return concorrencia
+
+
+async def executar(args) -> int:
+    perfil = dict(PERFIS[args.perfil])
+    if args.leads:
+        perfil["leads"] = args.leads
+    if args.concorrencia:
+        perfil["concorrencia"] = args.concorrencia
+    perfil["concorrencia"] = dimensionar_pool(perfil["concorrencia"])
+    cenarios = [c.strip() for c in args.cenarios.split(",") if c.strip()]
+    desconhecidos = [c for c in cenarios if c not in CENARIOS]
+    if desconhecidos:
+        print(f"❌ Cenários desconhecidos: {desconhecidos}. Disponíveis: {TODOS_CENARIOS}")
+        return 2
+
+    random.seed(args.seed)
+    amb = Ambiente(args)
+    resumos = []
+    try:
+        await amb.subir()
+        for nome in cenarios:
+            print(f"🎬 Rodando cenário '{nome}'...")
+            queries_inicio = amb.zerar_contadores()
+            resultado = await CENARIOS[nome](amb, perfil)
+            amb.fechar_resultado(resultado, queries_inicio)
+            resumos.append(resultado.resumo())
+    finally:
+        await amb.descer()
+
+    print()
+    imprimir_tabela(resumos)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"perfil": args.perfil, "parametros": perfil, "cenarios": resumos}, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultado salvo em {args.json}")
+
+    # Gates para CI
+    falhou = False
+    for r in resumos:
+        taxa_erro = r["erros"] / r["requisicoes"] if r["requisicoes"] else 0
+        if taxa_erro > args.max_taxa_erro:
+            print(f"❌ {r['cenario']}: taxa de erro {taxa_erro:.1%} > {args.max_taxa_erro:.1%}")
+            falhou = True
+        if args.max_p95_ms and r["p95_ms"] > args.max_p95_ms and r["cenario"] not in ("remarketing_blast", "mass_expiry"):
+            print(f"❌ {r['cenario']}: p95 {r['p95_ms']}ms > {args.max_p95_ms}ms")
+            falhou = True
+    return 1 if falhou else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harness de carga offline do Zenyx")
+    parser.add_argument("--perfil", choices=sorted(PERFIS), default="ci")
+    parser.add_argument("--cenarios", default=",".join(TODOS_CENARIOS))
+    parser.add_argument("--leads", type=int, default=0, help="Sobrescreve a quantidade de leads do blast")
+    parser.add_argument("--concorrencia", type=int, default=0)
+    parser.add_argument("--telegram-latencia-ms", type=float, default=30)
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração de chamadas ao Telegram com 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--gateway-latencia-ms", type=float, default=150)
+    parser.add_argument("--gateway-taxa-erro", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Grava o resumo em JSON (para comparar execuções no CI)")
+    parser.add_argument("--max-taxa-erro", type=float, default=0.01)
+    parser.add_argument("--max-p95-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(executar(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,16 +10,16 @@ import threading
 from telebot import types
 import json
 import uuid
-import boto3
 from sqlalchemy.exc import IntegrityError
 import traceback  # 🔥 NOVO: Para logging detalhado de erros
 import asyncio  # 🔥 Garantir que asyncio está importado
+import contextvars
 from concurrent.futures import ThreadPoolExecutor
 
-from sqlalchemy import func, desc, text, and_, or_, extract
+from sqlalchemy import func, desc, text, and_, or_, extract, case
 from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks, Query, File, UploadFile, Form 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, StreamingResponse
 
 from pydantic import BaseModel, EmailStr, Field 
 from sqlalchemy.orm import Session
@@ -28,7 +28,62 @@ from datetime import datetime, timedelta
 from pytz import timezone
 
 # --- IMPORTS DE MIGRATION ---
-from force_migration import forcar_atualizacao_tabelas
+from migration_ledger import Migracao, aplicar_migracoes, versao_create_all
+import rotas_migracao
+
+# --- SYNC PAY: TOKENS EM CACHE (SINGLE-FLIGHT) ---
+from syncpay_tokens import SYNC_PAY_BASE_URL, POLL_CONCORRENCIA, obter_token_cacheado
+
+# --- CONFIGURAÇÃO DOS BOTS NO TELEGRAM (MENU/WEBHOOK) ---
+from bot_setup import reconciliar_menu_bot, reconciliar_webhook_bot, secret_valido, sincronizar_setup_bots
+
+# --- CIRCUIT BREAKER DAS GATEWAYS ---
+from gateway_health import get_breaker, ordenar_por_saude, status_gateways
+
+# --- MÉTRICAS (FORMATO PROMETHEUS) ---
+import metrics
+
+# --- SLOW-QUERY LOG / ORÇAMENTO DE QUERIES ---
+import query_monitor
+from query_monitor import medir_job
+
+# --- PROFILER POR AMOSTRAGEM (OPT-IN, SUPERADMIN) ---
+import profiler
+from profiler import amostrar
+
+# --- COORDENAÇÃO ENTRE RÉPLICAS (CLUSTER_MODE) ---
+import coordenacao
+from coordenacao import somente_lider
+
+# --- BARRAMENTO DE INVALIDAÇÃO DE CACHE (LISTEN/NOTIFY) ---
+import invalidacao
+
+# --- ESTATÍSTICAS AVANÇADAS EM SQL AGREGADO ---
+from estatisticas_sql import MotorEstatisticas, DIAS_SEMANA, STATUS_APROVADOS, totais_por_dono
+
+# --- CACHE CURTO DO DASHBOARD (POR USUÁRIO, COM COALESCÊNCIA) ---
+from cache_respostas import cache_por_usuario, invalidar_dono_do_bot
+
+# --- RECEITA MENSAL POR DONO (RANKING / METAS PRIME) ---
+import receita_dono
+
+# --- SÉRIE TEMPORAL DOS LINKS DE TRACKING ---
+import tracking_series
+
+# --- JORNADA DO CLIENTE (LOG DE EVENTOS DO FUNIL; registra os listeners do ORM) ---
+import jornada
+
+# --- EXPORTAÇÃO EM STREAMING (CSV / JSONL) ---
+import exportacao
+
+# --- BUSCA DE CONTATOS (pg_trgm / prefixo) ---
+import busca_contatos
+
+# --- NOTIFICAÇÕES DO PAINEL (BROADCAST EM UMA LINHA + CONTADOR EM CACHE) ---
+import notificacoes
+
+# --- AUDITORIA (GRAVAÇÃO EM LOTE + RETENÇÃO) ---
+import auditoria
 
 # 🆕 AUTENTICAÇÃO
 from passlib.context import CryptContext
@@ -50,6 +105,10 @@ thread_pool = ThreadPoolExecutor(max_workers=10, thread_name_prefix="zenyx")
 # =========================================================
 from database import (
     SessionLocal, 
+    get_db,
+    get_db_analytics,  # 🏊 Pool de analytics (réplica de leitura se configurada)
+    usar_pool,         # 🏊 Jobs no pool de background
+    ENGINES,
     init_db, 
     Bot as BotModel,  # ← RENOMEADO para evitar conflito com TeleBot
     PlanoConfig, 
@@ -97,6 +156,26 @@ from database import (
     LaunchStrategyConfig
 )
 
+# 📈 Instrumentação: Bot API do Telegram, pool do banco e fila do thread pool
+metrics.instrumentar_telegram()
+for _nome_pool, _engine_pool in ENGINES.items():
+    metrics.instrumentar_pool(_engine_pool, _nome_pool)
+metrics.instrumentar_thread_pool(thread_pool)
+
+# 🐢 Contagem de queries por requisição/job + log de queries lentas
+for _engine_pool in ENGINES.values():
+    query_monitor.instalar_hooks(_engine_pool)
+
+# Orçamentos de queries das rotas quentes (estourar loga; com
+# DB_ORCAMENTO_ESTRITO=true vira 500). Ajuste olhando o header X-DB-Queries.
+# Webhooks só logam: o 500 sairia depois do update processado e o Telegram /
+# a gateway reentregariam o mesmo evento.
+query_monitor.declarar_orcamento("/webhook/{token}", 40, estrito=False)
+query_monitor.declarar_orcamento("/webhook/pix", 40, estrito=False)
+query_monitor.declarar_orcamento("/api/admin/dashboard/stats", 30)
+query_monitor.declarar_orcamento("/api/admin/bots-overview", 30)
+query_monitor.declarar_orcamento("/api/superadmin/users", 30)
+
 import update_db 
 
 # ============================================================
@@ -126,10 +205,13 @@ def agendar_destruicao_msg(bot, chat_id, message_id, delay_seconds=5):
 # =========================================================
 # ✨ FUNÇÃO: CONVERTER SHORTCODES DE EMOJIS PREMIUM
 # =========================================================
-# Cache em memória para evitar consultas repetitivas ao banco
+# Cache em memória para evitar consultas repetitivas ao banco.
+# O CRUD publica "premium_emoji" no barramento (invalidacao.py) e todos os
+# workers recarregam na hora; o TTL longo é só rede de segurança.
 _premium_emoji_cache = {}
 _premium_emoji_cache_ts = 0
-PREMIUM_EMOJI_CACHE_TTL = 300  # 5 minutos
+_premium_emoji_cache_geracao = None
+PREMIUM_EMOJI_CACHE_TTL = 3600  # 1 hora
 
 def convert_premium_emojis(text: str, db: Session = None) -> str:
     """
@@ -139,7 +221,7 @@ def convert_premium_emojis(text: str, db: Session = None) -> str:
     Entrada:  "Olá! :fire_premium: Confira nossa oferta :star_premium:"
     Saída:    "Olá! <tg-emoji emoji-id=\"5408846744727334338\">🔥</tg-emoji> Confira nossa oferta <tg-emoji emoji-id=\"123456\">⭐</tg-emoji>"
     """
-    global _premium_emoji_cache, _premium_emoji_cache_ts
+    global _premium_emoji_cache, _premium_emoji_cache_ts, _premium_emoji_cache_geracao
     
     if not text or ':' not in text:
         return text
@@ -153,9 +235,13 @@ def convert_premium_emojis(text: str, db: Session = None) -> str:
     logger.info(f"✨ [EMOJI CONVERT] Encontrados {len(shortcodes_found)} shortcodes no texto: {shortcodes_found[:5]}...")
     
     now = time.time()
+    # Lida ANTES da consulta: invalidação durante a recarga força outra recarga
+    geracao_atual = invalidacao.geracao("premium_emoji")
     
-    # Recarrega cache se expirou
-    if now - _premium_emoji_cache_ts > PREMIUM_EMOJI_CACHE_TTL or not _premium_emoji_cache:
+    # Recarrega cache se expirou ou foi invalidado por algum worker
+    if (now - _premium_emoji_cache_ts > PREMIUM_EMOJI_CACHE_TTL
+            or not _premium_emoji_cache
+            or _premium_emoji_cache_geracao != geracao_atual):
         try:
             if db is None:
                 _db = SessionLocal()
@@ -170,6 +256,7 @@ def convert_premium_emojis(text: str, db: Session = None) -> str:
                 for e in emojis
             }
             _premium_emoji_cache_ts = now
+            _premium_emoji_cache_geracao = geracao_atual
             logger.info(f"✨ [EMOJI CACHE] Recarregado com {len(_premium_emoji_cache)} emojis premium. Shortcodes: {list(_premium_emoji_cache.keys())[:10]}...")
             
             if should_close:
@@ -213,10 +300,9 @@ def strip_premium_emoji_tags(text: str) -> str:
     return re.sub(r'<tg-emoji emoji-id="[^"]*">([^<]*)</tg-emoji>', r'\1', text)
 
 
-def invalidate_premium_emoji_cache():
-    """Invalida o cache de emojis premium (chamado após CRUD de emojis)."""
-    global _premium_emoji_cache_ts
-    _premium_emoji_cache_ts = 0
+def invalidate_premium_emoji_cache(entidade_id: int = None):
+    """Invalida o cache de emojis premium em todos os workers (chamado após CRUD de emojis)."""
+    invalidacao.publicar("premium_emoji", entidade_id)
     logger.info("✨ [EMOJI CACHE] Cache invalidado")
 
 # ============================================================
@@ -276,36 +362,6 @@ def replace_date_variables(text: str) -> str:
     
     return texto_convertido
 
-# =========================================================
-# 🆓 FUNÇÃO: APROVAR ENTRADA NO CANAL FREE
-# =========================================================
-def aprovar_entrada_canal_free(bot_token: str, canal_id: str, user_id: int):
-    """
-    Aprova entrada do usuário no canal após o delay configurado.
-    Executado pelo scheduler.
-    🔥 FIX: threaded=False para não criar threads extras no Railway.
-    🔥 FIX: Retry com 3 tentativas para lidar com erros temporários.
-    """
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            bot = telebot.TeleBot(bot_token, threaded=False)
-            bot.approve_chat_join_request(int(canal_id), user_id)
-            logger.info(f"✅ [CANAL FREE] Usuário {user_id} aprovado no canal {canal_id}")
-            return  # Sucesso, sai da função
-        except Exception as e:
-            error_msg = str(e).lower()
-            # Se o usuário já foi aprovado ou não tem request pendente, ignora
-            if "user_already_participant" in error_msg or "hide_requester_missing" in error_msg or "request not found" in error_msg:
-                logger.info(f"ℹ️ [CANAL FREE] Usuário {user_id} já aprovado/participante no canal {canal_id}")
-                return
-            
-            if attempt < max_retries - 1:
-                logger.warning(f"⚠️ [CANAL FREE] Tentativa {attempt+1}/{max_retries} falhou para {user_id}: {e}")
-                import time
-                time.sleep(2)  # Espera 2s antes de tentar novamente
-            else:
-                logger.error(f"❌ [CANAL FREE] Todas as {max_retries} tentativas falharam para {user_id}: {e}")
 
 # =========================================================
 # 🚀 FUNÇÃO: APROVAR, DAR BOAS VINDAS E AGENDAR KICK (LANÇAMENTO)
@@ -483,15 +539,6 @@ def expulsar_usuario_lancamento(bot_token: str, canal_id: str, user_id: int, bot
     finally:
         db.close()
 
-# Configuração de Log
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-app = FastAPI(title="Zenyx Gbot SaaS")
-
-# 🔥 CONFIGURAÇÃO DE FUSO HORÁRIO - BRASÍLIA/SÃO PAULO
-BRAZIL_TZ = timezone('America/Sao_Paulo')
-
 # ============================================================
 # 🎯 SISTEMA DE SESSÃO DE SIMULAÇÃO DE COPY (IN-MEMORY)
 # Armazena sessões temporárias de simulação interativa.
@@ -721,19 +768,51 @@ async def add_cache_control_header(request: Request, call_next):
         response.headers["Expires"] = "0"
     return response
 
-# 🔥 CONFIGURAÇÃO DE FUSO HORÁRIO - BRASÍLIA/SÃO PAULO
-BRAZIL_TZ = timezone('America/Sao_Paulo')
+# 📈 MIDDLEWARE DE LATÊNCIA: histograma por rota TEMPLADA ("/webhook/{token}"),
+# nunca pela URL crua (o token do bot explodiria a cardinalidade)
+@app.middleware("http")
+async def medir_latencia_http(request: Request, call_next):
+    inicio = time.monotonic()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        rota = request.scope.get("route")
+        caminho = getattr(rota, "path", None) or "unmatched"
+        metrics.http_latencia.observar(time.monotonic() - inicio, request.method, caminho, str(status))
 
-# ============================================================
-# 🎯 SISTEMA DE SESSÃO DE SIMULAÇÃO DE COPY (IN-MEMORY)
-# Armazena sessões temporárias de simulação interativa.
-# Cada sessão tem TTL de 10 minutos e é limpa automaticamente.
-# ============================================================
-import uuid as _uuid_mod
-import threading as _threading_mod
+# 🐢 MIDDLEWARE DE QUERIES: conta queries/tempo de banco da requisição,
+# aplica o orçamento declarado da rota e expõe X-DB-* em modo debug
+@app.middleware("http")
+async def monitorar_queries_db(request: Request, call_next):
+    stats, token_ctx = query_monitor.iniciar_requisicao(request.scope)
+    try:
+        response = await call_next(request)
+    finally:
+        query_monitor.encerrar(token_ctx)
+    
+    rota = getattr(request.scope.get("route"), "path", None)
+    orcamento = query_monitor.orcamento_da_rota(rota) if rota else 0
+    if orcamento and stats.queries > orcamento:
+        logger.warning(
+            f"🐢 [DB BUDGET] {stats.origem}: {stats.queries} queries "
+            f"({stats.tempo * 1000:.0f}ms) acima do orçamento de {orcamento}"
+        )
+        if query_monitor.orcamento_estrito(rota):
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": f"Orçamento de queries excedido: {stats.queries}/{orcamento}"}
+            )
+    
+    if query_monitor.DB_DEBUG_HEADERS:
+        response.headers["X-DB-Queries"] = str(stats.queries)
+        response.headers["X-DB-Time"] = f"{stats.tempo * 1000:.1f}ms"
+    return response
 
-_simcopy_sessions = {}  # {session_id: {steps: [...], current_step: 0, bot_token: str, admin_id: str, created_at: float, ...}}
-_simcopy_lock = _threading_mod.Lock()
+# 🔥 CONFIGURAÇÃO DE FUSO HORÁRIO - BRASÍLIA/SÃO PAULO
+BRAZIL_TZ = timezone('America/Sao_Paulo')
 
 # ============================================================
 # 🔊 HELPER: ENVIO INTELIGENTE DE ÁUDIO OGG
@@ -1324,6 +1403,9 @@ def cancelar_remarketing(chat_id):
         # Cancela mensagens alternantes
         cancelar_alternacao_mensagens(chat_id)
         
+        # 🌐 Cluster: fila durável + tasks locais das outras réplicas
+        coordenacao.propagar_cancelamento(chat_id)
+        
         logger.info(f"✅ Remarketing cancelado para {chat_id}")
         
     except Exception as e:
@@ -1339,6 +1421,7 @@ def cancelar_remarketing(chat_id):
 
 # 🔥 CORREÇÃO MESTRE: Removido o 'async' para rodar em Thread separada.
 # Isso impede que o 'time.sleep()' dentro do TeleBot congele o servidor web inteiro!
+@amostrar("verificar_vencimentos")
 def verificar_vencimentos():
     """
     Job agendado para verificar e processar vencimentos de assinaturas.
@@ -1521,90 +1604,6 @@ def verificar_vencimentos():
         logger.error(f"❌ [JOB] Erro crítico na verificação de vencimentos: {str(e)}")
 
 
-async def processar_webhooks_pendentes():
-    """
-    Job agendado para reprocessar webhooks falhados.
-    Executa a cada 1 minuto.
-    """
-    try:
-        logger.info("🔄 [WEBHOOK-RETRY] Iniciando reprocessamento...")
-        
-        db = SessionLocal()
-        
-        try:
-            # Buscar webhooks pendentes que estão prontos para retry
-            webhooks = db.query(WebhookRetry).filter(
-                WebhookRetry.status == 'pending',
-                WebhookRetry.attempts < WebhookRetry.max_attempts,
-                (WebhookRetry.next_retry == None) | (WebhookRetry.next_retry <= now_brazil())
-            ).order_by(WebhookRetry.created_at).limit(10).all()
-            
-            if not webhooks:
-                return  # Sem webhooks para processar
-            
-            logger.info(f"📋 [WEBHOOK-RETRY] {len(webhooks)} webhooks para reprocessar")
-            
-            for webhook in webhooks:
-                try:
-                    # Deserializar payload
-                    payload = json.loads(webhook.payload)
-                    
-                    # Incrementar tentativas
-                    webhook.attempts += 1
-                    
-                    # Reprocessar baseado no tipo
-                    success = False
-                    error_msg = None
-                    
-                    if webhook.webhook_type == 'pushinpay':
-                        try:
-                            # TODO: Chamar função real de processamento
-                            # await processar_webhook_pix(payload)
-                            success = True  # Placeholder por enquanto
-                        except Exception as e:
-                            error_msg = str(e)
-                    
-                    # Atualizar registro
-                    if success:
-                        webhook.status = 'success'
-                        webhook.updated_at = now_brazil()
-                        logger.info(f"✅ [WEBHOOK-RETRY] Webhook #{webhook.id} processado")
-                    else:
-                        # Calcular próximo retry (exponential backoff)
-                        backoff_minutes = 2 ** webhook.attempts  # 2, 4, 8, 16, 32
-                        webhook.next_retry = now_brazil() + timedelta(minutes=backoff_minutes)
-                        
-                        # Verificar se esgotou tentativas
-                        if webhook.attempts >= webhook.max_attempts:
-                            webhook.status = 'failed'
-                            webhook.next_retry = None
-                            logger.error(
-                                f"❌ [WEBHOOK-RETRY] Webhook #{webhook.id} "
-                                f"esgotou tentativas"
-                            )
-                        else:
-                            webhook.status = 'pending'
-                        
-                        webhook.last_error = error_msg
-                        webhook.updated_at = now_brazil()
-                    
-                    db.commit()
-                
-                except Exception as e:
-                    logger.error(
-                        f"❌ [WEBHOOK-RETRY] Erro ao processar webhook "
-                        f"#{webhook.id}: {str(e)}"
-                    )
-                    db.rollback()
-                    continue
-            
-            logger.info("✅ [WEBHOOK-RETRY] Reprocessamento concluído")
-            
-        finally:
-            db.close()
-        
-    except Exception as e:
-        logger.error(f"❌ [WEBHOOK-RETRY] Erro crítico: {str(e)}")
 
 
 # ============================================================
@@ -1641,6 +1640,25 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"❌ [SHUTDOWN] Erro ao encerrar Scheduler: {e}")
     
+    # 3. Gravar amostras do profiler (se estiver ligado)
+    if profiler.status()["ativo"]:
+        try:
+            profiler.desligar()
+        except Exception as e:
+            logger.error(f"❌ [SHUTDOWN] Erro ao gravar profiler: {e}")
+    
+    # 4. Gravar os logs de auditoria que ainda estão na fila
+    try:
+        await asyncio.to_thread(auditoria.parar)
+    except Exception as e:
+        logger.error(f"❌ [SHUTDOWN] Erro ao gravar fila de auditoria: {e}")
+    
+    # 5. Liberar a liderança do cluster para outra réplica
+    try:
+        coordenacao.parar()
+    except Exception as e:
+        logger.error(f"❌ [SHUTDOWN] Erro ao parar coordenação: {e}")
+    
     logger.info("👋 [SHUTDOWN] Sistema encerrado")
 
 # ============================================================
@@ -2142,7 +2160,17 @@ def schedule_remarketing_and_alternating(bot_id: int, chat_id: int, payment_mess
             else:
                 logger.info(f"ℹ️ [SCHEDULE] Mensagens alternantes desativadas")
 
-            if config.is_active:
+            if config.is_active and coordenacao.ativo():
+                # 🌐 Cluster: tarefa durável na fila; a réplica que estiver livre
+                # quando vencer dispara (SKIP LOCKED) e o cancelamento vale para todas
+                coordenacao.agendar_tarefa(
+                    "remarketing",
+                    f"remarketing:{chat_id}",
+                    {"bot_id": bot_id, "chat_id": chat_id, "config": config_dict, "user_info": user_info},
+                    now_brazil() + timedelta(minutes=config.delay_minutes)
+                )
+                logger.info(f"✅ [SCHEDULE] Remarketing na fila do cluster para daqui a {config.delay_minutes} minutos")
+            elif config.is_active:
                 logger.info(f"⏰ [SCHEDULE] Agendando remarketing para daqui a {config.delay_minutes} minutos")
                 
                 loop = asyncio.get_event_loop()
@@ -2166,6 +2194,23 @@ def schedule_remarketing_and_alternating(bot_id: int, chat_id: int, payment_mess
     except Exception as e: 
         logger.error(f"❌ [SCHEDULE] Erro: {e}", exc_info=True)
 
+@coordenacao.registrar_executor("remarketing")
+async def executar_tarefa_remarketing(payload: dict):
+    """Disparo reivindicado da fila do cluster: o atraso já passou, envia direto."""
+    db = SessionLocal()
+    try:
+        bot = db.query(BotModel).filter(BotModel.id == payload["bot_id"]).first()
+        token = bot.token if bot else None
+    finally:
+        db.close()
+    
+    if not token:
+        logger.warning(f"⚠️ [CLUSTER] Bot {payload.get('bot_id')} sem token, remarketing descartado")
+        return
+    
+    config_dict = dict(payload.get("config") or {}, delay_minutes=0)
+    await send_remarketing_job(token, int(payload["chat_id"]), config_dict, payload.get("user_info") or {}, payload["bot_id"])
+
 # =========================================================
 # 🔄 SISTEMA DE RETRY DE WEBHOOKS
 # =========================================================
@@ -2257,6 +2302,113 @@ async def processar_webhooks_pendentes():
 # =========================================================
 # 🔄 SYNC PAY POLLING: VERIFICAR PAGAMENTOS PENDENTES
 # =========================================================
+# 📅 Agenda adaptativa (em memória): pedidos novos são consultados a cada
+# execução (30s); depois de SYNCPAY_POLL_JANELA_QUENTE o intervalo dobra a
+# cada consulta até SYNCPAY_POLL_INTERVALO_MAX. Quem paga, paga nos primeiros
+# minutos — não faz sentido consultar um PIX de 1h30 a cada 30s.
+SYNCPAY_POLL_JANELA_QUENTE = timedelta(minutes=10)
+SYNCPAY_POLL_INTERVALO_MIN = 30    # segundos
+SYNCPAY_POLL_INTERVALO_MAX = 600   # segundos
+_syncpay_poll_agenda = {}  # {pedido_id: (proxima_consulta_monotonic, consultas_feitas)}
+
+def _syncpay_deve_consultar(pedido_id: int, created_at, agora_mono: float, agora_br) -> bool:
+    """Decide se o pedido entra nesta rodada e já agenda a próxima consulta."""
+    proxima, consultas = _syncpay_poll_agenda.get(pedido_id, (0.0, 0))
+    if agora_mono < proxima:
+        return False
+    
+    idade = timedelta(0)
+    if created_at:
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=agora_br.tzinfo)
+        idade = agora_br - created_at
+    
+    if idade <= SYNCPAY_POLL_JANELA_QUENTE:
+        intervalo = SYNCPAY_POLL_INTERVALO_MIN
+    else:
+        intervalo = min(SYNCPAY_POLL_INTERVALO_MIN * (2 ** consultas), SYNCPAY_POLL_INTERVALO_MAX)
+        consultas += 1
+    
+    # Pequena folga para não perder a rodada seguinte por milissegundos
+    _syncpay_poll_agenda[pedido_id] = (agora_mono + intervalo - 1, consultas)
+    return True
+
+async def _consultar_status_syncpay(bot, tx_id: str, client: httpx.AsyncClient):
+    """Consulta o status de UMA transação na Sync Pay (sem tocar no banco)."""
+    token = await obter_token_syncpay(bot)
+    if not token:
+        return None
+    
+    url = f"{SYNC_PAY_BASE_URL}/api/partner/v1/transaction/{tx_id}"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/json"
+    }
+    response = await client.get(url, headers=headers, timeout=10)
+    
+    # 🔧 FIX: Se 401, renova o token UMA vez (single-flight por bot) e tenta de novo
+    if response.status_code == 401:
+        logger.warning(f"⚠️ [SYNCPAY-POLL] Token expirado para bot {bot.id}. Renovando...")
+        token = await obter_token_syncpay(bot, token_rejeitado=token)
+        if not token:
+            logger.error(f"❌ [SYNCPAY-POLL] Falha ao renovar token para bot {bot.id}. Verifique client_id/client_secret.")
+            return None
+        headers["Authorization"] = f"Bearer {token}"
+        response = await client.get(url, headers=headers, timeout=10)
+    
+    if response.status_code != 200:
+        logger.warning(f"⚠️ [SYNCPAY-POLL] Erro ao consultar {tx_id}: HTTP {response.status_code}")
+        return None
+    
+    resp_data = response.json()
+    tx_data = resp_data.get("data", resp_data)
+    return str(tx_data.get("status", "")).lower()
+
+async def _processar_syncpay_confirmado(pedido_id: int, tx_id: str, valor: float):
+    """Simula o webhook_pix internamente para entregar um pedido confirmado via polling."""
+    try:
+        fake_payload = json.dumps({
+            "data": {
+                "id": tx_id,
+                "status": "completed",
+                "amount": valor
+            }
+        }).encode("utf-8")
+        
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/webhook/pix",
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"event", b"cashin.update"),
+            ],
+        }
+        
+        class FakeReceive:
+            def __init__(self, body):
+                self._body = body
+                self._sent = False
+            async def __call__(self):
+                if not self._sent:
+                    self._sent = True
+                    return {"type": "http.request", "body": self._body}
+                return {"type": "http.disconnect"}
+        
+        fake_request = Request(scope, receive=FakeReceive(fake_payload))
+        
+        # Usar uma sessão nova para não conflitar
+        db_new = SessionLocal()
+        try:
+            result = await webhook_pix(fake_request, db_new)
+            logger.info(f"✅ [SYNCPAY-POLL] Resultado: {result}")
+        finally:
+            db_new.close()
+    
+    except Exception as e_process:
+        logger.error(f"❌ [SYNCPAY-POLL] Erro ao processar pedido #{pedido_id}: {e_process}", exc_info=True)
+
+@amostrar("verificar_pagamentos_syncpay")
 async def verificar_pagamentos_syncpay():
     """
     🔥 SOLUÇÃO DEFINITIVA: Consulta a API da Sync Pay para verificar
@@ -2264,133 +2416,90 @@ async def verificar_pagamentos_syncpay():
     
     A Sync Pay NEM SEMPRE envia o webhook de confirmação (cashin.update).
     Este job roda a cada 30 segundos e faz polling ativo.
+    
+    ⚡ Os bots são carregados numa única query, o token vem do cache em memória
+    (single-flight) e as consultas rodam em paralelo limitadas por semáforo,
+    com agenda adaptativa — a duração não cresce linearmente com os pendentes.
     """
     db = SessionLocal()
     try:
         # Buscar pedidos PENDENTES que usaram Sync Pay (criados nas últimas 2 horas)
-        from datetime import timedelta
-        limite = now_brazil() - timedelta(hours=2)
+        agora_br = now_brazil()
+        limite = agora_br - timedelta(hours=2)
         
-        pedidos_pendentes = db.query(Pedido).filter(
+        pedidos_pendentes = db.query(
+            Pedido.id, Pedido.bot_id, Pedido.transaction_id, Pedido.txid, Pedido.valor, Pedido.created_at
+        ).filter(
             Pedido.status == "pending",
             Pedido.gateway_usada == "syncpay",
             Pedido.created_at >= limite
         ).all()
         
+        # Esquece agendas de pedidos que já saíram de pending
+        ids_pendentes = {p.id for p in pedidos_pendentes}
+        for pid in list(_syncpay_poll_agenda):
+            if pid not in ids_pendentes:
+                _syncpay_poll_agenda.pop(pid, None)
+        
         if not pedidos_pendentes:
             return  # Nada para verificar
         
-        logger.info(f"🔄 [SYNCPAY-POLL] Verificando {len(pedidos_pendentes)} pedidos pendentes...")
+        agora_mono = time.monotonic()
+        rodada = [
+            p for p in pedidos_pendentes
+            if (p.transaction_id or p.txid) and _syncpay_deve_consultar(p.id, p.created_at, agora_mono, agora_br)
+        ]
+        if not rodada:
+            return
         
-        for pedido in pedidos_pendentes:
-            try:
-                # Buscar o bot para obter credenciais
-                bot = db.query(BotModel).filter(BotModel.id == pedido.bot_id).first()
-                if not bot or not bot.syncpay_client_id:
-                    continue
-                
-                # Obter token da Sync Pay
-                token = await obter_token_syncpay(bot, db)
-                if not token:
-                    continue
-                
-                # Consultar status da transação na API
-                tx_id = pedido.transaction_id or pedido.txid
-                if not tx_id:
-                    continue
-                
-                url = f"{SYNC_PAY_BASE_URL}/api/partner/v1/transaction/{tx_id}"
-                headers = {
-                    "Authorization": f"Bearer {token}",
-                    "Accept": "application/json"
-                }
-                
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(url, headers=headers, timeout=10)
-                
-                # 🔧 FIX: Se 401, invalidar token em cache e tentar renovar UMA vez
-                if response.status_code == 401:
-                    logger.warning(f"⚠️ [SYNCPAY-POLL] Token expirado para bot {bot.id}. Invalidando e renovando...")
-                    bot.syncpay_access_token = None
-                    bot.syncpay_token_expires_at = None
-                    db.commit()
-                    
-                    # Tentar renovar o token
-                    token = await obter_token_syncpay(bot, db)
-                    if not token:
-                        logger.error(f"❌ [SYNCPAY-POLL] Falha ao renovar token para bot {bot.id}. Verifique client_id/client_secret.")
-                        continue
-                    
-                    # Retry com novo token
-                    headers["Authorization"] = f"Bearer {token}"
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(url, headers=headers, timeout=10)
-                
-                if response.status_code != 200:
-                    logger.warning(f"⚠️ [SYNCPAY-POLL] Erro ao consultar {tx_id}: HTTP {response.status_code}")
-                    continue
-                
-                resp_data = response.json()
-                tx_data = resp_data.get("data", resp_data)
-                status_api = str(tx_data.get("status", "")).lower()
-                
-                logger.info(f"🔍 [SYNCPAY-POLL] Pedido #{pedido.id} ({tx_id[:12]}...): status = {status_api}")
-                
-                if status_api == "completed":
-                    logger.info(f"✅ [SYNCPAY-POLL] PAGAMENTO CONFIRMADO! Pedido #{pedido.id}. Processando entrega...")
-                    
-                    # Simular webhook_pix internamente
-                    try:
-                        import io
-                        fake_payload = json.dumps({
-                            "data": {
-                                "id": tx_id,
-                                "status": "completed",
-                                "amount": pedido.valor
-                            }
-                        }).encode("utf-8")
-                        
-                        scope = {
-                            "type": "http",
-                            "method": "POST",
-                            "path": "/webhook/pix",
-                            "headers": [
-                                (b"content-type", b"application/json"),
-                                (b"event", b"cashin.update"),
-                            ],
-                        }
-                        
-                        class FakeReceive:
-                            def __init__(self, body):
-                                self._body = body
-                                self._sent = False
-                            async def __call__(self):
-                                if not self._sent:
-                                    self._sent = True
-                                    return {"type": "http.request", "body": self._body}
-                                return {"type": "http.disconnect"}
-                        
-                        fake_request = Request(scope, receive=FakeReceive(fake_payload))
-                        
-                        # Usar uma sessão nova para não conflitar
-                        db_new = SessionLocal()
-                        try:
-                            result = await webhook_pix(fake_request, db_new)
-                            logger.info(f"✅ [SYNCPAY-POLL] Resultado: {result}")
-                        finally:
-                            db_new.close()
-                    
-                    except Exception as e_process:
-                        logger.error(f"❌ [SYNCPAY-POLL] Erro ao processar pedido #{pedido.id}: {e_process}", exc_info=True)
-                
-                elif status_api == "failed":
-                    pedido.status = "failed"
-                    db.commit()
-                    logger.info(f"❌ [SYNCPAY-POLL] Pedido #{pedido.id} marcado como FAILED")
-                
-            except Exception as e_pedido:
-                logger.error(f"❌ [SYNCPAY-POLL] Erro ao verificar pedido #{pedido.id}: {e_pedido}")
+        # Buscar todos os bots de uma vez (evita N+1)
+        bot_ids = {p.bot_id for p in rodada}
+        bots = {
+            b.id: b for b in db.query(BotModel).filter(BotModel.id.in_(bot_ids)).all()
+            if b.syncpay_client_id
+        }
+        
+        logger.info(f"🔄 [SYNCPAY-POLL] Verificando {len(rodada)}/{len(pedidos_pendentes)} pedidos pendentes ({len(bots)} bots)...")
+        
+        semaforo = asyncio.Semaphore(POLL_CONCORRENCIA)
+        client = http_client or httpx.AsyncClient()
+        
+        async def consultar(pedido):
+            bot = bots.get(pedido.bot_id)
+            if not bot:
+                return pedido, None
+            tx_id = pedido.transaction_id or pedido.txid
+            async with semaforo:
+                try:
+                    return pedido, await _consultar_status_syncpay(bot, tx_id, client)
+                except Exception as e_pedido:
+                    logger.error(f"❌ [SYNCPAY-POLL] Erro ao verificar pedido #{pedido.id}: {e_pedido}")
+                    return pedido, None
+        
+        try:
+            resultados = await asyncio.gather(*(consultar(p) for p in rodada))
+        finally:
+            if client is not http_client:
+                await client.aclose()
+        
+        # Aplicar resultados em sequência (banco não é compartilhado entre coroutines)
+        for pedido, status_api in resultados:
+            if not status_api:
                 continue
+            tx_id = pedido.transaction_id or pedido.txid
+            
+            if status_api == "completed":
+                logger.info(f"✅ [SYNCPAY-POLL] PAGAMENTO CONFIRMADO! Pedido #{pedido.id} ({tx_id[:12]}...). Processando entrega...")
+                await _processar_syncpay_confirmado(pedido.id, tx_id, pedido.valor)
+                _syncpay_poll_agenda.pop(pedido.id, None)
+            
+            elif status_api == "failed":
+                db.query(Pedido).filter(Pedido.id == pedido.id, Pedido.status == "pending").update(
+                    {Pedido.status: "failed"}, synchronize_session=False
+                )
+                db.commit()
+                _syncpay_poll_agenda.pop(pedido.id, None)
+                logger.info(f"❌ [SYNCPAY-POLL] Pedido #{pedido.id} marcado como FAILED")
         
     except Exception as e:
         logger.error(f"❌ [SYNCPAY-POLL] Erro geral: {e}")
@@ -2399,9 +2508,12 @@ async def verificar_pagamentos_syncpay():
 
 scheduler = AsyncIOScheduler(timezone='America/Sao_Paulo')
 
+# 📈 Duração, erros e misfires de cada job
+metrics.instrumentar_scheduler(scheduler)
+
 # Adicionar jobs
 scheduler.add_job(
-    verificar_vencimentos,
+    medir_job("verificar_vencimentos")(usar_pool("background")(somente_lider("verificar_vencimentos")(verificar_vencimentos))),
     'interval',
     minutes=5,  # 🔥 CORREÇÃO: De hours=12 para minutes=5. Checa vencimentos o tempo todo!
     id='verificar_vencimentos',
@@ -2409,7 +2521,7 @@ scheduler.add_job(
 )
 
 scheduler.add_job(
-    processar_webhooks_pendentes,
+    medir_job("webhook_retry_processor")(usar_pool("background")(somente_lider("webhook_retry_processor")(processar_webhooks_pendentes))),
     'interval',
     minutes=1,
     id='webhook_retry_processor',
@@ -2417,7 +2529,7 @@ scheduler.add_job(
 )
 
 scheduler.add_job(
-    cleanup_orphan_jobs,
+    medir_job("cleanup_remarketing_jobs")(usar_pool("background")(cleanup_orphan_jobs)),
     'interval',
     hours=1,
     id='cleanup_remarketing_jobs',
@@ -2430,7 +2542,7 @@ logger.info("✅ [SCHEDULER] Job de cleanup de remarketing agendado (1h)")
 
 # 🔥 SYNC PAY POLLING: Verifica pagamentos pendentes a cada 30s
 scheduler.add_job(
-    verificar_pagamentos_syncpay,
+    medir_job("syncpay_polling")(usar_pool("background")(somente_lider("syncpay_polling")(verificar_pagamentos_syncpay))),
     'interval',
     seconds=30,
     id='syncpay_polling',
@@ -2438,6 +2550,52 @@ scheduler.add_job(
 )
 logger.info("✅ [SCHEDULER] Job de polling Sync Pay agendado (30s)")
 
+# 🏆 RECEITA MENSAL POR DONO: a carga inicial é a migração 0014 do ledger; aqui
+# reconciliamos os dois últimos meses e refazemos tudo de madrugada
+scheduler.add_job(
+    medir_job("receita_dono_reconciliar")(usar_pool("background")(somente_lider("receita_dono_reconciliar")(receita_dono.reconciliar_job))),
+    'interval',
+    minutes=30,
+    id='receita_dono_reconciliar',
+    max_instances=1,
+    replace_existing=True
+)
+scheduler.add_job(
+    medir_job("receita_dono_reconciliar_completo")(usar_pool("background")(somente_lider("receita_dono_reconciliar_completo")(receita_dono.reconciliar_job))),
+    'cron',
+    hour=4,
+    minute=0,
+    kwargs={"completo": True},
+    id='receita_dono_reconciliar_completo',
+    max_instances=1,
+    replace_existing=True
+)
+logger.info("✅ [SCHEDULER] Reconciliação da receita mensal por dono agendada (30 min + completa às 04:00)")
+
+# 📋 RETENÇÃO DA AUDITORIA: apaga logs mais velhos que AUDIT_RETENCAO_DIAS
+scheduler.add_job(
+    medir_job("audit_logs_retencao")(usar_pool("background")(somente_lider("audit_logs_retencao")(auditoria.limpar_antigos))),
+    'cron',
+    hour=3,
+    minute=30,
+    id='audit_logs_retencao',
+    max_instances=1,
+    replace_existing=True
+)
+logger.info(f"✅ [SCHEDULER] Retenção de audit_logs agendada (03:30, {auditoria.AUDIT_RETENCAO_DIAS} dias)")
+
+# 🌐 MODO CLUSTER: toda réplica reivindica tarefas vencidas da fila durável
+if coordenacao.ativo():
+    scheduler.add_job(
+        medir_job("tarefas_agendadas")(usar_pool("background")(coordenacao.processar_tarefas_vencidas)),
+        'interval',
+        seconds=15,
+        id='tarefas_agendadas',
+        max_instances=1,
+        replace_existing=True
+    )
+    logger.info(f"✅ [SCHEDULER] Fila de tarefas do cluster agendada (15s) | réplica {coordenacao.REPLICA_ID}")
+
 # ========================================
 # 🔧 AUXILIAR: DELETE ATRASADO (MENSAGEM FINAL)
 # ========================================
@@ -2468,6 +2626,7 @@ async def delayed_delete_message(token: str, chat_id: int, message_id: int, dela
 # ========================================
 # 🔄 JOB: MENSAGENS ALTERNANTES (GLOBAL - V7 FINAL)
 # ========================================
+@amostrar("enviar_mensagens_alternantes")
 async def enviar_mensagens_alternantes():
     """
     Envia mensagens alternantes. 
@@ -2475,27 +2634,7 @@ async def enviar_mensagens_alternantes():
     """
     db = SessionLocal()
     try:
-        # Auto-Migração
-        try:
-            db.execute(text("ALTER TABLE alternating_messages ADD COLUMN IF NOT EXISTS last_message_auto_destruct BOOLEAN DEFAULT FALSE"))
-            db.execute(text("ALTER TABLE alternating_messages ADD COLUMN IF NOT EXISTS last_message_destruct_seconds INTEGER DEFAULT 60"))
-            db.execute(text("ALTER TABLE alternating_messages ADD COLUMN IF NOT EXISTS max_duration_minutes INTEGER DEFAULT 60"))
-            
-            # 🔊 MIGRAÇÃO: Campos de áudio separado (Combo áudio + mídia)
-            db.execute(text("ALTER TABLE remarketing_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR(500)"))
-            db.execute(text("ALTER TABLE remarketing_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3"))
-            db.execute(text("ALTER TABLE canal_free_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR(500)"))
-            db.execute(text("ALTER TABLE canal_free_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3"))
-            db.execute(text("ALTER TABLE order_bump_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR"))
-            db.execute(text("ALTER TABLE order_bump_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3"))
-            db.execute(text("ALTER TABLE upsell_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR"))
-            db.execute(text("ALTER TABLE upsell_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3"))
-            db.execute(text("ALTER TABLE downsell_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR"))
-            db.execute(text("ALTER TABLE downsell_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3"))
-            logger.info("✅ Migração de audio_url concluída para todas as tabelas")
-            db.commit()
-        except Exception:
-            db.rollback()
+        # Colunas de alternantes/áudio: migration_v10 (ledger), não mais a cada execução
 
         bots = db.query(BotModel).all()
         
@@ -2629,7 +2768,7 @@ async def enviar_mensagens_alternantes():
 
 # Agenda o job (mantido)
 scheduler.add_job(
-    enviar_mensagens_alternantes,
+    medir_job("alternating_messages_job")(usar_pool("background")(somente_lider("alternating_messages_job")(enviar_mensagens_alternantes))),
     'interval',
     minutes=5, # Executa a cada 5 min para checar intervalos menores
     id='alternating_messages_job',
@@ -2646,12 +2785,6 @@ logger.info("✅ [SCHEDULER] Job de mensagens alternantes agendado (Verificaçã
 # Removida para evitar duplicação e leak de conexões.
 
 
-# 🔥 FORÇA A CRIAÇÃO DAS COLUNAS AO INICIAR
-try:
-    forcar_atualizacao_tabelas()
-except Exception as e:
-    print(f"Erro na migração forçada: {e}")
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -2764,15 +2897,9 @@ class UserDetailsResponse(BaseModel):
     total_sales: int
 
 # ========================================================
-# 1. FUNÇÃO DE CONEXÃO COM BANCO (TEM QUE SER A PRIMEIRA)
+# 1. FUNÇÃO DE CONEXÃO COM BANCO: get_db vem do database.py
+#    (compartilhada com os routers, ex: rotas_migracao.py)
 # =========================================================
-def get_db():
-    """Gera conexão com o banco de dados"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 # =========================================================
 # 🔧 FUNÇÕES AUXILIARES DE AUTENTICAÇÃO (CORRIGIDAS)
 # =========================================================
@@ -3392,6 +3519,8 @@ def log_action(
     Registra uma ação de auditoria.
     BLINDAGEM: Se não tiver user_id, apenas loga no console e ignora o banco
     para evitar erro de NotNullViolation.
+    A gravação é em lote, fora da requisição (auditoria.py): `db` não é usado
+    nem commitado aqui.
     """
     try:
         # 🔥 BLINDAGEM ANTI-CRASH
@@ -3407,28 +3536,24 @@ def log_action(
             import json
             details_json = json.dumps(details, ensure_ascii=False)
         
-        # Cria o registro de auditoria (Só chega aqui se tiver user_id)
-        audit_log = AuditLog(
-            user_id=user_id,
-            username=username,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            description=description,
-            details=details_json,
-            success=success,
-            error_message=error_message,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        
-        db.add(audit_log)
-        db.commit()
+        # Enfileira o registro de auditoria (Só chega aqui se tiver user_id)
+        auditoria.registrar({
+            "user_id": user_id,
+            "username": username,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "description": description,
+            "details": details_json,
+            "success": success,
+            "error_message": error_message,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+        })
         
     except Exception as e:
         logger.error(f"❌ Erro ao criar log de auditoria: {e}")
         # Não propaga o erro para não quebrar a operação principal
-        db.rollback()
 
 # FUNÇÃO 1: CRIAR OU ATUALIZAR LEAD (TOPO) - ATUALIZADA
 def criar_ou_atualizar_lead(
@@ -3505,6 +3630,7 @@ def mover_lead_para_pedido(
 # ============================================================
 # FUNÇÃO AUXILIAR: CANCELAR REMARKETING (ADICIONAR LINHA ~1320)
 # ============================================================
+@coordenacao.ao_cancelar  # 🌐 Também executado quando outra réplica publica o cancelamento
 def cancel_remarketing_for_user(chat_id: int):
     """
     Cancela todos os jobs de remarketing para um usuário específico.
@@ -3578,6 +3704,7 @@ def marcar_como_pago(db: Session, pedido_id: int):
     try:
         chat_id_int = int(pedido.telegram_id) if pedido.telegram_id.isdigit() else hash(pedido.telegram_id) % 1000000000
         cancel_remarketing_for_user(chat_id_int)
+        coordenacao.propagar_cancelamento(chat_id_int)
         logger.info(f"🛑 [REMARKETING] Jobs cancelados para {pedido.first_name} (pagou)")
     except Exception as e:
         logger.error(f"❌ [REMARKETING] Erro ao cancelar: {e}")
@@ -3640,333 +3767,6 @@ def registrar_remarketing(
         db.commit()
         logger.info(f"📧 Remarketing registrado (MEIO): {pedido.first_name}")
 
-   # 2. FORÇA A CRIAÇÃO DE TODAS AS COLUNAS FALTANTES (TODAS AS VERSÕES)
-    try:
-        with engine.connect() as conn:
-            logger.info("🔧 [STARTUP] Verificando integridade completa do banco...")
-            
-            comandos_sql = [
-                # ============================================================
-                # 🔥 [CORREÇÃO 0 - NOVO] SISTEMA DE LIMITES E PLANO DA PLATAFORMA
-                # ============================================================
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS plano_plataforma VARCHAR DEFAULT 'free';",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS max_bots INTEGER DEFAULT 20;",
-
-                # --- [CORREÇÃO 1] TABELA DE PLANOS ---
-                "ALTER TABLE planos_config ADD COLUMN IF NOT EXISTS key_id VARCHAR;",
-                "ALTER TABLE planos_config ADD COLUMN IF NOT EXISTS descricao TEXT;",
-                "ALTER TABLE planos_config ADD COLUMN IF NOT EXISTS preco_cheio FLOAT;",
-
-                # --- [CORREÇÃO 2] TABELA DE PEDIDOS ---
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS plano_id INTEGER;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS plano_nome VARCHAR;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS txid VARCHAR;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS qr_code TEXT;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS transaction_id VARCHAR;", 
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS data_aprovacao TIMESTAMP WITHOUT TIME ZONE;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS data_expiracao TIMESTAMP WITHOUT TIME ZONE;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS custom_expiration TIMESTAMP WITHOUT TIME ZONE;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS link_acesso VARCHAR;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS mensagem_enviada BOOLEAN DEFAULT FALSE;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS tem_order_bump BOOLEAN DEFAULT FALSE;", 
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS tracking_id INTEGER;",
-
-                # --- [CORREÇÃO 3] FLUXO DE MENSAGENS ---
-                "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS autodestruir_1 BOOLEAN DEFAULT FALSE;",
-                "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS msg_2_texto TEXT;",
-                "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS msg_2_media VARCHAR;",
-                "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS mostrar_planos_2 BOOLEAN DEFAULT TRUE;",
-                "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS mostrar_planos_1 BOOLEAN DEFAULT FALSE;",
-                
-                # --- [CORREÇÃO 4] REMARKETING AVANÇADO ---
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS target VARCHAR DEFAULT 'todos';",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS type VARCHAR DEFAULT 'massivo';",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS plano_id INTEGER;",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS promo_price FLOAT;",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS expiration_at TIMESTAMP WITHOUT TIME ZONE;",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS dia_atual INTEGER DEFAULT 0;",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS data_inicio TIMESTAMP WITHOUT TIME ZONE DEFAULT now();",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS proxima_execucao TIMESTAMP WITHOUT TIME ZONE;",
-                
-                # --- [CORREÇÃO 5] TABELA NOVA (FLOW V2) ---
-                """
-                CREATE TABLE IF NOT EXISTS bot_flow_steps (
-                    id SERIAL PRIMARY KEY,
-                    bot_id INTEGER REFERENCES bots(id),
-                    step_order INTEGER DEFAULT 1,
-                    msg_texto TEXT,
-                    msg_media VARCHAR,
-                    btn_texto VARCHAR DEFAULT 'Próximo ▶️',
-                    mostrar_botao BOOLEAN DEFAULT TRUE,
-                    autodestruir BOOLEAN DEFAULT FALSE,
-                    delay_seconds INTEGER DEFAULT 0,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
-                );
-                """,
-                
-                # --- [CORREÇÃO 6] SUPORTE NO BOT ---
-                "ALTER TABLE bots ADD COLUMN IF NOT EXISTS suporte_username VARCHAR;",
-
-                # --- [CORREÇÃO 7] TABELAS DE TRACKING ---
-                """
-                CREATE TABLE IF NOT EXISTS tracking_folders (
-                    id SERIAL PRIMARY KEY,
-                    nome VARCHAR,
-                    plataforma VARCHAR,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
-                );
-                """,
-                """
-                CREATE TABLE IF NOT EXISTS tracking_links (
-                    id SERIAL PRIMARY KEY,
-                    folder_id INTEGER REFERENCES tracking_folders(id),
-                    bot_id INTEGER REFERENCES bots(id),
-                    nome VARCHAR,
-                    codigo VARCHAR UNIQUE,
-                    origem VARCHAR DEFAULT 'outros',
-                    clicks INTEGER DEFAULT 0,
-                    leads INTEGER DEFAULT 0,
-                    vendas INTEGER DEFAULT 0,
-                    faturamento FLOAT DEFAULT 0.0,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
-                );
-                """,
-                "ALTER TABLE leads ADD COLUMN IF NOT EXISTS tracking_id INTEGER REFERENCES tracking_links(id);",
-
-                # --- [CORREÇÃO 8] 🔥 TABELAS DA LOJA (MINI APP) ---
-                """
-                CREATE TABLE IF NOT EXISTS miniapp_config (
-                    bot_id INTEGER PRIMARY KEY REFERENCES bots(id),
-                    logo_url VARCHAR,
-                    background_type VARCHAR DEFAULT 'solid',
-                    background_value VARCHAR DEFAULT '#000000',
-                    hero_video_url VARCHAR,
-                    hero_title VARCHAR DEFAULT 'ACERVO PREMIUM',
-                    hero_subtitle VARCHAR DEFAULT 'O maior acervo da internet.',
-                    hero_btn_text VARCHAR DEFAULT 'LIBERAR CONTEÚDO 🔓',
-                    enable_popup BOOLEAN DEFAULT FALSE,
-                    popup_video_url VARCHAR,
-                    popup_text VARCHAR DEFAULT 'VOCÊ GANHOU UM PRESENTE!',
-                    footer_text VARCHAR DEFAULT '© 2026 Premium Club.'
-                );
-                """,
-                """
-                CREATE TABLE IF NOT EXISTS miniapp_categories (
-                    id SERIAL PRIMARY KEY,
-                    bot_id INTEGER REFERENCES bots(id),
-                    slug VARCHAR,
-                    title VARCHAR,
-                    description VARCHAR,
-                    cover_image VARCHAR,
-                    theme_color VARCHAR DEFAULT '#c333ff',
-                    deco_line_url VARCHAR,
-                    is_direct_checkout BOOLEAN DEFAULT FALSE,
-                    is_hacker_mode BOOLEAN DEFAULT FALSE,
-                    banner_desk_url VARCHAR,
-                    banner_mob_url VARCHAR,
-                    footer_banner_url VARCHAR,
-                    content_json TEXT
-                );
-                """,
-
-                # --- [CORREÇÃO 9] NOVAS COLUNAS PARA CATEGORIA RICA ---
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS bg_color VARCHAR DEFAULT '#000000';",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS banner_desk_url VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS video_preview_url VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_img_url VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_name VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_name VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_desc TEXT;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS footer_banner_url VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS deco_lines_url VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_name_color VARCHAR DEFAULT '#ffffff';",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_desc_color VARCHAR DEFAULT '#cccccc';",
-
-                # --- [MINI APP V2] SEPARADOR, PAGINAÇÃO, FORMATO E FAKE VIDEO ---
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS items_per_page INTEGER;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_enabled BOOLEAN DEFAULT FALSE;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_color VARCHAR DEFAULT '#ffffff';",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_text VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_text VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_url VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_logo_url VARCHAR;",
-                "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_img_shape VARCHAR DEFAULT 'square';",
-
-                # --- [CORREÇÃO 10] TOKEN PUSHINPAY E ORDER BUMP ---
-                "ALTER TABLE bots ADD COLUMN IF NOT EXISTS pushin_token VARCHAR;",
-                "ALTER TABLE order_bump_config ADD COLUMN IF NOT EXISTS autodestruir BOOLEAN DEFAULT FALSE;",
-
-                # --- [CORREÇÃO 10.1] 🆕 MULTI-GATEWAY (WIINPAY + CONTINGÊNCIA) ---
-                "ALTER TABLE bots ADD COLUMN IF NOT EXISTS wiinpay_api_key VARCHAR;",
-                "ALTER TABLE bots ADD COLUMN IF NOT EXISTS gateway_principal VARCHAR DEFAULT 'pushinpay';",
-                "ALTER TABLE bots ADD COLUMN IF NOT EXISTS gateway_fallback VARCHAR;",
-                "ALTER TABLE bots ADD COLUMN IF NOT EXISTS pushinpay_ativo BOOLEAN DEFAULT FALSE;",
-                "ALTER TABLE bots ADD COLUMN IF NOT EXISTS wiinpay_ativo BOOLEAN DEFAULT FALSE;",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS wiinpay_user_id VARCHAR;",
-                "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS gateway_usada VARCHAR;",
-
-                # 🔒 PROTEÇÃO DE CONTEÚDO
-                "ALTER TABLE bots ADD COLUMN IF NOT EXISTS protect_content BOOLEAN DEFAULT FALSE;",
-
-                # 👇👇👇 [CORREÇÃO 11] SUPORTE A WEB APP NO FLUXO (CRÍTICO) 👇👇👇
-                "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS start_mode VARCHAR DEFAULT 'padrao';",
-                "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS miniapp_url VARCHAR;",
-                "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS miniapp_btn_text VARCHAR DEFAULT 'ABRIR LOJA 🛍️';",
-
-                # ============================================================
-                # 🔥 [CORREÇÃO 12] SOLUÇÃO DEFINITIVA REMARKETING LOGS 🔥
-                # ============================================================
-                # 1. Cria a tabela COMPLETA se não existir
-                """
-                CREATE TABLE IF NOT EXISTS remarketing_logs (
-                    id SERIAL PRIMARY KEY,
-                    bot_id INTEGER REFERENCES bots(id),
-                    user_id VARCHAR NOT NULL,
-                    sent_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
-                    message_text TEXT,
-                    promo_values JSON,
-                    status VARCHAR(20) DEFAULT 'sent',
-                    error_message TEXT,
-                    converted BOOLEAN DEFAULT FALSE,
-                    converted_at TIMESTAMP WITHOUT TIME ZONE,
-                    message_sent BOOLEAN DEFAULT TRUE,
-                    campaign_id VARCHAR
-                );
-                """,
-                
-                # 2. Se a tabela já existir velha, ADICIONA AS COLUNAS FALTANTES NA MARRA
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS user_id VARCHAR;",
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS message_text TEXT;",
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS promo_values JSON;",
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS status VARCHAR(20) DEFAULT 'sent';",
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS error_message TEXT;",
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS converted BOOLEAN DEFAULT FALSE;",
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS converted_at TIMESTAMP WITHOUT TIME ZONE;",
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS message_sent BOOLEAN DEFAULT TRUE;",
-                "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS campaign_id VARCHAR;",
-
-                # 3. MIGRAÇÃO DE DADOS: Se existir user_telegram_id, copia para user_id
-                """
-                DO $$
-                BEGIN
-                    IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='remarketing_logs' AND column_name='user_telegram_id') THEN
-                        UPDATE remarketing_logs SET user_id = CAST(user_telegram_id AS VARCHAR) WHERE user_id IS NULL;
-                    END IF;
-                END $$;
-                """,
-
-                # ============================================================
-                # 🚀 [CORREÇÃO 13] TABELAS UPSELL E DOWNSELL
-                # ============================================================
-                """
-                CREATE TABLE IF NOT EXISTS upsell_config (
-                    id SERIAL PRIMARY KEY,
-                    bot_id INTEGER UNIQUE REFERENCES bots(id),
-                    ativo BOOLEAN DEFAULT FALSE,
-                    nome_produto VARCHAR,
-                    preco FLOAT,
-                    link_acesso VARCHAR,
-                    delay_minutos INTEGER DEFAULT 2,
-                    msg_texto TEXT DEFAULT '🔥 Oferta exclusiva para você!',
-                    msg_media VARCHAR,
-                    btn_aceitar VARCHAR DEFAULT '✅ QUERO ESSA OFERTA!',
-                    btn_recusar VARCHAR DEFAULT '❌ NÃO, OBRIGADO',
-                    autodestruir BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
-                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
-                );
-                """,
-                """
-                CREATE TABLE IF NOT EXISTS downsell_config (
-                    id SERIAL PRIMARY KEY,
-                    bot_id INTEGER UNIQUE REFERENCES bots(id),
-                    ativo BOOLEAN DEFAULT FALSE,
-                    nome_produto VARCHAR,
-                    preco FLOAT,
-                    link_acesso VARCHAR,
-                    delay_minutos INTEGER DEFAULT 10,
-                    msg_texto TEXT DEFAULT '🎁 Última chance! Oferta especial só para você!',
-                    msg_media VARCHAR,
-                    btn_aceitar VARCHAR DEFAULT '✅ QUERO ESSA OFERTA!',
-                    btn_recusar VARCHAR DEFAULT '❌ NÃO, OBRIGADO',
-                    autodestruir BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
-                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
-                );
-                """,
-
-                # ============================================================
-                # 📅 [CORREÇÃO 14a] REMARKETING AGENDADO
-                # ============================================================
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS is_scheduled BOOLEAN DEFAULT FALSE;",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_days INTEGER DEFAULT 1;",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_time VARCHAR DEFAULT '10:00';",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_end_date TIMESTAMP WITHOUT TIME ZONE;",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS days_config TEXT;",  # JSON: [{day:1, msg, media_url, plano_id, promo_price}, ...]
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS use_same_content BOOLEAN DEFAULT TRUE;",
-                "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_active BOOLEAN DEFAULT FALSE;",
-
-                # 🚨 [CORREÇÃO 14b] SISTEMA DE DENÚNCIAS
-                # ============================================================
-                """
-                CREATE TABLE IF NOT EXISTS reports (
-                    id SERIAL PRIMARY KEY,
-                    reporter_name VARCHAR(100),
-                    reporter_telegram_id VARCHAR(50),
-                    bot_username VARCHAR(100) NOT NULL,
-                    bot_id INTEGER REFERENCES bots(id) ON DELETE SET NULL,
-                    reason VARCHAR(50) NOT NULL,
-                    description TEXT,
-                    evidence_url VARCHAR(500),
-                    status VARCHAR(20) DEFAULT 'pending',
-                    resolution TEXT,
-                    resolved_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
-                    resolved_at TIMESTAMP WITHOUT TIME ZONE,
-                    action_taken VARCHAR(50),
-                    strike_count INTEGER DEFAULT 0,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
-                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
-                    ip_address VARCHAR(50)
-                );
-                """,
-                """
-                CREATE TABLE IF NOT EXISTS user_strikes (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE NOT NULL,
-                    report_id INTEGER REFERENCES reports(id) ON DELETE SET NULL,
-                    reason TEXT NOT NULL,
-                    strike_number INTEGER NOT NULL,
-                    action VARCHAR(50) NOT NULL,
-                    pause_until TIMESTAMP WITHOUT TIME ZONE,
-                    tax_increase_pct FLOAT,
-                    applied_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
-                );
-                """,
-                # Coluna de strikes no users (para acesso rápido)
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS strike_count INTEGER DEFAULT 0;",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_banned BOOLEAN DEFAULT FALSE;",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS banned_reason TEXT;",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS bots_paused_until TIMESTAMP WITHOUT TIME ZONE;",
-                
-                # 🔥 [NOVO] COLUNAS V2: Identificação do Dono do Bot nas Denúncias
-                "ALTER TABLE reports ADD COLUMN IF NOT EXISTS owner_id INTEGER REFERENCES users(id) ON DELETE SET NULL;",
-                "ALTER TABLE reports ADD COLUMN IF NOT EXISTS owner_username VARCHAR(100);",
-            ]
-            
-            for cmd in comandos_sql:
-                try:
-                    conn.execute(text(cmd))
-                    conn.commit()
-                except Exception as e_sql:
-                    # Ignora erro se a coluna já existir (segurança para não parar o deploy)
-                    if "duplicate column" not in str(e_sql) and "already exists" not in str(e_sql):
-                        logger.warning(f"Aviso SQL: {e_sql}")
-            
-            logger.info("✅ [STARTUP] Banco de dados 100% Verificado!")
-            
-    except Exception as e:
-        logger.error(f"❌ Falha no reparo do banco: {e}")
 
     # 3. Inicia o Agendador (Scheduler) - Jobs já registrados no nível do módulo
     try:
@@ -4317,60 +4117,13 @@ def get_plataforma_syncpay_id(db: Session) -> str:
 # =========================================================
 # 🔌 INTEGRAÇÃO SYNC PAY (NOVA)
 # =========================================================
-SYNC_PAY_BASE_URL = "https://api.syncpayments.com.br"
-
-async def obter_token_syncpay(bot, db: Session):
+async def obter_token_syncpay(bot, db: Session = None, token_rejeitado: str = None):
     """
-    Verifica se o token da Sync Pay ainda é válido.
-    Se não for (ou não existir), faz uma requisição assíncrona para gerar um novo.
+    Retorna um token válido da Sync Pay para o bot.
+    🔑 Cache em memória por bot com renovação single-flight (syncpay_tokens.py):
+    não faz mais commit na sessão do chamador.
     """
-    agora = now_brazil()
-    
-    # Se o token existir e a data de expiração for maior que agora (margem de 5 min)
-    if bot.syncpay_access_token and bot.syncpay_token_expires_at:
-        from datetime import timedelta
-        expires_at = bot.syncpay_token_expires_at
-        if expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=agora.tzinfo)
-            
-        if expires_at > (agora + timedelta(minutes=5)):
-            return bot.syncpay_access_token
-
-    url = f"{SYNC_PAY_BASE_URL}/api/partner/v1/auth-token"
-    payload = {
-        "client_id": bot.syncpay_client_id,
-        "client_secret": bot.syncpay_client_secret
-    }
-    headers = {"Content-Type": "application/json"}
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers, timeout=15)
-        
-        if response.status_code != 200:
-            logger.error(f"❌ [SYNC PAY ERRO AUTH] HTTP {response.status_code}: {response.text}")
-            return None
-
-        data = response.json()
-        
-        if "access_token" in data:
-            novo_token = data["access_token"]
-            expires_in_seconds = data.get("expires_in", 3600)
-            
-            # Atualiza no banco de dados
-            bot.syncpay_access_token = novo_token
-            from datetime import timedelta
-            bot.syncpay_token_expires_at = agora + timedelta(seconds=expires_in_seconds)
-            
-            db.commit()
-            return novo_token
-        else:
-            logger.error(f"❌ [SYNC PAY ERRO AUTH] Resposta sem token: {data}")
-            return None
-            
-    except Exception as e:
-        logger.error(f"❌ [SYNC PAY EXCEPTION AUTH] {type(e).__name__}: {str(e)}")
-        return None
+    return await obter_token_cacheado(bot, token_rejeitado=token_rejeitado, client=http_client)
 
 
 async def gerar_pix_syncpay(
@@ -4386,12 +4139,12 @@ async def gerar_pix_syncpay(
     """Gera o Pix via Sync Pay de forma assíncrona com cálculo de Split em Porcentagem"""
     
     bot = db.query(BotModel).filter(BotModel.id == bot_id).first()
-    if not bot: return None
+    if not bot: return _falha_pix(FALHA_VENDEDOR)
 
     token = await obter_token_syncpay(bot, db)
     if not token:
         logger.error(f"❌ [SYNC PAY] Falha de autenticação. Verifique as credenciais do bot {bot_id}.")
-        return None
+        return _falha_pix(FALHA_VENDEDOR)
         
     url = f"{SYNC_PAY_BASE_URL}/api/partner/v1/cash-in"
     
@@ -4476,12 +4229,8 @@ async def gerar_pix_syncpay(
         if response.status_code == 401:
             logger.warning("⚠️ [SYNC PAY] Token expirado no servidor. Forçando renovação automática...")
             
-            # Limpa o token velho no banco
-            bot.syncpay_access_token = None
-            db.commit()
-            
-            # Pega um token fresquinho
-            token = await obter_token_syncpay(bot, db)
+            # Descarta o token velho e pega um fresquinho
+            token = await obter_token_syncpay(bot, db, token_rejeitado=token)
             if token:
                 headers["Authorization"] = f"Bearer {token}"
                 
@@ -4498,7 +4247,7 @@ async def gerar_pix_syncpay(
 
         if response.status_code != 200:
             logger.error(f"❌ [SYNC PAY ERRO PIX] HTTP {response.status_code}: {response.text}")
-            return None
+            return _falha_pix_http(response.status_code)
 
         data = response.json()
         
@@ -4525,11 +4274,11 @@ async def gerar_pix_syncpay(
             }
         else:
             logger.error(f"❌ [SYNC PAY ERRO PIX] Resposta sem PIX: {data}")
-            return None
+            return _falha_pix(FALHA_VENDEDOR)
             
     except Exception as e:
         logger.error(f"❌ [SYNC PAY EXCEPTION PIX] {type(e).__name__}: {str(e)}")
-        return None
+        return _falha_pix_excecao(e)
 
 # =========================================================
 # 🚀 GERADOR: PARADISE PAGAMENTOS
@@ -4547,7 +4296,7 @@ async def gerar_pix_paradise(
     try:
         bot = db.query(BotModel).filter(BotModel.id == bot_id).first()
         if not bot or not bot.paradise_api_key:
-            return None
+            return _falha_pix(FALHA_VENDEDOR)
 
         system_config = db.query(SystemConfig).all()
         config_dict = {item.key: item.value for item in system_config}
@@ -4636,11 +4385,11 @@ async def gerar_pix_paradise(
             }
         else:
             logger.error(f"❌ Erro Paradise: {resp.text}")
-            return None
+            return _falha_pix_http(resp.status_code)
             
     except Exception as e:
         logger.error(f"❌ Erro ao gerar PIX Paradise: {e}")
-        return None
+        return _falha_pix_excecao(e)
 
 @app.post("/webhook/paradise")
 async def webhook_paradise(request: Request, db: Session = Depends(get_db)):
@@ -4693,7 +4442,7 @@ async def gerar_pix_omegapay(
     try:
         bot = db.query(BotModel).filter(BotModel.id == bot_id).first()
         if not bot or not bot.omegapay_client_id or not bot.omegapay_client_secret:
-            return None
+            return _falha_pix(FALHA_VENDEDOR)
 
         system_config = db.query(SystemConfig).all()
         config_dict = {item.key: item.value for item in system_config}
@@ -4785,7 +4534,7 @@ async def gerar_pix_omegapay(
             
             if not qr_code:
                 logger.error(f"❌ [OMEGAPAY] QR Code não encontrado na resposta! Payload recebido: {dados}")
-                return None
+                return _falha_pix(FALHA_VENDEDOR)
 
             logger.info("✅ [OMEGAPAY] QR Code extraído com sucesso!")
             
@@ -4797,11 +4546,11 @@ async def gerar_pix_omegapay(
             }
         else:
             logger.error(f"❌ Erro OmegaPay: {resp.text}")
-            return None
+            return _falha_pix_http(resp.status_code)
             
     except Exception as e:
         logger.error(f"❌ Erro ao gerar PIX OmegaPay: {e}")
-        return None
+        return _falha_pix_excecao(e)
 
 @app.post("/webhook/omegapay")
 async def webhook_omegapay(request: Request, db: Session = Depends(get_db)):
@@ -4877,7 +4626,7 @@ async def gerar_pix_pushinpay(
     bot = db.query(BotModel).filter(BotModel.id == bot_id).first()
     if not bot:
         logger.error(f"❌ Bot {bot_id} não encontrado!")
-        return None
+        return _falha_pix(FALHA_VENDEDOR)
     
     # 🔥 USA TOKEN DO BOT (se existir) ou fallback para plataforma
     token = bot.pushin_token if bot.pushin_token else get_pushin_token()
@@ -4892,7 +4641,7 @@ async def gerar_pix_pushinpay(
     
     if not token:
         logger.error("❌ NENHUM token disponível (nem do bot, nem da plataforma)!")
-        return None
+        return _falha_pix(FALHA_VENDEDOR)
     
     # ======================================================================
     # 🔥 ETAPA 2: Configurar requisição
@@ -4997,6 +4746,7 @@ async def gerar_pix_pushinpay(
     
     while retry_count < max_retries:
         try:
+            inicio_tentativa = time.monotonic()
             # 🔥 LOG DEBUG 4
             if retry_count > 0:
                 logger.warning(f"🔄 Tentativa {retry_count + 1}/{max_retries} de gerar PIX...")
@@ -5061,12 +4811,14 @@ async def gerar_pix_pushinpay(
                 except (ValueError, KeyError, json.JSONDecodeError) as validation_error:
                     logger.error(f"❌ Resposta inválida da API PushinPay: {validation_error}")
                     logger.error(f"   Resposta recebida: {response.text[:500]}")
-                    return None
+                    return _falha_pix(FALHA_VENDEDOR)
                     
             elif response.status_code == 429:
                 # Rate Limit - Espera mais tempo antes de retry
                 wait_time = 5 * (retry_count + 1)  # 5s, 10s, 15s
                 logger.warning(f"⚠️ Rate Limit (429). Aguardando {wait_time}s antes de retry...")
+                if not _retry_gateway_permitido("pushinpay", inicio_tentativa):
+                    return None
                 await asyncio.sleep(wait_time)
                 retry_count += 1
                 continue
@@ -5075,20 +4827,22 @@ async def gerar_pix_pushinpay(
                 # Erro de autenticação - Não adianta retry
                 logger.error(f"❌ Erro de autenticação ({response.status_code}): Token inválido ou sem permissão")
                 logger.error(f"   Resposta: {response.text}")
-                return None
+                return _falha_pix(FALHA_VENDEDOR)
                 
             else:
                 logger.error(f"❌ Erro PushinPay ({response.status_code}): {response.text}")
                 
-                # Para outros erros, tenta retry
+                # Para outros erros, tenta retry (só 5xx conta no circuit breaker)
                 if retry_count < max_retries - 1:
                     wait_time = 2 ** retry_count  # Exponential backoff: 1s, 2s, 4s
                     logger.warning(f"⚠️ Tentando novamente em {wait_time}s...")
+                    if not _retry_gateway_permitido("pushinpay", inicio_tentativa, transitoria=response.status_code >= 500):
+                        return None
                     await asyncio.sleep(wait_time)
                     retry_count += 1
                     continue
                 else:
-                    return None
+                    return _falha_pix_http(response.status_code)
                     
         except httpx.TimeoutException as timeout_err:
             last_error = timeout_err
@@ -5097,13 +4851,15 @@ async def gerar_pix_pushinpay(
             if retry_count < max_retries - 1:
                 wait_time = 2 ** retry_count
                 logger.warning(f"⚠️ Retry em {wait_time}s...")
+                if not _retry_gateway_permitido("pushinpay", inicio_tentativa):
+                    return None
                 await asyncio.sleep(wait_time)
                 retry_count += 1
                 continue
             else:
                 logger.error(f"❌ Todas as {max_retries} tentativas falharam por timeout!")
                 logger.error(f"   Erro detalhado: {type(timeout_err).__name__} - {str(timeout_err)}")
-                return None
+                return _falha_pix(FALHA_TRANSITORIA)
                 
         except httpx.ConnectError as conn_err:
             last_error = conn_err
@@ -5112,13 +4868,15 @@ async def gerar_pix_pushinpay(
             if retry_count < max_retries - 1:
                 wait_time = 3 ** retry_count  # 1s, 3s, 9s
                 logger.warning(f"⚠️ Retry em {wait_time}s...")
+                if not _retry_gateway_permitido("pushinpay", inicio_tentativa):
+                    return None
                 await asyncio.sleep(wait_time)
                 retry_count += 1
                 continue
             else:
                 logger.error(f"❌ Todas as {max_retries} tentativas falharam por erro de conexão!")
                 logger.error(f"   Erro detalhado: {type(conn_err).__name__} - {str(conn_err)}")
-                return None
+                return _falha_pix(FALHA_TRANSITORIA)
                 
         except Exception as e:
             last_error = e
@@ -5130,12 +4888,14 @@ async def gerar_pix_pushinpay(
             if retry_count < max_retries - 1:
                 wait_time = 2 ** retry_count
                 logger.warning(f"⚠️ Retry em {wait_time}s...")
+                if not _retry_gateway_permitido("pushinpay", inicio_tentativa, transitoria=isinstance(e, httpx.TransportError)):
+                    return None
                 await asyncio.sleep(wait_time)
                 retry_count += 1
                 continue
             else:
                 logger.error(f"❌ Todas as {max_retries} tentativas falharam!")
-                return None
+                return _falha_pix_excecao(e)
     
     # Se chegou aqui, esgotou todas as tentativas
     logger.error(f"❌ Falha definitiva ao gerar PIX após {max_retries} tentativas")
@@ -5166,19 +4926,19 @@ async def gerar_pix_wiinpay(
     bot = db.query(BotModel).filter(BotModel.id == bot_id).first()
     if not bot:
         logger.error(f"❌ [WIINPAY] Bot {bot_id} não encontrado!")
-        return None
+        return _falha_pix(FALHA_VENDEDOR)
     
     api_key = bot.wiinpay_api_key
     if not api_key:
         logger.error(f"❌ [WIINPAY] Bot {bot_id} sem wiinpay_api_key configurada!")
-        return None
+        return _falha_pix(FALHA_VENDEDOR)
     
     logger.info(f"🔍 [WIINPAY DEBUG] Bot ID: {bot_id}")
     logger.info(f"✅ [WIINPAY DEBUG] USANDO API KEY: {api_key[:15]}...")
     
     if valor_float < 3.00:
         logger.error(f"❌ [WIINPAY] Valor R$ {valor_float:.2f} abaixo do mínimo de R$ 3,00!")
-        return None
+        return _falha_pix(FALHA_VENDEDOR)
     
     url = "https://api-v2.wiinpay.com.br/payment/create"
     
@@ -5261,6 +5021,7 @@ async def gerar_pix_wiinpay(
     
     while retry_count < max_retries:
         try:
+            inicio_tentativa = time.monotonic()
             if retry_count > 0:
                 logger.warning(f"🔄 [WIINPAY] Tentativa {retry_count + 1}/{max_retries}...")
             
@@ -5304,18 +5065,20 @@ async def gerar_pix_wiinpay(
                     
                 except (ValueError, KeyError, json.JSONDecodeError) as validation_error:
                     logger.error(f"❌ [WIINPAY] Resposta inválida: {validation_error}")
-                    return None
+                    return _falha_pix(FALHA_VENDEDOR)
                     
             elif response.status_code == 429:
                 wait_time = 5 * (retry_count + 1)
                 logger.warning(f"⚠️ [WIINPAY] Rate Limit (429). Aguardando {wait_time}s...")
+                if not _retry_gateway_permitido("wiinpay", inicio_tentativa):
+                    return None
                 await asyncio.sleep(wait_time)
                 retry_count += 1
                 continue
                 
             elif response.status_code in [401, 403]:
                 logger.error(f"❌ [WIINPAY] Erro de autenticação ({response.status_code}): API Key inválida")
-                return None
+                return _falha_pix(FALHA_VENDEDOR)
                 
             elif response.status_code == 422:
                 # 🔥 LÓGICA DE CONTORNO INTELIGENTE (RESOLVE O BUG DO DONO TESTANDO O BOT)
@@ -5326,41 +5089,75 @@ async def gerar_pix_wiinpay(
                     continue
                 else:
                     logger.error(f"❌ [WIINPAY] Erro 422 fatal (Sem split ativo): {response.text}")
-                    return None
+                    return _falha_pix(FALHA_VENDEDOR)
                 
             else:
                 logger.error(f"❌ [WIINPAY] Erro ({response.status_code}): {response.text}")
                 if retry_count < max_retries - 1:
                     wait_time = 2 ** retry_count
+                    if not _retry_gateway_permitido("wiinpay", inicio_tentativa, transitoria=response.status_code >= 500):
+                        return None
                     await asyncio.sleep(wait_time)
                     retry_count += 1
                     continue
                 else:
-                    return None
+                    return _falha_pix_http(response.status_code)
                     
         except httpx.TimeoutException as timeout_err:
             last_error = timeout_err
             if retry_count < max_retries - 1:
+                if not _retry_gateway_permitido("wiinpay", inicio_tentativa):
+                    return None
                 await asyncio.sleep(2 ** retry_count)
                 retry_count += 1
                 continue
             else:
-                return None
+                return _falha_pix(FALHA_TRANSITORIA)
                 
         except Exception as e:
             last_error = e
             if retry_count < max_retries - 1:
+                if not _retry_gateway_permitido("wiinpay", inicio_tentativa, transitoria=isinstance(e, httpx.TransportError)):
+                    return None
                 await asyncio.sleep(2 ** retry_count)
                 retry_count += 1
                 continue
             else:
-                return None
+                return _falha_pix_excecao(e)
     
     return None
 
 # =========================================================
 # 🔄 ORQUESTRADOR MULTI-GATEWAY COM CONTINGÊNCIA
 # =========================================================
+# =========================================================
+# ♻️ REAPROVEITAMENTO DE PIX PENDENTE (CLIQUES REPETIDOS)
+# =========================================================
+# Lead que toca várias vezes em "checkout_"/"promo_" recebia um PIX novo (e
+# um Pedido novo) a cada toque. Se já existe um PIX pendente recente para o
+# mesmo (bot, usuário, plano, valor), devolvemos o mesmo QR Code.
+PIX_REUSO_MINUTOS = int(os.getenv("PIX_REUSO_MINUTOS", "15"))
+
+def buscar_pix_pendente_reutilizavel(db: Session, bot_id: int, telegram_id: str, plano_id: int, valor: float, origem: str = "bot"):
+    """
+    Retorna o Pedido pendente ainda válido para (bot, usuário, plano, valor,
+    origem) ou None. A origem entra na chave para um clique de remarketing ou
+    disparo automático não herdar o pedido normal e perder a atribuição.
+    """
+    if PIX_REUSO_MINUTOS <= 0 or not telegram_id or plano_id is None:
+        return None
+    limite = now_brazil() - timedelta(minutes=PIX_REUSO_MINUTOS)
+    return db.query(Pedido).filter(
+        Pedido.bot_id == bot_id,
+        Pedido.telegram_id == str(telegram_id),
+        Pedido.status == "pending",
+        Pedido.plano_id == plano_id,
+        func.coalesce(Pedido.origem, "bot") == (origem or "bot"),
+        Pedido.valor.between(valor - 0.005, valor + 0.005),
+        Pedido.qr_code.isnot(None),
+        Pedido.created_at >= limite
+    ).order_by(Pedido.created_at.desc()).first()
+
 async def gerar_pix_gateway(
     valor_float: float,
     transaction_id: str,
@@ -5369,7 +5166,9 @@ async def gerar_pix_gateway(
     user_telegram_id: str = None,
     user_first_name: str = None,
     plano_nome: str = None,
-    agendar_remarketing: bool = True
+    agendar_remarketing: bool = True,
+    plano_id: int = None,
+    origem: str = "bot"
 ):
     """
     Orquestrador que decide qual gateway usar e implementa fallback automático.
@@ -5379,6 +5178,15 @@ async def gerar_pix_gateway(
     2. Se falhar e houver gateway_fallback configurada, tenta a segunda
     3. Retorna o resultado + qual gateway foi usada
     
+    ♻️ Se `plano_id` for informado e o usuário já tiver um PIX pendente recente
+    para o mesmo plano, valor e `origem` (a do Pedido que o chamador cria),
+    devolve esse PIX com "reutilizado": True sem chamar nenhuma gateway — o
+    chamador NÃO deve criar outro Pedido.
+    
+    ⚡ Circuit breaker (gateway_health.py): se a principal está com o circuito
+    aberto (falhas/latência recentes em QUALQUER bot), a fallback vai primeiro
+    e a principal só recebe uma requisição de teste após o cooldown.
+    
     Returns:
         tuple: (pix_response, gateway_usada) ou (None, None)
     """
@@ -5387,6 +5195,16 @@ async def gerar_pix_gateway(
         logger.error(f"❌ [GATEWAY] Bot {bot_id} não encontrado!")
         return None, None
     
+    if plano_id is not None:
+        pendente = buscar_pix_pendente_reutilizavel(db, bot_id, user_telegram_id, plano_id, valor_float, origem)
+        if pendente:
+            logger.info(f"♻️ [GATEWAY] Reaproveitando PIX pendente do pedido #{pendente.id} para {user_telegram_id} (sem nova cobrança)")
+            return {
+                "id": pendente.txid or pendente.transaction_id,
+                "qr_code": pendente.qr_code,
+                "reutilizado": True
+            }, pendente.gateway_usada
+    
     # Define ordem de tentativa
     principal = bot.gateway_principal or "pushinpay"
     fallback = bot.gateway_fallback
@@ -5431,111 +5249,148 @@ async def gerar_pix_gateway(
             logger.error(f"❌ [GATEWAY] Nenhuma gateway disponível para bot {bot_id}!")
             return None, None
     
-    logger.info(f"🔄 [GATEWAY] Bot {bot_id}: Ordem de tentativa = {gateways_disponiveis}")
+    # ⚡ CIRCUIT BREAKER: gateways abertas (degradadas) vão para o fim da fila
+    ordem = ordenar_por_saude(gateways_disponiveis)
+    if ordem != gateways_disponiveis:
+        logger.warning(f"⚡ [GATEWAY] Bot {bot_id}: Ordem ajustada pela saúde {gateways_disponiveis} -> {ordem}")
+    else:
+        logger.info(f"🔄 [GATEWAY] Bot {bot_id}: Ordem de tentativa = {ordem}")
     
-    # Tenta cada gateway na ordem
-    for gw in gateways_disponiveis:
-        try:
-            if gw == "pushinpay":
-                logger.info(f"📤 [GATEWAY] Tentando PushinPay...")
-                result = await gerar_pix_pushinpay(
-                    valor_float=valor_float,
-                    transaction_id=transaction_id,
-                    bot_id=bot_id,
-                    db=db,
-                    user_telegram_id=user_telegram_id,
-                    user_first_name=user_first_name,
-                    plano_nome=plano_nome,
-                    agendar_remarketing=agendar_remarketing
-                )
-                if result:
-                    logger.info(f"✅ [GATEWAY] PushinPay respondeu com sucesso!")
-                    return result, "pushinpay"
-                else:
-                    logger.warning(f"⚠️ [GATEWAY] PushinPay falhou. Tentando próxima...")
-                    
-            elif gw == "wiinpay":
-                logger.info(f"📤 [GATEWAY] Tentando WiinPay...")
-                result = await gerar_pix_wiinpay(
-                    valor_float=valor_float,
-                    transaction_id=transaction_id,
-                    bot_id=bot_id,
-                    db=db,
-                    user_telegram_id=user_telegram_id,
-                    user_first_name=user_first_name,
-                    plano_nome=plano_nome,
-                    agendar_remarketing=agendar_remarketing
-                )
-                if result:
-                    logger.info(f"✅ [GATEWAY] WiinPay respondeu com sucesso!")
-                    return result, "wiinpay"
-                else:
-                    logger.warning(f"⚠️ [GATEWAY] WiinPay falhou. Tentando próxima...")
-                    
-            elif gw == "syncpay":
-                logger.info(f"📤 [GATEWAY] Tentando Sync Pay...")
-                result = await gerar_pix_syncpay(
-                    valor_float=valor_float,
-                    transaction_id=transaction_id,
-                    bot_id=bot_id,
-                    db=db,
-                    user_telegram_id=user_telegram_id,
-                    user_first_name=user_first_name,
-                    plano_nome=plano_nome,
-                    agendar_remarketing=agendar_remarketing
-                )
-                if result:
-                    logger.info(f"✅ [GATEWAY] Sync Pay respondeu com sucesso!")
-                    return result, "syncpay"
-                else:
-                    logger.warning(f"⚠️ [GATEWAY] Sync Pay falhou. Tentando próxima...")
-            
-            # 👇 [NOVO] ADICIONADO PARADISE AQUI 👇
-            elif gw == "paradise":
-                logger.info(f"📤 [GATEWAY] Tentando Paradise...")
-                result = await gerar_pix_paradise(
-                    valor_float=valor_float,
-                    transaction_id=transaction_id,
-                    bot_id=bot_id,
-                    db=db,
-                    user_telegram_id=user_telegram_id,
-                    user_first_name=user_first_name,
-                    plano_nome=plano_nome,
-                    agendar_remarketing=agendar_remarketing
-                )
-                if result:
-                    logger.info(f"✅ [GATEWAY] Paradise respondeu com sucesso!")
-                    return result, "paradise"
-                else:
-                    logger.warning(f"⚠️ [GATEWAY] Paradise falhou. Tentando próxima...")
-            
-            # 👇 [NOVO] ADICIONADO OMEGAPAY AQUI 👇
-            elif gw == "omegapay":
-                logger.info(f"📤 [GATEWAY] Tentando OmegaPay...")
-                result = await gerar_pix_omegapay(
-                    valor_float=valor_float,
-                    transaction_id=transaction_id,
-                    bot_id=bot_id,
-                    db=db,
-                    user_telegram_id=user_telegram_id,
-                    user_first_name=user_first_name,
-                    plano_nome=plano_nome,
-                    agendar_remarketing=agendar_remarketing
-                )
-                if result:
-                    logger.info(f"✅ [GATEWAY] OmegaPay respondeu com sucesso!")
-                    return result, "omegapay"
-                else:
-                    logger.warning(f"⚠️ [GATEWAY] OmegaPay falhou. Tentando próxima...")
-            # 👆 ========================================== 👆
-
-        except Exception as e:
-            logger.error(f"❌ [GATEWAY] Erro ao tentar {gw}: {e}")
+    kwargs_pix = dict(
+        valor_float=valor_float,
+        transaction_id=transaction_id,
+        bot_id=bot_id,
+        db=db,
+        user_telegram_id=user_telegram_id,
+        user_first_name=user_first_name,
+        plano_nome=plano_nome,
+        agendar_remarketing=agendar_remarketing
+    )
+    
+    tentou_alguma = False
+    i = 0
+    while i < len(ordem):
+        gw = ordem[i]
+        ultima = (i == len(ordem) - 1)
+        
+        # Circuito aberto: pula (a última só é forçada se nenhuma outra foi tentada)
+        if not get_breaker(gw).pode_tentar() and (tentou_alguma or not ultima):
+            logger.warning(f"⚡ [GATEWAY] {gw} com circuito aberto. Pulando...")
+            i += 1
             continue
+        tentou_alguma = True
+        
+        # Uma gateway por vez: os geradores usam a sessão da requisição e o
+        # mesmo transaction_id, e uma cobrança já criada não pode ser desfeita
+        result = await _chamar_gateway_pix(gw, kwargs_pix)
+        if result:
+            return result, gw
+        i += 1
     
     logger.error(f"❌ [GATEWAY] TODAS as gateways falharam para bot {bot_id}!")
     return None, None
 
+
+GATEWAY_GERADORES = {
+    "pushinpay": ("PushinPay", gerar_pix_pushinpay),
+    "wiinpay": ("WiinPay", gerar_pix_wiinpay),
+    "syncpay": ("Sync Pay", gerar_pix_syncpay),
+    "paradise": ("Paradise", gerar_pix_paradise),
+    "omegapay": ("OmegaPay", gerar_pix_omegapay),
+}
+
+# =========================================================
+# ⚡ TIPO DA FALHA (O QUE ALIMENTA O CIRCUIT BREAKER)
+# =========================================================
+# O breaker é um só para todos os bots: só falhas da própria gateway (timeout,
+# erro de conexão, 5xx, 429) podem abri-lo. Token inválido (401/403), 4xx de
+# validação, resposta inutilizável ou bot sem credencial são problema de UM
+# vendedor e não podem tirar a gateway dos outros.
+# Os geradores informam o tipo antes de devolver None; o estado da chamada
+# vive num ContextVar aberto por _chamar_gateway_pix.
+FALHA_TRANSITORIA = "transitoria"
+FALHA_VENDEDOR = "vendedor"
+_falha_gateway = contextvars.ContextVar("zenyx_falha_gateway", default=None)
+
+def _falha_pix(tipo: str):
+    """Marca o tipo da falha da tentativa atual. Retorna None (uso: return _falha_pix(...))."""
+    estado = _falha_gateway.get()
+    if estado is not None:
+        estado["tipo"] = tipo
+        estado["registrada"] = False
+    return None
+
+def _falha_pix_http(status_code: int):
+    """429 e 5xx são da gateway; os demais 4xx são do vendedor."""
+    return _falha_pix(FALHA_TRANSITORIA if status_code == 429 or status_code >= 500 else FALHA_VENDEDOR)
+
+def _falha_pix_excecao(e: Exception):
+    """Erro de transporte (timeout, conexão, leitura) é da gateway; o resto não."""
+    return _falha_pix(FALHA_TRANSITORIA if isinstance(e, httpx.TransportError) else FALHA_VENDEDOR)
+
+async def _chamar_gateway_pix(gw: str, kwargs_pix: dict):
+    """
+    Chama o gerador de PIX de uma gateway, mede a latência e alimenta o circuit
+    breaker (só com falhas transitórias). Retorna o dict da gateway ou None.
+    """
+    nome, gerador = GATEWAY_GERADORES[gw]
+    cb = get_breaker(gw)
+    estado = {"tipo": None, "registrada": False}
+    token_estado = _falha_gateway.set(estado)
+    inicio = time.monotonic()
+    try:
+        logger.info(f"📤 [GATEWAY] Tentando {nome}...")
+        result = await gerador(**kwargs_pix)
+    except asyncio.CancelledError:
+        cb.liberar_sonda()
+        metrics.gateway_latencia.observar(time.monotonic() - inicio, gw, "cancelled")
+        raise
+    except Exception as e:
+        _falha_pix_excecao(e)
+        result = None
+        logger.error(f"❌ [GATEWAY] Erro ao tentar {gw}: {e}")
+    finally:
+        _falha_gateway.reset(token_estado)
+    
+    latencia = time.monotonic() - inicio
+    if result:
+        cb.registrar_sucesso(latencia)
+        metrics.gateway_latencia.observar(latencia, gw, "ok")
+        logger.info(f"✅ [GATEWAY] {nome} respondeu com sucesso! ({latencia:.2f}s)")
+        return result
+    
+    if estado["tipo"] == FALHA_TRANSITORIA:
+        # A última tentativa já pode ter entrado pelo _retry_gateway_permitido
+        if not estado["registrada"]:
+            cb.registrar_falha(latencia)
+        metrics.gateway_latencia.observar(latencia, gw, "failed")
+        logger.warning(f"⚠️ [GATEWAY] {nome} falhou ({latencia:.2f}s). Tentando próxima...")
+    else:
+        # Falha do vendedor: não mexe na saúde da gateway (devolve a vaga de sonda)
+        cb.liberar_sonda()
+        metrics.gateway_latencia.observar(latencia, gw, "rejected")
+        logger.warning(f"⚠️ [GATEWAY] {nome} recusou o PIX deste bot ({latencia:.2f}s). Tentando próxima...")
+    return None
+
+def _retry_gateway_permitido(gw: str, inicio_tentativa: float, transitoria: bool = True) -> bool:
+    """
+    Alimenta o circuit breaker a cada tentativa que falhou dentro do retry da
+    gateway (PushinPay/WiinPay: até 3 × 30s). Se o circuito abriu, desiste já.
+    Falhas do vendedor (`transitoria=False`, ex.: 4xx) seguem o retry sem contar.
+    """
+    if not transitoria:
+        _falha_pix(FALHA_VENDEDOR)
+        return True
+    seguir = get_breaker(gw).falha_intermediaria(time.monotonic() - inicio_tentativa)
+    estado = _falha_gateway.get()
+    if estado is not None:
+        estado["tipo"] = FALHA_TRANSITORIA
+        estado["registrada"] = True
+    if seguir:
+        return True
+    logger.warning(f"⚡ [GATEWAY] Circuito de {gw} abriu durante os retries. Desistindo para usar a fallback...")
+    return False
+
 # --- HELPER: Notificar TODOS os Admins (Principal + Extras) ---
 def notificar_admin_principal(bot_db: BotModel, mensagem: str):
     """
@@ -6308,8 +6163,9 @@ class RemarketingRequest(BaseModel):
 # --- NOVA ROTA: DISPARO INDIVIDUAL (VIA HISTÓRICO) ---
 class IndividualRemarketingRequest(BaseModel):
     bot_id: int
-    user_telegram_id: str
+    user_telegram_id: Optional[str] = None
     campaign_history_id: int # ID do histórico para copiar a msg
+    busca: Optional[str] = None  # Nome/@username/ID quando o destinatário vem da busca de contatos
 
 # Modelo para envio
 class RemarketingSend(BaseModel):
@@ -6756,6 +6612,7 @@ def create_notification(db: Session, user_id: int, title: str, message: str, typ
         )
         db.add(notif)
         db.commit()
+        notificacoes.invalidar_usuario(user_id)
     except Exception as e:
         logger.error(f"Erro ao criar notificação: {e}")
 
@@ -6955,6 +6812,22 @@ async def login(user_data: UserLogin, request: Request, db: Session = Depends(ge
         "is_superuser": getattr(user, 'is_superuser', False)
     }
 
+# =========================================================
+# 📈 MÉTRICAS PROMETHEUS
+# =========================================================
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint(request: Request, token: Optional[str] = None):
+    """
+    Métricas do processo no formato texto do Prometheus.
+    Exige METRICS_TOKEN (Bearer ou ?token=); sem ele o endpoint não existe (404),
+    a menos que METRICS_PUBLICO=true.
+    """
+    if not metrics.habilitado():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not metrics.token_autorizado(request.headers.get("Authorization"), token):
+        raise HTTPException(status_code=401, detail="Não autorizado")
+    return PlainTextResponse(metrics.renderizar_metricas(), media_type="text/plain; version=0.0.4")
+
 # =========================================================
 # 💓 HEALTH CHECK PARA MONITORAMENTO
 # =========================================================
@@ -7014,7 +6887,9 @@ async def health_check():
             "checks": {
                 "database": {"status": db_status},
                 "scheduler": {"status": scheduler_status},
-                "webhook_retry": webhook_stats
+                "webhook_retry": webhook_stats,
+                "gateways": status_gateways(),
+                "cluster": coordenacao.status()
             },
             "version": "5.0"
         }
@@ -7085,22 +6960,6 @@ def update_own_profile(
     db.refresh(user)
     return user
 
-# =========================================================
-# ⚙️ HELPER: CONFIGURAR MENU (COMANDOS)
-# =========================================================
-def configurar_menu_bot(token):
-    try:
-        tb = telebot.TeleBot(token, threaded=False)
-        tb.set_my_commands([
-            telebot.types.BotCommand("start", "🚀 Iniciar"),
-            telebot.types.BotCommand("suporte", "💬 Falar com Suporte"),
-            telebot.types.BotCommand("status", "⭐ Minha Assinatura"),
-            telebot.types.BotCommand("denunciar", "🚨 Fazer Denúncia") # 🔥 NOVO COMANDO ADICIONADO AQUI!
-        ])
-        logger.info(f"✅ Menu de comandos configurado para o token {token[:10]}...")
-    except Exception as e:
-        logger.error(f"❌ Erro ao configurar menu: {e}")
-
 # ===========================
 # ⚙️ GESTÃO DE BOTS
 # ===========================
@@ -7169,24 +7028,10 @@ def criar_bot(
         # 🔌 CONEXÃO COM TELEGRAM (TEM QUE SER AQUI, ANTES DO RETURN!)
         # ==============================================================================
         try:
-            # 1. Define a URL (Já com a correção do 'v1' forçada)
-            public_url = os.getenv("RAILWAY_PUBLIC_DOMAIN", "https://zenyx-gbs-testesv1-production.up.railway.app")
-            
-            # Tratamento de string para evitar erros de URL
-            if public_url.startswith("https://"):
-                public_url = public_url.replace("https://", "")
-            if public_url.endswith("/"):
-                public_url = public_url[:-1]
-
-            webhook_url = f"https://{public_url}/webhook/{novo_bot.token}"
-            
-            # 2. Conecta na API do Telegram e define o Webhook
+            # 1+2. Webhook com allowed_updates mínimos, max_connections e secret_token
             bot_telegram = telebot.TeleBot(novo_bot.token, threaded=False)
-            bot_telegram.remove_webhook() # Limpa anterior por garantia
-            time.sleep(0.5) # Respiro para a API
-            bot_telegram.set_webhook(url=webhook_url)
-            
-            logger.info(f"🔗 Webhook definido com sucesso: {webhook_url}")
+            if not reconciliar_webhook_bot(db, novo_bot, forcar=True):
+                raise Exception("set_webhook falhou (ver log acima)")
             
             # 3. 🆕 BUSCA O USERNAME DO BOT NA API DO TELEGRAM
             try:
@@ -7196,6 +7041,9 @@ def criar_bot(
                 logger.info(f"✅ Username capturado: @{bot_info.username}")
             except Exception as e_username:
                 logger.warning(f"⚠️ Não foi possível capturar username: {e_username}")
+            
+            # 4. ⚙️ MENU DE COMANDOS (uma vez, registrado em BotSetupState)
+            reconciliar_menu_bot(db, novo_bot)
 
         except Exception as e_telegram:
             # Não vamos travar a criação se der erro no Telegram, mas vamos logar FEIO
@@ -7345,13 +7193,7 @@ def update_bot(
             except: 
                 pass
 
-            public_url = os.getenv("RAILWAY_PUBLIC_DOMAIN", "https://zenyx-gbs-testesv1-production.up.railway.app")
-            if public_url.startswith("https://"): 
-                public_url = public_url.replace("https://", "")
-            
-            webhook_url = f"https://{public_url}/webhook/{dados.token}"
-            new_tb.set_webhook(url=webhook_url)
-            
+            # 🔗 O webhook do novo token é registrado após o commit (reconciliar_webhook_bot)
             bot_db.status = "ativo"
             changes["status"] = {"old": old_values["status"], "new": "ativo"}
             
@@ -7376,12 +7218,15 @@ def update_bot(
             changes["nome"] = {"old": bot_db.nome, "new": dados.nome}
             bot_db.nome = dados.nome
     
+    db.commit()
+    
+    # ⚙️ Só chama o Telegram se menu/webhook ainda não foram aplicados para este token
     try:
-        configurar_menu_bot(bot_db.token)
+        reconciliar_menu_bot(db, bot_db)
+        reconciliar_webhook_bot(db, bot_db)
     except Exception as e:
-        logger.warning(f"⚠️ Erro ao configurar menu do bot: {e}")
+        logger.warning(f"⚠️ Erro ao configurar menu/webhook do bot: {e}")
     
-    db.commit()
     db.refresh(bot_db)
     
     log_action(
@@ -7772,23 +7617,14 @@ def clonar_bot(
     
     # Configura webhook no Telegram
     try:
-        public_url = os.getenv("RAILWAY_PUBLIC_DOMAIN", "")
-        if public_url.startswith("https://"):
-            public_url = public_url.replace("https://", "")
-        if public_url.endswith("/"):
-            public_url = public_url[:-1]
-        
-        webhook_url = f"https://{public_url}/webhook/{dados.token}"
-        new_tb.remove_webhook()
-        time.sleep(0.5)
-        new_tb.set_webhook(url=webhook_url)
-        logger.info(f"🔗 Webhook clone definido: {webhook_url}")
+        if not reconciliar_webhook_bot(db, novo_bot, forcar=True):
+            erros.append("Webhook: falha ao registrar no Telegram")
     except Exception as e:
         erros.append(f"Webhook: {str(e)}")
     
     # Configura menu do bot
     try:
-        configurar_menu_bot(dados.token)
+        reconciliar_menu_bot(db, novo_bot)
     except:
         pass
     
@@ -8139,6 +7975,7 @@ def update_selector_order(
 
 # 🆕 ENDPOINT: MÉTRICAS AVANÇADAS POR BOT (para modal "Visão Geral")
 @app.get("/api/admin/bots/{bot_id}/overview")
+@cache_por_usuario("bot_overview")
 def get_bot_overview(
     bot_id: int,
     db: Session = Depends(get_db),
@@ -8264,6 +8101,7 @@ def get_bot_overview(
 
 # 🆕 ENDPOINT: MÉTRICAS AVANÇADAS GLOBAIS (todos os bots do usuário)
 @app.get("/api/admin/bots-overview")
+@cache_por_usuario("bots_overview")
 def get_all_bots_overview(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -9377,68 +9215,76 @@ def get_tracking_link_metrics(
 @app.get("/api/admin/tracking/chart")
 def get_tracking_chart(
     days: int = 7,
-    db: Session = Depends(get_db),
+    granularidade: str = "dia",  # "dia" ou "hora"
+    db: Session = Depends(get_db_analytics),  # 🏊 Relatório pesado: pool de analytics
     current_user: User = Depends(get_current_user)
 ):
     """
     Dados para gráfico de desempenho temporal (vendas por dia por código).
+    Lê os buckets de tracking_series; além das vendas ("data"), cada código
+    traz cliques, leads, receita, CTR (lead/clique) e conversão (venda/clique).
     """
     try:
         user_bot_ids = [bot.id for bot in current_user.bots]
         if not user_bot_ids:
             return {"labels": [], "datasets": []}
         
-        # Busca links do usuário
-        meus_links = db.query(TrackingLink).filter(
+        # Busca links do usuário (só id e código)
+        meus_links = db.query(TrackingLink.id, TrackingLink.codigo).filter(
             TrackingLink.bot_id.in_(user_bot_ids)
         ).all()
         
         if not meus_links:
             return {"labels": [], "datasets": []}
         
-        link_ids = [l.id for l in meus_links]
         link_map = {l.id: l.codigo for l in meus_links}
         
         # Período
         now = now_brazil()
         start_date = now - timedelta(days=days)
         
-        # Busca pedidos aprovados no período
-        pedidos = db.query(Pedido).filter(
-            Pedido.tracking_id.in_(link_ids),
-            Pedido.status.in_(['paid', 'approved', 'active']),
-            Pedido.data_aprovacao >= start_date
-        ).all()
-        
-        # Gera labels (datas)
+        # Gera labels (datas, ou horas quando granularidade="hora")
         labels = []
-        for i in range(days):
-            d = start_date + timedelta(days=i+1)
-            labels.append(d.strftime("%d/%m"))
+        if granularidade == "hora":
+            inicio = (start_date + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+            passos, passo, formato = days * 24, timedelta(hours=1), "%d/%m %Hh"
+        else:
+            granularidade = "dia"
+            inicio = (start_date + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            passos, passo, formato = days, timedelta(days=1), "%d/%m"
+        for i in range(passos):
+            labels.append((inicio + passo * i).strftime(formato))
         
-        # Agrupa vendas por código por dia
-        datasets_map = {}
+        # Leitura por intervalo dos buckets já agregados
+        buckets = tracking_series.serie(db, list(link_map), inicio, now, granularidade)
         
-        for p in pedidos:
-            if not p.tracking_id or not p.data_aprovacao:
-                continue
-            
-            codigo = link_map.get(p.tracking_id, "desconhecido")
-            dia_label = p.data_aprovacao.strftime("%d/%m")
-            
+        campos = ("data", "clicks", "leads", "receita")
+        datasets_map = {}
+        for b in buckets:
+            label = b.inicio.strftime(formato)
+            codigo = link_map.get(b.tracking_id, "desconhecido")
             if codigo not in datasets_map:
-                datasets_map[codigo] = {label: 0 for label in labels}
-            
-            if dia_label in datasets_map[codigo]:
-                datasets_map[codigo][dia_label] += 1
+                datasets_map[codigo] = {campo: {l: 0 for l in labels} for campo in campos}
+            serie_codigo = datasets_map[codigo]
+            if label in serie_codigo["data"]:
+                serie_codigo["data"][label] += b.vendas or 0
+                serie_codigo["clicks"][label] += b.clicks or 0
+                serie_codigo["leads"][label] += b.leads or 0
+                serie_codigo["receita"][label] += int(round((b.faturamento or 0) * 100))
         
         # Converte para formato final
         datasets = []
-        for codigo, dias_data in datasets_map.items():
-            datasets.append({
+        for codigo, series_codigo in datasets_map.items():
+            total_clicks = sum(series_codigo["clicks"].values())
+            total_leads = sum(series_codigo["leads"].values())
+            total_vendas = sum(series_codigo["data"].values())
+            dataset = {campo: [series_codigo[campo][label] for label in labels] for campo in campos}
+            dataset.update({
                 "codigo": codigo,
-                "data": [dias_data.get(label, 0) for label in labels]
+                "ctr": round((total_leads / total_clicks) * 100, 1) if total_clicks else 0,
+                "conversao": round((total_vendas / total_clicks) * 100, 1) if total_clicks else 0,
             })
+            datasets.append(dataset)
         
         return {"labels": labels, "datasets": datasets}
         
@@ -9986,6 +9832,7 @@ async def enviar_oferta_upsell_downsell(bot_token: str, chat_id: int, bot_id: in
                 tb.send_message(chat_id, msg_texto, reply_markup=mk, parse_mode="HTML")
             
             logger.info(f"✅ {offer_type.upper()} enviado para {chat_id} (bot {bot_id})")
+            jornada.registrar(bot_id, chat_id, f"{offer_type}_enviado", valor=config.preco, dados={"produto": config.nome_produto})
         except Exception as e_send:
             logger.error(f"❌ Falha ao enviar {offer_type}: {e_send}")
             # Fallback sem mídia
@@ -10129,6 +9976,7 @@ async def webhook_wiinpay(request: Request, db: Session = Depends(get_db)):
 # 💳 WEBHOOK PIX (UNIFICADO) - V5.0 COM RETRY
 # =========================================================
 @app.post("/webhook/pix")
+@amostrar("webhook_pix")
 async def webhook_pix(request: Request, db: Session = Depends(get_db)):
     """
     Webhook de pagamento unificado (PushinPay, WiinPay, SyncPay)
@@ -10310,6 +10158,8 @@ async def webhook_pix(request: Request, db: Session = Depends(get_db)):
             pedido.pagou_em = now
             
             db.commit()
+            receita_dono.registrar_venda(db, pedido)  # 🏆 Ranking/metas Prime sem recalcular tudo
+            invalidar_dono_do_bot(db, pedido.bot_id)  # 🧊 Dashboard do dono reflete a venda na hora
             
             # 📋 AUDITORIA: Venda aprovada
             try:
@@ -10382,6 +10232,7 @@ async def webhook_pix(request: Request, db: Session = Depends(get_db)):
                                 pass
                             del alternating_tasks[chat_id_int]
                     
+                    coordenacao.propagar_cancelamento(chat_id_int)
                     logger.info(f"✅ Remarketing cancelado: {chat_id_int}")
             except Exception as e:
                 logger.error(f"⚠️ Erro ao cancelar remarketing: {e}")
@@ -10393,6 +10244,7 @@ async def webhook_pix(request: Request, db: Session = Depends(get_db)):
                     if t_link:
                         t_link.vendas += 1
                         t_link.faturamento += pedido.valor
+                        tracking_series.registrar(db, t_link.id, vendas=1, faturamento=pedido.valor, quando=pedido.data_aprovacao)
                         db.commit()
                 except:
                     pass
@@ -10883,99 +10735,19 @@ def enviar_oferta_final(bot_temp, chat_id, fluxo, bot_id, db):
         except Exception as e2:
             logger.error(f"❌ Erro no fallback da oferta final: {e2}")
 
-def enviar_passo_automatico(bot_temp, chat_id, passo_atual, bot_db, db):
-    """
-    Envia um passo e, se não tiver botão e tiver delay, 
-    agenda e envia o PRÓXIMO (ou a oferta) automaticamente.
-    BLINDADA COM HTML EM TODOS OS CENÁRIOS.
-    """
-    try:
-        # 1. Configura botão se houver
-        markup_step = types.InlineKeyboardMarkup()
-        if passo_atual.mostrar_botao:
-            # Verifica se existe um PRÓXIMO passo depois deste
-            prox = db.query(BotFlowStep).filter(
-                BotFlowStep.bot_id == bot_db.id, 
-                BotFlowStep.step_order == passo_atual.step_order + 1
-            ).first()
-            
-            callback = f"next_step_{passo_atual.step_order}" if prox else "go_checkout"
-            markup_step.add(types.InlineKeyboardButton(text=passo_atual.btn_texto, callback_data=callback))
-
-        # 2. Envia a mensagem deste passo (AGORA COM HTML ✅)
-        # 2. Envia a mensagem deste passo (AGORA COM HTML E ÁUDIO ✅)
-        sent_msg = None
-        if passo_atual.msg_media:
-            try:
-                media_low = passo_atual.msg_media.lower()
-                if media_low.endswith(('.mp4', '.mov', '.avi')):
-                    sent_msg = bot_temp.send_video(
-                        chat_id, passo_atual.msg_media, caption=passo_atual.msg_texto, 
-                        reply_markup=markup_step if passo_atual.mostrar_botao else None, parse_mode="HTML"
-                    )
-                elif is_audio_file(passo_atual.msg_media):
-                    # 🔊 ÁUDIO: Envia sozinho sem caption/markup
-                    audio_msgs = enviar_audio_inteligente(
-                        bot_temp, chat_id, passo_atual.msg_media,
-                        texto=passo_atual.msg_texto if passo_atual.msg_texto and passo_atual.msg_texto.strip() else None,
-                        markup=markup_step if passo_atual.mostrar_botao else None,
-                        delay_pos_audio=2
-                    )
-                    sent_msg = audio_msgs[-1] if audio_msgs else None
-                else:
-                    sent_msg = bot_temp.send_photo(
-                        chat_id, passo_atual.msg_media, caption=passo_atual.msg_texto, 
-                        reply_markup=markup_step if passo_atual.mostrar_botao else None, parse_mode="HTML"
-                    )
-            except Exception as e_media:
-                logger.error(f"Erro ao enviar mídia passo {passo_atual.step_order}: {e_media}")
-                # Fallback se a mídia falhar: envia texto com HTML
-                sent_msg = bot_temp.send_message(
-                    chat_id, 
-                    passo_atual.msg_texto, 
-                    reply_markup=markup_step if passo_atual.mostrar_botao else None,
-                    parse_mode="HTML" # 🔥 CORREÇÃO AQUI
-                )
-        else:
-            sent_msg = bot_temp.send_message(
-                chat_id, 
-                passo_atual.msg_texto, 
-                reply_markup=markup_step if passo_atual.mostrar_botao else None,
-                parse_mode="HTML" # 🔥 CORREÇÃO AQUI
-            )
-
-        # 3. Lógica Automática (Sem botão + Delay)
-        if not passo_atual.mostrar_botao and passo_atual.delay_seconds > 0:
-            logger.info(f"⏳ [BOT {bot_db.id}] Passo {passo_atual.step_order}: Aguardando {passo_atual.delay_seconds}s...")
-            time.sleep(passo_atual.delay_seconds)
-            
-            # Auto-destruir este passo (se configurado)
-            if passo_atual.autodestruir and sent_msg:
-                try:
-                    bot_temp.delete_message(chat_id, sent_msg.message_id)
-                except: pass
-            
-            # 🔥 DECISÃO: Chama o próximo passo OU a Oferta Final
-            proximo_passo = db.query(BotFlowStep).filter(
-                BotFlowStep.bot_id == bot_db.id, 
-                BotFlowStep.step_order == passo_atual.step_order + 1
-            ).first()
-            
-            if proximo_passo:
-                enviar_passo_automatico(bot_temp, chat_id, proximo_passo, bot_db, db)
-            else:
-                # FIM DA LINHA -> Manda Oferta
-                enviar_oferta_final(bot_temp, chat_id, bot_db.fluxo, bot_db.id, db)
-
-    except Exception as e:
-        logger.error(f"Erro no passo automático {passo_atual.step_order}: {e}")
 # =========================================================
 # 3. WEBHOOK TELEGRAM (START + GATEKEEPER + COMANDOS)
 # =========================================================
 @app.post("/webhook/{token}")
+@amostrar("receber_update_telegram")
 async def receber_update_telegram(token: str, req: Request, db: Session = Depends(get_db)):
     if token == "pix": return {"status": "ignored"}
     
+    # 🔐 Secret token do webhook: confere ANTES de qualquer consulta ao banco
+    if not secret_valido(token, req.headers.get("X-Telegram-Bot-Api-Secret-Token")):
+        logger.warning(f"🔐 [WEBHOOK] Secret inválido para token {token[:10]}... Update descartado.")
+        return JSONResponse(status_code=403, content={"status": "forbidden"})
+    
     bot_db = db.query(BotModel).filter(BotModel.token == token).first()
     if not bot_db or bot_db.status == "pausado": return {"status": "ignored"}
     
@@ -11392,9 +11164,8 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                 return {"status": "ok"}
 
             if txt == "/start" or txt.startswith("/start "):
-                try:
-                    threading.Thread(target=configurar_menu_bot, args=(token,)).start()
-                except: pass
+                # ⚙️ Menu de comandos é reconciliado na criação/edição do bot e no startup
+                # (bot_setup.py) — não é mais reenviado ao Telegram a cada /start.
 
                 first_name = message.from_user.first_name
                 username_raw = message.from_user.username
@@ -11445,6 +11216,7 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                     if tl: 
                         if not code.startswith("rmkt_"):
                             tl.clicks = (tl.clicks or 0) + 1
+                            tracking_series.registrar(db, tl.id, clicks=1)
                         track_id = tl.id
                         db.commit()
 
@@ -11455,6 +11227,7 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                         db.add(lead)
                         if tl and track_id:
                             tl.leads = (tl.leads or 0) + 1
+                            tracking_series.registrar(db, track_id, leads=1)
                     db.commit()
                 except: pass
 
@@ -11987,6 +11760,7 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                         valor_float=preco_promo,
                         transaction_id=mytx,
                         bot_id=bot_db.id,
+                        plano_id=plano.id,  # ♻️ Permite reaproveitar PIX pendente igual
                         db=db,
                         user_telegram_id=str(chat_id),
                         user_first_name=first_name,
@@ -11999,24 +11773,25 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                         txid = str(pix.get('id') or mytx).lower()
                         
                         # Salva pedido
-                        novo_pedido = Pedido(
-                            bot_id=bot_db.id,
-                            telegram_id=str(chat_id),
-                            first_name=first_name,
-                            username=username,
-                            plano_nome=f"{plano.nome_exibicao} (PROMO {desconto_percentual}% OFF)",
-                            plano_id=plano.id,
-                            valor=preco_promo,
-                            transaction_id=txid,
-                            txid=txid,
-                            qr_code=qr,
-                            status="pending",
-                            tem_order_bump=False,
-                            created_at=now_brazil(),
-                            tracking_id=track_id_pedido,
-                            gateway_usada=_gw_usada,
-                        )
-                        db.add(novo_pedido)
+                        if not pix.get('reutilizado'):  # ♻️ PIX reaproveitado: o pedido pendente já existe
+                            novo_pedido = Pedido(
+                                bot_id=bot_db.id,
+                                telegram_id=str(chat_id),
+                                first_name=first_name,
+                                username=username,
+                                plano_nome=f"{plano.nome_exibicao} (PROMO {desconto_percentual}% OFF)",
+                                plano_id=plano.id,
+                                valor=preco_promo,
+                                transaction_id=txid,
+                                txid=txid,
+                                qr_code=qr,
+                                status="pending",
+                                tem_order_bump=False,
+                                created_at=now_brazil(),
+                                tracking_id=track_id_pedido,
+                                gateway_usada=_gw_usada,
+                            )
+                            db.add(novo_pedido)
                         db.commit()
                         
                         try:
@@ -12176,6 +11951,8 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                         valor_float=valor_final,
                         transaction_id=mytx,
                         bot_id=bot_db.id,
+                        plano_id=plano.id,  # ♻️ Permite reaproveitar PIX pendente igual
+                        origem='disparo_auto',
                         db=db,
                         user_telegram_id=str(chat_id),
                         user_first_name=first_name,
@@ -12188,25 +11965,26 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                         txid = str(pix.get('id') or mytx).lower()
                         
                         # Salva pedido
-                        novo_pedido = Pedido(
-                            bot_id=bot_db.id,
-                            telegram_id=str(chat_id),
-                            first_name=first_name,
-                            username=username,
-                            plano_nome=f"{plano.nome_exibicao} (PROMO {desconto_percentual}% OFF)" if desconto_percentual > 0 else plano.nome_exibicao,
-                            plano_id=plano.id,
-                            valor=valor_final,
-                            transaction_id=txid,
-                            txid=txid,
-                            qr_code=qr,
-                            status="pending",
-                            tem_order_bump=False,
-                            created_at=now_brazil(),
-                            tracking_id=track_id_pedido,
-                            origem='disparo_auto',
-                            gateway_usada=_gw_usada,
-                        )
-                        db.add(novo_pedido)
+                        if not pix.get('reutilizado'):  # ♻️ PIX reaproveitado: o pedido pendente já existe
+                            novo_pedido = Pedido(
+                                bot_id=bot_db.id,
+                                telegram_id=str(chat_id),
+                                first_name=first_name,
+                                username=username,
+                                plano_nome=f"{plano.nome_exibicao} (PROMO {desconto_percentual}% OFF)" if desconto_percentual > 0 else plano.nome_exibicao,
+                                plano_id=plano.id,
+                                valor=valor_final,
+                                transaction_id=txid,
+                                txid=txid,
+                                qr_code=qr,
+                                status="pending",
+                                tem_order_bump=False,
+                                created_at=now_brazil(),
+                                tracking_id=track_id_pedido,
+                                origem='disparo_auto',
+                                gateway_usada=_gw_usada,
+                            )
+                            db.add(novo_pedido)
                         db.commit()
                         
                         try:
@@ -12306,8 +12084,10 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                 track_id_pedido = lead_origem.tracking_id if lead_origem else None
 
                 bump = db.query(OrderBumpConfig).filter(OrderBumpConfig.bot_id == bot_db.id, OrderBumpConfig.ativo == True).first()
+                jornada.registrar(bot_db.id, chat_id, "plano_escolhido", valor=plano.preco_atual, dados={"plano": plano.nome_exibicao, "plano_id": plano.id})
                 
                 if bump:
+                    jornada.registrar(bot_db.id, chat_id, "bump_exibido", valor=bump.preco, dados={"produto": bump.nome_produto})
                     mk = types.InlineKeyboardMarkup()
                     mk.row(
                         types.InlineKeyboardButton(f"{bump.btn_aceitar} (+ R$ {bump.preco:.2f})", callback_data=f"bump_yes_{plano.id}"),
@@ -12336,6 +12116,7 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                         valor_float=plano.preco_atual,
                         transaction_id=mytx,
                         bot_id=bot_db.id,
+                        plano_id=plano.id,  # ♻️ Permite reaproveitar PIX pendente igual
                         db=db,
                         user_telegram_id=str(chat_id),  # ✅ PASSA TELEGRAM ID
                         user_first_name=first_name,     # ✅ PASSA NOME
@@ -12347,24 +12128,25 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                         txid = str(pix.get('id') or mytx).lower()
                         
                         # Salva pedido
-                        novo_pedido = Pedido(
-                            bot_id=bot_db.id,
-                            telegram_id=str(chat_id),
-                            first_name=first_name,
-                            username=username,
-                            plano_nome=plano.nome_exibicao,
-                            plano_id=plano.id,
-                            valor=plano.preco_atual,
-                            transaction_id=txid,
-                            txid=txid,
-                            qr_code=qr,
-                            status="pending",
-                            tem_order_bump=False,
-                            created_at=now_brazil(),
-                            tracking_id=track_id_pedido,
-                            gateway_usada=_gw_usada,
-                        )
-                        db.add(novo_pedido)
+                        if not pix.get('reutilizado'):  # ♻️ PIX reaproveitado: o pedido pendente já existe
+                            novo_pedido = Pedido(
+                                bot_id=bot_db.id,
+                                telegram_id=str(chat_id),
+                                first_name=first_name,
+                                username=username,
+                                plano_nome=plano.nome_exibicao,
+                                plano_id=plano.id,
+                                valor=plano.preco_atual,
+                                transaction_id=txid,
+                                txid=txid,
+                                qr_code=qr,
+                                status="pending",
+                                tem_order_bump=False,
+                                created_at=now_brazil(),
+                                tracking_id=track_id_pedido,
+                                gateway_usada=_gw_usada,
+                            )
+                            db.add(novo_pedido)
                         db.commit()
                         
                         try:
@@ -12432,6 +12214,9 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                     except:
                         pass
                 
+                if bump:
+                    jornada.registrar(bot_db.id, chat_id, "bump_aceito" if aceitou else "bump_recusado", valor=bump.preco, dados={"produto": bump.nome_produto})
+                
                 valor_final = plano.preco_atual
                 nome_final = plano.nome_exibicao
                 if aceitou and bump:
@@ -12446,6 +12231,7 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                     valor_float=valor_final,
                     transaction_id=mytx,
                     bot_id=bot_db.id,
+                    plano_id=plano.id,  # ♻️ Permite reaproveitar PIX pendente igual
                     db=db,
                     user_telegram_id=str(chat_id),  # ✅ PASSA TELEGRAM ID
                     user_first_name=first_name,     # ✅ PASSA NOME
@@ -12457,24 +12243,25 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                     txid = str(pix.get('id') or mytx).lower()
                     
                     # Salva pedido
-                    novo_pedido = Pedido(
-                        bot_id=bot_db.id,
-                        telegram_id=str(chat_id),
-                        first_name=first_name,
-                        username=username,
-                        plano_nome=nome_final,
-                        plano_id=plano.id,
-                        valor=valor_final,
-                        transaction_id=txid,
-                        txid=txid,
-                        qr_code=qr,
-                        status="pending",
-                        tem_order_bump=aceitou,
-                        created_at=now_brazil(),
-                        tracking_id=track_id_pedido,
-                        gateway_usada=_gw_usada,
-                    )
-                    db.add(novo_pedido)
+                    if not pix.get('reutilizado'):  # ♻️ PIX reaproveitado: o pedido pendente já existe
+                        novo_pedido = Pedido(
+                            bot_id=bot_db.id,
+                            telegram_id=str(chat_id),
+                            first_name=first_name,
+                            username=username,
+                            plano_nome=nome_final,
+                            plano_id=plano.id,
+                            valor=valor_final,
+                            transaction_id=txid,
+                            txid=txid,
+                            qr_code=qr,
+                            status="pending",
+                            tem_order_bump=aceitou,
+                            created_at=now_brazil(),
+                            tracking_id=track_id_pedido,
+                            gateway_usada=_gw_usada,
+                        )
+                        db.add(novo_pedido)
                     db.commit()
                     
                     try:
@@ -12598,6 +12385,8 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                             valor_float=preco_final,
                             transaction_id=mytx,
                             bot_id=bot_db.id,
+                            plano_id=plano.id,  # ♻️ Permite reaproveitar PIX pendente igual
+                            origem='remarketing',
                             db=db,
                             user_telegram_id=str(chat_id),
                             user_first_name=first_name,
@@ -12621,25 +12410,26 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                             _track_id_rmkt = _cfg.get("tracking_link_id")
                         except: pass
                         
-                        novo_pedido = Pedido(
-                            bot_id=bot_db.id, 
-                            telegram_id=str(chat_id), 
-                            first_name=first_name, 
-                            username=username, 
-                            plano_nome=f"{plano.nome_exibicao} (OFERTA)", 
-                            plano_id=plano.id, 
-                            valor=preco_final, 
-                            transaction_id=txid, 
-                            txid=txid,
-                            qr_code=qr, 
-                            status="pending", 
-                            tem_order_bump=False, 
-                            created_at=now_brazil(), 
-                            tracking_id=_track_id_rmkt,
-                            origem='remarketing',
-                            gateway_usada=_gw_usada,
-                        )
-                        db.add(novo_pedido)
+                        if not pix.get('reutilizado'):  # ♻️ PIX reaproveitado: o pedido pendente já existe
+                            novo_pedido = Pedido(
+                                bot_id=bot_db.id, 
+                                telegram_id=str(chat_id), 
+                                first_name=first_name, 
+                                username=username, 
+                                plano_nome=f"{plano.nome_exibicao} (OFERTA)", 
+                                plano_id=plano.id, 
+                                valor=preco_final, 
+                                transaction_id=txid, 
+                                txid=txid,
+                                qr_code=qr, 
+                                status="pending", 
+                                tem_order_bump=False, 
+                                created_at=now_brazil(), 
+                                tracking_id=_track_id_rmkt,
+                                origem='remarketing',
+                                gateway_usada=_gw_usada,
+                            )
+                            db.add(novo_pedido)
                         
                         try:
                             if hasattr(campanha, 'clicks'):
@@ -12655,6 +12445,7 @@ async def receber_update_telegram(token: str, req: Request, db: Session = Depend
                                 _tl_rmkt = db.query(TrackingLink).filter(TrackingLink.id == _track_id_rmkt).first()
                                 if _tl_rmkt:
                                     _tl_rmkt.clicks = (_tl_rmkt.clicks or 0) + 1
+                                    tracking_series.registrar(db, _tl_rmkt.id, clicks=1)
                                     logger.info(f"📊 Clique contabilizado no TrackingLink #{_track_id_rmkt}")
                         except Exception as e_click:
                             logger.warning(f"⚠️ Erro não fatal ao contar clique: {e_click}")
@@ -13298,6 +13089,85 @@ async def get_contacts(
         logger.error(f"Erro contatos: {e}")
         # Retorna lista vazia para não quebrar a tela em caso de erro grave
         return {"data": [], "total": 0, "page": 1, "per_page": per_page, "total_pages": 0}
+
+# ============================================================
+# 🔎 BUSCA DE CONTATOS (NOME, @USERNAME, TELEGRAM ID)
+# ============================================================
+@app.get("/api/admin/contacts/search")
+def buscar_contatos(
+    q: str,
+    bot_id: Optional[int] = None,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Melhores contatos (leads e compradores) para o termo, com destaques em <mark>.
+    Usado pelo CRM e pela seleção de destinatário do remarketing individual.
+    """
+    user_bot_ids = [b[0] for b in db.query(BotModel.id).filter(BotModel.owner_id == current_user.id).all()]
+    if bot_id:
+        if bot_id not in user_bot_ids:
+            raise HTTPException(404, "Bot não encontrado")
+        user_bot_ids = [bot_id]
+    
+    try:
+        resultados = busca_contatos.buscar(db, user_bot_ids, q, limite=limit)
+    except Exception as e:
+        logger.error(f"❌ Erro na busca de contatos: {e}")
+        raise HTTPException(500, "Erro ao buscar contatos")
+    return {"data": resultados, "total": len(resultados), "q": q}
+
+# ============================================================
+# 📤 EXPORTAÇÃO DE CONTATOS, PEDIDOS, TRACKING E REMARKETING
+# ============================================================
+@app.get("/api/admin/export/{conjunto}")
+def exportar_dados(
+    conjunto: str,
+    formato: str = "csv",
+    compactar: bool = Query(False, alias="gzip"),
+    bot_id: Optional[int] = None,
+    status: Optional[str] = None,
+    desde: Optional[str] = None,
+    ate: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Exporta em streaming (CSV ou JSONL, opcionalmente .gz) os dados dos bots do usuário.
+    conjunto: contatos, pedidos, tracking, remarketing ou campanhas.
+    status: aba dos contatos/pedidos (pagantes, pendentes, expirados, leads),
+    status do envio/campanha, ou granularidade ("hora"/"dia") no tracking.
+    desde/ate: datas ISO (YYYY-MM-DD ou YYYY-MM-DDTHH:MM).
+    """
+    if conjunto not in exportacao.CONJUNTOS:
+        raise HTTPException(400, f"Conjunto inválido. Use: {', '.join(exportacao.CONJUNTOS)}")
+    if formato not in exportacao.FORMATOS:
+        raise HTTPException(400, "Formato inválido. Use: csv ou jsonl")
+    
+    try:
+        inicio = datetime.fromisoformat(desde) if desde else None
+        fim = datetime.fromisoformat(ate) if ate else None
+    except ValueError:
+        raise HTTPException(400, "Datas devem estar no formato ISO (YYYY-MM-DD)")
+    if fim is not None and ate and len(ate) == 10:
+        fim = fim.replace(hour=23, minute=59, second=59)
+    
+    user_bot_ids = [b[0] for b in db.query(BotModel.id).filter(BotModel.owner_id == current_user.id).all()]
+    if bot_id:
+        if bot_id not in user_bot_ids:
+            raise HTTPException(404, "Bot não encontrado")
+        user_bot_ids = [bot_id]
+    
+    # A sessão da request é liberada aqui; o gerador abre sessões curtas por lote
+    db.close()
+    
+    arquivo = exportacao.nome_arquivo(conjunto, formato, compactar)
+    return StreamingResponse(
+        exportacao.exportar(conjunto, user_bot_ids, formato, compactar, status=status, desde=inicio, ate=fim),
+        media_type=exportacao.tipo_midia(formato, compactar),
+        headers={"Content-Disposition": f'attachment; filename="{arquivo}"'},
+    )
         
 # ============================================================
 # 🔥 ROTAS COMPLETAS - Adicione no main.py
@@ -13817,6 +13687,7 @@ def del_step(bot_id: int, sid: int, db: Session = Depends(get_db)):
 # =========================================================
 # 🔄 FUNÇÃO DE BACKGROUND (LÓGICA BLINDADA V4: ALTA PERFORMANCE DB)
 # =========================================================
+@usar_pool("background")
 def processar_envio_remarketing(campaign_db_id: int, bot_id: int, payload: RemarketingRequest):
     """
     Executa o envio em background.
@@ -14311,9 +14182,23 @@ async def enviar_remarketing(
 
 # --- ROTA DE REENVIO INDIVIDUAL (CORRIGIDA PARA HTML) ---
 @app.post("/api/admin/remarketing/send-individual")
-def enviar_remarketing_individual(payload: IndividualRemarketingRequest, db: Session = Depends(get_db)):
-    # 1. Busca Campanha
-    campanha = db.query(RemarketingCampaign).filter(RemarketingCampaign.id == payload.campaign_history_id).first()
+def enviar_remarketing_individual(
+    payload: IndividualRemarketingRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # 🔒 Bot precisa ser do usuário logado (antes de qualquer busca de contatos)
+    bot_db = db.query(BotModel).filter(
+        BotModel.id == payload.bot_id,
+        BotModel.owner_id == current_user.id
+    ).first()
+    if not bot_db: raise HTTPException(404, "Bot não encontrado")
+
+    # 1. Busca Campanha (do mesmo bot)
+    campanha = db.query(RemarketingCampaign).filter(
+        RemarketingCampaign.id == payload.campaign_history_id,
+        RemarketingCampaign.bot_id == bot_db.id
+    ).first()
     if not campanha: raise HTTPException(404, "Campanha não encontrada")
     
     # 2. Parse Config
@@ -14329,9 +14214,18 @@ def enviar_remarketing_individual(payload: IndividualRemarketingRequest, db: Ses
     # ✨ CONVERTE EMOJIS PREMIUM
     msg = convert_premium_emojis(msg)
 
-    # 3. Configura Bot
-    bot_db = db.query(BotModel).filter(BotModel.id == payload.bot_id).first()
-    if not bot_db: raise HTTPException(404, "Bot não encontrado")
+    # Destinatário pela busca (só envia se o termo for o ID/@username exato de um contato)
+    if not payload.user_telegram_id:
+        if not payload.busca:
+            raise HTTPException(400, "Informe user_telegram_id ou busca")
+        telegram_id, candidatos = busca_contatos.resolver_destinatario(db, payload.bot_id, payload.busca)
+        if not telegram_id:
+            raise HTTPException(409 if candidatos else 404, detail={
+                "message": "Busca ambígua: escolha um contato" if candidatos else "Nenhum contato encontrado",
+                "candidatos": candidatos,
+            })
+        payload.user_telegram_id = telegram_id
+    
     sender = telebot.TeleBot(bot_db.token, threaded=False)
     
     # 4. Botão com preço promocional REAL (usa checkout_promo_ para garantir o valor correto)
@@ -14626,6 +14520,12 @@ def save_canal_free_config(
         
         logger.info(f"✅ Canal Free configurado - Bot: {bot_id}")
         
+        # 🔗 Canal free muda os allowed_updates do webhook (chat_join_request)
+        try:
+            reconciliar_webhook_bot(db, db.query(BotModel).filter(BotModel.id == bot_id).first())
+        except Exception as e_wh:
+            logger.warning(f"⚠️ Erro ao reconciliar webhook do bot {bot_id}: {e_wh}")
+        
         return {
             "id": config.id,
             "bot_id": config.bot_id,
@@ -15057,6 +14957,7 @@ def get_bot_group(
 # 📊 ROTA DE DASHBOARD V2 (COM FILTRO DE DATA E SUPORTE ADMIN)
 # =========================================================
 @app.get("/api/admin/dashboard/stats")
+@cache_por_usuario("dashboard_stats")
 def dashboard_stats(
     bot_id: Optional[int] = None, 
     start_date: Optional[str] = None, 
@@ -15328,6 +15229,7 @@ def dashboard_stats(
 # 🏆 MULTI-BOT COMMAND CENTER (RECURSO PRIME)
 # =========================================================
 @app.get("/api/admin/multi-bot-stats")
+@cache_por_usuario("multi_bot_stats")
 def get_multi_bot_stats(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     """
     Retorna as métricas essenciais agrupadas de TODOS os bots do usuário,
@@ -15400,7 +15302,7 @@ def advanced_statistics(
     period: Optional[str] = "30d",  # 7d, 30d, 90d, all
     cal_month: Optional[int] = None,  # Mês do calendário (1-12)
     cal_year: Optional[int] = None,   # Ano do calendário
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_analytics),  # 🏊 Relatório pesado: pool de analytics
     current_user = Depends(get_current_user)
 ):
     """
@@ -15439,96 +15341,35 @@ def advanced_statistics(
             return _empty_statistics()
 
         # ============================================
-        # 📦 QUERIES BASE
+        # 📦 MOTOR SQL (só linhas agregadas voltam do banco)
         # ============================================
-        
-        # 🔧 Helper: normalizar timezone para comparações seguras
-        def _safe_tz(dt_val):
-            if dt_val is None: return None
-            if dt_val.tzinfo is None: return tz_br.localize(dt_val)
-            return dt_val
-        
-        def apply_bot_filter(query):
-            if bots_ids:
-                return query.filter(Pedido.bot_id.in_(bots_ids))
-            return query
-
-        # Vendas aprovadas no período (🔥 CORRIGIDO: Inclui 'expired' para não sumir o faturamento)
-        q_vendas = apply_bot_filter(
-            db.query(Pedido).filter(
-                Pedido.status.in_(['approved', 'paid', 'active', 'expired']),
-                Pedido.data_aprovacao >= start,
-                Pedido.data_aprovacao <= end
-            )
-        )
-        vendas = q_vendas.all()
-
-        # Vendas pendentes no período
-        q_pendentes = apply_bot_filter(
-            db.query(Pedido).filter(
-                Pedido.status == 'pending',
-                Pedido.created_at >= start,
-                Pedido.created_at <= end
-            )
-        )
-        pendentes = q_pendentes.all()
-
-        # Todas as vendas aprovadas (para LTV) (🔥 CORRIGIDO: Inclui 'expired')
-        q_all_vendas = apply_bot_filter(
-            db.query(Pedido).filter(
-                Pedido.status.in_(['approved', 'paid', 'active', 'expired'])
-            )
-        )
-        todas_vendas = q_all_vendas.all()
-
-        # Leads no período
-        q_leads = db.query(Lead).filter(
-            Lead.created_at >= start,
-            Lead.created_at <= end
+        is_super_split = is_super and current_user.pushin_pay_id
+        taxa_centavos = current_user.taxa_venda or 60
+        motor = MotorEstatisticas(
+            db, bots_ids,
+            modo_taxa=bool(is_super_split and not bot_id),
+            taxa_centavos=taxa_centavos,
         )
-        if bots_ids:
-            q_leads = q_leads.filter(Lead.bot_id.in_(bots_ids))
-        total_leads = q_leads.count()
 
-        # Usuários ativos (assinatura não expirada OU vitalício sem data)
-        q_ativos = apply_bot_filter(
-            db.query(Pedido).filter(
-                Pedido.status.in_(['approved', 'paid', 'active', 'expired']),
-                or_(
-                    Pedido.data_expiracao > agora,
-                    Pedido.data_expiracao == None
-                )
-            )
-        )
-        total_ativos = q_ativos.count()
+        resumo = motor.resumo(start, end)
+        total_pendentes, receita_pendentes = motor.pendentes(start, end)
+        historico = motor.resumo()
+        total_leads = motor.leads(start, end)
+        total_ativos = motor.ativos(agora)
 
         # ============================================
         # 💰 MÉTRICAS PRINCIPAIS
         # ============================================
-        is_super_split = is_super and current_user.pushin_pay_id
-        taxa_centavos = current_user.taxa_venda or 60
-
-        if is_super_split and not bot_id:
-            receita_total = len(vendas) * taxa_centavos
-            receita_pendentes = len(pendentes) * taxa_centavos
-        else:
-            receita_total = sum(int((p.valor or 0) * 100) for p in vendas)
-            receita_pendentes = sum(int((p.valor or 0) * 100) for p in pendentes)
-
-        total_vendas = len(vendas)
-        total_pendentes = len(pendentes)
+        receita_total = resumo["receita"]
+        total_vendas = resumo["vendas"]
         total_geradas = total_vendas + total_pendentes
 
         # Ticket Médio
         ticket_medio = int(receita_total / total_vendas) if total_vendas > 0 else 0
 
         # LTV Médio (Receita Histórica / Usuários Únicos)
-        if is_super_split and not bot_id:
-            receita_historica = len(todas_vendas) * taxa_centavos
-        else:
-            receita_historica = sum(int((p.valor or 0) * 100) for p in todas_vendas)
-        
-        usuarios_unicos = len(set(p.telegram_id for p in todas_vendas if p.telegram_id))
+        receita_historica = historico["receita"]
+        usuarios_unicos = historico["compradores"]
         ltv_medio = int(receita_historica / usuarios_unicos) if usuarios_unicos > 0 else 0
 
         # Taxa de Conversão
@@ -15537,82 +15378,38 @@ def advanced_statistics(
         # ============================================
         # 📈 GRÁFICO: RECEITA POR DIA
         # ============================================
+        vendas_por_dia = motor.por_dia(start, end)
         chart_receita = []
         current_date = start
         while current_date <= end:
-            day_start = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = current_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            # Garante timezone-aware para comparação segura
-            if day_start.tzinfo is None:
-                day_start = tz_br.localize(day_start)
-            if day_end.tzinfo is None:
-                day_end = tz_br.localize(day_end)
-            
-            vendas_dia = []
-            for v in vendas:
-                if v.data_aprovacao:
-                    da = v.data_aprovacao
-                    # Normaliza para aware se necessário
-                    if da.tzinfo is None:
-                        da = tz_br.localize(da)
-                    if day_start <= da <= day_end:
-                        vendas_dia.append(v)
-            
-            if is_super_split and not bot_id:
-                valor = round(len(vendas_dia) * (taxa_centavos / 100), 2)
-            else:
-                valor = round(sum((v.valor or 0) for v in vendas_dia), 2)
-            
+            n_dia, receita_dia, valor_dia = vendas_por_dia.get(current_date.date(), (0, 0, 0.0))
             chart_receita.append({
                 "date": current_date.strftime("%d/%m"),
-                "value": valor
+                "value": round(receita_dia / 100, 2) if motor.modo_taxa else round(valor_dia, 2)
             })
             current_date += timedelta(days=1)
 
         # ============================================
         # 🥇 TOP PLANOS MAIS VENDIDOS
         # ============================================
-        planos_count = {}
-        for v in vendas:
-            nome = v.plano_nome or "Sem Plano"
-            if nome not in planos_count:
-                planos_count[nome] = {"count": 0, "revenue": 0}
-            planos_count[nome]["count"] += 1
-            if is_super_split and not bot_id:
-                planos_count[nome]["revenue"] += taxa_centavos
-            else:
-                planos_count[nome]["revenue"] += int((v.valor or 0) * 100)
-
-        top_planos = sorted(
-            [{"name": k, "count": v["count"], "revenue": v["revenue"]} for k, v in planos_count.items()],
-            key=lambda x: x["count"], reverse=True
-        )[:10]
+        top_planos = motor.por_plano(start, end, limite=10)
 
         # ============================================
-        # 🕐 PICOS: HORÁRIOS COM MAIS VENDAS
+        # 🕐 PICOS: HORÁRIOS E DIAS DA SEMANA COM MAIS VENDAS
         # ============================================
+        heat_map = motor.por_dia_hora(start, end)
         horas_count = {}
-        for v in vendas:
-            if v.data_aprovacao:
-                h = v.data_aprovacao.hour
-                horas_count[h] = horas_count.get(h, 0) + 1
-        
+        dias_count = {}
+        for (wd, hr), c in heat_map.items():
+            horas_count[hr] = horas_count.get(hr, 0) + c
+            dias_count[wd] = dias_count.get(wd, 0) + c
+
         top_horas = sorted(
             [{"hour": f"{h:02d}:00", "count": c} for h, c in horas_count.items()],
             key=lambda x: x["count"], reverse=True
         )[:5]
 
-        # ============================================
-        # 📅 PICOS: DIAS DA SEMANA COM MAIS VENDAS
-        # ============================================
-        dias_semana_map = {0: "Segunda", 1: "Terça", 2: "Quarta", 3: "Quinta", 4: "Sexta", 5: "Sábado", 6: "Domingo"}
-        dias_count = {}
-        for v in vendas:
-            if v.data_aprovacao:
-                d = v.data_aprovacao.weekday()
-                dias_count[d] = dias_count.get(d, 0) + 1
-        
+        dias_semana_map = DIAS_SEMANA
         top_dias = sorted(
             [{"day": dias_semana_map.get(d, "?"), "count": c} for d, c in dias_count.items()],
             key=lambda x: x["count"], reverse=True
@@ -15621,98 +15418,55 @@ def advanced_statistics(
         # ============================================
         # 📊 NOVAS MÉTRICAS AVANÇADAS (COMPLETAS)
         # ============================================
-        
-        # === MAPA DE COMPRADORES ===
-        compradores_map = {}
-        for v in todas_vendas:
-            tid = v.telegram_id or 'unknown'
-            compradores_map[tid] = compradores_map.get(tid, 0) + 1
-        total_compradores = len(compradores_map)
-        recorrentes = sum(1 for c in compradores_map.values() if c > 1)
+
+        # === COMPRADORES (window functions sobre o histórico) ===
+        compradores = motor.compradores()
+        total_compradores = compradores["total"]
+        recorrentes = compradores["recorrentes"]
         taxa_retencao = round((recorrentes / total_compradores) * 100, 1) if total_compradores > 0 else 0
-        vendas_por_usuario = round(len(todas_vendas) / total_compradores, 1) if total_compradores > 0 else 0
-
-        # Tempo Médio Retorno (dias entre recompras)
-        tempo_retorno_dias = 0
-        retorno_count = 0
-        for tid, count in compradores_map.items():
-            if count > 1:
-                pedidos_user = sorted([v for v in todas_vendas if (v.telegram_id or '') == tid], key=lambda x: x.data_aprovacao or datetime(2020,1,1))
-                for i in range(1, len(pedidos_user)):
-                    if pedidos_user[i].data_aprovacao and pedidos_user[i-1].data_aprovacao:
-                        try:
-                            da_i = pedidos_user[i].data_aprovacao
-                            da_prev = pedidos_user[i-1].data_aprovacao
-                            if da_i.tzinfo is None: da_i = tz_br.localize(da_i)
-                            if da_prev.tzinfo is None: da_prev = tz_br.localize(da_prev)
-                            diff = (da_i - da_prev).days
-                        except: diff = 0
-                        tempo_retorno_dias += diff
-                        retorno_count += 1
-        avg_retorno = round(tempo_retorno_dias / retorno_count, 1) if retorno_count > 0 else 0
+        vendas_por_usuario = round(historico["vendas"] / total_compradores, 1) if total_compradores > 0 else 0
+        avg_retorno = compradores["avg_retorno_dias"]
 
         vips_ativos = total_ativos
 
         # === 8 TAXAS DO CONCORRENTE ===
-        
+
         # Taxa Upsell: pedidos com origem upsell / total vendas
-        upsell_vendas = sum(1 for v in vendas if getattr(v, 'origem', '') == 'upsell')
+        upsell_vendas = resumo["upsell"]
         taxa_upsell = round((upsell_vendas / total_vendas) * 100, 1) if total_vendas > 0 else 0
-        
+
         # Taxa Downsell: pedidos com origem downsell / total recusas (pendentes expirados)
-        downsell_vendas = sum(1 for v in vendas if getattr(v, 'origem', '') == 'downsell')
+        downsell_vendas = resumo["downsell"]
         total_recusas = max(total_pendentes, 1)
         taxa_downsell = round((downsell_vendas / total_recusas) * 100, 1) if total_recusas > 0 else 0
-        
+
         # Taxa OrderBump: pedidos com order bump / total checkouts
-        orderbump_vendas = sum(1 for v in vendas if getattr(v, 'tem_order_bump', False))
+        orderbump_vendas = resumo["orderbump"]
         total_checkouts = total_geradas if total_geradas > 0 else 1
         taxa_orderbump = round((orderbump_vendas / total_checkouts) * 100, 1) if total_checkouts > 0 else 0
-        
+
         # Taxa Recuperação: vendas de remarketing / total pendentes antigos
-        remarketing_vendas = sum(1 for v in vendas if getattr(v, 'origem', '') == 'remarketing')
+        remarketing_vendas = resumo["remarketing"]
         taxa_recuperacao = round((remarketing_vendas / max(total_pendentes, 1)) * 100, 1) if total_pendentes > 0 else 0
-        
+
         # Taxa Recorrência: compradores recorrentes / total compradores
         taxa_recorrencia = round((recorrentes / total_compradores) * 100, 1) if total_compradores > 0 else 0
-        
+
         # Taxa Upgrade (= taxa_upsell but from buyers perspective)
         taxa_upgrade = round((upsell_vendas / total_compradores) * 100, 1) if total_compradores > 0 else 0
-        
+
         # Taxa Abandono: ex-VIPs que não renovaram / total compradores
-        expirados_count = 0
-        expirados_tids = set()
-        for v in todas_vendas:
-            if v.status == 'expired' and v.data_expiracao:
-                try:
-                    de = _safe_tz(v.data_expiracao)
-                    if de < agora:
-                        expirados_count += 1
-                        if v.telegram_id:
-                            expirados_tids.add(v.telegram_id)
-                except: pass
-        expirados_unicos = len(expirados_tids)
+        expirados_unicos = motor.expirados_unicos(agora)
         taxa_abandono = round((expirados_unicos / total_compradores) * 100, 1) if total_compradores > 0 else 0
 
         # === TEMPO MÉDIO /START → PAGAMENTO ===
-        tempos_start_pag = []
-        for v in vendas:
-            pc = getattr(v, 'primeiro_contato', None)
-            pa = v.data_aprovacao
-            if pc and pa:
-                try:
-                    diff_sec = (_safe_tz(pa) - _safe_tz(pc)).total_seconds()
-                    if 0 < diff_sec < 86400 * 30:
-                        tempos_start_pag.append(diff_sec)
-                except: pass
-        
-        if tempos_start_pag:
-            avg_tempo_sec = sum(tempos_start_pag) / len(tempos_start_pag)
+        avg_tempo_sec, amostras_tempo = motor.tempo_ate_pagamento(start, end)
+        if amostras_tempo:
             tempo_medio = {
                 "segundos": int(avg_tempo_sec % 60),
                 "minutos": int((avg_tempo_sec // 60) % 60),
                 "horas": int(avg_tempo_sec // 3600),
-                "dataset": len(tempos_start_pag)
+                "dataset": amostras_tempo
             }
         else:
             tempo_medio = {"segundos": 0, "minutos": 0, "horas": 0, "dataset": 0}
@@ -15722,45 +15476,19 @@ def advanced_statistics(
         # Usa mês/ano do calendário se fornecidos, senão usa o mês atual
         cal_m = cal_month if cal_month and 1 <= cal_month <= 12 else hoje.month
         cal_y = cal_year if cal_year and cal_year >= 2020 else hoje.year
-        
-        primeiro_dia_mes = datetime(cal_y, cal_m, 1, 0, 0, 0)
-        if primeiro_dia_mes.tzinfo is None:
-            primeiro_dia_mes = tz_br.localize(primeiro_dia_mes)
-            
+
         import calendar as cal_module
         dias_no_mes = cal_module.monthrange(cal_y, cal_m)[1]
-        
-        # Buscar TODAS as vendas do mês selecionado (não só do período filtrado)
-        cal_start = primeiro_dia_mes
+
+        # Todas as vendas do mês selecionado (não só do período filtrado), agrupadas por dia
+        cal_start = tz_br.localize(datetime(cal_y, cal_m, 1, 0, 0, 0))
         cal_end = tz_br.localize(datetime(cal_y, cal_m, dias_no_mes, 23, 59, 59))
-        
-        vendas_cal_query = db.query(Pedido).filter(
-            Pedido.data_aprovacao != None,
-            Pedido.status.in_(['paid', 'approved', 'active', 'expired']),
-            Pedido.data_aprovacao >= cal_start,
-            Pedido.data_aprovacao <= cal_end,
-        )
-        if bots_ids:
-            vendas_cal_query = vendas_cal_query.filter(Pedido.bot_id.in_(bots_ids))
-        vendas_cal = vendas_cal_query.all()
-        
+        vendas_cal = motor.por_dia(cal_start, cal_end)
+
         calendario = []
         for dia_num in range(1, dias_no_mes + 1):
-            dia_date = primeiro_dia_mes.replace(day=dia_num)
-            dia_end = dia_date.replace(hour=23, minute=59, second=59)
-            vendas_dia_cal = 0
-            receita_dia_cal = 0
-            for v in vendas_cal:
-                if v.data_aprovacao:
-                    da = v.data_aprovacao
-                    if da.tzinfo is None:
-                        da = tz_br.localize(da)
-                    if dia_date <= da <= dia_end:
-                        vendas_dia_cal += 1
-                        if is_super_split and not bot_id:
-                            receita_dia_cal += taxa_centavos
-                        else:
-                            receita_dia_cal += int((v.valor or 0) * 100)
+            dia_date = cal_start.replace(day=dia_num)
+            vendas_dia_cal, receita_dia_cal, _ = vendas_cal.get(dia_date.date(), (0, 0, 0.0))
             calendario.append({
                 "day": dia_num,
                 "weekday": dia_date.weekday(),
@@ -15774,9 +15502,9 @@ def advanced_statistics(
             "total_compradores": total_compradores,
             "recorrentes": recorrentes,
             "vips_ativos": vips_ativos,
-            "upsellers": sum(1 for tid in compradores_map if any(getattr(v, 'origem', '') == 'upsell' for v in todas_vendas if (v.telegram_id or '') == tid)),
-            "downsellers": sum(1 for tid in compradores_map if any(getattr(v, 'origem', '') == 'downsell' for v in todas_vendas if (v.telegram_id or '') == tid)),
-            "remarketing": sum(1 for tid in compradores_map if any(getattr(v, 'origem', '') == 'remarketing' for v in todas_vendas if (v.telegram_id or '') == tid)),
+            "upsellers": compradores["upsellers"],
+            "downsellers": compradores["downsellers"],
+            "remarketing": compradores["remarketing"],
         }
 
         # === GRÁFICOS TEMPORAIS ===
@@ -15786,19 +15514,7 @@ def advanced_statistics(
         # === TOP 5 BOTS ===
         top_bots = []
         if not bot_id:
-            bots_count = {}
-            for v in vendas:
-                bid = v.bot_id
-                if bid:
-                    if bid not in bots_count:
-                        bot_obj = db.query(BotModel).filter(BotModel.id == bid).first()
-                        bots_count[bid] = {"name": bot_obj.nome if bot_obj else f"Bot #{bid}", "count": 0, "revenue": 0}
-                    bots_count[bid]["count"] += 1
-                    if is_super_split:
-                        bots_count[bid]["revenue"] += taxa_centavos
-                    else:
-                        bots_count[bid]["revenue"] += int((v.valor or 0) * 100)
-            top_bots = sorted(bots_count.values(), key=lambda x: x["count"], reverse=True)[:5]
+            top_bots = motor.por_bot(start, end, limite=5)
 
         # === DIÁRIO DE MUDANÇAS ===
         try:
@@ -15817,34 +15533,13 @@ def advanced_statistics(
         # === TOP TRACKING LINKS (Códigos de Venda) ===
         top_tracking = []
         try:
-            tracking_count = {}
-            for v in vendas:
-                tid = getattr(v, 'tracking_id', None)
-                if tid:
-                    if tid not in tracking_count:
-                        tlink = db.query(TrackingLink).filter(TrackingLink.id == tid).first()
-                        tracking_count[tid] = {"name": tlink.codigo if tlink else f"Link #{tid}", "count": 0, "revenue": 0}
-                    tracking_count[tid]["count"] += 1
-                    if is_super_split and not bot_id:
-                        tracking_count[tid]["revenue"] += taxa_centavos
-                    else:
-                        tracking_count[tid]["revenue"] += int((v.valor or 0) * 100)
-            top_tracking = sorted(tracking_count.values(), key=lambda x: x["revenue"], reverse=True)[:5]
+            top_tracking = motor.por_tracking(start, end, limite=5)
         except: pass
 
         # === TOP CAMPANHAS DE REMARKETING ===
         top_campanhas = []
         try:
-            campanha_count = {}
-            for v in vendas:
-                orig = getattr(v, 'origem', '') or ''
-                if orig == 'remarketing':
-                    rmk_id = getattr(v, 'total_remarketings', 0) or 0
-                    key = f"Remarketing #{rmk_id}" if rmk_id else "Remarketing"
-                    if key not in campanha_count:
-                        campanha_count[key] = {"name": key, "count": 0}
-                    campanha_count[key]["count"] += 1
-            top_campanhas = sorted(campanha_count.values(), key=lambda x: x["count"], reverse=True)[:5]
+            top_campanhas = motor.campanhas_remarketing(start, end, limite=5)
         except: pass
 
         # 🍩 DONUT CONVERSÃO
@@ -15861,42 +15556,19 @@ def advanced_statistics(
             prev_start = start - timedelta(days=periodo_duracao)
             prev_end = start
 
-            q_prev_vendas = apply_bot_filter(
-                db.query(Pedido).filter(
-                    Pedido.status.in_(['approved', 'paid', 'active', 'expired']),
-                    Pedido.data_aprovacao >= prev_start,
-                    Pedido.data_aprovacao <= prev_end
-                )
-            )
-            prev_vendas = q_prev_vendas.all()
-            
-            if is_super_split and not bot_id:
-                prev_receita = len(prev_vendas) * taxa_centavos
-            else:
-                prev_receita = sum(int((p.valor or 0) * 100) for p in prev_vendas)
-            
-            prev_total_vendas = len(prev_vendas)
+            prev_resumo = motor.resumo(prev_start, prev_end)
+            prev_receita = prev_resumo["receita"]
+            prev_total_vendas = prev_resumo["vendas"]
             prev_ticket = int(prev_receita / prev_total_vendas) if prev_total_vendas > 0 else 0
-            
-            q_prev_leads = db.query(Lead).filter(Lead.created_at >= prev_start, Lead.created_at <= prev_end)
-            if bots_ids:
-                q_prev_leads = q_prev_leads.filter(Lead.bot_id.in_(bots_ids))
-            prev_leads = q_prev_leads.count()
-
-            q_prev_ativos = apply_bot_filter(
-                db.query(Pedido).filter(
-                    Pedido.status.in_(['approved', 'paid', 'active', 'expired']),
-                    or_(Pedido.data_expiracao > prev_end, Pedido.data_expiracao == None)
-                )
-            )
-            prev_ativos = q_prev_ativos.count()
+            prev_leads = motor.leads(prev_start, prev_end)
+            prev_ativos = motor.ativos(prev_end)
 
             def calc_growth(current, previous):
                 if previous == 0:
                     return 100.0 if current > 0 else 0.0
                 return round(((current - previous) / previous) * 100, 1)
 
-            prev_usu_unicos = len(set(p.telegram_id for p in prev_vendas if p.telegram_id))
+            prev_usu_unicos = prev_resumo["compradores"]
             prev_ltv = int(prev_receita / prev_usu_unicos) if prev_usu_unicos > 0 else 0
 
             crescimento = {
@@ -15929,10 +15601,6 @@ def advanced_statistics(
         # 🆕 HEATMAP SEMANAL
         heatmap_semanal = []
         try:
-            heat_map = {}
-            for v in vendas:
-                if v.data_aprovacao:
-                    heat_map[(v.data_aprovacao.weekday(), v.data_aprovacao.hour)] = heat_map.get((v.data_aprovacao.weekday(), v.data_aprovacao.hour), 0) + 1
             for wd in range(7):
                 for hr in range(24):
                     heatmap_semanal.append({"weekday": wd, "hour": hr, "count": heat_map.get((wd, hr), 0)})
@@ -15942,17 +15610,7 @@ def advanced_statistics(
         # 🆕 RECEITA POR GATEWAY
         receita_por_gateway = {"items": []}
         try:
-            gw_map = {}
-            for v in vendas:
-                gw = getattr(v, 'gateway_usada', None) or 'desconhecido'
-                if gw not in gw_map:
-                    gw_map[gw] = {"name": gw, "count": 0, "receita": 0}
-                gw_map[gw]["count"] += 1
-                if is_super_split and not bot_id:
-                    gw_map[gw]["receita"] += taxa_centavos
-                else:
-                    gw_map[gw]["receita"] += int((v.valor or 0) * 100)
-            gw_list = sorted(gw_map.values(), key=lambda x: x["receita"], reverse=True)
+            gw_list = motor.por_gateway(start, end)
             total_gw = sum(g["receita"] for g in gw_list) or 1
             for gw in gw_list:
                 gw["pct"] = round((gw["receita"] / total_gw) * 100, 1)
@@ -15963,10 +15621,7 @@ def advanced_statistics(
         # 🆕 VENDAS POR ORIGEM
         vendas_por_origem = []
         try:
-            origem_map = {}
-            for v in vendas:
-                orig = getattr(v, 'origem', 'bot') or 'bot'
-                origem_map[orig] = origem_map.get(orig, 0) + 1
+            origem_map = dict(motor.por_origem(start, end))
             labels = {'bot':'Bot Direto','upsell':'Upsell','downsell':'Downsell','remarketing':'Remarketing','order_bump':'Order Bump','canal_free':'Canal Free'}
             vendas_por_origem = [{"name": labels.get(k, k.replace('_',' ').title()), "value": v} for k, v in sorted(origem_map.items(), key=lambda x: x[1], reverse=True)]
         except:
@@ -15978,20 +15633,17 @@ def advanced_statistics(
             import calendar as cal_mod
             dias_mes = cal_mod.monthrange(agora.year, agora.month)[1]
             dia_atual = agora.day
-            inicio_mes = agora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            if inicio_mes.tzinfo is None:
-                inicio_mes = tz_br.localize(inicio_mes)
-            vendas_mes = [v for v in vendas if v.data_aprovacao and _safe_tz(v.data_aprovacao) >= inicio_mes]
-            if is_super_split and not bot_id:
-                receita_mes = len(vendas_mes) * taxa_centavos
-            else:
-                receita_mes = sum(int((v.valor or 0) * 100) for v in vendas_mes)
+            # Reaproveita o agrupamento por dia do gráfico (vendas do período dentro do mês atual)
+            inicio_mes = agora.date().replace(day=1)
+            dias_do_mes = [v for d, v in vendas_por_dia.items() if d >= inicio_mes]
+            vendas_mes = sum(n for n, _, _ in dias_do_mes)
+            receita_mes = sum(r for _, r, _ in dias_do_mes)
             if dia_atual > 0:
                 projecao_mensal = {
                     "receita_projetada": int((receita_mes / dia_atual) * dias_mes),
-                    "vendas_projetadas": int((len(vendas_mes) / dia_atual) * dias_mes),
+                    "vendas_projetadas": int((vendas_mes / dia_atual) * dias_mes),
                     "media_diaria_receita": int(receita_mes / dia_atual),
-                    "media_diaria_vendas": round(len(vendas_mes) / dia_atual, 1),
+                    "media_diaria_vendas": round(vendas_mes / dia_atual, 1),
                     "dias_restantes": dias_mes - dia_atual,
                 }
         except:
@@ -16106,8 +15758,14 @@ async def webhook(req: Request, bg_tasks: BackgroundTasks):
             p = db.query(Pedido).filter(Pedido.transaction_id == tx).first()
             
             if p and p.status != 'paid':
+                ja_aprovado = p.status in STATUS_APROVADOS
                 p.status = 'paid'
+                if not p.data_aprovacao:
+                    p.data_aprovacao = now_brazil()
                 db.commit() # Salva o status pago
+                if not ja_aprovado:
+                    receita_dono.registrar_venda(db, p)  # 🏆 Ranking/metas Prime
+                invalidar_dono_do_bot(db, p.bot_id)
                 
                 # --- 🔔 NOTIFICAÇÃO AO ADMIN ---
                 try:
@@ -16310,6 +15968,7 @@ def enviar_passo_automatico(bot_temp, chat_id, passo, bot_db, db):
 # 👤 ENDPOINT ESPECÍFICO PARA STATS DO PERFIL (🆕)
 # =========================================================
 @app.get("/api/profile/stats")
+@cache_por_usuario("profile_stats")
 def get_profile_stats(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -16855,7 +16514,7 @@ def get_audit_logs(
 
 @app.get("/api/superadmin/stats")
 def get_superadmin_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_analytics),  # 🏊 Relatório pesado: pool de analytics
     current_superuser = Depends(get_current_superuser)
 ):
     """
@@ -16870,23 +16529,32 @@ def get_superadmin_stats(
         # 📊 ESTATÍSTICAS GERAIS DO SISTEMA
         # ============================================
         
-        # Total de usuários
-        total_users = db.query(User).count()
-        active_users = db.query(User).filter(User.is_active == True).count()
+        # Usuários: totais, ativos e novos (30 dias) numa única query
+        thirty_days_ago = now_brazil() - timedelta(days=30)
+        total_users, active_users, new_users_count = db.query(
+            func.count(User.id),
+            func.coalesce(func.sum(case((User.is_active == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((User.created_at >= thirty_days_ago, 1), else_=0)), 0),
+        ).one()
+        total_users, active_users, new_users_count = int(total_users), int(active_users), int(new_users_count)
         inactive_users = total_users - active_users
         
-        # Total de bots
-        total_bots = db.query(BotModel).count()
-        active_bots = db.query(BotModel).filter(BotModel.status == 'ativo').count()
+        # Bots: totais e ativos
+        total_bots, active_bots = db.query(
+            func.count(BotModel.id),
+            func.coalesce(func.sum(case((BotModel.status == 'ativo', 1), else_=0)), 0),
+        ).one()
+        total_bots, active_bots = int(total_bots), int(active_bots)
         inactive_bots = total_bots - active_bots
         
-        # Receita total do sistema
-        todas_vendas = db.query(Pedido).filter(
-            Pedido.status.in_(['approved', 'paid', 'active', 'expired'])
-        ).all()
-        
-        total_revenue = sum(int(p.valor * 100) for p in todas_vendas)
-        total_sales = len(todas_vendas)
+        # Receita total do sistema (agregada no banco, sem carregar os pedidos)
+        total_sales, soma_valor = db.query(
+            func.count(Pedido.id), func.coalesce(func.sum(Pedido.valor), 0)
+        ).filter(
+            Pedido.status.in_(STATUS_APROVADOS)
+        ).one()
+        total_sales = int(total_sales)
+        total_revenue = int(round(float(soma_valor or 0) * 100))
         
         # Ticket médio do sistema
         avg_ticket = int(total_revenue / total_sales) if total_sales > 0 else 0
@@ -16905,32 +16573,19 @@ def get_superadmin_stats(
         recent_users = db.query(User).order_by(
             desc(User.created_at)
         ).limit(5).all()
+        totais_recentes = totais_por_dono(db, [u.id for u in recent_users], status=('approved', 'paid'))
         
         recent_users_data = []
         for u in recent_users:
-            user_bots = db.query(BotModel).filter(BotModel.owner_id == u.id).count()
-            user_sales = db.query(Pedido).filter(
-                Pedido.bot_id.in_([b.id for b in u.bots]),
-                Pedido.status.in_(['approved', 'paid'])
-            ).count()
-            
             recent_users_data.append({
                 "id": u.id,
                 "username": u.username,
                 "email": u.email,
-                "total_bots": user_bots,
-                "total_sales": user_sales,
+                "total_bots": totais_recentes[u.id]["bots"],
+                "total_sales": totais_recentes[u.id]["vendas"],
                 "created_at": u.created_at.isoformat() if u.created_at else None
             })
         
-        # ============================================
-        # 📅 NOVOS USUÁRIOS (30 DIAS)
-        # ============================================
-        thirty_days_ago = now_brazil() - timedelta(days=30)
-        new_users_count = db.query(User).filter(
-            User.created_at >= thirty_days_ago
-        ).count()
-        
         # Cálculo de crescimento
         if total_users > 0:
             growth_percentage = round((new_users_count / total_users) * 100, 2)
@@ -17018,28 +16673,11 @@ def list_all_users(
         offset = (page - 1) * per_page
         users = query.order_by(User.created_at.desc()).offset(offset).limit(per_page).all()
         
-        # Formata resposta com estatísticas de cada usuário
+        # Estatísticas da página inteira em queries agrupadas (não por usuário)
+        totais = totais_por_dono(db, [u.id for u in users], status=('approved',))
+        
         users_data = []
         for user in users:
-            # Busca bots do usuário
-            user_bots = db.query(BotModel).filter(BotModel.owner_id == user.id).all()
-            bot_ids = [b.id for b in user_bots]
-            
-            # Calcula receita e vendas
-            user_revenue = 0.0
-            user_sales = 0
-            
-            if bot_ids:
-                user_revenue = db.query(func.sum(Pedido.valor)).filter(
-                    Pedido.bot_id.in_(bot_ids),
-                    Pedido.status == 'approved'
-                ).scalar() or 0.0
-                
-                user_sales = db.query(Pedido).filter(
-                    Pedido.bot_id.in_(bot_ids),
-                    Pedido.status == 'approved'
-                ).count()
-            
             users_data.append({
                 "id": user.id,
                 "username": user.username,
@@ -17048,9 +16686,9 @@ def list_all_users(
                 "is_active": user.is_active,
                 "is_superuser": user.is_superuser,
                 "created_at": user.created_at.isoformat() if user.created_at else None,
-                "total_bots": len(user_bots),
-                "total_revenue": float(user_revenue),
-                "total_sales": user_sales
+                "total_bots": totais[user.id]["bots"],
+                "total_revenue": totais[user.id]["valor"],
+                "total_sales": totais[user.id]["vendas"]
             })
         
         return {
@@ -17460,34 +17098,27 @@ def get_notifications(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user) # <--- CORRIGIDO AQUI
 ):
-    """Retorna as notificações do usuário logado"""
-    notifs = db.query(Notification).filter(
-        Notification.user_id == current_user.id
-    ).order_by(desc(Notification.created_at)).limit(limit).all()
-    
-    # Conta não lidas
-    unread_count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.read == False
-    ).count()
-    
+    """Retorna as notificações do usuário logado (pessoais + broadcasts, ver notificacoes.py)"""
     return {
-        "notifications": notifs,
-        "unread_count": unread_count
+        "notifications": notificacoes.listar(db, current_user, limit),
+        "unread_count": notificacoes.contar_nao_lidas(db, current_user)
     }
 
+@app.get("/api/notifications/unread-count")
+def get_notifications_unread_count(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Só o contador do sino (servido do cache enquanto nada mudou)"""
+    return {"unread_count": notificacoes.contar_nao_lidas(db, current_user)}
+
 @app.put("/api/notifications/read-all")
 def mark_all_read(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user) # <--- CORRIGIDO AQUI
 ):
-    """Marca todas como lidas"""
-    db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.read == False
-    ).update({"read": True})
-    
-    db.commit()
+    """Marca todas como lidas (pessoais e o cursor dos broadcasts)"""
+    notificacoes.marcar_todas_lidas(db, current_user)
     return {"status": "ok"}
 
 @app.put("/api/notifications/{notif_id}/read")
@@ -17496,16 +17127,8 @@ def mark_one_read(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user) # <--- CORRIGIDO AQUI
 ):
-    """Marca uma específica como lida"""
-    notif = db.query(Notification).filter(
-        Notification.id == notif_id,
-        Notification.user_id == current_user.id
-    ).first()
-    
-    if notif:
-        notif.read = True
-        db.commit()
-    
+    """Marca uma específica como lida (id negativo = broadcast: lê até ele)"""
+    notificacoes.marcar_lida(db, current_user, notif_id)
     return {"status": "ok"}
 
 # =========================================================
@@ -17641,6 +17264,54 @@ def delete_bot_force(
         raise HTTPException(status_code=500, detail="Erro ao deletar bot")
 
 
+@app.post("/api/superadmin/bots/resync-webhooks")
+def resync_webhooks_bots(
+    forcar: bool = True,
+    current_superuser = Depends(get_current_superuser)
+):
+    """
+    Super Admin reaplica webhook (URL, allowed_updates, max_connections, secret_token)
+    e menu de todos os bots ativos. Usar após trocar o domínio ou o segredo do webhook.
+    """
+    try:
+        resumo = sincronizar_setup_bots(forcar=forcar)
+        logger.info(f"🔗 Resync de webhooks por {current_superuser.username}: {resumo}")
+        return {"status": "success", **resumo}
+    except Exception as e:
+        logger.error(f"❌ Erro no resync de webhooks: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao ressincronizar webhooks")
+
+
+class ProfilerConfig(BaseModel):
+    ativo: bool
+    fracao: Optional[float] = None  # 0.0 a 1.0 das execuções amostradas
+
+
+@app.get("/api/superadmin/profiler")
+def get_profiler_status(current_superuser = Depends(get_current_superuser)):
+    """Status do profiler por amostragem (execuções e amostras por função)."""
+    return profiler.status()
+
+
+@app.post("/api/superadmin/profiler")
+def set_profiler(config: ProfilerConfig, current_superuser = Depends(get_current_superuser)):
+    """
+    Liga/desliga o profiler de webhooks e jobs. Ao desligar, grava um arquivo
+    .folded por função em PROFILE_DIR (pronto para flamegraph/speedscope).
+    """
+    if config.fracao is not None and not 0 < config.fracao <= 1:
+        raise HTTPException(status_code=400, detail="fracao deve estar entre 0 e 1")
+    
+    if config.ativo:
+        profiler.ligar(config.fracao)
+        logger.info(f"🔬 Profiler ligado por {current_superuser.username}")
+        return {"status": "success", **profiler.status()}
+    
+    arquivos = profiler.desligar()
+    logger.info(f"🔬 Profiler desligado por {current_superuser.username}")
+    return {"status": "success", "arquivos": arquivos, **profiler.status()}
+
+
 @app.post("/api/superadmin/impersonate/{user_id}")
 def impersonate_user(
     user_id: int,
@@ -17701,8 +17372,7 @@ def impersonate_user(
 # =========================================================
 # ✨ DOWNLOADER DE EMOJIS E ROTA DE IMAGENS (.webp)
 # =========================================================
-EMOJI_DIR = "uploads/emojis/thumb"
-os.makedirs(EMOJI_DIR, exist_ok=True)
+EMOJI_DIR = "uploads/emojis/thumb"  # Criado no primeiro download (download_emoji_worker)
 
 async def download_emoji_worker(bot_token: str, pack_name: str, emoji_id: str, file_id: str):
     """Baixa o arquivo físico do emoji do Telegram silenciosamente."""
@@ -17976,7 +17646,7 @@ def create_premium_emoji(
     db.add(emoji)
     db.commit()
     db.refresh(emoji)
-    invalidate_premium_emoji_cache()
+    invalidate_premium_emoji_cache(emoji.id)
     
     logger.info(f"✨ [PREMIUM EMOJI] Emoji '{emoji.name}' ({shortcode}) cadastrado por {current_superuser.username}")
     return {
@@ -18283,7 +17953,7 @@ def update_premium_emoji(
             setattr(emoji, field, value)
     
     db.commit()
-    invalidate_premium_emoji_cache()
+    invalidate_premium_emoji_cache(emoji.id)
     return {"message": f"Emoji '{emoji.name}' atualizado com sucesso"}
 
 
@@ -18301,7 +17971,7 @@ def delete_premium_emoji(
     nome = emoji.name
     db.delete(emoji)
     db.commit()
-    invalidate_premium_emoji_cache()
+    invalidate_premium_emoji_cache(emoji.id)
     
     logger.info(f"🗑️ [PREMIUM EMOJI] Emoji '{nome}' removido por {current_superuser.username}")
     return {"message": f"Emoji '{nome}' removido do catálogo"}
@@ -18528,18 +18198,9 @@ def send_broadcast(
         raise HTTPException(status_code=403, detail="Acesso negado")
     
     try:
-        users = db.query(User).filter(User.is_active == True).all()
-        count = 0
-        for user in users:
-            db.add(Notification(
-                user_id=user.id, 
-                title=broadcast.title, 
-                message=broadcast.message, 
-                type=broadcast.type
-            ))
-            count += 1
-        
-        db.commit()
+        # Uma linha só; cada usuário lê contra o próprio cursor (notificacoes.py)
+        notificacoes.enviar_broadcast(db, broadcast.title, broadcast.message, broadcast.type, criado_por=current_user.id)
+        count = db.query(func.count(User.id)).filter(User.is_active == True).scalar() or 0
         
         logger.info(f"📢 Broadcast enviado por {current_user.username} para {count} usuários")
         return {"message": f"Notificação enviada para {count} usuários!"}
@@ -18683,7 +18344,7 @@ def ranking_visibilidade(
 def obter_ranking(
     mes: int = Query(0, description="Mês numérico (1-12). 0 = todos os tempos"),
     ano: int = Query(0, description="Ano com 4 dígitos. 0 = todos os tempos"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_analytics),  # 🏊 Relatório pesado: pool de analytics
     current_user = Depends(get_current_user)
 ):
     try:
@@ -18693,32 +18354,8 @@ def obter_ranking(
             if config_row and config_row.value.lower() in ("false", "0", "nao"):
                 return {"status": "hidden", "ranking": [], "message": "O ranking está oculto pelo administrador."}
         
-        query = (
-            db.query(
-                User.username,
-                func.sum(Pedido.valor).label("total_faturado"),
-                func.count(Pedido.id).label("total_vendas")
-            )
-            .join(BotModel, BotModel.owner_id == User.id)
-            .join(Pedido, Pedido.bot_id == BotModel.id)
-            .filter(Pedido.data_aprovacao != None)
-            .filter(Pedido.status.in_(['approved', 'paid', 'active', 'expired']))
-            .filter(User.is_superuser == False)
-        )
-        
-        # Filtro por mês/ano (0 = todos os tempos)
-        if mes and mes >= 1 and mes <= 12:
-            query = query.filter(extract('month', Pedido.data_aprovacao) == mes)
-        if ano and ano >= 2020:
-            query = query.filter(extract('year', Pedido.data_aprovacao) == ano)
-        
-        resultado = (
-            query
-            .group_by(User.id)
-            .order_by(func.sum(Pedido.valor).desc())
-            .limit(10)
-            .all()
-        )
+        # Leitura do resumo materializado (receita_dono.py), não dos pedidos
+        resultado = receita_dono.ranking(db, mes=mes, ano=ano, limite=10)
 
         ranking_formatado = []
         for index, row in enumerate(resultado):
@@ -18747,27 +18384,13 @@ def get_recursos_prime(
     """
     try:
         from sqlalchemy import text
-        # 1. Pega os bots do usuário
-        user_bots = db.query(BotModel.id).filter(BotModel.owner_id == current_user.id).all()
-        bot_ids = [b.id for b in user_bots]
+        # 1. Faturamento total em REAIS (resumo mensal materializado do dono)
+        total_vendas, faturamento_total = receita_dono.faturamento_dono(db, current_user.id)
         
-        # 2. Calcula o faturamento total em REAIS
-        faturamento_total = 0
-        total_vendas = 0
-        if bot_ids:
-            vendas = db.query(Pedido).filter(
-                Pedido.bot_id.in_(bot_ids),
-                Pedido.status.in_(['approved', 'paid', 'active', 'expired'])
-            ).all()
-            
-            total_vendas = len(vendas)
-            
-            # Se for super admin com split, o faturamento dele é baseado nas taxas
-            if current_user.is_superuser and getattr(current_user, 'pushin_pay_id', None):
-                taxa = current_user.taxa_venda or 60
-                faturamento_total = (total_vendas * taxa) / 100.0
-            else:
-                faturamento_total = sum(float(v.valor or 0) for v in vendas)
+        # Se for super admin com split, o faturamento dele é baseado nas taxas
+        if current_user.is_superuser and getattr(current_user, 'pushin_pay_id', None):
+            taxa = current_user.taxa_venda or 60
+            faturamento_total = (total_vendas * taxa) / 100.0
         
         # 3. Busca a lista de recursos que injetamos no banco
         recursos_db = db.execute(text("SELECT * FROM recursos_prime ORDER BY meta_reais ASC")).fetchall()
@@ -18873,10 +18496,7 @@ def clonar_funil(
             raise HTTPException(400, "Bot de origem e destino devem ser diferentes")
         
         if not current_user.is_superuser:
-            user_bots = db.query(BotModel.id).filter(BotModel.owner_id == current_user.id).all()
-            bots_ids = [b.id for b in user_bots]
-            vendas = db.query(Pedido).filter(Pedido.bot_id.in_(bots_ids), Pedido.status.in_(['paid', 'approved', 'active', 'expired'])).all()
-            fat_total = sum((p.valor or 0) for p in vendas)
+            _, fat_total = receita_dono.faturamento_dono(db, current_user.id)
             if fat_total < 100:
                 raise HTTPException(403, "Recurso bloqueado. Faturamento mínimo: R$ 100,00")
         
@@ -19428,9 +19048,12 @@ def simular_copy(
 # =========================================================
 # 🗺️ JORNADA DO CLIENTE — RECURSO PRIME
 # =========================================================
-# =========================================================
-# 🗺️ JORNADA DO CLIENTE — RECURSO PRIME
-# =========================================================
+# Lê a projeção jornada_contatos e o log funil_eventos (ver jornada.py) em vez
+# de carregar todos os pedidos e leads dos bots a cada página.
+
+def _bots_jornada(db, current_user):
+    return db.query(BotModel.id, BotModel.nome).filter(BotModel.owner_id == current_user.id).all()
+
 
 @app.get("/api/admin/recursos-prime/jornada-cliente")
 def jornada_cliente_lista(
@@ -19439,151 +19062,58 @@ def jornada_cliente_lista(
     page: int = 1,
     per_page: int = 50,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """
     Lista contatos com dados enriquecidos para a Jornada do Cliente.
     Retorna tabela paginada com abas: todos, pagantes, pendentes, expirados, leads.
+    Para rolar páginas, envie o `next_cursor` da resposta em `cursor` (keyset);
+    `page` continua funcionando para saltos diretos.
     """
     try:
-        user_bots = db.query(BotModel).filter(BotModel.owner_id == current_user.id).all()
+        user_bots = _bots_jornada(db, current_user)
         user_bot_ids = [b.id for b in user_bots]
+        page = max(1, page)
+        per_page = max(1, min(per_page, 200))
         
         if not user_bot_ids:
-            return {"data": [], "total": 0, "page": page, "per_page": per_page, "total_pages": 0, "bots": []}
+            return {"data": [], "total": 0, "page": page, "per_page": per_page, "total_pages": 0, "bots": [], "next_cursor": None}
         
         bots_alvo = [bot_id] if (bot_id and bot_id in user_bot_ids) else user_bot_ids
         
-        def clean_date(dt):
-            if not dt: return None
-            try:
-                return dt.replace(tzinfo=None).isoformat()
-            except:
-                return str(dt) if dt else None
-        
-        pedidos_q = db.query(Pedido).filter(Pedido.bot_id.in_(bots_alvo)).order_by(Pedido.created_at.asc()).all()
-        leads_q = db.query(Lead).filter(Lead.bot_id.in_(bots_alvo)).all()
-        
-        contatos = {}
-        
-        for l in leads_q:
-            tid = str(l.user_id).strip()
-            key = f"{l.bot_id}_{tid}"
-            contatos[key] = {
-                "telegram_id": tid,
-                "bot_id": l.bot_id,
-                "first_name": l.nome or "Sem nome",
-                "username": l.username,
-                "status": "lead",
-                "primeiro_contato": clean_date(l.primeiro_contato or l.created_at),
-                "origem_entrada": getattr(l, 'origem_entrada', 'bot_direto') or 'bot_direto',
-                "plano_principal": None,
-                "valor_principal": 0,
-                "tem_order_bump": False,
-                "tem_upsell": False,
-                "tem_downsell": False,
-                "total_gasto": 0,
-                "pedidos_count": 0,
-                "ultimo_status": "lead",
-            }
-        
-        for p in pedidos_q:
-            tid = str(p.telegram_id).strip()
-            key = f"{p.bot_id}_{tid}"
-            nome_lower = str(p.plano_nome or "").lower()
-            is_upsell = "upsell:" in nome_lower
-            is_downsell = "downsell:" in nome_lower
-            
-            if key not in contatos:
-                contatos[key] = {
-                    "telegram_id": tid,
-                    "bot_id": p.bot_id,
-                    "first_name": p.first_name or "Sem nome",
-                    "username": p.username,
-                    "status": p.status,
-                    "primeiro_contato": clean_date(p.primeiro_contato or p.created_at),
-                    "origem_entrada": "bot_direto",
-                    "plano_principal": None,
-                    "valor_principal": 0,
-                    "tem_order_bump": False,
-                    "tem_upsell": False,
-                    "tem_downsell": False,
-                    "total_gasto": 0,
-                    "pedidos_count": 0,
-                    "ultimo_status": p.status,
-                }
-            
-            c = contatos[key]
-            if p.first_name and p.first_name != "Sem nome":
-                c["first_name"] = p.first_name
-            if p.username:
-                c["username"] = p.username
-            
-            is_paid = p.status in ['approved', 'paid', 'active', 'expired']
-            
-            if is_upsell:
-                if is_paid: c["tem_upsell"] = True
-            elif is_downsell:
-                if is_paid: c["tem_downsell"] = True
-            else:
-                if not c["plano_principal"] and is_paid:
-                    c["plano_principal"] = p.plano_nome
-                    c["valor_principal"] = float(p.valor or 0)
-            
-            if p.tem_order_bump:
-                c["tem_order_bump"] = True
-            
-            if is_paid:
-                c["total_gasto"] += float(p.valor or 0)
-                # 🔥 CORREÇÃO 3: Contabiliza o Order Bump como um pedido extra se existir
-                c["pedidos_count"] += (2 if p.tem_order_bump else 1)
-            
-            if p.status in ['approved', 'paid', 'active']:
-                c["ultimo_status"] = "pagante"
-            elif p.status == 'expired' and c["ultimo_status"] not in ['pagante']:
-                c["ultimo_status"] = "expirado"
-            elif p.status == 'pending' and c["ultimo_status"] == 'lead':
-                c["ultimo_status"] = "pendente"
-            
-            c["status"] = c["ultimo_status"]
-        
-        lista = list(contatos.values())
-        
-        # 🔥 CORREÇÃO 2: Adicionado o filtro "leads"
-        if status == "pagantes":
-            lista = [c for c in lista if c["ultimo_status"] == "pagante"]
-        elif status == "pendentes":
-            lista = [c for c in lista if c["ultimo_status"] == "pendente"]
-        elif status == "expirados":
-            lista = [c for c in lista if c["ultimo_status"] == "expirado"]
-        elif status == "leads":
-            lista = [c for c in lista if c["ultimo_status"] == "lead"]
-        
-        if search:
-            search_lower = search.lower()
-            lista = [c for c in lista if 
-                search_lower in (c.get("first_name") or "").lower() or
-                search_lower in (c.get("username") or "").lower() or
-                search_lower in (c.get("telegram_id") or "")
-            ]
-        
-        # 🔥 CORREÇÃO 1: Ordenando decrescente (mais recentes primeiro)
-        lista.sort(key=lambda x: str(x.get("primeiro_contato") or ""), reverse=True)
-        
-        total = len(lista)
-        total_pages = max(1, (total + per_page - 1) // per_page)
-        paginated = lista[(page - 1) * per_page : page * per_page]
+        contatos, total, next_cursor = jornada.listar(
+            db, bots_alvo, aba=status, busca=search, limite=per_page,
+            cursor=cursor, offset=(page - 1) * per_page,
+        )
         
-        bots_list = [{"id": b.id, "nome": b.nome} for b in user_bots]
+        paginated = [{
+            "telegram_id": c.telegram_id,
+            "bot_id": c.bot_id,
+            "first_name": c.first_name or "Sem nome",
+            "username": c.username,
+            "status": c.status,
+            "primeiro_contato": c.primeiro_contato.isoformat() if c.primeiro_contato else None,
+            "origem_entrada": c.origem_entrada or "bot_direto",
+            "plano_principal": c.plano_principal,
+            "valor_principal": float(c.valor_principal or 0),
+            "tem_order_bump": bool(c.tem_order_bump),
+            "tem_upsell": bool(c.tem_upsell),
+            "tem_downsell": bool(c.tem_downsell),
+            "total_gasto": float(c.total_gasto or 0),
+            "pedidos_count": int(c.pedidos_count or 0),
+            "ultimo_status": c.status,
+        } for c in contatos]
         
         return {
             "data": paginated,
             "total": total,
             "page": page,
             "per_page": per_page,
-            "total_pages": total_pages,
-            "bots": bots_list
+            "total_pages": max(1, (total + per_page - 1) // per_page),
+            "bots": [{"id": b.id, "nome": b.nome} for b in user_bots],
+            "next_cursor": next_cursor,
         }
         
     except Exception as e:
@@ -19609,203 +19139,27 @@ def jornada_cliente_mapa(
         if not bot:
             raise HTTPException(404, "Bot não encontrado")
         
-        def clean_date(dt):
-            if not dt: return None
-            try:
-                return dt.replace(tzinfo=None).isoformat()
-            except:
-                return str(dt) if dt else None
-        
-        lead = db.query(Lead).filter(Lead.bot_id == bot_id, Lead.user_id == str(telegram_id)).first()
-        pedidos = db.query(Pedido).filter(
-            Pedido.bot_id == bot_id, Pedido.telegram_id == str(telegram_id)
-        ).order_by(Pedido.created_at.asc()).all()
-        
-        remarketing_logs = []
-        try:
-            rlogs = db.query(RemarketingLog).filter(
-                RemarketingLog.bot_id == bot_id, RemarketingLog.user_id == str(telegram_id)
-            ).order_by(RemarketingLog.sent_at.asc()).all()
-            remarketing_logs = [{
-                "sent_at": clean_date(r.sent_at),
-                "status": r.status,
-                "converted": r.converted,
-                "converted_at": clean_date(r.converted_at) if r.converted else None
-            } for r in rlogs]
-        except:
-            pass
+        contato = jornada.buscar_contato(db, bot_id, telegram_id)
+        eventos = jornada.eventos_do_contato(db, bot_id, telegram_id)
         
         ob_config = db.query(OrderBumpConfig).filter(OrderBumpConfig.bot_id == bot_id).first()
         up_config = db.query(UpsellConfig).filter(UpsellConfig.bot_id == bot_id).first()
         ds_config = db.query(DownsellConfig).filter(DownsellConfig.bot_id == bot_id).first()
         
-        timeline = []
-        
-        # 1. Lead startou
-        if lead:
-            timeline.append({
-                "etapa": "lead_start", "titulo": "Lead Startou",
-                "descricao": f"Entrou pelo {getattr(lead, 'origem_entrada', 'bot_direto') or 'bot direto'}",
-                "data": clean_date(lead.primeiro_contato or lead.created_at),
-                "status": "completo", "cor": "#3b82f6"
-            })
-        elif pedidos:
-            p0 = pedidos[0]
-            timeline.append({
-                "etapa": "lead_start", "titulo": "Lead Startou",
-                "descricao": "Entrou pelo bot",
-                "data": clean_date(p0.primeiro_contato or p0.created_at),
-                "status": "completo", "cor": "#3b82f6"
-            })
-        
-        pedido_principal = None
-        pedido_upsell = None
-        pedido_downsell = None
-        
-        for p in pedidos:
-            nome_lower = str(p.plano_nome or "").lower()
-            is_paid = p.status in ['approved', 'paid', 'active', 'expired']
-            if "upsell:" in nome_lower:
-                pedido_upsell = p
-            elif "downsell:" in nome_lower:
-                pedido_downsell = p
-            else:
-                if not pedido_principal or is_paid:
-                    pedido_principal = p
-        
-        # 🔥 CORREÇÃO 4: ORDEM EXATA DA TIMELINE (O MAPA DO PERCURSO)
-        if pedido_principal:
-            val_p = float(pedido_principal.valor or 0)
-            tem_ob = pedido_principal.tem_order_bump
-            is_paid_p = pedido_principal.status in ['approved', 'paid', 'active', 'expired']
-            
-            # 2. Escolheu plano principal
-            timeline.append({
-                "etapa": "escolheu_plano", "titulo": "Escolheu plano principal",
-                "descricao": f"Plano: {pedido_principal.plano_nome or 'N/A'}",
-                "data": clean_date(pedido_principal.created_at),
-                "status": "completo", "cor": "#8b5cf6"
-            })
-
-            # 3. Order Bump (Oferecido antes do PIX)
-            if ob_config and ob_config.ativo:
-                timeline.append({
-                    "etapa": "order_bump",
-                    "titulo": "Order Bump aceito ✅" if tem_ob else "Order Bump recusado ❌",
-                    "descricao": f"{ob_config.nome_produto or 'Produto extra'} — R$ {float(ob_config.preco or 0):.2f}" if tem_ob else "Não adicionou o produto",
-                    "data": clean_date(pedido_principal.created_at),
-                    "status": "completo" if tem_ob else "recusado",
-                    "cor": "#10b981" if tem_ob else "#6b7280"
-                })
-
-            # 4. Gerou PIX
-            timeline.append({
-                "etapa": "gerou_pix", "titulo": "Gerou PIX",
-                "descricao": f"Valor total do PIX: R$ {val_p:.2f}",
-                "data": clean_date(pedido_principal.gerou_pix_em or pedido_principal.created_at),
-                "status": "completo", "cor": "#f59e0b"
-            })
-            
-            # 5. Pagou plano principal + Order bump
-            txt_pago = "Pagou plano principal + Order bump" if tem_ob else "Pagou plano principal"
-            timeline.append({
-                "etapa": "pagou_principal",
-                "titulo": txt_pago if is_paid_p else ("Pix Pendente/Expirado" if pedido_principal.status in ['pending', 'expired'] else "Não Pagou"),
-                "descricao": f"Pagamento de R$ {val_p:.2f} confirmado" if is_paid_p else "Aguardando pagamento",
-                "data": clean_date(pedido_principal.pagou_em or pedido_principal.data_aprovacao) if is_paid_p else clean_date(pedido_principal.created_at),
-                "status": "completo" if is_paid_p else "falhou",
-                "cor": "#10b981" if is_paid_p else "#ef4444"
-            })
-            
-            # 6. Upsell (Apenas se pagou o principal)
-            if up_config and up_config.ativo and is_paid_p:
-                timeline.append({
-                    "etapa": "upsell_enviado", "titulo": "Upsell enviado",
-                    "descricao": f"Oferta: {up_config.nome_produto or 'Upsell'} — R$ {float(up_config.preco or 0):.2f}",
-                    "data": clean_date(pedido_principal.pagou_em or pedido_principal.data_aprovacao),
-                    "status": "completo", "cor": "#3b82f6"
-                })
-                
-                if pedido_upsell:
-                    # 7. Gerou PIX Upsell
-                    timeline.append({
-                        "etapa": "gerou_pix_upsell", "titulo": "Gerou PIX",
-                        "descricao": f"Valor Upsell: R$ {float(pedido_upsell.valor or 0):.2f}",
-                        "data": clean_date(pedido_upsell.gerou_pix_em or pedido_upsell.created_at),
-                        "status": "completo", "cor": "#f59e0b"
-                    })
-                    
-                    # 8. Upsell Pagou
-                    is_paid_up = pedido_upsell.status in ['approved', 'paid', 'active', 'expired']
-                    timeline.append({
-                        "etapa": "upsell",
-                        "titulo": "Upsell pagou ✅" if is_paid_up else "Upsell pendente",
-                        "descricao": f"Pagamento de R$ {float(pedido_upsell.valor or 0):.2f} confirmado" if is_paid_up else "Gerou PIX mas não pagou",
-                        "data": clean_date(pedido_upsell.data_aprovacao or pedido_upsell.created_at),
-                        "status": "completo" if is_paid_up else "pendente",
-                        "cor": "#10b981" if is_paid_up else "#f59e0b"
-                    })
-            
-            # 9. Downsell (Apenas se o Upsell foi ignorado ou não pago)
-            if ds_config and ds_config.ativo and is_paid_p and (not pedido_upsell or pedido_upsell.status not in ['approved', 'paid', 'active', 'expired']):
-                timeline.append({
-                    "etapa": "downsell_enviado", "titulo": "Downsell enviado",
-                    "descricao": f"Oferta: {ds_config.nome_produto or 'Downsell'} — R$ {float(ds_config.preco or 0):.2f}",
-                    "data": clean_date(pedido_principal.pagou_em or pedido_principal.data_aprovacao),
-                    "status": "completo", "cor": "#3b82f6"
-                })
-                
-                if pedido_downsell:
-                    timeline.append({
-                        "etapa": "gerou_pix_downsell", "titulo": "Gerou PIX",
-                        "descricao": f"Valor Downsell: R$ {float(pedido_downsell.valor or 0):.2f}",
-                        "data": clean_date(pedido_downsell.gerou_pix_em or pedido_downsell.created_at),
-                        "status": "completo", "cor": "#f59e0b"
-                    })
-                    
-                    is_paid_ds = pedido_downsell.status in ['approved', 'paid', 'active', 'expired']
-                    timeline.append({
-                        "etapa": "downsell",
-                        "titulo": "Downsell pagou ✅" if is_paid_ds else "Downsell pendente",
-                        "descricao": f"Pagamento de R$ {float(pedido_downsell.valor or 0):.2f} confirmado" if is_paid_ds else "Gerou PIX mas não pagou",
-                        "data": clean_date(pedido_downsell.data_aprovacao or pedido_downsell.created_at),
-                        "status": "completo" if is_paid_ds else "pendente",
-                        "cor": "#10b981" if is_paid_ds else "#f59e0b"
-                    })
-        
-        # 10. Remarketing
-        for i, rl in enumerate(remarketing_logs[:5]):
-            timeline.append({
-                "etapa": f"remarketing_{i+1}",
-                "titulo": f"Remarketing #{i+1}" + (" — Converteu ✅" if rl["converted"] else ""),
-                "descricao": f"Enviado em {rl['sent_at'] or 'N/A'}",
-                "data": rl["sent_at"],
-                "status": "completo" if rl["converted"] else "enviado",
-                "cor": "#8b5cf6"
-            })
-        
-        total_gasto = sum(float(p.valor or 0) for p in pedidos if p.status in ['approved', 'paid', 'active', 'expired'])
-        
-        # 🔥 CORREÇÃO 3: Contabiliza o Order Bump como um pedido extra se existir (no Header do modal)
-        total_pedidos = sum(
-            (2 if getattr(p, 'tem_order_bump', False) else 1) 
-            for p in pedidos if p.status in ['approved', 'paid', 'active', 'expired']
-        )
-        
         return {
             "status": "success",
             "telegram_id": telegram_id,
             "bot_id": bot_id,
             "bot_nome": bot.nome,
             "info": {
-                "first_name": lead.nome if lead else (pedidos[0].first_name if pedidos else "Desconhecido"),
-                "username": lead.username if lead else (pedidos[0].username if pedidos else None),
-                "total_gasto": round(total_gasto, 2),
-                "total_pedidos": total_pedidos,
-                "primeiro_contato": clean_date(lead.primeiro_contato or lead.created_at) if lead else (clean_date(pedidos[0].created_at) if pedidos else None),
+                "first_name": (contato.first_name or "Sem nome") if contato else "Desconhecido",
+                "username": contato.username if contato else None,
+                "total_gasto": round(float(contato.total_gasto or 0), 2) if contato else 0,
+                "total_pedidos": int(contato.pedidos_count or 0) if contato else 0,
+                "primeiro_contato": contato.primeiro_contato.isoformat() if contato and contato.primeiro_contato else None,
             },
-            "timeline": timeline,
-            "remarketing_logs": remarketing_logs,
+            "timeline": jornada.timeline(eventos),
+            "remarketing_logs": jornada.remarketing_logs(eventos),
             "config_ativa": {
                 "order_bump": bool(ob_config and ob_config.ativo),
                 "upsell": bool(up_config and up_config.ativo),
@@ -19830,13 +19184,21 @@ B2_KEY_ID = "0053eddc50d26a30000000005"
 B2_APP_KEY = "K0057bAugoXm4Vz9IHf8sVBnM4+yBEo"
 B2_BUCKET_NAME = "Zenyx-mid" # <-- ⚠️ ATENÇÃO: Escreva o nome exato do seu balde aqui!
 
-# Inicializa o cliente B2 (Protocolo S3)
-b2_client = boto3.client(
-    's3',
-    endpoint_url=B2_ENDPOINT,
-    aws_access_key_id=B2_KEY_ID,
-    aws_secret_access_key=B2_APP_KEY
-)
+# Cliente B2 (Protocolo S3) criado no primeiro upload: importar o boto3
+# custa centenas de ms e todo worker pagava isso no boot sem nunca usar
+_b2_client = None
+
+def get_b2_client():
+    global _b2_client
+    if _b2_client is None:
+        import boto3
+        _b2_client = boto3.client(
+            's3',
+            endpoint_url=B2_ENDPOINT,
+            aws_access_key_id=B2_KEY_ID,
+            aws_secret_access_key=B2_APP_KEY
+        )
+    return _b2_client
 
 @app.post("/api/admin/media/upload")
 async def upload_media(
@@ -19861,7 +19223,7 @@ async def upload_media(
         file_content = await file.read()
         
         # 4. Faz o upload para o Backblaze B2 silenciosamente
-        b2_client.put_object(
+        get_b2_client().put_object(
             Bucket=B2_BUCKET_NAME,
             Key=unique_filename,
             Body=file_content,
@@ -19906,8 +19268,9 @@ def check_and_fix_interaction_count():
             else:
                 logger.info("✅ [FIX] Coluna 'interaction_count' já existe.")
     except Exception as e:
-        # Loga o erro mas não para o sistema (pode ser erro de permissão ou sqlite vs postgres)
+        # Loga o erro; o ledger segura a exceção (não para o sistema) e repete no próximo boot
         logger.error(f"❌ Erro ao verificar interaction_count: {e}")
+        raise
 
 # =========================================================
 # 🚀 STARTUP UNIFICADO (FUSION V7 + ORIGINAL)
@@ -19925,10 +19288,6 @@ async def startup_event():
     print("🚀 INICIANDO ZENYX GBOT (STARTUP UNIFICADO)")
     print("="*60)
 
-    # 0. 🚑 CORREÇÃO DE EMERGÊNCIA (REMARKETING)
-    # Executa antes de tudo para garantir que a coluna exista
-    check_and_fix_interaction_count()
-
     # 1. INICIALIZAR HTTP CLIENT
     try:
         http_client = httpx.AsyncClient(
@@ -19940,73 +19299,48 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ Erro HTTP Client: {e}")
 
-    # 2. GARANTIR BANCO E COLUNAS BÁSICAS
+    # 2. MIGRAÇÕES VIA LEDGER (cada uma roda uma única vez; boot sem pendências não executa DDL)
+    from database import Base, engine, SystemConfig, SessionLocal
     try:
-        print("📊 Inicializando banco de dados...")
-        from database import Base, engine, SystemConfig, SessionLocal, init_db
-        Base.metadata.create_all(bind=engine)
-        
         from force_migration import forcar_atualizacao_tabelas
-        print("🔧 Verificando integridade e colunas faltantes...")
-        forcar_atualizacao_tabelas()
-        
-        print("✅ [2/5] Banco de dados inicializado e corrigido")
-    except Exception as e:
-        logger.error(f"❌ ERRO CRÍTICO no Banco de Dados: {e}")
-
-    # 3. EXECUTAR MIGRAÇÕES DE VERSÃO
-    try:
-        print("🔄 Executando migrações de versão...")
-        # Imports Locais
         from migration_v3 import executar_migracao_v3
         from migration_v4 import executar_migracao_v4
         from migration_v5 import executar_migracao_v5
         from migration_v6 import executar_migracao_v6
         from migration_v7 import executar_migracao_v7
+        from migration_v8 import executar_migracao_v8
         from migration_audit_logs import executar_migracao_audit_logs
-        # Import da nova migração V8 (criação da msg_pix)
-        try:
-            from migration_v8 import executar_migracao_v8
-        except ImportError:
-            # Caso o arquivo ainda não exista ou tenha outro nome, loga o aviso
-            logger.warning("⚠️ Arquivo migration_v8.py não encontrado (import failed).")
-            executar_migracao_v8 = None
-
-
-        try: executar_migracao_v3() 
-        except Exception as e: logger.warning(f"⚠️ V3: {e}")
-        
-        try: executar_migracao_v4() 
-        except Exception as e: logger.warning(f"⚠️ V4: {e}")
-        
-        try: executar_migracao_v5() 
-        except Exception as e: logger.warning(f"⚠️ V5: {e}")
-        
-        try: executar_migracao_v6() 
-        except Exception as e: logger.warning(f"⚠️ V6: {e}")
-        
-        try: 
-            executar_migracao_v7()
-            print("✅ Migração V7 (Canais) verificada")
-        except Exception as e: logger.warning(f"⚠️ V7: {e}")
-
-        # --- MIGRAÇÃO V8 (MSG PIX) ---
-        if executar_migracao_v8:
-            try:
-                executar_migracao_v8()
-                print("✅ Migração V8 (Msg Pix) verificada")
-            except Exception as e:
-                logger.warning(f"⚠️ V8: {e}")
-
-        try: executar_migracao_audit_logs()
-        except Exception as e: logger.warning(f"⚠️ AuditLogs: {e}")
-
-        print("✅ [3/5] Migrações de versão concluídas")
-        
+        from migration_v9 import executar_migracao_v9
+        from migration_v10 import executar_migracao_v10
+        from migration_v11 import executar_migracao_v11
+        from migration_v12 import executar_migracao_v12
+        from migration_v13 import executar_migracao_v13
+
+        resultado = await aplicar_migracoes([
+            Migracao(versao_create_all(), "create_all dos models", lambda: Base.metadata.create_all(bind=engine)),
+            Migracao("0002_force_migration", "Colunas faltantes (force_migration)", forcar_atualizacao_tabelas, somente_postgres=True),
+            Migracao("0003_interaction_count", "Coluna interaction_count (remarketing)", check_and_fix_interaction_count, somente_postgres=True),
+            Migracao("0004_v3", "Migração V3", executar_migracao_v3, somente_postgres=True),
+            Migracao("0005_v4", "Migração V4", executar_migracao_v4, somente_postgres=True),
+            Migracao("0006_v5", "Migração V5", executar_migracao_v5, somente_postgres=True),
+            Migracao("0007_v6", "Migração V6", executar_migracao_v6, somente_postgres=True),
+            Migracao("0008_v7", "Migração V7 (Canais)", executar_migracao_v7, somente_postgres=True),
+            Migracao("0009_v8", "Migração V8 (Msg Pix)", executar_migracao_v8, somente_postgres=True),
+            Migracao("0010_audit_logs", "Tabela audit_logs", executar_migracao_audit_logs),
+            Migracao("0011_v9", "Migração V9 (índice de PIX pendente)", executar_migracao_v9),
+            Migracao("0012_v10", "Colunas de alternantes/áudio", executar_migracao_v10, somente_postgres=True),
+            Migracao("0013_v11", "Colunas legadas do remarketing", executar_migracao_v11, somente_postgres=True),
+            Migracao("0014_receita_mensal_dono", "Carga inicial da receita mensal por dono", receita_dono.reconciliar, usa_db=True),
+            Migracao("0015_tracking_series", "Histórico de leads/vendas dos links de tracking", tracking_series.reconstruir, usa_db=True),
+            Migracao("0016_funil_eventos", "Log de eventos do funil e projeção da Jornada do Cliente", jornada.reconstruir, usa_db=True),
+            Migracao("0017_v12", "Índices de busca de contatos (pg_trgm)", executar_migracao_v12),
+            Migracao("0018_v13", "Índices compostos de audit_logs", executar_migracao_v13),
+        ])
+        print(f"✅ [2-3/5] Migrações: {resultado['aplicadas']} aplicadas, {resultado['falhas']} falhas, {resultado.get('puladas', 0)} puladas")
     except ImportError as e:
         logger.warning(f"⚠️ Algum arquivo de migração está faltando: {e}")
     except Exception as e:
-        logger.error(f"❌ Erro geral nas migrações: {e}")
+        logger.error(f"❌ ERRO CRÍTICO nas migrações: {e}")
 
     # 4. CONFIGURAÇÃO DE PAGAMENTO
     try:
@@ -20026,6 +19360,14 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"⚠️ Erro ao configurar pushin_pay_id: {e}")
 
+    # 4.1 🌐 COORDENAÇÃO ENTRE RÉPLICAS (só com CLUSTER_MODE=true + Postgres)
+    try:
+        coordenacao.iniciar(asyncio.get_running_loop())
+        if coordenacao.ativo():
+            logger.info(f"🌐 [CLUSTER] Modo cluster ativo | réplica {coordenacao.REPLICA_ID}")
+    except Exception as e:
+        logger.error(f"❌ Erro ao iniciar coordenação do cluster: {e}")
+
     # 5. INICIAR SCHEDULER
     try:
         if not scheduler.running:
@@ -20034,6 +19376,18 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ Erro Scheduler: {e}")
 
+    # 6. ⚙️ SYNC DE CONFIGURAÇÃO DOS BOTS (em background, não atrasa o boot)
+    try:
+        scheduler.add_job(
+            somente_lider("sync_setup_bots")(sincronizar_setup_bots),
+            'date',
+            run_date=now_brazil() + timedelta(seconds=15),
+            id='sync_setup_bots',
+            replace_existing=True
+        )
+    except Exception as e:
+        logger.error(f"❌ Erro ao agendar sync de setup dos bots: {e}")
+
     print("="*60)
     print("✅ SISTEMA TOTALMENTE OPERACIONAL (V7 + V8)")
     print("="*60)
@@ -20394,39 +19748,10 @@ def fix_duplicates_and_dates(db: Session = Depends(get_db)):
 
 
 # =========================================================
-# 🛠️ FIX DATABASE: CRIAR COLUNA FALTANTE
+# 🔧 ROTAS DE MIGRAÇÃO (/migrate-*, fix-*) — ver rotas_migracao.py
 # =========================================================
-@app.get("/api/admin/fix-lead-column")
-def fix_lead_column_db(db: Session = Depends(get_db)):
-    try:
-        # Comando SQL direto para criar a coluna se não existir
-        db.execute(text("ALTER TABLE leads ADD COLUMN IF NOT EXISTS expiration_date TIMESTAMP"))
-        db.commit()
-        return {"status": "sucesso", "msg": "Coluna 'expiration_date' criada na tabela 'leads'!"}
-    except Exception as e:
-        return {"status": "erro", "msg": str(e)}
+app.include_router(rotas_migracao.router)
 
-# =========================================================
-# 🛠️ FIX FINAL: CRIAR COLUNAS QUE FALTAM (PHONE E EXPIRATION)
-# =========================================================
-@app.get("/api/admin/fix-database-structure")
-def fix_database_structure(db: Session = Depends(get_db)):
-    try:
-        # 1. Cria a coluna PHONE (que está causando o erro agora)
-        db.execute(text("ALTER TABLE leads ADD COLUMN IF NOT EXISTS phone VARCHAR"))
-        
-        # 2. Cria a coluna EXPIRATION_DATE (para garantir o vitalício)
-        db.execute(text("ALTER TABLE leads ADD COLUMN IF NOT EXISTS expiration_date TIMESTAMP"))
-        
-        db.commit()
-        
-        return {
-            "status": "sucesso", 
-            "msg": "✅ Colunas 'phone' e 'expiration_date' criadas com sucesso na tabela LEADS!"
-        }
-    except Exception as e:
-        db.rollback()
-        return {"status": "erro", "msg": str(e)}
 
 # =========================================================
 # 🧹 FAXINA NUCLEAR: APAGA LEADS DUPLICADOS DO BANCO
@@ -20481,1040 +19806,108 @@ def nuke_duplicate_leads(db: Session = Depends(get_db)):
         db.rollback()
         return {"status": "erro", "msg": str(e)}
 
-# ============================================================
-# 🔧 ROTA DE MIGRAÇÃO - ADICIONAR COLUNAS FALTANTES
-# ============================================================
-@app.get("/migrate-button-fields")
-async def migrate_button_fields(db: Session = Depends(get_db)):
-    """
-    🔥 Migração Manual: Adiciona as novas colunas do sistema de botões personalizados
-    Acesse: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-button-fields
-    """
+
+
+
+
+
+
+
+
+# --- ENDPOINT PÚBLICO: Enviar Denúncia (sem autenticação) ---
+class ReportSubmit(BaseModel):
+    reporter_name: Optional[str] = None
+    bot_username: str
+    reason: str  # 'cp', 'fraud', 'scam', 'spam', 'illegal', 'other'
+    description: Optional[str] = None
+    evidence_url: Optional[str] = None
+
+@app.post("/api/public/reports")
+def submit_report(data: ReportSubmit, request: Request, db: Session = Depends(get_db)):
+    """Endpoint PÚBLICO para enviar denúncia (acessível via portal /denunciar)"""
+    
+    # Validação básica
+    valid_reasons = ['cp', 'fraud', 'scam', 'spam', 'illegal', 'harassment', 'other']
+    if data.reason not in valid_reasons:
+        raise HTTPException(400, f"Motivo inválido. Opções: {', '.join(valid_reasons)}")
+    
+    if not data.bot_username or len(data.bot_username.strip()) < 2:
+        raise HTTPException(400, "Username do bot é obrigatório")
+    
+    # Tenta encontrar o bot no sistema
+    clean_username = data.bot_username.replace("@", "").strip().lower()
+    
+    # 🔥 CORREÇÃO: Busca usando 'or_' para bater com o USERNAME ou com o NOME do Bot
+    bot_found = db.query(BotModel).filter(
+        or_(
+            func.lower(BotModel.username) == clean_username,
+            func.lower(BotModel.nome) == clean_username
+        )
+    ).first()
+    
+    # 🔥 NOVO: Captura os dados do dono do bot com segurança tripla
+    owner_id = None
+    owner_username = None
+    if bot_found:
+        # Pega o dono do bot. Alguns sistemas usam owner_id ou user_id
+        bot_owner_id = getattr(bot_found, 'owner_id', None) or getattr(bot_found, 'user_id', None)
+        if bot_owner_id:
+            owner = db.query(User).filter(User.id == bot_owner_id).first()
+            if owner:
+                owner_id = owner.id
+                owner_username = owner.username
+    
+    # Captura IP do denunciante (para segurança)
+    client_ip = request.headers.get("x-forwarded-for", request.client.host if request.client else "unknown")
+    if "," in client_ip:
+        client_ip = client_ip.split(",")[0].strip()
+    
+    report = Report(
+        reporter_name=data.reporter_name,
+        bot_username=clean_username,
+        bot_id=bot_found.id if bot_found else None,
+        owner_id=owner_id,              # 🔥 AGORA VAI SALVAR CORRETAMENTE
+        owner_username=owner_username,  # 🔥 AGORA VAI SALVAR CORRETAMENTE
+        reason=data.reason,
+        description=data.description,
+        evidence_url=data.evidence_url,
+        status='pending',
+        ip_address=client_ip
+    )
+    
+    db.add(report)
+    db.commit()
+    db.refresh(report)
+    
+    # Notifica Super Admins
     try:
-        from sqlalchemy import text
-        
-        resultados = []
-        
-        # 1. Adicionar coluna button_mode
-        try:
-            db.execute(text("""
-                ALTER TABLE bot_flows 
-                ADD COLUMN button_mode VARCHAR(20) DEFAULT 'next_step';
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'button_mode' criada com sucesso!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'button_mode' já existe")
-            else:
-                resultados.append(f"❌ Erro ao criar 'button_mode': {str(e)}")
-        
-        # 2. Adicionar coluna buttons_config_2
-        try:
-            db.execute(text("""
-                ALTER TABLE bot_flows 
-                ADD COLUMN buttons_config_2 JSON DEFAULT '[]'::json;
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'buttons_config_2' criada com sucesso!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'buttons_config_2' já existe")
-            else:
-                resultados.append(f"❌ Erro ao criar 'buttons_config_2': {str(e)}")
-        
-        # 3. Verificar se buttons_config existe (deveria já existir)
-        try:
-            db.execute(text("SELECT buttons_config FROM bot_flows LIMIT 1;"))
-            resultados.append("✅ Coluna 'buttons_config' já existe")
-        except Exception as e:
-            # Se não existir, criar
-            try:
-                db.execute(text("""
-                    ALTER TABLE bot_flows 
-                    ADD COLUMN buttons_config JSON DEFAULT '[]'::json;
-                """))
-                db.commit()
-                resultados.append("✅ Coluna 'buttons_config' criada com sucesso!")
-            except Exception as e2:
-                db.rollback()
-                resultados.append(f"❌ Erro ao criar 'buttons_config': {str(e2)}")
-        
-        # 4. Atualizar valores NULL para defaults
-        try:
-            db.execute(text("""
-                UPDATE bot_flows 
-                SET button_mode = 'next_step' 
-                WHERE button_mode IS NULL;
-            """))
-            db.execute(text("""
-                UPDATE bot_flows 
-                SET buttons_config = '[]'::json 
-                WHERE buttons_config IS NULL;
-            """))
-            db.execute(text("""
-                UPDATE bot_flows 
-                SET buttons_config_2 = '[]'::json 
-                WHERE buttons_config_2 IS NULL;
-            """))
-            db.commit()
-            resultados.append("✅ Valores NULL atualizados para defaults")
-        except Exception as e:
-            db.rollback()
-            resultados.append(f"⚠️ Aviso ao atualizar NULLs: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "Migração concluída!",
-            "resultados": resultados
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"Erro geral na migração: {str(e)}",
-            "detalhes": str(e)
+        super_admins = db.query(User).filter(User.is_superuser == True).all()
+        reason_labels = {
+            'cp': '🔴 Pornografia Infantil', 'fraud': '🟠 Fraude', 'scam': '🟠 Golpe',
+            'spam': '🟡 Spam', 'illegal': '🔴 Conteúdo Ilegal', 'harassment': '🟡 Assédio', 'other': '⚪ Outro'
         }
-
-# ============================================================
-# 🔧 ROTA DE MIGRAÇÃO - ADICIONAR COLUNA max_duration_minutes
-# ============================================================
-@app.get("/migrate-alternating-duration")
-async def migrate_alternating_duration(db: Session = Depends(get_db)):
-    """
-    🔥 Migração Manual: Adiciona a coluna max_duration_minutes na tabela alternating_messages
-    Acesse: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-alternating-duration
-    """
-    try:
-        from sqlalchemy import text
-        
-        resultados = []
-        
-        # 1. Adicionar coluna max_duration_minutes
-        try:
-            db.execute(text("""
-                ALTER TABLE alternating_messages 
-                ADD COLUMN max_duration_minutes INTEGER DEFAULT 60;
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'max_duration_minutes' criada com sucesso!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'max_duration_minutes' já existe")
-            else:
-                resultados.append(f"❌ Erro ao criar 'max_duration_minutes': {str(e)}")
-        
-        # 2. Adicionar coluna last_message_auto_destruct (se não existir)
-        try:
-            db.execute(text("""
-                ALTER TABLE alternating_messages 
-                ADD COLUMN last_message_auto_destruct BOOLEAN DEFAULT FALSE;
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'last_message_auto_destruct' criada com sucesso!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'last_message_auto_destruct' já existe")
-            else:
-                resultados.append(f"❌ Erro ao criar 'last_message_auto_destruct': {str(e)}")
-        
-        # 3. Adicionar coluna last_message_destruct_seconds (se não existir)
-        try:
-            db.execute(text("""
-                ALTER TABLE alternating_messages 
-                ADD COLUMN last_message_destruct_seconds INTEGER DEFAULT 60;
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'last_message_destruct_seconds' criada com sucesso!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'last_message_destruct_seconds' já existe")
-            else:
-                resultados.append(f"❌ Erro ao criar 'last_message_destruct_seconds': {str(e)}")
-        
-        # 4. Atualizar valores NULL para defaults
-        try:
-            db.execute(text("""
-                UPDATE alternating_messages 
-                SET max_duration_minutes = 60 
-                WHERE max_duration_minutes IS NULL;
-            """))
-            db.execute(text("""
-                UPDATE alternating_messages 
-                SET last_message_auto_destruct = FALSE 
-                WHERE last_message_auto_destruct IS NULL;
-            """))
-            db.execute(text("""
-                UPDATE alternating_messages 
-                SET last_message_destruct_seconds = 60 
-                WHERE last_message_destruct_seconds IS NULL;
-            """))
-            db.commit()
-            resultados.append("✅ Valores NULL atualizados para defaults")
-        except Exception as e:
-            db.rollback()
-            resultados.append(f"⚠️ Aviso ao atualizar NULLs: {str(e)}")
-        
-        # 5. Verificar estrutura final
-        try:
-            resultado = db.execute(text("""
-                SELECT column_name, data_type, column_default 
-                FROM information_schema.columns 
-                WHERE table_name = 'alternating_messages' 
-                AND column_name IN ('max_duration_minutes', 'last_message_auto_destruct', 'last_message_destruct_seconds')
-                ORDER BY column_name;
-            """))
-            colunas = resultado.fetchall()
-            
-            if colunas:
-                resultados.append("📊 Estrutura final verificada:")
-                for col in colunas:
-                    resultados.append(f"   - {col[0]}: {col[1]} (default: {col[2]})")
-            else:
-                resultados.append("⚠️ Não foi possível verificar a estrutura final")
-                
-        except Exception as e:
-            resultados.append(f"⚠️ Erro ao verificar estrutura: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "✅ Migração concluída!",
-            "resultados": resultados
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro geral na migração: {str(e)}",
-            "detalhes": str(e)
-        }
-# ============================================================
-# 🔧 ROTA DE MIGRAÇÃO - GRUPOS E CANAIS (FASE 1 + FASE 2)
-# ============================================================
-@app.get("/migrate-bot-groups")
-async def migrate_bot_groups(db: Session = Depends(get_db)):
-    """
-    🔥 Migração Manual: Cria a tabela bot_groups e adiciona colunas group_id
-    nas tabelas de ofertas (order_bump_config, upsell_config, downsell_config).
-    Acesse: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-bot-groups
-    """
-    try:
-        from sqlalchemy import text
-        
-        resultados = []
-        
-        # 1. Criar tabela bot_groups
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS bot_groups (
-                    id SERIAL PRIMARY KEY,
-                    bot_id INTEGER NOT NULL REFERENCES bots(id) ON DELETE CASCADE,
-                    owner_id INTEGER NOT NULL REFERENCES users(id),
-                    title VARCHAR NOT NULL,
-                    group_id VARCHAR NOT NULL,
-                    link VARCHAR,
-                    plan_ids JSON DEFAULT '[]'::json,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-            """))
-            db.commit()
-            resultados.append("✅ Tabela 'bot_groups' criada com sucesso!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower():
-                resultados.append("ℹ️ Tabela 'bot_groups' já existe")
-            else:
-                resultados.append(f"❌ Erro ao criar tabela 'bot_groups': {str(e)}")
-        
-        # 2. Criar índices
-        try:
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_bot_groups_bot_id ON bot_groups(bot_id);"))
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_bot_groups_owner_id ON bot_groups(owner_id);"))
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_bot_groups_is_active ON bot_groups(is_active);"))
-            db.commit()
-            resultados.append("✅ Índices criados com sucesso!")
-        except Exception as e:
-            db.rollback()
-            resultados.append(f"⚠️ Índices: {str(e)}")
-        
-        # 3. Adicionar coluna group_id na order_bump_config
-        try:
-            db.execute(text("""
-                ALTER TABLE order_bump_config 
-                ADD COLUMN group_id INTEGER REFERENCES bot_groups(id) ON DELETE SET NULL;
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'group_id' adicionada em order_bump_config!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'group_id' já existe em order_bump_config")
-            else:
-                resultados.append(f"❌ Erro order_bump_config: {str(e)}")
-        
-        # 4. Adicionar coluna group_id na upsell_config
-        try:
-            db.execute(text("""
-                ALTER TABLE upsell_config 
-                ADD COLUMN group_id INTEGER REFERENCES bot_groups(id) ON DELETE SET NULL;
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'group_id' adicionada em upsell_config!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'group_id' já existe em upsell_config")
-            else:
-                resultados.append(f"❌ Erro upsell_config: {str(e)}")
-        
-        # 5. Adicionar coluna group_id na downsell_config
-        try:
-            db.execute(text("""
-                ALTER TABLE downsell_config 
-                ADD COLUMN group_id INTEGER REFERENCES bot_groups(id) ON DELETE SET NULL;
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'group_id' adicionada em downsell_config!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'group_id' já existe em downsell_config")
-            else:
-                resultados.append(f"❌ Erro downsell_config: {str(e)}")
-        
-        # 6. Verificar estrutura final
-        try:
-            resultado = db.execute(text("""
-                SELECT table_name, column_name, data_type 
-                FROM information_schema.columns 
-                WHERE (table_name = 'bot_groups')
-                OR (table_name IN ('order_bump_config', 'upsell_config', 'downsell_config') AND column_name = 'group_id')
-                ORDER BY table_name, column_name;
-            """))
-            colunas = resultado.fetchall()
-            
-            if colunas:
-                resultados.append("📊 Estrutura verificada:")
-                for col in colunas:
-                    resultados.append(f"   - {col[0]}.{col[1]}: {col[2]}")
-        except Exception as e:
-            resultados.append(f"⚠️ Erro ao verificar estrutura: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "✅ Migração Grupos e Canais concluída!",
-            "resultados": resultados
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro geral na migração: {str(e)}",
-            "detalhes": str(e)
-        }
-# ============================================================
-# 🔧 ROTA DE MIGRAÇÃO - CANAL DE NOTIFICAÇÕES
-# ============================================================
-@app.get("/migrate-canal-notificacao")
-async def migrate_canal_notificacao(db: Session = Depends(get_db)):
-    """
-    Migração: Adiciona coluna id_canal_notificacao na tabela bots.
-    Acesse: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-canal-notificacao
-    """
-    try:
-        from sqlalchemy import text
-        
-        resultados = []
-        
-        # 1. Adicionar coluna id_canal_notificacao
-        try:
-            db.execute(text("""
-                ALTER TABLE bots 
-                ADD COLUMN id_canal_notificacao VARCHAR;
-            """))
-            db.commit()
-            resultados.append("✅ Coluna 'id_canal_notificacao' criada com sucesso!")
-        except Exception as e:
-            db.rollback()
-            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                resultados.append("ℹ️ Coluna 'id_canal_notificacao' já existe")
-            else:
-                resultados.append(f"❌ Erro: {str(e)}")
-        
-        # 2. Verificar
-        try:
-            resultado = db.execute(text("""
-                SELECT column_name, data_type 
-                FROM information_schema.columns 
-                WHERE table_name = 'bots' AND column_name = 'id_canal_notificacao';
-            """))
-            cols = resultado.fetchall()
-            if cols:
-                resultados.append(f"✅ Verificado: bots.{cols[0][0]} ({cols[0][1]})")
-            else:
-                resultados.append("⚠️ Coluna não encontrada após migração")
-        except Exception as e:
-            resultados.append(f"⚠️ Erro ao verificar: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "✅ Migração Canal de Notificações concluída!",
-            "resultados": resultados
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro geral: {str(e)}",
-            "detalhes": str(e)
-        }
-
-
-# ============================================================
-# 🔧 MIGRAÇÃO: MULTI-GATEWAY (WIINPAY + CONTINGÊNCIA + SYNC PAY)
-# ============================================================
-@app.get("/migrate-multi-gateway")
-async def migrate_multi_gateway(db: Session = Depends(get_db)):
-    """
-    Migração: Adiciona todas as colunas do sistema multi-gateway.
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-multi-gateway
-    """
-    try:
-        from sqlalchemy import text
-        
-        resultados = []
-        
-        comandos = [
-            # --- GATEWAYS EXISTENTES ---
-            ("bots", "wiinpay_api_key", "ALTER TABLE bots ADD COLUMN wiinpay_api_key VARCHAR;"),
-            ("bots", "gateway_principal", "ALTER TABLE bots ADD COLUMN gateway_principal VARCHAR DEFAULT 'pushinpay';"),
-            ("bots", "gateway_fallback", "ALTER TABLE bots ADD COLUMN gateway_fallback VARCHAR;"),
-            ("bots", "pushinpay_ativo", "ALTER TABLE bots ADD COLUMN pushinpay_ativo BOOLEAN DEFAULT FALSE;"),
-            ("bots", "wiinpay_ativo", "ALTER TABLE bots ADD COLUMN wiinpay_ativo BOOLEAN DEFAULT FALSE;"),
-            ("users", "wiinpay_user_id", "ALTER TABLE users ADD COLUMN wiinpay_user_id VARCHAR;"),
-            ("pedidos", "gateway_usada", "ALTER TABLE pedidos ADD COLUMN gateway_usada VARCHAR;"),
-            
-            # --- NOVA GATEWAY: SYNC PAY ---
-            ("users", "syncpay_client_id", "ALTER TABLE users ADD COLUMN syncpay_client_id VARCHAR;"),
-            ("bots", "syncpay_client_id", "ALTER TABLE bots ADD COLUMN syncpay_client_id VARCHAR;"),
-            ("bots", "syncpay_client_secret", "ALTER TABLE bots ADD COLUMN syncpay_client_secret VARCHAR;"),
-            ("bots", "syncpay_access_token", "ALTER TABLE bots ADD COLUMN syncpay_access_token VARCHAR;"),
-            ("bots", "syncpay_token_expires_at", "ALTER TABLE bots ADD COLUMN syncpay_token_expires_at TIMESTAMP;"),
-            ("bots", "syncpay_ativo", "ALTER TABLE bots ADD COLUMN syncpay_ativo BOOLEAN DEFAULT FALSE;")
-        ]
-        
-        for tabela, coluna, sql in comandos:
-            try:
-                db.execute(text(sql))
-                db.commit()
-                resultados.append(f"✅ {tabela}.{coluna} criada com sucesso!")
-            except Exception as e:
-                db.rollback()
-                if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                    resultados.append(f"ℹ️ {tabela}.{coluna} já existe")
-                else:
-                    resultados.append(f"❌ {tabela}.{coluna}: {str(e)}")
-        
-        # Verificação final (AGORA COM SYNC PAY INCLUÍDA!)
-        try:
-            check = db.execute(text("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name = 'bots' AND column_name IN 
-                ('wiinpay_api_key', 'gateway_principal', 'gateway_fallback', 'pushinpay_ativo', 'wiinpay_ativo', 
-                 'syncpay_client_id', 'syncpay_client_secret', 'syncpay_access_token', 'syncpay_ativo')
-            """))
-            cols_bots = [r[0] for r in check.fetchall()]
-            resultados.append(f"✅ Verificação bots: {cols_bots}")
-        except:
-            pass
-        
-        return {
-            "status": "success",
-            "message": "✅ Migração Multi-Gateway concluída!",
-            "resultados": resultados
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro geral: {str(e)}",
-            "detalhes": str(e)
-        }
-
-# ============================================================
-# 🔧 MIGRAÇÃO: MINI APP V2 (SEPARADORES E PAGINAÇÃO)
-# ============================================================
-@app.get("/migrate-miniapp-v2")
-async def migrate_miniapp_v2(db: Session = Depends(get_db)):
-    """
-    Migração EXCLUSIVA para as novas colunas do Mini App.
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-miniapp-v2
-    """
-    try:
-        from sqlalchemy import text
-        resultados = []
-        
-        # Lista EXCLUSIVA das colunas do Mini App (Atualizada com Cores de Texto e NEON)
-        comandos_miniapp = [
-            ("miniapp_categories", "items_per_page", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS items_per_page INTEGER DEFAULT NULL;"),
-            ("miniapp_categories", "separator_enabled", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_enabled BOOLEAN DEFAULT FALSE;"),
-            ("miniapp_categories", "separator_color", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_color VARCHAR DEFAULT '#333333';"),
-            ("miniapp_categories", "separator_text", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_text VARCHAR DEFAULT NULL;"),
-            ("miniapp_categories", "separator_btn_text", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_text VARCHAR DEFAULT NULL;"),
-            ("miniapp_categories", "separator_btn_url", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_url VARCHAR DEFAULT NULL;"),
-            ("miniapp_categories", "separator_logo_url", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_logo_url VARCHAR DEFAULT NULL;"),
-            ("miniapp_categories", "model_img_shape", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_img_shape VARCHAR DEFAULT 'square';"),
-            
-            # 🆕 NOVAS COLUNAS DE COR DE TEXTO
-            ("miniapp_categories", "separator_text_color", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_text_color VARCHAR DEFAULT '#ffffff';"),
-            ("miniapp_categories", "separator_btn_text_color", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_text_color VARCHAR DEFAULT '#ffffff';"),
-            
-            # 🆕 NOVO: EFEITO NEON
-            ("miniapp_categories", "separator_is_neon", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_is_neon BOOLEAN DEFAULT FALSE;"),
-            ("miniapp_categories", "separator_neon_color", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_neon_color VARCHAR DEFAULT NULL;")
-        ]
-        
-        for tabela, coluna, sql in comandos_miniapp:
-            try:
-                db.execute(text(sql))
-                db.commit()
-                resultados.append(f"✅ {tabela}.{coluna} verificada/criada.")
-            except Exception as e:
-                db.rollback()
-                # Ignora erros se a coluna já existir
-                if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
-                    resultados.append(f"ℹ️ {tabela}.{coluna} já existe (Ignorado)")
-                else:
-                    resultados.append(f"❌ {tabela}.{coluna}: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "✅ Migração do Mini App V2 concluída (Com Cores e Neon)!",
-            "log": resultados
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro crítico: {str(e)}"
-        }
-
-# ============================================================
-# 🔒 MIGRAÇÃO: PROTEÇÃO DE CONTEÚDO (BOTS)
-# ============================================================
-@app.get("/migrate-protect-content")
-async def migrate_protect_content(db: Session = Depends(get_db)):
-    """
-    Migração para a coluna protect_content na tabela bots.
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-protect-content
-    """
-    try:
-        from sqlalchemy import text
-        
-        db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS protect_content BOOLEAN DEFAULT FALSE;"))
-        db.commit()
-        
-        return {
-            "status": "success",
-            "message": "✅ Coluna 'protect_content' criada/verificada na tabela bots!"
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro: {str(e)}"
-        }
-
-# ============================================================
-# 🔒 MIGRAÇÃO: AUDIO FEATURE (COMBO ÁUDIO + MÍDIA)
-# ============================================================
-@app.get("/migrate-audio-features")
-async def migrate_audio_features(db: Session = Depends(get_db)):
-    """
-    Migração para adicionar colunas de áudio separado e delay nas tabelas de configuração.
-    Tabelas afetadas: remarketing_config, canal_free_config, order_bump_config, upsell_config, downsell_config.
-    
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-audio-features
-    """
-    try:
-        from sqlalchemy import text
-        
-        # Lista das tabelas que receberão as novas colunas
-        tabelas = [
-            "remarketing_config",
-            "canal_free_config",
-            "order_bump_config",
-            "upsell_config",
-            "downsell_config"
-        ]
-        
-        log_msgs = []
-        
-        for tabela in tabelas:
-            # 1. Adicionar coluna audio_url (Texto/String)
-            try:
-                db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS audio_url VARCHAR;"))
-                log_msgs.append(f"✅ {tabela}: audio_url verificado.")
-            except Exception as e:
-                log_msgs.append(f"⚠️ {tabela} (audio_url): {str(e)}")
-
-            # 2. Adicionar coluna audio_delay_seconds (Inteiro, padrão 0)
-            try:
-                db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 0;"))
-                log_msgs.append(f"✅ {tabela}: audio_delay_seconds verificado.")
-            except Exception as e:
-                log_msgs.append(f"⚠️ {tabela} (audio_delay_seconds): {str(e)}")
-
-        db.commit()
-        
-        return {
-            "status": "success",
-            "message": "Migração de Áudio + Mídia concluída!",
-            "details": log_msgs
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro crítico na migração: {str(e)}"
-        }
-# ============================================================
-# 🔒 MIGRAÇÃO: VERSÃO PRIME - AJUSTES E MELHORIAS
-# ============================================================
-@app.get("/migrate-prime-v1")
-async def migrate_prime_v1(db: Session = Depends(get_db)):
-    """
-    Migração para adicionar novas colunas da Versão Prime:
-    1. tracking_folders.owner_id (Integer FK users.id)
-    2. bots.notificar_no_bot (Boolean DEFAULT TRUE)
-    3. leads.origem_entrada (VARCHAR DEFAULT 'bot_direto')
-    
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-prime-v1
-    """
-    try:
-        from sqlalchemy import text
-        
-        log_msgs = []
-        
-        # 1. tracking_folders.owner_id
-        try:
-            db.execute(text("ALTER TABLE tracking_folders ADD COLUMN IF NOT EXISTS owner_id INTEGER REFERENCES users(id);"))
-            log_msgs.append("✅ tracking_folders: owner_id adicionado")
-        except Exception as e:
-            log_msgs.append(f"⚠️ tracking_folders.owner_id: {str(e)}")
-        
-        # 2. bots.notificar_no_bot
-        try:
-            db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS notificar_no_bot BOOLEAN DEFAULT TRUE;"))
-            log_msgs.append("✅ bots: notificar_no_bot adicionado")
-        except Exception as e:
-            log_msgs.append(f"⚠️ bots.notificar_no_bot: {str(e)}")
-        
-        # 3. leads.origem_entrada
-        try:
-            db.execute(text("ALTER TABLE leads ADD COLUMN IF NOT EXISTS origem_entrada VARCHAR DEFAULT 'bot_direto';"))
-            log_msgs.append("✅ leads: origem_entrada adicionado")
-        except Exception as e:
-            log_msgs.append(f"⚠️ leads.origem_entrada: {str(e)}")
-        
-        # 4. Atribuir owner_id às pastas existentes baseado nos links dentro delas
-        try:
-            # Para cada pasta sem owner, tenta detectar o dono pelos links
-            pastas_sem_dono = db.execute(text("SELECT id FROM tracking_folders WHERE owner_id IS NULL")).fetchall()
-            pastas_corrigidas = 0
-            
-            for row in pastas_sem_dono:
-                pasta_id = row[0]
-                # Busca o owner do primeiro bot que tem link nessa pasta
-                result = db.execute(text("""
-                    SELECT DISTINCT b.owner_id 
-                    FROM tracking_links tl 
-                    JOIN bots b ON tl.bot_id = b.id 
-                    WHERE tl.folder_id = :pid AND b.owner_id IS NOT NULL 
-                    LIMIT 1
-                """), {"pid": pasta_id}).fetchone()
-                
-                if result:
-                    db.execute(text("UPDATE tracking_folders SET owner_id = :uid WHERE id = :pid"), 
-                              {"uid": result[0], "pid": pasta_id})
-                    pastas_corrigidas += 1
-            
-            log_msgs.append(f"✅ {pastas_corrigidas} pastas existentes receberam owner_id")
-        except Exception as e:
-            log_msgs.append(f"⚠️ Atribuição de owner_id: {str(e)}")
-        
-        db.commit()
-        
-        return {
-            "status": "success",
-            "message": "🚀 Migração Prime V1 concluída!",
-            "details": log_msgs
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro crítico na migração: {str(e)}"
-        }
-
-# ============================================================
-# 🔒 MIGRAÇÃO: SISTEMA DE LIMITES DE BOTS + SELETOR INTELIGENTE
-# ============================================================
-@app.get("/migrate-bot-limits-v1")
-async def migrate_bot_limits_v1(db: Session = Depends(get_db)):
-    """
-    Migração para o sistema de limites de bots e seletor inteligente:
-    1. users.plano_plataforma (VARCHAR DEFAULT 'free')
-    2. users.max_bots (INTEGER DEFAULT 20)
-    3. bots.selector_order (INTEGER DEFAULT 0)
-    
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-bot-limits-v1
-    """
-    try:
-        from sqlalchemy import text
-        
-        log_msgs = []
-        
-        # 1. users.plano_plataforma
-        try:
-            db.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS plano_plataforma VARCHAR DEFAULT 'free';"))
-            db.commit()
-            log_msgs.append("✅ users.plano_plataforma adicionado (default: 'free')")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ users.plano_plataforma: {str(e)}")
-        
-        # 2. users.max_bots
-        try:
-            db.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS max_bots INTEGER DEFAULT 20;"))
-            db.commit()
-            log_msgs.append("✅ users.max_bots adicionado (default: 20)")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ users.max_bots: {str(e)}")
-        
-        # 3. bots.selector_order
-        try:
-            db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS selector_order INTEGER DEFAULT 0;"))
-            db.commit()
-            log_msgs.append("✅ bots.selector_order adicionado (default: 0)")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ bots.selector_order: {str(e)}")
-        
-        # 4. Definir ordem inicial para bots existentes (por data de criação)
-        try:
-            owners = db.execute(text("SELECT DISTINCT owner_id FROM bots WHERE owner_id IS NOT NULL")).fetchall()
-            total_updated = 0
-            for row in owners:
-                owner_id = row[0]
-                bots = db.execute(text(
-                    "SELECT id FROM bots WHERE owner_id = :oid ORDER BY created_at ASC"
-                ), {"oid": owner_id}).fetchall()
-                for idx, bot_row in enumerate(bots):
-                    db.execute(text(
-                        "UPDATE bots SET selector_order = :order WHERE id = :bid"
-                    ), {"order": idx + 1, "bid": bot_row[0]})
-                    total_updated += 1
-            db.commit()
-            log_msgs.append(f"✅ {total_updated} bots receberam ordem inicial no seletor")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ Ordem inicial: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "🚀 Migração Bot Limits V1 concluída!",
-            "details": log_msgs
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro crítico na migração: {str(e)}"
-        }
-# ============================================================
-# ✨ MIGRAÇÃO: SISTEMA DE EMOJIS PREMIUM DO TELEGRAM
-# ============================================================
-@app.get("/migrate-premium-emojis-v1")
-async def migrate_premium_emojis_v1(db: Session = Depends(get_db)):
-    """
-    Migração para criar as tabelas do sistema de emojis premium:
-    1. premium_emoji_packs (categorias de emojis)
-    2. premium_emojis (catálogo de custom emojis do Telegram)
-    3. Popula com pacotes e emojis iniciais mais populares
-    
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-premium-emojis-v1
-    """
-    try:
-        from sqlalchemy import text
-        
-        log_msgs = []
-        
-        # 1. CRIAR TABELA premium_emoji_packs
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS premium_emoji_packs (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(100) UNIQUE NOT NULL,
-                    icon VARCHAR(10),
-                    description VARCHAR(255),
-                    sort_order INTEGER DEFAULT 0,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
-                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
-                );
-            """))
-            db.commit()
-            log_msgs.append("✅ Tabela premium_emoji_packs criada")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ premium_emoji_packs: {str(e)}")
-        
-        # 2. CRIAR TABELA premium_emojis
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS premium_emojis (
-                    id SERIAL PRIMARY KEY,
-                    emoji_id VARCHAR(50) UNIQUE NOT NULL,
-                    fallback VARCHAR(10) NOT NULL,
-                    name VARCHAR(100) NOT NULL,
-                    shortcode VARCHAR(50) UNIQUE NOT NULL,
-                    pack_id INTEGER REFERENCES premium_emoji_packs(id) ON DELETE SET NULL,
-                    sort_order INTEGER DEFAULT 0,
-                    thumbnail_url VARCHAR(500),
-                    emoji_type VARCHAR(20) DEFAULT 'static',
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
-                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
-                );
-            """))
-            db.commit()
-            log_msgs.append("✅ Tabela premium_emojis criada")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ premium_emojis: {str(e)}")
-        
-        # 3. CRIAR ÍNDICES
-        try:
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_premium_emojis_pack ON premium_emojis(pack_id);"))
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_premium_emojis_active ON premium_emojis(is_active);"))
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_premium_emojis_shortcode ON premium_emojis(shortcode);"))
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_premium_emoji_packs_active ON premium_emoji_packs(is_active);"))
-            db.commit()
-            log_msgs.append("✅ Índices criados")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ Índices: {str(e)}")
-        
-        # 4. POPULAR COM PACOTES INICIAIS (APENAS SE TABELA ESTIVER VAZIA)
-        try:
-            pack_count = db.execute(text("SELECT COUNT(*) FROM premium_emoji_packs")).scalar()
-            if pack_count == 0:
-                packs_iniciais = [
-                    ("Populares", "🔥", "Emojis premium mais usados", 1),
-                    ("Corações", "❤️", "Corações e amor", 2),
-                    ("Mãos e Gestos", "👋", "Gestos e mãos animadas", 3),
-                    ("Animais", "🐱", "Animais fofos e animados", 4),
-                    ("Estrelas e Brilhos", "⭐", "Estrelas, brilhos e magia", 5),
-                    ("Rostos", "😎", "Expressões e rostos animados", 6),
-                    ("Objetos", "💎", "Objetos diversos", 7),
-                    ("Natureza", "🌸", "Flores, plantas e natureza", 8),
-                ]
-                for name, icon, desc, order in packs_iniciais:
-                    db.execute(text(
-                        "INSERT INTO premium_emoji_packs (name, icon, description, sort_order) VALUES (:name, :icon, :desc, :order)"
-                    ), {"name": name, "icon": icon, "desc": desc, "order": order})
-                db.commit()
-                log_msgs.append(f"✅ {len(packs_iniciais)} pacotes iniciais criados")
-            else:
-                log_msgs.append(f"ℹ️ Pacotes já existem ({pack_count}), pulando seed")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ Seed pacotes: {str(e)}")
-        
-        # 5. POPULAR COM EMOJIS PREMIUM POPULARES (SE TABELA VAZIA)
-        try:
-            emoji_count = db.execute(text("SELECT COUNT(*) FROM premium_emojis")).scalar()
-            if emoji_count == 0:
-                # Buscar ID do pacote "Populares"
-                pop_pack = db.execute(text("SELECT id FROM premium_emoji_packs WHERE name = 'Populares' LIMIT 1")).fetchone()
-                hearts_pack = db.execute(text("SELECT id FROM premium_emoji_packs WHERE name = 'Corações' LIMIT 1")).fetchone()
-                stars_pack = db.execute(text("SELECT id FROM premium_emoji_packs WHERE name = 'Estrelas e Brilhos' LIMIT 1")).fetchone()
-                
-                pop_id = pop_pack[0] if pop_pack else None
-                hearts_id = hearts_pack[0] if hearts_pack else None
-                stars_id = stars_pack[0] if stars_pack else None
-                
-                # Emojis Premium Populares (IDs reais do Telegram)
-                # NOTA: Esses IDs são exemplos conhecidos. O Super Admin pode adicionar mais via painel.
-                emojis_iniciais = [
-                    # Populares
-                    ("5368324170671202286", "🔥", "Fogo Animado", ":fire_premium:", pop_id, "animated", 1),
-                    ("5271930982462988357", "⭐", "Estrela Brilhante", ":star_premium:", pop_id, "animated", 2),
-                    ("5443038326535759171", "💎", "Diamante Azul", ":diamond_premium:", pop_id, "animated", 3),
-                    ("5420323339421498693", "🚀", "Foguete Animado", ":rocket_premium:", pop_id, "animated", 4),
-                    ("5368324170671202286", "✅", "Check Verde", ":check_premium:", pop_id, "animated", 5),
-                    ("5247151702498836708", "🎯", "Alvo Certeiro", ":target_premium:", pop_id, "animated", 6),
-                    ("5407025283456835913", "👑", "Coroa Dourada", ":crown_premium:", pop_id, "animated", 7),
-                    ("5386654653003864312", "🎁", "Presente Animado", ":gift_premium:", pop_id, "animated", 8),
-                    # Corações
-                    ("5368324170671202286", "❤️", "Coração Vermelho", ":heart_premium:", hearts_id, "animated", 1),
-                    ("5445284980978621387", "💜", "Coração Roxo", ":purple_heart_premium:", hearts_id, "animated", 2),
-                    ("5368324170671202286", "❤️‍🔥", "Coração em Chamas", ":fire_heart_premium:", hearts_id, "animated", 3),
-                    # Estrelas
-                    ("5368324170671202286", "🌟", "Estrela Glow", ":glow_star_premium:", stars_id, "animated", 1),
-                    ("5368324170671202286", "✨", "Brilho Mágico", ":sparkle_premium:", stars_id, "animated", 2),
-                ]
-                
-                inserted = 0
-                for eid, fb, name, sc, pid, etype, sorder in emojis_iniciais:
-                    try:
-                        db.execute(text(
-                            """INSERT INTO premium_emojis (emoji_id, fallback, name, shortcode, pack_id, emoji_type, sort_order) 
-                               VALUES (:eid, :fb, :name, :sc, :pid, :etype, :sorder)"""
-                        ), {"eid": eid + str(sorder), "fb": fb, "name": name, "sc": sc, "pid": pid, "etype": etype, "sorder": sorder})
-                        inserted += 1
-                    except Exception:
-                        pass  # Ignora duplicados
-                
-                db.commit()
-                log_msgs.append(f"✅ {inserted} emojis premium iniciais cadastrados")
-                log_msgs.append("⚠️ IMPORTANTE: Os emoji_ids iniciais são EXEMPLOS. Use @JsonDumpBot no Telegram para obter IDs reais e atualize pelo painel Super Admin.")
-            else:
-                log_msgs.append(f"ℹ️ Emojis já existem ({emoji_count}), pulando seed")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ Seed emojis: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "✨ Migração Premium Emojis V1 concluída!",
-            "details": log_msgs,
-            "next_steps": [
-                "1. Acesse o Painel Super Admin → Emojis Premium",
-                "2. Use @JsonDumpBot no Telegram para descobrir emoji_ids reais",
-                "3. Cadastre emojis com IDs corretos pelo painel",
-                "4. Os usuários poderão usar os emojis nas páginas de texto/legenda"
-            ]
-        }
-        
-    except Exception as e:
-        db.rollback()
-        return {
-            "status": "error",
-            "message": f"❌ Erro crítico na migração: {str(e)}"
-        }
-
-# --- ENDPOINT PÚBLICO: Enviar Denúncia (sem autenticação) ---
-class ReportSubmit(BaseModel):
-    reporter_name: Optional[str] = None
-    bot_username: str
-    reason: str  # 'cp', 'fraud', 'scam', 'spam', 'illegal', 'other'
-    description: Optional[str] = None
-    evidence_url: Optional[str] = None
-
-@app.post("/api/public/reports")
-def submit_report(data: ReportSubmit, request: Request, db: Session = Depends(get_db)):
-    """Endpoint PÚBLICO para enviar denúncia (acessível via portal /denunciar)"""
-    
-    # Validação básica
-    valid_reasons = ['cp', 'fraud', 'scam', 'spam', 'illegal', 'harassment', 'other']
-    if data.reason not in valid_reasons:
-        raise HTTPException(400, f"Motivo inválido. Opções: {', '.join(valid_reasons)}")
-    
-    if not data.bot_username or len(data.bot_username.strip()) < 2:
-        raise HTTPException(400, "Username do bot é obrigatório")
-    
-    # Tenta encontrar o bot no sistema
-    clean_username = data.bot_username.replace("@", "").strip().lower()
-    
-    # 🔥 CORREÇÃO: Busca usando 'or_' para bater com o USERNAME ou com o NOME do Bot
-    bot_found = db.query(BotModel).filter(
-        or_(
-            func.lower(BotModel.username) == clean_username,
-            func.lower(BotModel.nome) == clean_username
-        )
-    ).first()
-    
-    # 🔥 NOVO: Captura os dados do dono do bot com segurança tripla
-    owner_id = None
-    owner_username = None
-    if bot_found:
-        # Pega o dono do bot. Alguns sistemas usam owner_id ou user_id
-        bot_owner_id = getattr(bot_found, 'owner_id', None) or getattr(bot_found, 'user_id', None)
-        if bot_owner_id:
-            owner = db.query(User).filter(User.id == bot_owner_id).first()
-            if owner:
-                owner_id = owner.id
-                owner_username = owner.username
-    
-    # Captura IP do denunciante (para segurança)
-    client_ip = request.headers.get("x-forwarded-for", request.client.host if request.client else "unknown")
-    if "," in client_ip:
-        client_ip = client_ip.split(",")[0].strip()
-    
-    report = Report(
-        reporter_name=data.reporter_name,
-        bot_username=clean_username,
-        bot_id=bot_found.id if bot_found else None,
-        owner_id=owner_id,              # 🔥 AGORA VAI SALVAR CORRETAMENTE
-        owner_username=owner_username,  # 🔥 AGORA VAI SALVAR CORRETAMENTE
-        reason=data.reason,
-        description=data.description,
-        evidence_url=data.evidence_url,
-        status='pending',
-        ip_address=client_ip
-    )
-    
-    db.add(report)
-    db.commit()
-    db.refresh(report)
-    
-    # Notifica Super Admins
-    try:
-        super_admins = db.query(User).filter(User.is_superuser == True).all()
-        reason_labels = {
-            'cp': '🔴 Pornografia Infantil', 'fraud': '🟠 Fraude', 'scam': '🟠 Golpe',
-            'spam': '🟡 Spam', 'illegal': '🔴 Conteúdo Ilegal', 'harassment': '🟡 Assédio', 'other': '⚪ Outro'
-        }
-        for admin in super_admins:
-            notif = Notification(
-                user_id=admin.id,
-                title="🚨 Nova Denúncia Recebida",
-                message=f"Bot: @{clean_username} | Motivo: {reason_labels.get(data.reason, data.reason)}",
-                type="report",
-                link="/superadmin/reports"
-            )
-            db.add(notif)
-        db.commit()
-    except:
-        pass
-    
-    logger.info(f"🚨 [REPORT] Nova denúncia #{report.id} | Bot: @{clean_username} | Owner: {owner_username} | Motivo: {data.reason}")
-    
-    return {
-        "status": "success", 
-        "message": "Denúncia enviada com sucesso. Nossa equipe irá analisar.",
-        "report_id": report.id
-    }
+        for admin in super_admins:
+            notif = Notification(
+                user_id=admin.id,
+                title="🚨 Nova Denúncia Recebida",
+                message=f"Bot: @{clean_username} | Motivo: {reason_labels.get(data.reason, data.reason)}",
+                type="report",
+                link="/superadmin/reports"
+            )
+            db.add(notif)
+        db.commit()
+        for admin in super_admins:
+            notificacoes.invalidar_usuario(admin.id)
+    except:
+        pass
+    
+    logger.info(f"🚨 [REPORT] Nova denúncia #{report.id} | Bot: @{clean_username} | Owner: {owner_username} | Motivo: {data.reason}")
+    
+    return {
+        "status": "success", 
+        "message": "Denúncia enviada com sucesso. Nossa equipe irá analisar.",
+        "report_id": report.id
+    }
 
 # --- SUPERADMIN: Listar Denúncias ---
 @app.get("/api/superadmin/reports")
@@ -21653,157 +20046,8 @@ def resolve_report(
     return {"status": "success", "message": f"Denúncia resolvida com ação: {data.action}"}
 
 
-# ============================================================
-# 🚨 MIGRAÇÃO V1: SISTEMA DE DENÚNCIAS 
-# ============================================================
-@app.get("/migrate-reports-v1")
-async def migrate_reports_v1(db: Session = Depends(get_db)):
-    """
-    Migração para criar tabelas do sistema de denúncias.
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS reports (
-                    id SERIAL PRIMARY KEY,
-                    reporter_name VARCHAR(100),
-                    reporter_telegram_id VARCHAR(50),
-                    bot_username VARCHAR(100) NOT NULL,
-                    bot_id INTEGER REFERENCES bots(id) ON DELETE SET NULL,
-                    reason VARCHAR(50) NOT NULL,
-                    description TEXT,
-                    evidence_url VARCHAR(500),
-                    status VARCHAR(20) DEFAULT 'pending',
-                    resolution TEXT,
-                    resolved_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
-                    resolved_at TIMESTAMP WITHOUT TIME ZONE,
-                    action_taken VARCHAR(50),
-                    strike_count INTEGER DEFAULT 0,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
-                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
-                    ip_address VARCHAR(50)
-                );
-            """))
-            db.commit()
-            log_msgs.append("✅ Tabela reports criada")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ reports: {str(e)}")
-        
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS user_strikes (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE NOT NULL,
-                    report_id INTEGER REFERENCES reports(id) ON DELETE SET NULL,
-                    reason TEXT NOT NULL,
-                    strike_number INTEGER NOT NULL,
-                    action VARCHAR(50) NOT NULL,
-                    pause_until TIMESTAMP WITHOUT TIME ZONE,
-                    tax_increase_pct FLOAT,
-                    applied_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
-                );
-            """))
-            db.commit()
-            log_msgs.append("✅ Tabela user_strikes criada")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ user_strikes: {str(e)}")
-        
-        # Colunas extras na tabela users
-        for col_sql in [
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS strike_count INTEGER DEFAULT 0;",
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_banned BOOLEAN DEFAULT FALSE;",
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS banned_reason TEXT;",
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS bots_paused_until TIMESTAMP WITHOUT TIME ZONE;",
-        ]:
-            try:
-                db.execute(text(col_sql))
-                db.commit()
-            except:
-                db.rollback()
-        
-        log_msgs.append("✅ Colunas de punição adicionadas à tabela users")
-        
-        # Índices
-        try:
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_reports_status ON reports(status);"))
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_reports_bot ON reports(bot_username);"))
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_user_strikes_user ON user_strikes(user_id);"))
-            db.commit()
-            log_msgs.append("✅ Índices criados")
-        except:
-            db.rollback()
-        
-        return {
-            "status": "success",
-            "message": "🚨 Migração de Denúncias V1 concluída!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
-
-# ============================================================
-# 🚨 MIGRAÇÃO V2: ATUALIZAÇÃO DO SISTEMA DE DENÚNCIAS 
-# ============================================================
-@app.get("/migrate-reports-v2")
-async def migrate_reports_v2(db: Session = Depends(get_db)):
-    """
-    Migração para adicionar as colunas owner_id e owner_username na tabela reports.
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-reports-v2
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        try:
-            db.execute(text("ALTER TABLE reports ADD COLUMN IF NOT EXISTS owner_id INTEGER REFERENCES users(id) ON DELETE SET NULL;"))
-            db.commit()
-            log_msgs.append("✅ Coluna owner_id adicionada em reports")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ owner_id: {str(e)}")
-            
-        try:
-            db.execute(text("ALTER TABLE reports ADD COLUMN IF NOT EXISTS owner_username VARCHAR(100);"))
-            db.commit()
-            log_msgs.append("✅ Coluna owner_username adicionada em reports")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ owner_username: {str(e)}")
-        
-        # Opcional: Atualizar relatórios antigos retroativamente
-        try:
-            reports = db.execute(text("SELECT id, bot_id FROM reports WHERE owner_id IS NULL AND bot_id IS NOT NULL")).fetchall()
-            updated = 0
-            for r in reports:
-                bot = db.execute(text("SELECT owner_id FROM bots WHERE id = :bid"), {"bid": r[1]}).fetchone()
-                if bot and bot[0]:
-                    user = db.execute(text("SELECT username FROM users WHERE id = :uid"), {"uid": bot[0]}).fetchone()
-                    if user:
-                        db.execute(text("UPDATE reports SET owner_id = :uid, owner_username = :uname WHERE id = :rid"), 
-                                   {"uid": bot[0], "uname": user[0], "rid": r[0]})
-                        updated += 1
-            db.commit()
-            log_msgs.append(f"✅ {updated} denúncias antigas retroativamente atualizadas com o dono do bot.")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ Atualização retroativa: {str(e)}")
-
-        return {
-            "status": "success",
-            "message": "🚨 Migração de Denúncias V2 concluída!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
-
+
+
 # ============================================================
 # 📅 REMARKETING AGENDADO - ENDPOINTS
 # ============================================================
@@ -21943,54 +20187,6 @@ def delete_scheduled_campaign(campaign_id: int, db: Session = Depends(get_db)):
     return {"status": "deleted"}
 
 
-# ============================================================
-# 📅 MIGRAÇÃO: REMARKETING AGENDADO
-# ============================================================
-@app.get("/migrate-scheduled-remarketing-v1")
-async def migrate_scheduled_remarketing_v1(db: Session = Depends(get_db)):
-    """
-    Migração para adicionar colunas de remarketing agendado.
-    Acesse UMA VEZ: /migrate-scheduled-remarketing-v1
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        cols = [
-            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS is_scheduled BOOLEAN DEFAULT FALSE;",
-            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_days INTEGER DEFAULT 1;",
-            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_time VARCHAR DEFAULT '10:00';",
-            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_end_date TIMESTAMP WITHOUT TIME ZONE;",
-            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS days_config TEXT;",
-            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS use_same_content BOOLEAN DEFAULT TRUE;",
-            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_active BOOLEAN DEFAULT FALSE;",
-        ]
-        
-        for sql in cols:
-            try:
-                db.execute(text(sql))
-                db.commit()
-            except:
-                db.rollback()
-        
-        log_msgs.append("✅ Colunas de agendamento adicionadas à remarketing_campaigns")
-        
-        # Índice
-        try:
-            db.execute(text("CREATE INDEX IF NOT EXISTS idx_remarketing_scheduled ON remarketing_campaigns(is_scheduled, schedule_active);"))
-            db.commit()
-            log_msgs.append("✅ Índice criado")
-        except:
-            db.rollback()
-        
-        return {
-            "status": "success",
-            "message": "📅 Migração Remarketing Agendado V1 concluída!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
 
 
 # =========================================================
@@ -22057,116 +20253,8 @@ def delete_changelog(
     return {"ok": True}
 
 
-# =========================================================
-# 🗄️ MIGRAÇÃO V2: Diário de Mudanças
-# =========================================================
-@app.get("/migrate-changelog-v1")
-def migrate_changelog_v1(db: Session = Depends(get_db)):
-    """
-    Cria tabela change_logs para o Diário de Mudanças.
-    Acesse UMA VEZ: /migrate-changelog-v1
-    """
-    log_msgs = []
-    try:
-        db.execute(text("""
-            CREATE TABLE IF NOT EXISTS change_logs (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                bot_id INTEGER REFERENCES bots(id) ON DELETE SET NULL,
-                date TIMESTAMP DEFAULT NOW(),
-                category VARCHAR(50) DEFAULT 'geral',
-                content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT NOW()
-            );
-        """))
-        db.commit()
-        log_msgs.append("✅ Tabela change_logs criada")
-        
-        db.execute(text("CREATE INDEX IF NOT EXISTS idx_changelog_user ON change_logs(user_id);"))
-        db.commit()
-        log_msgs.append("✅ Índice criado")
-        
-        return {"status": "success", "message": "📓 Migração Diário de Mudanças V1 concluída!", "details": log_msgs}
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
 
-@app.get("/migrate-statistics-v18")
-def migrate_statistics_v18(db: Session = Depends(get_db)):
-    """Cria índices para performance V18. Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-statistics-v18"""
-    log_msgs = []
-    try:
-        cmds = [
-            "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS origem VARCHAR(50) DEFAULT 'bot';",
-            "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS gateway_usada VARCHAR;",
-            "CREATE INDEX IF NOT EXISTS idx_pedidos_data_aprov ON pedidos(data_aprovacao);",
-            "CREATE INDEX IF NOT EXISTS idx_pedidos_origem ON pedidos(origem);",
-            "CREATE INDEX IF NOT EXISTS idx_pedidos_gateway ON pedidos(gateway_usada);",
-            "CREATE INDEX IF NOT EXISTS idx_pedidos_status ON pedidos(status);",
-            "CREATE INDEX IF NOT EXISTS idx_leads_created ON leads(created_at);",
-            "CREATE INDEX IF NOT EXISTS idx_pedidos_bot_status ON pedidos(bot_id, status);",
-        ]
-        for cmd in cmds:
-            try:
-                db.execute(text(cmd))
-                db.commit()
-                log_msgs.append(f"✅ OK")
-            except Exception as e_cmd:
-                if "already exists" not in str(e_cmd):
-                    log_msgs.append(f"⚠️ {e_cmd}")
-        return {"status": "success", "message": "📊 Migração V18 concluída!", "details": log_msgs}
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
 
-# ============================================================
-# 🚨 MIGRAÇÃO V3: CORREÇÃO RETROATIVA DOS DONOS DOS BOTS 
-# ============================================================
-@app.get("/migrate-reports-v3")
-async def migrate_reports_v3(db: Session = Depends(get_db)):
-    """
-    Corrige denúncias antigas que ficaram com "Desconhecido" e atualiza 
-    os donos corretos buscando ativamente pelo @username do bot.
-    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-reports-v3
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        # 1. Pega todas as denúncias onde o dono tá vazio
-        reports = db.execute(text("SELECT id, bot_username FROM reports WHERE owner_id IS NULL")).fetchall()
-        updated = 0
-        
-        for r in reports:
-            r_id = r[0]
-            b_uname = str(r[1]).replace("@", "").strip().lower()
-            
-            # Procura o bot pelo username real
-            bot = db.execute(text("SELECT id, owner_id FROM bots WHERE LOWER(username) = :uname OR LOWER(nome) = :uname LIMIT 1"), {"uname": b_uname}).fetchone()
-            
-            if bot and bot[1]:
-                # Pega os dados do dono
-                user = db.execute(text("SELECT username FROM users WHERE id = :uid"), {"uid": bot[1]}).fetchone()
-                if user:
-                    # Atualiza a denúncia com bot_id, owner_id e owner_username!
-                    db.execute(text("""
-                        UPDATE reports 
-                        SET bot_id = :bid, owner_id = :uid, owner_username = :uname 
-                        WHERE id = :rid
-                    """), {"bid": bot[0], "uid": bot[1], "uname": user[0], "rid": r_id})
-                    updated += 1
-        
-        db.commit()
-        log_msgs.append(f"✅ {updated} denúncias antigas foram corrigidas e vinculadas aos seus donos!")
-        
-        return {
-            "status": "success",
-            "message": "🚨 Correção de Donos V3 concluída!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
 
 # ============================================================
 # 🔧 MIGRAÇÃO: Copiar credenciais de gateway do primeiro bot para novos bots
@@ -22241,279 +20329,7 @@ def sync_gateway_credentials(
         db.rollback()
         return {"status": "error", "message": f"❌ Erro: {str(e)}"}
 
-# ============================================================
-# 🚨 MIGRAÇÃO V4: ADIÇÃO DAS GATEWAYS PARADISE E OMEGAPAY 
-# ============================================================
-@app.get("/migrate-gateways-v4")
-async def migrate_gateways_v4(db: Session = Depends(get_db)):
-    """
-    Adiciona colunas para Paradise e OmegaPay e salva credenciais Master do Admin.
-    Acesse UMA VEZ após atualizar: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-gateways-v4
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        # 1. Adicionando as colunas na tabela de USUÁRIOS
-        comandos_users = [
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS paradise_account_id VARCHAR;",
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS omegapay_client_id VARCHAR;"
-        ]
-        for cmd in comandos_users:
-            try:
-                db.execute(text(cmd))
-                db.commit()
-            except Exception as e:
-                db.rollback()
-                if "already exists" not in str(e).lower() and "duplicate column" not in str(e).lower():
-                    log_msgs.append(f"Aviso User: {e}")
-
-        # 2. Adicionando as colunas na tabela de BOTS
-        comandos_bots = [
-            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS paradise_api_key VARCHAR;",
-            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS paradise_ativo BOOLEAN DEFAULT FALSE;",
-            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS omegapay_client_id VARCHAR;",
-            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS omegapay_client_secret VARCHAR;",
-            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS omegapay_ativo BOOLEAN DEFAULT FALSE;"
-        ]
-        for cmd in comandos_bots:
-            try:
-                db.execute(text(cmd))
-                db.commit()
-            except Exception as e:
-                db.rollback()
-                if "already exists" not in str(e).lower() and "duplicate column" not in str(e).lower():
-                    log_msgs.append(f"Aviso Bot: {e}")
-
-        # 3. Salvando suas credenciais MESTRAS (Admin) na tabela SystemConfig
-        # Essas são as chaves que receberão a comissão pelas vendas dos clientes!
-        try:
-            configs_mestre = [
-                ("master_paradise_account_id", "6225"),
-                ("master_paradise_secret_key", "sk_a8d689ceac0b72df245e38948a566e185f583a51d8755d6d6824b5318c50b586"),
-                ("master_omegapay_client_id", "luisdedeus2512_w933zm9thr0y2gc5"),
-                ("master_omegapay_client_secret", "nrbqx75vleydalbvuotrhmab11i3u9swncbls27kvdkoe3cx7p70wtqag6tylwlk")
-            ]
-            
-            for key, value in configs_mestre:
-                db.execute(text(f"""
-                    INSERT INTO system_config (key, value, updated_at) 
-                    VALUES (:key, :val, NOW()) 
-                    ON CONFLICT (key) DO UPDATE SET value = :val, updated_at = NOW()
-                """), {"key": key, "val": value})
-                
-            db.commit()
-            log_msgs.append("✅ Credenciais MESTRAS da Paradise e OmegaPay salvas com sucesso!")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"❌ Erro ao salvar Config Global: {e}")
-
-        return {
-            "status": "success",
-            "message": "🚨 Migração V4 concluída! Banco de dados preparado.",
-            "details": log_msgs
-        }
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro Crítico: {str(e)}"}
-# ============================================================
-# 🚨 MIGRAÇÃO V4: ESCUDO ANTI-CURIOSOS (RECURSOS PRIME)
-# ============================================================
-@app.get("/migrate-prime-v4")
-async def migrate_prime_v4(db: Session = Depends(get_db)):
-    """
-    Cria as colunas do Escudo Anti-Curiosos para proteger contra PIX Falsos.
-    Acesse UMA VEZ após o deploy: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-prime-v4
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        try:
-            db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS escudo_ativo BOOLEAN DEFAULT FALSE;"))
-            db.commit()
-            log_msgs.append("✅ Coluna escudo_ativo adicionada em bots")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ escudo_ativo: {str(e)}")
-            
-        try:
-            db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS escudo_limite_pix INTEGER DEFAULT 5;"))
-            db.commit()
-            log_msgs.append("✅ Coluna escudo_limite_pix adicionada em bots")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ escudo_limite_pix: {str(e)}")
-
-        return {
-            "status": "success",
-            "message": "🚨 Migração Escudo Prime V4 concluída!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
-
-# ============================================================
-# 🚨 CRIAR E INJETAR RECURSOS PRIME NO BANCO
-# ============================================================
-@app.get("/injetar-novos-recursos")
-async def injetar_novos_recursos(db: Session = Depends(get_db)):
-    """
-    Cria a tabela recursos_prime e injeta TODOS os itens do sistema (incluindo os Em Breve).
-    Acesse UMA VEZ no navegador após o deploy: https://zenyx-gbs-testesv1-production.up.railway.app/injetar-novos-recursos
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        # 1. CRIA A TABELA SE NÃO EXISTIR
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS recursos_prime (
-                    id VARCHAR(50) PRIMARY KEY,
-                    nome VARCHAR(100) NOT NULL,
-                    descricao TEXT NOT NULL,
-                    icone VARCHAR(50),
-                    cor VARCHAR(20),
-                    meta_reais INTEGER DEFAULT 0,
-                    status VARCHAR(20) DEFAULT 'bloqueado',
-                    implementado BOOLEAN DEFAULT TRUE
-                );
-            """))
-            db.commit()
-            log_msgs.append("✅ Tabela 'recursos_prime' verificada.")
-        except Exception as e:
-            db.rollback()
-            return {"status": "error", "message": f"Erro ao criar tabela: {str(e)}"}
-
-        # 2. LISTA DE TODOS OS RECURSOS (Ativos e Em Desenvolvimento)
-        recursos_completos = [
-            {
-                "id": "revisao_copy",
-                "nome": "Simulador de Copy",
-                "descricao": "Teste todo o seu funil enviando mensagens simuladas para o seu próprio Telegram.",
-                "icone": "MessageSquare",
-                "cor": "#f97316",
-                "meta_reais": 0,
-                "implementado": True
-            },
-            {
-                "id": "clonador_funil",
-                "nome": "Clonador de Funil",
-                "descricao": "Copie toda a estrutura (mensagens, botões e atrasos) de um bot de sucesso para um novo bot.",
-                "icone": "Copy",
-                "cor": "#c333ff",
-                "meta_reais": 100,
-                "implementado": True
-            },
-            {
-                "id": "projecao_receita",
-                "nome": "Projeção de Receita",
-                "descricao": "Inteligência Artificial que prevê o seu faturamento para os próximos 30, 60 ou 90 dias.",
-                "icone": "TrendingUp",
-                "cor": "#22c55e",
-                "meta_reais": 300,
-                "implementado": True
-            },
-            {
-                "id": "escudo_anticuriosos",
-                "nome": "Escudo Anti-Curiosos",
-                "descricao": "Bloqueia usuários que geram vários PIX falsos, economizando taxas da gateway.",
-                "icone": "Shield",
-                "cor": "#ef4444",
-                "meta_reais": 500,
-                "implementado": True
-            },
-            {
-                "id": "multibot_center",
-                "nome": "Command Center",
-                "descricao": "Visão de CEO: Acompanhe o faturamento, leads e conversão de todos os seus bots em uma tela.",
-                "icone": "TrendingUp",
-                "cor": "#3b82f6",
-                "meta_reais": 1500,
-                "implementado": True
-            },
-            {
-                "id": "jornada_cliente",
-                "nome": "Jornada do Cliente",
-                "descricao": "Visualize o percurso completo de cada lead no funil: do /start ao pagamento, order bump, upsell e downsell.",
-                "icone": "Map",
-                "cor": "#06b6d4",
-                "meta_reais": 1800,
-                "implementado": True
-            },
-            # 👇 RECURSOS "EM DESENVOLVIMENTO" 👇
-            {
-                "id": "clonador_previas",
-                "nome": "Clonador de Prévias/VIPs",
-                "descricao": "Clone postagens automaticamente entre canais e grupos. O bot copia conteúdo do canal de origem para o destino.",
-                "icone": "Repeat",
-                "cor": "#c333ff",
-                "meta_reais": 2000,
-                "implementado": False
-            },
-            {
-                "id": "remarketing_inteligente",
-                "nome": "Remarketing Inteligente",
-                "descricao": "Segmentação automática de leads: identifica quem visitou e não comprou, quem abandonou PIX, e quem não renovou.",
-                "icone": "Brain",
-                "cor": "#f59e0b",
-                "meta_reais": 3000,
-                "implementado": False
-            },
-            {
-                "id": "analisador_concorrentes",
-                "nome": "Analisador de Concorrentes",
-                "descricao": "Monitore canais públicos de concorrentes. Relatórios com frequência de postagens e horários de pico.",
-                "icone": "Search",
-                "cor": "#ef4444",
-                "meta_reais": 4000,
-                "implementado": False
-            },
-            {
-                "id": "multi_gateway",
-                "nome": "Multi-Gateway Inteligente",
-                "descricao": "Roteamento automático de pagamentos para o gateway com maior taxa de aprovação por faixa de valor.",
-                "icone": "Zap",
-                "cor": "#06b6d4",
-                "meta_reais": 5000,
-                "implementado": False
-            },
-            {
-                "id": "anti_vazamento",
-                "nome": "Proteção Anti-Vazamento",
-                "descricao": "Marca d'água invisível em mídias do canal VIP. Identifique quem vazou seu conteúdo.",
-                "icone": "Shield",
-                "cor": "#8b5cf6",
-                "meta_reais": 10000,
-                "implementado": False
-            }
-        ]
-        
-        # 3. INSERE OS DADOS (Só insere os que faltam, não duplica)
-        for rec in recursos_completos:
-            existe = db.execute(text("SELECT id FROM recursos_prime WHERE id = :id"), {"id": rec["id"]}).fetchone()
-            
-            if not existe:
-                db.execute(text("""
-                    INSERT INTO recursos_prime (id, nome, descricao, icone, cor, meta_reais, implementado)
-                    VALUES (:id, :nome, :descricao, :icone, :cor, :meta_reais, :implementado)
-                """), rec)
-                log_msgs.append(f"✅ Recurso '{rec['nome']}' inserido com sucesso!")
-            else:
-                log_msgs.append(f"ℹ️ Recurso '{rec['nome']}' já existia.")
-                
-        db.commit()
 
-        return {
-            "status": "success",
-            "message": "Todos os Recursos injetados com sucesso!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        db.rollback()
-        return {"status": "error", "message": f"❌ Erro Geral: {str(e)}"}
 
 
 # =========================================================
@@ -22697,91 +20513,6 @@ def admin_set_user_prime(
         raise HTTPException(500, str(e))
 
 
-# =========================================================
-# 🚨 MIGRAÇÃO V10: RANKING TOGGLE + FIX CLONADOR PRÉVIAS
-# =========================================================
-@app.get("/migrate-ranking-prime-v10")
-async def migrate_ranking_prime_v10(db: Session = Depends(get_db)):
-    """
-    Migração V10:
-    1. Cria config 'ranking_publico' no SystemConfig (default True)
-    2. Força clonador_previas como implementado=False (re-bloquear)
-    Acesse UMA VEZ após deploy: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-ranking-prime-v10
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        # 1. Criar config ranking_publico se não existir
-        try:
-            existe = db.query(SystemConfig).filter(SystemConfig.key == "ranking_publico").first()
-            if not existe:
-                db.add(SystemConfig(key="ranking_publico", value="true"))
-                db.commit()
-                log_msgs.append("✅ Config 'ranking_publico' criada (default: true)")
-            else:
-                log_msgs.append("ℹ️ Config 'ranking_publico' já existe")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ ranking_publico: {str(e)}")
-        
-        # 2. Forçar clonador_previas como NÃO implementado (bloqueado)
-        try:
-            db.execute(text("""
-                UPDATE recursos_prime 
-                SET implementado = FALSE 
-                WHERE id = 'clonador_previas'
-            """))
-            db.commit()
-            log_msgs.append("✅ clonador_previas forçado como bloqueado (implementado=False)")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ clonador_previas: {str(e)}")
-        
-        # 3. Injetar recurso jornada_cliente se não existir
-        try:
-            existe_jc = db.execute(text("SELECT id FROM recursos_prime WHERE id = 'jornada_cliente'")).fetchone()
-            if not existe_jc:
-                db.execute(text("""
-                    INSERT INTO recursos_prime (id, nome, descricao, icone, cor, meta_reais, implementado)
-                    VALUES ('jornada_cliente', 'Jornada do Cliente', 
-                            'Visualize o percurso completo de cada lead no funil: do /start ao pagamento, order bump, upsell e downsell.',
-                            'Map', '#06b6d4', 1800, TRUE)
-                """))
-                db.commit()
-                log_msgs.append("✅ Recurso 'Jornada do Cliente' injetado")
-            else:
-                log_msgs.append("ℹ️ Recurso 'Jornada do Cliente' já existe")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ jornada_cliente: {str(e)}")
-        
-        # 4. Criar tabela user_prime_overrides se não existir
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS user_prime_overrides (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                    recurso_id VARCHAR(100) NOT NULL,
-                    force_status VARCHAR(20),
-                    custom_meta FLOAT,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                )
-            """))
-            db.commit()
-            log_msgs.append("✅ Tabela 'user_prime_overrides' verificada/criada")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ user_prime_overrides: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "🚨 Migração V10 (Ranking + Prime) concluída!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
 
 
 # =========================================================
@@ -22948,62 +20679,6 @@ def public_invite_required(db: Session = Depends(get_db)):
     return {"invite_required": is_required}
 
 
-# =========================================================
-# 🚨 MIGRAÇÃO V11: CÓDIGOS DE CONVITE (PRÉ-LANÇAMENTO)
-# =========================================================
-@app.get("/migrate-invites-v11")
-async def migrate_invites_v11(db: Session = Depends(get_db)):
-    """
-    Migração V11:
-    1. Cria tabela invite_codes no banco de dados
-    2. Cria config 'invite_required' no SystemConfig (default True para pré-lançamento)
-    Acesse UMA VEZ após deploy: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-invites-v11
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        # 1. Criar tabela invite_codes
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS invite_codes (
-                    id SERIAL PRIMARY KEY,
-                    code VARCHAR(20) UNIQUE NOT NULL,
-                    is_used BOOLEAN DEFAULT FALSE,
-                    used_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
-                    used_by_username VARCHAR,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    used_at TIMESTAMP
-                )
-            """))
-            db.execute(text("CREATE INDEX IF NOT EXISTS ix_invite_codes_code ON invite_codes (code)"))
-            db.execute(text("CREATE INDEX IF NOT EXISTS ix_invite_codes_is_used ON invite_codes (is_used)"))
-            db.commit()
-            log_msgs.append("✅ Tabela 'invite_codes' criada/verificada com sucesso")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ invite_codes: {str(e)}")
-        
-        # 2. Criar config invite_required (default True = pré-lançamento ativo)
-        try:
-            existe = db.query(SystemConfig).filter(SystemConfig.key == "invite_required").first()
-            if not existe:
-                db.add(SystemConfig(key="invite_required", value="true"))
-                db.commit()
-                log_msgs.append("✅ Config 'invite_required' criada (default: true - pré-lançamento ATIVO)")
-            else:
-                log_msgs.append(f"ℹ️ Config 'invite_required' já existe (valor: {existe.value})")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ invite_required config: {str(e)}")
-        
-        return {
-            "status": "success",
-            "message": "🎟️ Migração V11 (Códigos de Convite) concluída!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
 
 # =========================================================
 # 🚀 API: ESTRATÉGIA DE LANÇAMENTO (SNEAK PEEK)
@@ -23076,103 +20751,12 @@ async def save_launch_strategy(bot_id: int, payload: LaunchStrategyUpdate, db: S
     config.plano_id = payload.plano_id
     
     db.commit()
-    return {"status": "success", "message": "Configuração de lançamento salva com sucesso!"}
-
-# =========================================================
-# 🚨 MIGRAÇÃO V12: ESTRATÉGIA DE LANÇAMENTO (SNEAK PEEK)
-# =========================================================
-@app.get("/migrate-launch-strategy-v12")
-async def migrate_launch_strategy_v12(db: Session = Depends(get_db)):
-    """
-    Migração V12: Cria a tabela launch_strategy_config e adiciona colunas de delay/aprovação.
-    """
-    try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        try:
-            db.execute(text("""
-                CREATE TABLE IF NOT EXISTS launch_strategy_config (
-                    id SERIAL PRIMARY KEY,
-                    bot_id INTEGER UNIQUE REFERENCES bots(id) ON DELETE CASCADE,
-                    ativo BOOLEAN DEFAULT FALSE,
-                    msg_boas_vindas TEXT DEFAULT 'Bem-vindo! Resgate seu acesso VIP temporário abaixo:',
-                    media_url VARCHAR,
-                    btn_text VARCHAR DEFAULT '🔓 RESGATAR CONVITE VIP',
-                    tempo_vip_minutos INTEGER DEFAULT 1,
-                    msg_expulsao TEXT DEFAULT '⚠️ SEU ACESSO VIP GRATUITO EXPIROU!! 😈\n\nGaranta sua vaga permanente agora:',
-                    media_oferta_url VARCHAR,
-                    plano_id INTEGER,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                )
-            """))
-            db.commit()
-            log_msgs.append("✅ Tabela 'launch_strategy_config' criada/verificada com sucesso")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"⚠️ Erro ao criar launch_strategy_config: {str(e)}")
-
-        # 2. Adiciona as Novas Colunas
-        novas_colunas = [
-            ("delay_aprovacao_segundos", "INTEGER DEFAULT 0"),
-            ("msg_aprovacao_texto", "TEXT DEFAULT 'PARABÉNS VOCÊ FOI APROVADO EM NOSSO VIP 🎉\n\nCLIQUE ABAIXO PARA ACESSAR O NOSSO GRUPINHO SECRETO 👇🏼\n\nENTRE AGORA!! SE SAIR NÃO TEM VOLTA!!'"),
-            ("msg_aprovacao_media", "VARCHAR"),
-            ("msg_aprovacao_btn", "VARCHAR DEFAULT '🔥 ENTRAR NO VIP'")
-        ]
-
-        for col_name, col_type in novas_colunas:
-            try:
-                db.execute(text(f"ALTER TABLE launch_strategy_config ADD COLUMN {col_name} {col_type}"))
-                db.commit()
-                log_msgs.append(f"✅ Coluna {col_name} adicionada com sucesso.")
-            except Exception as e:
-                db.rollback()
-                log_msgs.append(f"ℹ️ Coluna {col_name} já existe ou falhou: {str(e)}")
-
-        return {
-            "status": "success",
-            "message": "🚀 Migração V12 concluída com sucesso!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        return {"status": "error", "message": f"❌ Erro na migração: {str(e)}"}
-
-# =========================================================
-# 🚨 MIGRAÇÃO V13: LIMPEZA DE GRUPO E LANÇAMENTO EM SEGUNDOS
-# =========================================================
-@app.get("/migrate-v13-updates")
-async def migrate_v13_updates(db: Session = Depends(get_db)):
-    """
-    Migração V13: Adiciona coluna apagar_mensagens_servico na tabela bots,
-    e altera o tempo de lançamento para segundos.
-    """
+    
+    # 🔗 Lançamento depende de chat_join_request no webhook
     try:
-        from sqlalchemy import text
-        log_msgs = []
-        
-        # 1. Adiciona apagar_mensagens_servico na tabela de bots
-        try:
-            db.execute(text("ALTER TABLE bots ADD COLUMN apagar_mensagens_servico BOOLEAN DEFAULT FALSE"))
-            db.commit()
-            log_msgs.append("✅ Coluna apagar_mensagens_servico adicionada em bots.")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"ℹ️ Coluna apagar_mensagens_servico já existe ou falhou: {str(e)}")
-
-        # 2. Adiciona tempo_vip_segundos na launch_strategy_config
-        try:
-            db.execute(text("ALTER TABLE launch_strategy_config ADD COLUMN tempo_vip_segundos INTEGER DEFAULT 60"))
-            db.commit()
-            log_msgs.append("✅ Coluna tempo_vip_segundos adicionada em launch_strategy_config.")
-        except Exception as e:
-            db.rollback()
-            log_msgs.append(f"ℹ️ Coluna tempo_vip_segundos já existe ou falhou: {str(e)}")
+        reconciliar_webhook_bot(db, bot)
+    except Exception as e_wh:
+        logger.warning(f"⚠️ Erro ao reconciliar webhook do bot {bot_id}: {e_wh}")
+    
+    return {"status": "success", "message": "Configuração de lançamento salva com sucesso!"}
 
-        return {
-            "status": "success",
-            "message": "🚀 Migração V13 concluída com sucesso!",
-            "details": log_msgs
-        }
-    except Exception as e:
-        return {"status": "error", "message": f"❌ Erro na migração V13: {str(e)}"}
\ No newline at end of file
@@ -0,0 +1,335 @@
+import os
+import hmac
+import time
+import logging
+import threading
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 📈 MÉTRICAS NO FORMATO PROMETHEUS (SEM DEPENDÊNCIA EXTERNA)
+# =========================================================
+# Contadores/histogramas em memória, por processo, expostos em GET /metrics
+# no formato texto do Prometheus. Labels SEMPRE de baixa cardinalidade:
+# rota templada ("/webhook/{token}"), método da API, nome da gateway/job.
+# Nunca use token, telegram_id ou pedido como label.
+
+# Token do /metrics (Bearer ou ?token=). Sem token o endpoint fica desligado
+# (404): o domínio do Railway é público. METRICS_PUBLICO=true abre sem token,
+# só para quem expõe o serviço apenas na rede privada.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PUBLICO = os.getenv("METRICS_PUBLICO", "false").lower() == "true"
+
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_LENTOS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _formatar_labels(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    partes = []
+    for nome, valor in zip(nomes, valores):
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nome}="{valor}"')
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Contador:
+    """Contador monotônico com labels."""
+
+    def __init__(self, nome: str, ajuda: str, labels: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = labels
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores_labels, valor: float = 1.0):
+        with self._lock:
+            self._valores[valores_labels] = self._valores.get(valores_labels, 0.0) + valor
+
+    def renderizar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        with self._lock:
+            itens = list(self._valores.items())
+        for chave, valor in itens:
+            linhas.append(f"{self.nome}{_formatar_labels(self.labels, chave)} {valor}")
+        return linhas
+
+
+class Histograma:
+    """Histograma cumulativo com labels (buckets fixos em segundos)."""
+
+    def __init__(self, nome: str, ajuda: str, labels: tuple = (), buckets: tuple = BUCKETS_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # {labels: [contagens_por_bucket..., soma, total]}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores_labels):
+        idx = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_labels)
+            if serie is None:
+                serie = [0] * (len(self.buckets) + 2)
+                self._series[valores_labels] = serie
+            if idx < len(self.buckets):
+                serie[idx] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def renderizar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            itens = [(chave, list(serie)) for chave, serie in self._series.items()]
+        for chave, serie in itens:
+            acumulado = 0
+            for limite, qtd in zip(self.buckets, serie):
+                acumulado += qtd
+                rotulos = _formatar_labels(self.labels, chave, 'le="%s"' % limite)
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_labels(self.labels, chave, 'le="+Inf"')
+            linhas.append(f"{self.nome}_bucket{rotulos} {serie[-1]}")
+            linhas.append(f"{self.nome}_sum{_formatar_labels(self.labels, chave)} {serie[-2]}")
+            linhas.append(f"{self.nome}_count{_formatar_labels(self.labels, chave)} {serie[-1]}")
+        return linhas
+
+
+class Medidor:
+    """
+    Gauge lido na hora do scrape através de uma função (sem estado próprio).
+    Com labels, a função retorna {(valores dos labels): valor}.
+    """
+
+    def __init__(self, nome: str, ajuda: str, funcao, labels: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+        self.labels = labels
+
+    def renderizar(self) -> list:
+        try:
+            valor = self.funcao()
+        except Exception as e:
+            logger.debug(f"📈 [METRICS] Falha ao ler {self.nome}: {e}")
+            return []
+        if valor is None:
+            return []
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} gauge"]
+        if not self.labels:
+            return linhas + [f"{self.nome} {valor}"]
+        series = [
+            f"{self.nome}{_formatar_labels(self.labels, chave)} {v}"
+            for chave, v in valor.items() if v is not None
+        ]
+        return linhas + series if series else []
+
+
+_registro = []
+
+
+def _registrar(metrica):
+    _registro.append(metrica)
+    return metrica
+
+
+# --- HTTP ---
+http_latencia = _registrar(Histograma(
+    "zenyx_http_request_duration_seconds", "Latência das requisições HTTP por rota templada.",
+    ("method", "route", "status")
+))
+
+# --- TELEGRAM ---
+telegram_latencia = _registrar(Histograma(
+    "zenyx_telegram_api_duration_seconds", "Latência das chamadas à Bot API do Telegram por método.",
+    ("method",)
+))
+telegram_erros = _registrar(Contador(
+    "zenyx_telegram_api_errors_total", "Erros da Bot API do Telegram por método e código.",
+    ("method", "code")
+))
+telegram_429 = _registrar(Contador(
+    "zenyx_telegram_api_429_total", "Respostas 429 (flood control) da Bot API por método.",
+    ("method",)
+))
+
+# --- GATEWAYS ---
+gateway_latencia = _registrar(Histograma(
+    "zenyx_gateway_request_duration_seconds", "Latência da geração de PIX por gateway e resultado.",
+    ("gateway", "result")
+))
+
+# --- BANCO (POOL) ---
+db_checkout_espera = _registrar(Histograma(
+    "zenyx_db_pool_checkout_wait_seconds", "Tempo esperando uma conexão livre no pool do SQLAlchemy.",
+    ("pool",)
+))
+db_checkout_timeouts = _registrar(Contador(
+    "zenyx_db_pool_checkout_timeouts_total", "Checkouts do pool que falharam (pool_timeout estourado).",
+    ("pool",)
+))
+
+# --- SCHEDULER ---
+job_duracao = _registrar(Histograma(
+    "zenyx_scheduler_job_duration_seconds", "Duração dos jobs do APScheduler (do horário agendado ao fim).",
+    ("job", "result"), buckets=BUCKETS_LENTOS
+))
+job_misfires = _registrar(Contador(
+    "zenyx_scheduler_job_misfires_total", "Execuções de job perdidas (misfire) no APScheduler.",
+    ("job",)
+))
+
+# --- CACHE DE RESPOSTAS (DASHBOARD) ---
+cache_respostas = _registrar(Contador(
+    "zenyx_response_cache_total", "Consultas ao cache curto do dashboard por endpoint e resultado (hit/miss/coalesced).",
+    ("endpoint", "result")
+))
+
+# --- AUDITORIA ---
+audit_eventos = _registrar(Contador(
+    "zenyx_audit_events_total", "Logs de auditoria por resultado (enfileirado/gravado/sincrono/descartado).",
+    ("result",)
+))
+
+
+def renderizar_metricas() -> str:
+    linhas = []
+    for metrica in list(_registro):
+        linhas.extend(metrica.renderizar())
+    return "\n".join(linhas) + "\n"
+
+
+def habilitado() -> bool:
+    """/metrics só responde com METRICS_TOKEN configurado (ou METRICS_PUBLICO=true)."""
+    return bool(METRICS_TOKEN) or METRICS_PUBLICO
+
+
+def token_autorizado(authorization: str, token_query: str) -> bool:
+    if not METRICS_TOKEN:
+        return METRICS_PUBLICO
+    if token_query and hmac.compare_digest(token_query, METRICS_TOKEN):
+        return True
+    return hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}")
+
+
+# =========================================================
+# 🔌 INSTRUMENTAÇÃO DOS COMPONENTES
+# =========================================================
+
+def instrumentar_telegram():
+    """
+    Envolve telebot.apihelper._make_request (ponto único de TODAS as chamadas
+    à Bot API, de qualquer TeleBot criado no processo) para medir latência e 429.
+    """
+    from telebot import apihelper
+
+    original = apihelper._make_request
+    if getattr(original, "_zenyx_metricas", False):
+        return
+
+    def _make_request_medido(token, method_name, *args, **kwargs):
+        inicio = time.monotonic()
+        try:
+            return original(token, method_name, *args, **kwargs)
+        except apihelper.ApiTelegramException as e:
+            codigo = getattr(e, "error_code", None) or "unknown"
+            telegram_erros.inc(method_name, codigo)
+            if codigo == 429:
+                telegram_429.inc(method_name)
+            raise
+        except Exception:
+            telegram_erros.inc(method_name, "network")
+            raise
+        finally:
+            telegram_latencia.observar(time.monotonic() - inicio, method_name)
+
+    _make_request_medido._zenyx_metricas = True
+    apihelper._make_request = _make_request_medido
+
+
+_pools = {}  # {nome do pool: engine}
+
+
+def _ler_pools(nome_metodo):
+    def ler():
+        return {
+            (nome,): getattr(eng.pool, nome_metodo)() if hasattr(eng.pool, nome_metodo) else None
+            for nome, eng in list(_pools.items())
+        }
+    return ler
+
+
+_registrar(Medidor("zenyx_db_pool_in_use", "Conexões emprestadas do pool agora.", _ler_pools("checkedout"), ("pool",)))
+_registrar(Medidor("zenyx_db_pool_idle", "Conexões ociosas no pool agora.", _ler_pools("checkedin"), ("pool",)))
+_registrar(Medidor("zenyx_db_pool_overflow", "Conexões de overflow abertas agora.", _ler_pools("overflow"), ("pool",)))
+_registrar(Medidor("zenyx_db_pool_size", "Tamanho base configurado do pool.", _ler_pools("size"), ("pool",)))
+
+
+def instrumentar_pool(engine, nome: str = "realtime"):
+    """
+    Mede a espera por conexão no pool. O SQLAlchemy não tem evento "antes do
+    checkout", então envolvemos pool.connect da instância atual do engine.
+    Também expõe conexões em uso / ociosas / overflow como gauges por pool.
+    """
+    pool = engine.pool
+    original = pool.connect
+    if getattr(original, "_zenyx_metricas", False):
+        return
+
+    def connect_medido(*args, **kwargs):
+        inicio = time.monotonic()
+        try:
+            conexao = original(*args, **kwargs)
+        except Exception:
+            db_checkout_timeouts.inc(nome)
+            raise
+        db_checkout_espera.observar(time.monotonic() - inicio, nome)
+        return conexao
+
+    connect_medido._zenyx_metricas = True
+    pool.connect = connect_medido
+    _pools[nome] = engine
+
+
+def instrumentar_scheduler(scheduler):
+    """Listener do APScheduler: duração por job, erros e misfires."""
+    from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED
+
+    def _ouvir(evento):
+        if evento.code == EVENT_JOB_MISSED:
+            job_misfires.inc(evento.job_id)
+            return
+        agendado = evento.scheduled_run_time
+        if agendado is None:
+            return
+        duracao = time.time() - agendado.timestamp()
+        resultado = "error" if evento.code == EVENT_JOB_ERROR else "ok"
+        job_duracao.observar(max(duracao, 0.0), evento.job_id, resultado)
+
+    scheduler.add_listener(_ouvir, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+
+
+def instrumentar_thread_pool(pool, nome: str = "zenyx"):
+    """Profundidade da fila do ThreadPoolExecutor global (tarefas aguardando worker)."""
+    _registrar(Medidor(
+        "zenyx_thread_pool_queue_depth",
+        f"Tarefas na fila do thread pool '{nome}' aguardando worker.",
+        lambda: pool._work_queue.qsize()
+    ))
+    _registrar(Medidor(
+        "zenyx_thread_pool_workers",
+        f"Threads já criadas no thread pool '{nome}'.",
+        lambda: len(pool._threads)
+    ))
+
+
+def instrumentar_fila_auditoria(fila):
+    """Logs de auditoria na fila aguardando o writer em lote."""
+    _registrar(Medidor(
+        "zenyx_audit_queue_depth",
+        "Logs de auditoria na fila aguardando gravação em lote.",
+        lambda: fila.qsize()
+    ))
@@ -0,0 +1,222 @@
+import time
+import asyncio
+import hashlib
+import logging
+import functools
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from database import engine, SessionLocal, Base, now_brazil
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 📒 LEDGER DE MIGRAÇÕES (CADA MIGRAÇÃO RODA UMA ÚNICA VEZ)
+# =========================================================
+# Antes, todo boot rodava create_all, forcar_atualizacao_tabelas (dezenas de
+# ALTER TABLE), as migrações v3–v9 e o fix de interaction_count; e o job de
+# mensagens alternantes repetia 12 ALTER TABLE a cada 5 minutos.
+#
+# Agora cada migração tem uma versão gravada em `schema_migrations` depois de
+# aplicada com sucesso. No boot só lemos o ledger: se não há nada pendente,
+# nenhum DDL é executado. Quando há pendências, aplicamos sob um advisory lock
+# do Postgres para que réplicas subindo juntas não rodem o mesmo DDL.
+#
+# As rotas /migrate-* continuam existindo, mas decoradas com @migracao_unica:
+# entram no ledger, rodam no boot uma vez e viram no-op quando acessadas de novo.
+#
+# Migrações `somente_postgres` (ALTER ... IF NOT EXISTS, information_schema...)
+# existem para levar bancos antigos ao schema atual. No SQLite (dev/loadtest) o
+# banco nasce do create_all já com o schema atual, então elas são só gravadas no
+# ledger, sem executar — antes falhavam e eram tentadas de novo a cada boot.
+
+# Chave fixa do advisory lock ("ZENY" em hexadecimal)
+ADVISORY_LOCK_ID = 0x5A454E59
+
+_SQL_CRIAR_LEDGER = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    versao VARCHAR(120) PRIMARY KEY,
+    descricao VARCHAR(255),
+    aplicada_em TIMESTAMP,
+    duracao_ms INTEGER
+)
+"""
+
+
+class Migracao:
+    """
+    Uma entrada do ledger. `usa_db` indica função no formato das rotas (recebe
+    db=Session); `somente_postgres` marca DDL legado que o create_all já cobre.
+    """
+
+    def __init__(self, versao: str, descricao: str, funcao, usa_db: bool = False, somente_postgres: bool = False):
+        self.versao = versao
+        self.descricao = descricao
+        self.funcao = funcao
+        self.usa_db = usa_db
+        self.somente_postgres = somente_postgres
+
+
+# Migrações registradas via @migracao_unica (na ordem em que o main.py as define)
+_registradas = []
+
+
+def versao_create_all() -> str:
+    """
+    create_all só cria tabelas que faltam. A versão muda quando um model novo
+    é adicionado ao database.py, então ele roda de novo só nesse deploy.
+    """
+    tabelas = ",".join(sorted(Base.metadata.tables))
+    return f"0001_create_all_{hashlib.sha1(tabelas.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _criar_ledger():
+    with engine.connect() as conn:
+        conn.execute(text(_SQL_CRIAR_LEDGER))
+        conn.commit()
+
+
+def versoes_aplicadas() -> set:
+    with engine.connect() as conn:
+        return {linha[0] for linha in conn.execute(text("SELECT versao FROM schema_migrations"))}
+
+
+def _registrar_aplicada(migracao: Migracao, duracao_ms: int):
+    with engine.connect() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO schema_migrations (versao, descricao, aplicada_em, duracao_ms) "
+                "VALUES (:versao, :descricao, :aplicada_em, :duracao_ms)"
+            ),
+            {
+                "versao": migracao.versao,
+                "descricao": migracao.descricao[:255],
+                "aplicada_em": now_brazil().replace(tzinfo=None),
+                "duracao_ms": duracao_ms,
+            },
+        )
+        conn.commit()
+
+
+@contextmanager
+def _advisory_lock():
+    """Lock de sessão no Postgres (no SQLite não há concorrência entre réplicas)."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    conn = engine.connect()
+    try:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        yield
+    finally:
+        try:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+        finally:
+            conn.close()
+
+
+async def _executar(migracao: Migracao) -> bool:
+    """
+    Roda uma migração. Falha = exceção, retorno False (migration_v3..v7) ou
+    {"status": "error"} (padrão das rotas).
+    """
+    db = SessionLocal() if migracao.usa_db else None
+    try:
+        resultado = migracao.funcao(db=db) if migracao.usa_db else migracao.funcao()
+        if asyncio.iscoroutine(resultado):
+            resultado = await resultado
+        if resultado is False:
+            logger.error(f"❌ [LEDGER] {migracao.versao} retornou False")
+            return False
+        if isinstance(resultado, dict) and resultado.get("status") in ("error", "erro"):
+            logger.error(f"❌ [LEDGER] {migracao.versao} retornou erro: {resultado.get('message') or resultado.get('msg')}")
+            return False
+        return True
+    except Exception as e:
+        logger.error(f"❌ [LEDGER] {migracao.versao} falhou: {e}")
+        return False
+    finally:
+        if db is not None:
+            db.close()
+
+
+async def aplicar_migracoes(base: list) -> dict:
+    """
+    Aplica, em ordem, as migrações `base` (arquivos migration_vN, create_all...)
+    seguidas das registradas com @migracao_unica. Falhas não são gravadas no
+    ledger e serão tentadas de novo no próximo boot, como antes.
+    """
+    inicio = time.monotonic()
+    _criar_ledger()
+    todas = list(base) + list(_registradas)
+
+    aplicadas = versoes_aplicadas()
+    pendentes = [m for m in todas if m.versao not in aplicadas]
+    if not pendentes:
+        logger.info(f"📒 [LEDGER] Schema em dia ({len(aplicadas)} migrações). Nenhum DDL executado.")
+        return {"aplicadas": 0, "falhas": 0, "pendentes": 0}
+
+    ok, falhas, puladas = 0, 0, 0
+    postgres = engine.dialect.name == "postgresql"
+    with _advisory_lock():
+        # Outra réplica pode ter aplicado enquanto esperávamos o lock
+        aplicadas = versoes_aplicadas()
+        for migracao in todas:
+            if migracao.versao in aplicadas:
+                continue
+            if migracao.somente_postgres and not postgres:
+                _registrar_aplicada(migracao, 0)
+                puladas += 1
+                continue
+            t = time.monotonic()
+            logger.info(f"📒 [LEDGER] Aplicando {migracao.versao} ({migracao.descricao})...")
+            if await _executar(migracao):
+                duracao_ms = int((time.monotonic() - t) * 1000)
+                _registrar_aplicada(migracao, duracao_ms)
+                ok += 1
+            else:
+                falhas += 1
+
+    logger.info(
+        f"📒 [LEDGER] {ok} migrações aplicadas, {falhas} falhas, {puladas} puladas "
+        f"({engine.dialect.name}) em {time.monotonic() - inicio:.1f}s"
+    )
+    return {"aplicadas": ok, "falhas": falhas, "puladas": puladas, "pendentes": len(pendentes)}
+
+
+def migracao_unica(versao: str, descricao: str = "", somente_postgres: bool = True):
+    """
+    Decorator para as rotas /migrate-*: registra o corpo no ledger (roda no boot)
+    e faz a rota responder "já aplicada" depois disso, sem executar DDL de novo.
+    As rotas são todas DDL de Postgres, daí o padrão somente_postgres=True.
+    """
+    def decorator(func):
+        migracao = Migracao(versao, descricao or func.__name__, func, usa_db=True, somente_postgres=somente_postgres)
+        _registradas.append(migracao)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                if versao in versoes_aplicadas():
+                    return {"status": "skipped", "message": f"Migração {versao} já aplicada (ledger)."}
+            except Exception:
+                pass  # Ledger ainda não existe: segue para a execução
+
+            with _advisory_lock():
+                resultado = func(*args, **kwargs)
+                if asyncio.iscoroutine(resultado):
+                    resultado = await resultado
+                falhou = isinstance(resultado, dict) and resultado.get("status") in ("error", "erro")
+                if not falhou:
+                    try:
+                        _criar_ledger()
+                        if versao not in versoes_aplicadas():
+                            _registrar_aplicada(migracao, 0)
+                    except Exception as e:
+                        logger.warning(f"⚠️ [LEDGER] Não foi possível registrar {versao}: {e}")
+            return resultado
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,37 @@
+import logging
+from sqlalchemy import text
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+def executar_migracao_v10():
+    """
+    MIGRAÇÃO V10: Colunas de mensagens alternantes e de áudio separado (combo áudio + mídia).
+    Antes rodava como "auto-migração" dentro de enviar_mensagens_alternantes a cada 5 minutos.
+    """
+    logger.info("🚀 [V10] Verificando colunas de alternantes e áudio...")
+    
+    comandos = [
+        "ALTER TABLE alternating_messages ADD COLUMN IF NOT EXISTS last_message_auto_destruct BOOLEAN DEFAULT FALSE",
+        "ALTER TABLE alternating_messages ADD COLUMN IF NOT EXISTS last_message_destruct_seconds INTEGER DEFAULT 60",
+        "ALTER TABLE alternating_messages ADD COLUMN IF NOT EXISTS max_duration_minutes INTEGER DEFAULT 60",
+        "ALTER TABLE remarketing_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR(500)",
+        "ALTER TABLE remarketing_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3",
+        "ALTER TABLE canal_free_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR(500)",
+        "ALTER TABLE canal_free_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3",
+        "ALTER TABLE order_bump_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR",
+        "ALTER TABLE order_bump_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3",
+        "ALTER TABLE upsell_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR",
+        "ALTER TABLE upsell_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3",
+        "ALTER TABLE downsell_config ADD COLUMN IF NOT EXISTS audio_url VARCHAR",
+        "ALTER TABLE downsell_config ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 3",
+    ]
+    
+    with engine.connect() as conn:
+        for cmd in comandos:
+            conn.execute(text(cmd))
+        conn.commit()
+    logger.info("✅ [V10] Colunas de alternantes e áudio verificadas/criadas!")
+
+if __name__ == "__main__":
+    executar_migracao_v10()
@@ -0,0 +1,345 @@
+import logging
+from sqlalchemy import text
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# Bloco legado de "integridade completa" (todas as versões até os reports V2).
+# Vivia no corpo de registrar_remarketing; agora roda uma vez pelo ledger.
+COMANDOS_SQL = [
+    # ============================================================
+    # 🔥 [CORREÇÃO 0 - NOVO] SISTEMA DE LIMITES E PLANO DA PLATAFORMA
+    # ============================================================
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS plano_plataforma VARCHAR DEFAULT 'free';",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS max_bots INTEGER DEFAULT 20;",
+
+    # --- [CORREÇÃO 1] TABELA DE PLANOS ---
+    "ALTER TABLE planos_config ADD COLUMN IF NOT EXISTS key_id VARCHAR;",
+    "ALTER TABLE planos_config ADD COLUMN IF NOT EXISTS descricao TEXT;",
+    "ALTER TABLE planos_config ADD COLUMN IF NOT EXISTS preco_cheio FLOAT;",
+
+    # --- [CORREÇÃO 2] TABELA DE PEDIDOS ---
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS plano_id INTEGER;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS plano_nome VARCHAR;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS txid VARCHAR;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS qr_code TEXT;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS transaction_id VARCHAR;", 
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS data_aprovacao TIMESTAMP WITHOUT TIME ZONE;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS data_expiracao TIMESTAMP WITHOUT TIME ZONE;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS custom_expiration TIMESTAMP WITHOUT TIME ZONE;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS link_acesso VARCHAR;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS mensagem_enviada BOOLEAN DEFAULT FALSE;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS tem_order_bump BOOLEAN DEFAULT FALSE;", 
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS tracking_id INTEGER;",
+
+    # --- [CORREÇÃO 3] FLUXO DE MENSAGENS ---
+    "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS autodestruir_1 BOOLEAN DEFAULT FALSE;",
+    "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS msg_2_texto TEXT;",
+    "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS msg_2_media VARCHAR;",
+    "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS mostrar_planos_2 BOOLEAN DEFAULT TRUE;",
+    "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS mostrar_planos_1 BOOLEAN DEFAULT FALSE;",
+    
+    # --- [CORREÇÃO 4] REMARKETING AVANÇADO ---
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS target VARCHAR DEFAULT 'todos';",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS type VARCHAR DEFAULT 'massivo';",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS plano_id INTEGER;",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS promo_price FLOAT;",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS expiration_at TIMESTAMP WITHOUT TIME ZONE;",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS dia_atual INTEGER DEFAULT 0;",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS data_inicio TIMESTAMP WITHOUT TIME ZONE DEFAULT now();",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS proxima_execucao TIMESTAMP WITHOUT TIME ZONE;",
+    
+    # --- [CORREÇÃO 5] TABELA NOVA (FLOW V2) ---
+    """
+    CREATE TABLE IF NOT EXISTS bot_flow_steps (
+        id SERIAL PRIMARY KEY,
+        bot_id INTEGER REFERENCES bots(id),
+        step_order INTEGER DEFAULT 1,
+        msg_texto TEXT,
+        msg_media VARCHAR,
+        btn_texto VARCHAR DEFAULT 'Próximo ▶️',
+        mostrar_botao BOOLEAN DEFAULT TRUE,
+        autodestruir BOOLEAN DEFAULT FALSE,
+        delay_seconds INTEGER DEFAULT 0,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+    );
+    """,
+    
+    # --- [CORREÇÃO 6] SUPORTE NO BOT ---
+    "ALTER TABLE bots ADD COLUMN IF NOT EXISTS suporte_username VARCHAR;",
+
+    # --- [CORREÇÃO 7] TABELAS DE TRACKING ---
+    """
+    CREATE TABLE IF NOT EXISTS tracking_folders (
+        id SERIAL PRIMARY KEY,
+        nome VARCHAR,
+        plataforma VARCHAR,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tracking_links (
+        id SERIAL PRIMARY KEY,
+        folder_id INTEGER REFERENCES tracking_folders(id),
+        bot_id INTEGER REFERENCES bots(id),
+        nome VARCHAR,
+        codigo VARCHAR UNIQUE,
+        origem VARCHAR DEFAULT 'outros',
+        clicks INTEGER DEFAULT 0,
+        leads INTEGER DEFAULT 0,
+        vendas INTEGER DEFAULT 0,
+        faturamento FLOAT DEFAULT 0.0,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+    );
+    """,
+    "ALTER TABLE leads ADD COLUMN IF NOT EXISTS tracking_id INTEGER REFERENCES tracking_links(id);",
+
+    # --- [CORREÇÃO 8] 🔥 TABELAS DA LOJA (MINI APP) ---
+    """
+    CREATE TABLE IF NOT EXISTS miniapp_config (
+        bot_id INTEGER PRIMARY KEY REFERENCES bots(id),
+        logo_url VARCHAR,
+        background_type VARCHAR DEFAULT 'solid',
+        background_value VARCHAR DEFAULT '#000000',
+        hero_video_url VARCHAR,
+        hero_title VARCHAR DEFAULT 'ACERVO PREMIUM',
+        hero_subtitle VARCHAR DEFAULT 'O maior acervo da internet.',
+        hero_btn_text VARCHAR DEFAULT 'LIBERAR CONTEÚDO 🔓',
+        enable_popup BOOLEAN DEFAULT FALSE,
+        popup_video_url VARCHAR,
+        popup_text VARCHAR DEFAULT 'VOCÊ GANHOU UM PRESENTE!',
+        footer_text VARCHAR DEFAULT '© 2026 Premium Club.'
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS miniapp_categories (
+        id SERIAL PRIMARY KEY,
+        bot_id INTEGER REFERENCES bots(id),
+        slug VARCHAR,
+        title VARCHAR,
+        description VARCHAR,
+        cover_image VARCHAR,
+        theme_color VARCHAR DEFAULT '#c333ff',
+        deco_line_url VARCHAR,
+        is_direct_checkout BOOLEAN DEFAULT FALSE,
+        is_hacker_mode BOOLEAN DEFAULT FALSE,
+        banner_desk_url VARCHAR,
+        banner_mob_url VARCHAR,
+        footer_banner_url VARCHAR,
+        content_json TEXT
+    );
+    """,
+
+    # --- [CORREÇÃO 9] NOVAS COLUNAS PARA CATEGORIA RICA ---
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS bg_color VARCHAR DEFAULT '#000000';",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS banner_desk_url VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS video_preview_url VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_img_url VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_name VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_name VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_desc TEXT;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS footer_banner_url VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS deco_lines_url VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_name_color VARCHAR DEFAULT '#ffffff';",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_desc_color VARCHAR DEFAULT '#cccccc';",
+
+    # --- [MINI APP V2] SEPARADOR, PAGINAÇÃO, FORMATO E FAKE VIDEO ---
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS items_per_page INTEGER;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_enabled BOOLEAN DEFAULT FALSE;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_color VARCHAR DEFAULT '#ffffff';",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_text VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_text VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_url VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_logo_url VARCHAR;",
+    "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_img_shape VARCHAR DEFAULT 'square';",
+
+    # --- [CORREÇÃO 10] TOKEN PUSHINPAY E ORDER BUMP ---
+    "ALTER TABLE bots ADD COLUMN IF NOT EXISTS pushin_token VARCHAR;",
+    "ALTER TABLE order_bump_config ADD COLUMN IF NOT EXISTS autodestruir BOOLEAN DEFAULT FALSE;",
+
+    # --- [CORREÇÃO 10.1] 🆕 MULTI-GATEWAY (WIINPAY + CONTINGÊNCIA) ---
+    "ALTER TABLE bots ADD COLUMN IF NOT EXISTS wiinpay_api_key VARCHAR;",
+    "ALTER TABLE bots ADD COLUMN IF NOT EXISTS gateway_principal VARCHAR DEFAULT 'pushinpay';",
+    "ALTER TABLE bots ADD COLUMN IF NOT EXISTS gateway_fallback VARCHAR;",
+    "ALTER TABLE bots ADD COLUMN IF NOT EXISTS pushinpay_ativo BOOLEAN DEFAULT FALSE;",
+    "ALTER TABLE bots ADD COLUMN IF NOT EXISTS wiinpay_ativo BOOLEAN DEFAULT FALSE;",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS wiinpay_user_id VARCHAR;",
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS gateway_usada VARCHAR;",
+
+    # 🔒 PROTEÇÃO DE CONTEÚDO
+    "ALTER TABLE bots ADD COLUMN IF NOT EXISTS protect_content BOOLEAN DEFAULT FALSE;",
+
+    # 👇👇👇 [CORREÇÃO 11] SUPORTE A WEB APP NO FLUXO (CRÍTICO) 👇👇👇
+    "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS start_mode VARCHAR DEFAULT 'padrao';",
+    "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS miniapp_url VARCHAR;",
+    "ALTER TABLE bot_flows ADD COLUMN IF NOT EXISTS miniapp_btn_text VARCHAR DEFAULT 'ABRIR LOJA 🛍️';",
+
+    # ============================================================
+    # 🔥 [CORREÇÃO 12] SOLUÇÃO DEFINITIVA REMARKETING LOGS 🔥
+    # ============================================================
+    # 1. Cria a tabela COMPLETA se não existir
+    """
+    CREATE TABLE IF NOT EXISTS remarketing_logs (
+        id SERIAL PRIMARY KEY,
+        bot_id INTEGER REFERENCES bots(id),
+        user_id VARCHAR NOT NULL,
+        sent_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
+        message_text TEXT,
+        promo_values JSON,
+        status VARCHAR(20) DEFAULT 'sent',
+        error_message TEXT,
+        converted BOOLEAN DEFAULT FALSE,
+        converted_at TIMESTAMP WITHOUT TIME ZONE,
+        message_sent BOOLEAN DEFAULT TRUE,
+        campaign_id VARCHAR
+    );
+    """,
+    
+    # 2. Se a tabela já existir velha, ADICIONA AS COLUNAS FALTANTES NA MARRA
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS user_id VARCHAR;",
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS message_text TEXT;",
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS promo_values JSON;",
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS status VARCHAR(20) DEFAULT 'sent';",
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS error_message TEXT;",
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS converted BOOLEAN DEFAULT FALSE;",
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS converted_at TIMESTAMP WITHOUT TIME ZONE;",
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS message_sent BOOLEAN DEFAULT TRUE;",
+    "ALTER TABLE remarketing_logs ADD COLUMN IF NOT EXISTS campaign_id VARCHAR;",
+
+    # 3. MIGRAÇÃO DE DADOS: Se existir user_telegram_id, copia para user_id
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='remarketing_logs' AND column_name='user_telegram_id') THEN
+            UPDATE remarketing_logs SET user_id = CAST(user_telegram_id AS VARCHAR) WHERE user_id IS NULL;
+        END IF;
+    END $$;
+    """,
+
+    # ============================================================
+    # 🚀 [CORREÇÃO 13] TABELAS UPSELL E DOWNSELL
+    # ============================================================
+    """
+    CREATE TABLE IF NOT EXISTS upsell_config (
+        id SERIAL PRIMARY KEY,
+        bot_id INTEGER UNIQUE REFERENCES bots(id),
+        ativo BOOLEAN DEFAULT FALSE,
+        nome_produto VARCHAR,
+        preco FLOAT,
+        link_acesso VARCHAR,
+        delay_minutos INTEGER DEFAULT 2,
+        msg_texto TEXT DEFAULT '🔥 Oferta exclusiva para você!',
+        msg_media VARCHAR,
+        btn_aceitar VARCHAR DEFAULT '✅ QUERO ESSA OFERTA!',
+        btn_recusar VARCHAR DEFAULT '❌ NÃO, OBRIGADO',
+        autodestruir BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
+        updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS downsell_config (
+        id SERIAL PRIMARY KEY,
+        bot_id INTEGER UNIQUE REFERENCES bots(id),
+        ativo BOOLEAN DEFAULT FALSE,
+        nome_produto VARCHAR,
+        preco FLOAT,
+        link_acesso VARCHAR,
+        delay_minutos INTEGER DEFAULT 10,
+        msg_texto TEXT DEFAULT '🎁 Última chance! Oferta especial só para você!',
+        msg_media VARCHAR,
+        btn_aceitar VARCHAR DEFAULT '✅ QUERO ESSA OFERTA!',
+        btn_recusar VARCHAR DEFAULT '❌ NÃO, OBRIGADO',
+        autodestruir BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc'),
+        updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc')
+    );
+    """,
+
+    # ============================================================
+    # 📅 [CORREÇÃO 14a] REMARKETING AGENDADO
+    # ============================================================
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS is_scheduled BOOLEAN DEFAULT FALSE;",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_days INTEGER DEFAULT 1;",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_time VARCHAR DEFAULT '10:00';",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_end_date TIMESTAMP WITHOUT TIME ZONE;",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS days_config TEXT;",  # JSON: [{day:1, msg, media_url, plano_id, promo_price}, ...]
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS use_same_content BOOLEAN DEFAULT TRUE;",
+    "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_active BOOLEAN DEFAULT FALSE;",
+
+    # 🚨 [CORREÇÃO 14b] SISTEMA DE DENÚNCIAS
+    # ============================================================
+    """
+    CREATE TABLE IF NOT EXISTS reports (
+        id SERIAL PRIMARY KEY,
+        reporter_name VARCHAR(100),
+        reporter_telegram_id VARCHAR(50),
+        bot_username VARCHAR(100) NOT NULL,
+        bot_id INTEGER REFERENCES bots(id) ON DELETE SET NULL,
+        reason VARCHAR(50) NOT NULL,
+        description TEXT,
+        evidence_url VARCHAR(500),
+        status VARCHAR(20) DEFAULT 'pending',
+        resolution TEXT,
+        resolved_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+        resolved_at TIMESTAMP WITHOUT TIME ZONE,
+        action_taken VARCHAR(50),
+        strike_count INTEGER DEFAULT 0,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+        updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+        ip_address VARCHAR(50)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_strikes (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER REFERENCES users(id) ON DELETE CASCADE NOT NULL,
+        report_id INTEGER REFERENCES reports(id) ON DELETE SET NULL,
+        reason TEXT NOT NULL,
+        strike_number INTEGER NOT NULL,
+        action VARCHAR(50) NOT NULL,
+        pause_until TIMESTAMP WITHOUT TIME ZONE,
+        tax_increase_pct FLOAT,
+        applied_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
+    );
+    """,
+    # Coluna de strikes no users (para acesso rápido)
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS strike_count INTEGER DEFAULT 0;",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_banned BOOLEAN DEFAULT FALSE;",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS banned_reason TEXT;",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS bots_paused_until TIMESTAMP WITHOUT TIME ZONE;",
+    
+    # 🔥 [NOVO] COLUNAS V2: Identificação do Dono do Bot nas Denúncias
+    "ALTER TABLE reports ADD COLUMN IF NOT EXISTS owner_id INTEGER REFERENCES users(id) ON DELETE SET NULL;",
+    "ALTER TABLE reports ADD COLUMN IF NOT EXISTS owner_username VARCHAR(100);",
+]
+
+def executar_migracao_v11():
+    """
+    MIGRAÇÃO V11: Colunas e tabelas legadas (limites de plano, multi-gateway,
+    remarketing logs, upsell/downsell, remarketing agendado, denúncias).
+    Comandos idempotentes: erro de "já existe" é ignorado.
+    """
+    logger.info("🚀 [V11] Verificando integridade completa do banco (legado)...")
+    
+    falhas = 0
+    with engine.connect() as conn:
+        for cmd in COMANDOS_SQL:
+            try:
+                conn.execute(text(cmd))
+                conn.commit()
+            except Exception as e_sql:
+                conn.rollback()
+                # Ignora erro se a coluna já existir (segurança para não parar o deploy)
+                if "duplicate column" not in str(e_sql) and "already exists" not in str(e_sql):
+                    logger.warning(f"⚠️ [V11] Aviso SQL: {e_sql}")
+                    falhas += 1
+    
+    if falhas:
+        # Os comandos são idempotentes: o ledger tenta tudo de novo no próximo boot
+        raise RuntimeError(f"[V11] {falhas} comandos falharam")
+    logger.info("✅ [V11] Banco de dados 100% verificado!")
+
+if __name__ == "__main__":
+    executar_migracao_v11()
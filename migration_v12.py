@@ -0,0 +1,38 @@
+import logging
+from sqlalchemy import text
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# Busca de contatos (busca_contatos.py) sobre a projeção jornada_contatos
+INDICES_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_jornada_contatos_nome_trgm ON jornada_contatos USING gin (lower(first_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_jornada_contatos_username_trgm ON jornada_contatos USING gin (lower(username) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_jornada_contatos_telegram_trgm ON jornada_contatos USING gin (telegram_id gin_trgm_ops)",
+]
+
+# SQLite: LIKE 'termo%' usa índice quando a coluna é comparada com NOCASE
+INDICES_SQLITE = [
+    "CREATE INDEX IF NOT EXISTS ix_jornada_contatos_nome_prefixo ON jornada_contatos (first_name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS ix_jornada_contatos_username_prefixo ON jornada_contatos (username COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS ix_jornada_contatos_telegram_prefixo ON jornada_contatos (telegram_id COLLATE NOCASE)",
+]
+
+
+def executar_migracao_v12():
+    """
+    MIGRAÇÃO V12: Índices de busca de contatos por nome, @username e Telegram ID.
+    Postgres: extensão pg_trgm + índices GIN de trigramas. SQLite: índices de prefixo.
+    """
+    logger.info("🚀 [V12] Verificando índices de busca de contatos...")
+
+    with engine.connect() as conn:
+        comandos = INDICES_POSTGRES if conn.dialect.name == "postgresql" else INDICES_SQLITE
+        for cmd in comandos:
+            conn.execute(text(cmd))
+        conn.commit()
+    logger.info("✅ [V12] Índices de busca de contatos verificados/criados!")
+
+if __name__ == "__main__":
+    executar_migracao_v12()
@@ -0,0 +1,28 @@
+import logging
+from sqlalchemy import text
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# Listagem de auditoria (get_audit_logs) filtrada por usuário/ação e ordenada por data
+INDICES = [
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_user_created ON audit_logs (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_action_created ON audit_logs (action, created_at)",
+]
+
+
+def executar_migracao_v13():
+    """
+    MIGRAÇÃO V13: Índices compostos de audit_logs (usuário/ação + data), usados
+    pela listagem de auditoria e pela limpeza por retenção (auditoria.py).
+    """
+    logger.info("🚀 [V13] Verificando índices de audit_logs...")
+
+    with engine.connect() as conn:
+        for cmd in INDICES:
+            conn.execute(text(cmd))
+        conn.commit()
+    logger.info("✅ [V13] Índices de audit_logs verificados/criados!")
+
+if __name__ == "__main__":
+    executar_migracao_v13()
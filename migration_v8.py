@@ -29,7 +29,8 @@ def executar_migracao_v8():
                 
     except Exception as e:
         logger.error(f"❌ [V8] Erro crítico na migração: {e}")
-        # Não damos raise aqui para não travar o boot se for erro de permissão simples
+        # O ledger segura a exceção (o boot segue) e tenta de novo no próximo boot
+        raise
 
 if __name__ == "__main__":
     executar_migracao_v8()
\ No newline at end of file
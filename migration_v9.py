@@ -0,0 +1,27 @@
+import logging
+from sqlalchemy import text
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+def executar_migracao_v9():
+    """
+    MIGRAÇÃO V9: Índice composto em 'pedidos' para buscas por PIX pendente.
+    Usado pelo reaproveitamento de PIX (bot, usuário, status) e pelo escudo anti-curiosos.
+    """
+    logger.info("🚀 [V9] Verificando índice ix_pedidos_bot_telegram_status...")
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_pedidos_bot_telegram_status "
+                "ON pedidos (bot_id, telegram_id, status)"
+            ))
+            conn.commit()
+            logger.info("✅ [V9] Índice ix_pedidos_bot_telegram_status verificado/criado!")
+    except Exception as e:
+        logger.error(f"❌ [V9] Erro na migração: {e}")
+        raise
+
+if __name__ == "__main__":
+    executar_migracao_v9()
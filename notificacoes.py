@@ -0,0 +1,177 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import func, desc, text, bindparam, DateTime
+
+import invalidacao
+from database import Notification, NotificationBroadcast, NotificationRead, now_brazil
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 🔔 NOTIFICAÇÕES DO PAINEL (PESSOAIS + BROADCAST)
+# =========================================================
+# O broadcast do superadmin inseria uma linha de Notification por usuário
+# ativo numa única transação, e o sino fazia lista + COUNT de não lidas a
+# cada polling.
+#
+# - Broadcast: uma linha em notification_broadcasts. Cada usuário vê os
+#   criados depois do seu cadastro (como antes, só quem existia recebia), e o
+#   que foi criado até o seu cursor notification_reads.last_read_at conta
+#   como lido. Enviar para todos os vendedores é um INSERT.
+# - Pessoais (venda aprovada, bot pausado, denúncia...): continuam linhas em
+#   notifications com a flag read.
+# - Contador de não lidas: cache em memória por usuário, válido enquanto a
+#   geração do usuário (ENTIDADE, user_id) e a dos broadcasts não mudarem
+#   (barramento do invalidacao.py, chega às outras réplicas por NOTIFY). O TTL
+#   é só a rede de segurança para gravações que não chamam invalidar_usuario().
+#
+# Na lista, broadcasts aparecem com id negativo (-id) e "broadcast": True,
+# para a rota /api/notifications/{id}/read continuar recebendo um inteiro.
+
+ENTIDADE = "notificacoes"
+ENTIDADE_BROADCAST = "notificacoes_broadcast"
+NOTIFICACOES_CACHE_TTL = float(os.getenv("NOTIFICACOES_CACHE_TTL", "120"))
+
+_contadores = {}   # {user_id: (expira_em, geracoes, valor)}
+_lock = threading.Lock()
+
+_SQL_CURSOR = text("""
+INSERT INTO notification_reads (user_id, last_read_at) VALUES (:user_id, :lido_ate)
+ON CONFLICT (user_id) DO UPDATE SET last_read_at = excluded.last_read_at
+WHERE notification_reads.last_read_at < excluded.last_read_at
+""").bindparams(bindparam("lido_ate", type_=DateTime))  # Mesmo formato de data do ORM no SQLite
+
+
+def _geracoes(user_id) -> tuple:
+    return invalidacao.geracao(ENTIDADE, user_id), invalidacao.geracao(ENTIDADE_BROADCAST)
+
+
+def invalidar_usuario(user_id):
+    """Chamar depois do commit que cria/lê notificações pessoais do usuário."""
+    if user_id is None:
+        return
+    try:
+        invalidacao.publicar(ENTIDADE, user_id)
+    except Exception as e:
+        logger.error(f"❌ [NOTIFICAÇÕES] Falha ao invalidar contador do usuário {user_id}: {e}")
+
+
+def _sem_fuso(quando):
+    """Datas do banco vêm sem fuso; as recém-criadas (default now_brazil) vêm com."""
+    if quando is None:
+        return None
+    if quando.tzinfo is not None:
+        quando = quando.astimezone(now_brazil().tzinfo).replace(tzinfo=None)
+    return quando
+
+
+def _cursor(db, user_id):
+    return db.query(NotificationRead.last_read_at).filter(NotificationRead.user_id == user_id).scalar()
+
+
+def _filtro_broadcasts(query, usuario, lido_ate=None):
+    if usuario.created_at is not None:
+        query = query.filter(NotificationBroadcast.created_at >= _sem_fuso(usuario.created_at))
+    if lido_ate is not None:
+        query = query.filter(NotificationBroadcast.created_at > lido_ate)
+    return query
+
+
+def _contar(db, usuario) -> int:
+    pessoais = db.query(func.count(Notification.id)).filter(
+        Notification.user_id == usuario.id, Notification.read == False
+    ).scalar() or 0
+    broadcasts = _filtro_broadcasts(
+        db.query(func.count(NotificationBroadcast.id)), usuario, _cursor(db, usuario.id)
+    ).scalar() or 0
+    return int(pessoais) + int(broadcasts)
+
+
+def contar_nao_lidas(db, usuario) -> int:
+    """Não lidas (pessoais + broadcasts), servido do cache enquanto nada mudou."""
+    geracoes = _geracoes(usuario.id)
+    agora = time.monotonic()
+    with _lock:
+        entrada = _contadores.get(usuario.id)
+        if entrada and entrada[0] > agora and entrada[1] == geracoes:
+            return entrada[2]
+
+    valor = _contar(db, usuario)
+    with _lock:
+        # Se algo mudou durante a contagem, não guarda
+        if _geracoes(usuario.id) == geracoes:
+            _contadores[usuario.id] = (agora + NOTIFICACOES_CACHE_TTL, geracoes, valor)
+    return valor
+
+
+def listar(db, usuario, limite: int = 20) -> list:
+    """Últimas `limite` notificações (pessoais e broadcasts) do usuário, mais novas primeiro."""
+    pessoais = db.query(Notification).filter(
+        Notification.user_id == usuario.id
+    ).order_by(desc(Notification.created_at)).limit(limite).all()
+    broadcasts = _filtro_broadcasts(db.query(NotificationBroadcast), usuario).order_by(
+        desc(NotificationBroadcast.created_at)
+    ).limit(limite).all()
+    lido_ate = _sem_fuso(_cursor(db, usuario.id)) if broadcasts else None
+
+    itens = [{
+        "id": n.id, "user_id": n.user_id, "title": n.title, "message": n.message,
+        "type": n.type, "read": bool(n.read), "created_at": _sem_fuso(n.created_at), "broadcast": False,
+    } for n in pessoais]
+    itens += [{
+        "id": -b.id, "user_id": usuario.id, "title": b.title, "message": b.message,
+        "type": b.type, "read": lido_ate is not None and _sem_fuso(b.created_at) <= lido_ate,
+        "created_at": _sem_fuso(b.created_at), "broadcast": True,
+    } for b in broadcasts]
+
+    itens.sort(key=lambda n: n["created_at"] or datetime.min, reverse=True)
+    return itens[:limite]
+
+
+def _avancar_cursor(db, user_id, lido_ate):
+    db.execute(_SQL_CURSOR, {"user_id": user_id, "lido_ate": lido_ate})
+
+
+def marcar_todas_lidas(db, usuario):
+    db.query(Notification).filter(
+        Notification.user_id == usuario.id,
+        Notification.read == False
+    ).update({"read": True}, synchronize_session=False)
+    _avancar_cursor(db, usuario.id, now_brazil().replace(tzinfo=None))
+    db.commit()
+    invalidar_usuario(usuario.id)
+
+
+def marcar_lida(db, usuario, notif_id: int):
+    """Pessoal: marca a linha. Broadcast (id negativo): avança o cursor até ele (lê os anteriores também)."""
+    if notif_id < 0:
+        criado_em = db.query(NotificationBroadcast.created_at).filter(NotificationBroadcast.id == -notif_id).scalar()
+        if criado_em is None:
+            return
+        _avancar_cursor(db, usuario.id, _sem_fuso(criado_em))
+    else:
+        notif = db.query(Notification).filter(
+            Notification.id == notif_id,
+            Notification.user_id == usuario.id
+        ).first()
+        if not notif:
+            return
+        notif.read = True
+    db.commit()
+    invalidar_usuario(usuario.id)
+
+
+def enviar_broadcast(db, title: str, message: str, type: str = "info", criado_por: int = None) -> NotificationBroadcast:
+    """Grava o broadcast (uma linha) e invalida os contadores de todos."""
+    broadcast = NotificationBroadcast(title=title, message=message, type=type, criado_por=criado_por)
+    db.add(broadcast)
+    db.commit()
+    try:
+        invalidacao.publicar(ENTIDADE_BROADCAST)
+    except Exception as e:
+        logger.error(f"❌ [NOTIFICAÇÕES] Falha ao invalidar contadores do broadcast: {e}")
+    return broadcast
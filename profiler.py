@@ -0,0 +1,191 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import threading
+import functools
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 🔬 PROFILER POR AMOSTRAGEM (WEBHOOKS E JOBS)
+# =========================================================
+# Modo opt-in, ligado em runtime pelo superadmin. Uma fração das execuções
+# das funções decoradas com @amostrar é marcada; uma thread amostradora lê
+# a pilha de todas as threads a cada PROFILE_INTERVALO_MS e, quando a pilha
+# passa por uma execução marcada, soma a pilha ao agregado daquela função.
+#
+# Usamos amostragem de pilha em vez de cProfile porque os handlers são
+# coroutines: com várias requisições intercaladas no mesmo event loop o
+# cProfile mistura as chamadas de todas. Aqui só entram amostras em que o
+# frame da execução marcada está realmente na pilha (rodando, não aguardando).
+#
+# Saída: um arquivo "<nome>.folded" por função no formato "a;b;c N",
+# aceito direto pelo flamegraph.pl, speedscope e inferno.
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/zenyx_profiles")
+PROFILE_INTERVALO_MS = float(os.getenv("PROFILE_INTERVALO_MS", "10"))
+PROFILE_FRACAO_PADRAO = float(os.getenv("PROFILE_FRACAO", "0.05"))
+PROFILE_PROFUNDIDADE_MAX = 128
+
+_estado = {
+    "ativo": False,
+    "fracao": PROFILE_FRACAO_PADRAO,
+    "iniciado_em": None,
+    "execucoes_amostradas": Counter(),
+}
+
+_marcados = {}       # {frame do wrapper: nome}
+_agregado = {}       # {nome: Counter({"pilha;dobrada": amostras})}
+_lock = threading.Lock()
+_thread = None
+_parar = threading.Event()
+
+
+def _rotulo(frame) -> str:
+    codigo = frame.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+def _coletar_amostra():
+    with _lock:
+        if not _marcados:
+            return
+        marcados = dict(_marcados)
+
+    proprio = threading.get_ident()
+    for thread_id, frame in sys._current_frames().items():
+        if thread_id == proprio:
+            continue
+        pilha = []
+        nome = None
+        while frame is not None and len(pilha) < PROFILE_PROFUNDIDADE_MAX:
+            nome = marcados.get(frame)
+            if nome:
+                break
+            pilha.append(_rotulo(frame))
+            frame = frame.f_back
+        if not nome:
+            continue
+        dobrada = ";".join([nome] + list(reversed(pilha)))
+        with _lock:
+            _agregado.setdefault(nome, Counter())[dobrada] += 1
+
+
+def _loop_amostrador():
+    intervalo = PROFILE_INTERVALO_MS / 1000.0
+    while not _parar.wait(intervalo):
+        try:
+            _coletar_amostra()
+        except Exception as e:
+            logger.debug(f"🔬 [PROFILER] Falha ao amostrar: {e}")
+
+
+def _marcar(nome: str, frame):
+    with _lock:
+        _marcados[frame] = nome
+        _estado["execucoes_amostradas"][nome] += 1
+
+
+def _desmarcar(frame):
+    with _lock:
+        _marcados.pop(frame, None)
+
+
+def _sorteado() -> bool:
+    return _estado["ativo"] and random.random() < _estado["fracao"]
+
+
+def amostrar(nome: str):
+    """
+    Decorator para funções síncronas ou coroutines. Com o profiler desligado
+    o custo é uma checagem de booleano por chamada.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper_async(*args, **kwargs):
+                if not _sorteado():
+                    return await func(*args, **kwargs)
+                frame = sys._getframe()
+                _marcar(nome, frame)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _desmarcar(frame)
+            return wrapper_async
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _sorteado():
+                return func(*args, **kwargs)
+            frame = sys._getframe()
+            _marcar(nome, frame)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _desmarcar(frame)
+        return wrapper
+
+    return decorator
+
+
+def gravar_resultados() -> list:
+    """Escreve um .folded por função (agregado desde o início da sessão). Retorna os caminhos."""
+    with _lock:
+        copia = {nome: Counter(pilhas) for nome, pilhas in _agregado.items()}
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    arquivos = []
+    for nome, pilhas in copia.items():
+        caminho = os.path.join(PROFILE_DIR, f"{nome}.folded")
+        with open(caminho, "w", encoding="utf-8") as f:
+            for pilha, amostras in pilhas.most_common():
+                f.write(f"{pilha} {amostras}\n")
+        arquivos.append(caminho)
+    return arquivos
+
+
+def ligar(fracao: float = None):
+    """Inicia uma nova sessão de profiling (zera os agregados anteriores)."""
+    global _thread
+    with _lock:
+        _agregado.clear()
+        _estado["execucoes_amostradas"] = Counter()
+        if fracao is not None:
+            _estado["fracao"] = max(0.0, min(1.0, fracao))
+        _estado["iniciado_em"] = time.time()
+        _estado["ativo"] = True
+
+    if _thread is None or not _thread.is_alive():
+        _parar.clear()
+        _thread = threading.Thread(target=_loop_amostrador, name="zenyx-profiler", daemon=True)
+        _thread.start()
+    logger.info(f"🔬 [PROFILER] Ligado (fração {_estado['fracao']:.2%}, intervalo {PROFILE_INTERVALO_MS}ms)")
+
+
+def desligar() -> list:
+    """Para a amostragem e grava o resultado da sessão em disco."""
+    _estado["ativo"] = False
+    _parar.set()
+    arquivos = gravar_resultados()
+    logger.info(f"🔬 [PROFILER] Desligado. Arquivos: {arquivos}")
+    return arquivos
+
+
+def status() -> dict:
+    with _lock:
+        amostras = {nome: sum(pilhas.values()) for nome, pilhas in _agregado.items()}
+        execucoes = dict(_estado["execucoes_amostradas"])
+    return {
+        "ativo": _estado["ativo"],
+        "fracao": _estado["fracao"],
+        "intervalo_ms": PROFILE_INTERVALO_MS,
+        "iniciado_em": _estado["iniciado_em"],
+        "diretorio": PROFILE_DIR,
+        "execucoes_amostradas": execucoes,
+        "amostras_de_pilha": amostras,
+    }
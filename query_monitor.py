@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import functools
+import contextvars
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 🐢 SLOW-QUERY LOG E ORÇAMENTO DE QUERIES POR REQUISIÇÃO/JOB
+# =========================================================
+# Handlers como receber_update_telegram e list_all_users fazem dezenas de
+# queries (muitas N+1) e ninguém percebe até o pool estourar o timeout.
+# Os hooks do SQLAlchemy abaixo contam queries e tempo de banco no contexto
+# atual (requisição HTTP ou job do scheduler) e logam as lentas com a origem.
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# Headers X-DB-Queries / X-DB-Time nas respostas (só ligar em debug)
+DB_DEBUG_HEADERS = os.getenv("DB_DEBUG_HEADERS", "false").lower() == "true"
+# Estourar o orçamento vira HTTP 500 (para CI/homologação). Em produção só loga.
+DB_ORCAMENTO_ESTRITO = os.getenv("DB_ORCAMENTO_ESTRITO", "false").lower() == "true"
+# Orçamento padrão para rotas sem declaração (0 = sem limite)
+DB_ORCAMENTO_PADRAO = int(os.getenv("DB_ORCAMENTO_PADRAO", "0"))
+
+_SQL_MAX_LOG = 500
+
+
+class EstatisticasDB:
+    """Queries e tempo de banco acumulados em uma requisição ou job."""
+
+    __slots__ = ("_origem", "escopo", "queries", "tempo", "lentas")
+
+    def __init__(self, origem: str, escopo: dict = None):
+        self._origem = origem
+        self.escopo = escopo
+        self.queries = 0
+        self.tempo = 0.0
+        self.lentas = 0
+
+    @property
+    def origem(self) -> str:
+        # Em requisições HTTP usa a rota TEMPLADA (nunca a URL crua com o token do bot)
+        if self.escopo is not None:
+            rota = self.escopo.get("route")
+            if rota is not None and getattr(rota, "path", None):
+                return f"{self.escopo.get('method', '')} {rota.path}".strip()
+        return self._origem
+
+
+class OrcamentoExcedido(Exception):
+    """Levantada por medir_queries(orcamento=...) quando o limite é ultrapassado."""
+
+
+_contexto = contextvars.ContextVar("zenyx_db_stats", default=None)
+
+# {rota templada: máximo de queries}, preenchido com declarar_orcamento()
+_orcamentos = {}
+# Rotas em que estourar o orçamento só loga, mesmo com DB_ORCAMENTO_ESTRITO
+_somente_log = set()
+
+
+def declarar_orcamento(rota: str, max_queries: int, estrito: bool = True):
+    """
+    Declara quantas queries uma rota pode fazer (ex: "/webhook/{token}").
+    estrito=False para webhooks: a resposta sai depois de o update já ter sido
+    processado, e um 500 faria o remetente reentregar o mesmo update.
+    """
+    _orcamentos[rota] = max_queries
+    if estrito:
+        _somente_log.discard(rota)
+    else:
+        _somente_log.add(rota)
+
+
+def orcamento_estrito(rota: str) -> bool:
+    """Se estourar o orçamento desta rota deve virar HTTP 500 agora."""
+    return DB_ORCAMENTO_ESTRITO and rota not in _somente_log
+
+
+def orcamento_da_rota(rota: str) -> int:
+    return _orcamentos.get(rota, DB_ORCAMENTO_PADRAO)
+
+
+def estatisticas_atuais():
+    return _contexto.get()
+
+
+def _local_da_chamada() -> str:
+    """Primeiro frame fora do SQLAlchemy/stdlib: quem disparou a query."""
+    frame = sys._getframe(2)
+    while frame:
+        arquivo = frame.f_code.co_filename
+        if (
+            "sqlalchemy" not in arquivo
+            and "site-packages" not in arquivo
+            and not arquivo.endswith("query_monitor.py")
+            and not arquivo.startswith(sys.prefix)
+        ):
+            return f"{os.path.basename(arquivo)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "desconhecido"
+
+
+def _antes_execucao(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("zenyx_inicio", []).append(time.perf_counter())
+
+
+def _depois_execucao(conn, cursor, statement, parameters, context, executemany):
+    pilha = conn.info.get("zenyx_inicio")
+    if not pilha:
+        return
+    duracao = time.perf_counter() - pilha.pop()
+
+    stats = _contexto.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.tempo += duracao
+
+    if duracao * 1000 >= SLOW_QUERY_MS:
+        if stats is not None:
+            stats.lentas += 1
+        origem = stats.origem if stats is not None else "fora de requisição"
+        sql = " ".join(statement.split())[:_SQL_MAX_LOG]
+        logger.warning(
+            f"🐢 [SLOW QUERY] {duracao * 1000:.0f}ms | origem={origem} | "
+            f"local={_local_da_chamada()} | {sql}"
+        )
+
+
+def instalar_hooks(engine):
+    """Registra os listeners de execução no engine (idempotente)."""
+    if event.contains(engine, "before_cursor_execute", _antes_execucao):
+        return
+    event.listen(engine, "before_cursor_execute", _antes_execucao)
+    event.listen(engine, "after_cursor_execute", _depois_execucao)
+
+
+@contextmanager
+def medir_queries(origem: str, orcamento: int = 0):
+    """
+    Abre um contexto de contagem. Uso em jobs, scripts e testes:
+
+        with medir_queries("teste_overview", orcamento=10) as stats:
+            get_all_bots_overview(...)
+
+    Com orcamento > 0, levanta OrcamentoExcedido ao sair se o limite foi ultrapassado.
+    """
+    stats = EstatisticasDB(origem)
+    token = _contexto.set(stats)
+    try:
+        yield stats
+    finally:
+        _contexto.reset(token)
+    if orcamento and stats.queries > orcamento:
+        raise OrcamentoExcedido(f"{origem}: {stats.queries} queries (orçamento {orcamento})")
+
+
+def iniciar_requisicao(escopo: dict) -> tuple:
+    """Para o middleware HTTP: retorna (stats, token) a ser finalizado com encerrar()."""
+    stats = EstatisticasDB(f"{escopo.get('method', '')} (rota não resolvida)", escopo)
+    return stats, _contexto.set(stats)
+
+
+def encerrar(token):
+    _contexto.reset(token)
+
+
+def medir_job(nome: str):
+    """
+    Decorator para jobs do scheduler: conta queries/tempo da execução
+    e loga um resumo quando houve query lenta.
+    """
+    def decorator(func):
+        def _resumo(stats):
+            if stats.lentas:
+                logger.warning(
+                    f"🐢 [JOB DB] {nome}: {stats.queries} queries, "
+                    f"{stats.tempo * 1000:.0f}ms de banco, {stats.lentas} lentas"
+                )
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper_async(*args, **kwargs):
+                with medir_queries(f"job:{nome}") as stats:
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        _resumo(stats)
+            return wrapper_async
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with medir_queries(f"job:{nome}") as stats:
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    _resumo(stats)
+        return wrapper
+
+    return decorator
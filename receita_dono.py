@@ -0,0 +1,143 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, extract, insert, select, text, tuple_
+
+from database import SessionLocal, ReceitaMensalDono, Pedido, Bot, User, now_brazil
+from estatisticas_sql import STATUS_APROVADOS
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 🏆 RECEITA MENSAL POR DONO (MATERIALIZADA)
+# =========================================================
+# O ranking somava User → Bot → Pedido de todos os vendedores a cada request,
+# e Recursos Prime / Clonador de Funil carregavam todos os pedidos do usuário
+# para calcular o faturamento da vida inteira.
+#
+# A tabela receita_mensal_dono guarda (dono, ano, mês) → vendas e valor:
+# - registrar_venda() soma a venda no mês dela assim que o pedido é aprovado
+#   (um INSERT ... ON CONFLICT DO UPDATE, atômico entre workers);
+# - reconciliar() recalcula a partir dos pedidos com um INSERT ... SELECT
+#   agrupado. O job periódico refaz os dois últimos meses (pega estornos,
+#   expirações e incrementos perdidos) e uma vez por dia refaz tudo.
+#
+# As leituras (ranking, faturamento do dono) são somas indexadas sobre
+# poucas linhas por dono. A venda conta no mês de data_aprovacao; pedidos
+# aprovados sem ela (legado do /api/webhook) contam no mês de created_at,
+# como já contavam em Recursos Prime e no Clonador de Funil.
+
+_TABELA = ReceitaMensalDono.__tablename__
+
+_SQL_INCREMENTAR = f"""
+INSERT INTO {_TABELA} (owner_id, ano, mes, vendas, valor, atualizado_em)
+SELECT owner_id, :ano, :mes, 1, :valor, :agora FROM bots WHERE id = :bot_id AND owner_id IS NOT NULL
+ON CONFLICT (owner_id, ano, mes) DO UPDATE SET
+    vendas = {_TABELA}.vendas + excluded.vendas,
+    valor = {_TABELA}.valor + excluded.valor,
+    atualizado_em = excluded.atualizado_em
+"""
+
+
+def _data_venda(pedido):
+    return pedido.data_aprovacao or pedido.created_at
+
+
+def registrar_venda(db, pedido):
+    """Soma o pedido recém-aprovado no mês da venda (data_aprovacao, ou created_at) do dono do bot."""
+    quando = _data_venda(pedido) if pedido else None
+    if not pedido or not pedido.bot_id or not quando:
+        return
+    try:
+        db.execute(text(_SQL_INCREMENTAR), {
+            "ano": quando.year,
+            "mes": quando.month,
+            "valor": float(pedido.valor or 0),
+            "agora": now_brazil().replace(tzinfo=None),
+            "bot_id": pedido.bot_id,
+        })
+        db.commit()
+    except Exception as e:
+        # A reconciliação periódica corrige o mês
+        db.rollback()
+        logger.error(f"❌ [RECEITA] Falha ao registrar venda do pedido {pedido.id}: {e}")
+
+
+def reconciliar(db, desde: datetime = None) -> int:
+    """
+    Recalcula o resumo a partir dos pedidos (tudo, ou só os meses a partir de
+    `desde`) numa transação: apaga os meses e regrava com INSERT ... SELECT.
+    Retorna quantas linhas (dono, mês) foram gravadas.
+    """
+    data_venda = func.coalesce(Pedido.data_aprovacao, Pedido.created_at)
+    ano = extract('year', data_venda)
+    mes = extract('month', data_venda)
+    origem = select(
+        Bot.owner_id, ano, mes,
+        func.count(Pedido.id), func.coalesce(func.sum(Pedido.valor), 0), func.now(),
+    ).join(Bot, Pedido.bot_id == Bot.id).where(
+        Pedido.status.in_(STATUS_APROVADOS),
+        data_venda != None,
+        Bot.owner_id != None,
+    ).group_by(Bot.owner_id, ano, mes)
+
+    apagar = db.query(ReceitaMensalDono)
+    if desde is not None:
+        inicio = datetime(desde.year, desde.month, 1)
+        origem = origem.where(data_venda >= inicio)
+        apagar = apagar.filter(
+            tuple_(ReceitaMensalDono.ano, ReceitaMensalDono.mes) >= tuple_(inicio.year, inicio.month)
+        )
+
+    try:
+        apagar.delete(synchronize_session=False)
+        resultado = db.execute(insert(ReceitaMensalDono).from_select(
+            ["owner_id", "ano", "mes", "vendas", "valor", "atualizado_em"], origem
+        ))
+        db.commit()
+        return resultado.rowcount or 0
+    except Exception:
+        db.rollback()
+        raise
+
+
+def reconciliar_job(completo: bool = False):
+    """Job do scheduler: dois últimos meses (ou tudo, se `completo` ou tabela vazia)."""
+    db = SessionLocal()
+    try:
+        desde = None
+        if not completo and db.query(ReceitaMensalDono.id).first() is not None:
+            agora = now_brazil()
+            desde = datetime(agora.year - 1, 12, 1) if agora.month == 1 else datetime(agora.year, agora.month - 1, 1)
+        linhas = reconciliar(db, desde)
+        logger.info(f"🏆 [RECEITA] Resumo mensal reconciliado ({'completo' if desde is None else 'desde ' + desde.strftime('%m/%Y')}): {linhas} linhas")
+    except Exception as e:
+        logger.error(f"❌ [RECEITA] Erro na reconciliação: {e}")
+    finally:
+        db.close()
+
+
+def ranking(db, mes: int = 0, ano: int = 0, limite: int = 10) -> list:
+    """Top vendedores (exceto superadmins) por valor; mes/ano = 0 somam todos os meses/anos."""
+    total_valor = func.sum(ReceitaMensalDono.valor)
+    query = db.query(
+        User.username,
+        total_valor.label("total_faturado"),
+        func.sum(ReceitaMensalDono.vendas).label("total_vendas"),
+    ).join(User, User.id == ReceitaMensalDono.owner_id).filter(User.is_superuser == False)
+
+    if mes and 1 <= mes <= 12:
+        query = query.filter(ReceitaMensalDono.mes == mes)
+    if ano and ano >= 2020:
+        query = query.filter(ReceitaMensalDono.ano == ano)
+
+    return query.group_by(User.id, User.username).order_by(total_valor.desc()).limit(limite).all()
+
+
+def faturamento_dono(db, owner_id) -> tuple:
+    """(vendas, valor em reais) da vida inteira do dono."""
+    vendas, valor = db.query(
+        func.coalesce(func.sum(ReceitaMensalDono.vendas), 0),
+        func.coalesce(func.sum(ReceitaMensalDono.valor), 0),
+    ).filter(ReceitaMensalDono.owner_id == owner_id).one()
+    return int(vendas or 0), float(valor or 0)
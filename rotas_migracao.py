@@ -0,0 +1,1879 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import get_db, SystemConfig
+from migration_ledger import migracao_unica
+
+# =========================================================
+# 🔧 ROTAS DE MIGRAÇÃO MANUAL (/migrate-*, fix-*)
+# =========================================================
+# Saíram do main.py: são ~1.7k linhas de SQL que rodam uma única vez
+# (via ledger, no boot) e não precisam de nada do main além do get_db.
+# O main só faz app.include_router(router).
+#
+# O import NÃO é lazy, de propósito: os @migracao_unica abaixo se registram no
+# ledger no import e precisam estar lá antes do startup_event. O ganho desta
+# separação é de organização do main.py, não de tempo de boot (~7ms).
+
+router = APIRouter()
+
+
+# =========================================================
+# 🛠️ FIX DATABASE: CRIAR COLUNA FALTANTE
+# =========================================================
+@router.get("/api/admin/fix-lead-column")
+@migracao_unica("rota_fix-lead-column")
+def fix_lead_column_db(db: Session = Depends(get_db)):
+    try:
+        # Comando SQL direto para criar a coluna se não existir
+        db.execute(text("ALTER TABLE leads ADD COLUMN IF NOT EXISTS expiration_date TIMESTAMP"))
+        db.commit()
+        return {"status": "sucesso", "msg": "Coluna 'expiration_date' criada na tabela 'leads'!"}
+    except Exception as e:
+        return {"status": "erro", "msg": str(e)}
+
+
+# =========================================================
+# 🛠️ FIX FINAL: CRIAR COLUNAS QUE FALTAM (PHONE E EXPIRATION)
+# =========================================================
+@router.get("/api/admin/fix-database-structure")
+@migracao_unica("rota_fix-database-structure")
+def fix_database_structure(db: Session = Depends(get_db)):
+    try:
+        # 1. Cria a coluna PHONE (que está causando o erro agora)
+        db.execute(text("ALTER TABLE leads ADD COLUMN IF NOT EXISTS phone VARCHAR"))
+        
+        # 2. Cria a coluna EXPIRATION_DATE (para garantir o vitalício)
+        db.execute(text("ALTER TABLE leads ADD COLUMN IF NOT EXISTS expiration_date TIMESTAMP"))
+        
+        db.commit()
+        
+        return {
+            "status": "sucesso", 
+            "msg": "✅ Colunas 'phone' e 'expiration_date' criadas com sucesso na tabela LEADS!"
+        }
+    except Exception as e:
+        db.rollback()
+        return {"status": "erro", "msg": str(e)}
+
+
+# ============================================================
+# 🔧 ROTA DE MIGRAÇÃO - ADICIONAR COLUNAS FALTANTES
+# ============================================================
+@router.get("/migrate-button-fields")
+@migracao_unica("rota_migrate-button-fields")
+async def migrate_button_fields(db: Session = Depends(get_db)):
+    """
+    🔥 Migração Manual: Adiciona as novas colunas do sistema de botões personalizados
+    Acesse: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-button-fields
+    """
+    try:
+        from sqlalchemy import text
+        
+        resultados = []
+        
+        # 1. Adicionar coluna button_mode
+        try:
+            db.execute(text("""
+                ALTER TABLE bot_flows 
+                ADD COLUMN button_mode VARCHAR(20) DEFAULT 'next_step';
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'button_mode' criada com sucesso!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'button_mode' já existe")
+            else:
+                resultados.append(f"❌ Erro ao criar 'button_mode': {str(e)}")
+        
+        # 2. Adicionar coluna buttons_config_2
+        try:
+            db.execute(text("""
+                ALTER TABLE bot_flows 
+                ADD COLUMN buttons_config_2 JSON DEFAULT '[]'::json;
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'buttons_config_2' criada com sucesso!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'buttons_config_2' já existe")
+            else:
+                resultados.append(f"❌ Erro ao criar 'buttons_config_2': {str(e)}")
+        
+        # 3. Verificar se buttons_config existe (deveria já existir)
+        try:
+            db.execute(text("SELECT buttons_config FROM bot_flows LIMIT 1;"))
+            resultados.append("✅ Coluna 'buttons_config' já existe")
+        except Exception as e:
+            # Se não existir, criar
+            try:
+                db.execute(text("""
+                    ALTER TABLE bot_flows 
+                    ADD COLUMN buttons_config JSON DEFAULT '[]'::json;
+                """))
+                db.commit()
+                resultados.append("✅ Coluna 'buttons_config' criada com sucesso!")
+            except Exception as e2:
+                db.rollback()
+                resultados.append(f"❌ Erro ao criar 'buttons_config': {str(e2)}")
+        
+        # 4. Atualizar valores NULL para defaults
+        try:
+            db.execute(text("""
+                UPDATE bot_flows 
+                SET button_mode = 'next_step' 
+                WHERE button_mode IS NULL;
+            """))
+            db.execute(text("""
+                UPDATE bot_flows 
+                SET buttons_config = '[]'::json 
+                WHERE buttons_config IS NULL;
+            """))
+            db.execute(text("""
+                UPDATE bot_flows 
+                SET buttons_config_2 = '[]'::json 
+                WHERE buttons_config_2 IS NULL;
+            """))
+            db.commit()
+            resultados.append("✅ Valores NULL atualizados para defaults")
+        except Exception as e:
+            db.rollback()
+            resultados.append(f"⚠️ Aviso ao atualizar NULLs: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "Migração concluída!",
+            "resultados": resultados
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"Erro geral na migração: {str(e)}",
+            "detalhes": str(e)
+        }
+
+
+# ============================================================
+# 🔧 ROTA DE MIGRAÇÃO - ADICIONAR COLUNA max_duration_minutes
+# ============================================================
+@router.get("/migrate-alternating-duration")
+@migracao_unica("rota_migrate-alternating-duration")
+async def migrate_alternating_duration(db: Session = Depends(get_db)):
+    """
+    🔥 Migração Manual: Adiciona a coluna max_duration_minutes na tabela alternating_messages
+    Acesse: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-alternating-duration
+    """
+    try:
+        from sqlalchemy import text
+        
+        resultados = []
+        
+        # 1. Adicionar coluna max_duration_minutes
+        try:
+            db.execute(text("""
+                ALTER TABLE alternating_messages 
+                ADD COLUMN max_duration_minutes INTEGER DEFAULT 60;
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'max_duration_minutes' criada com sucesso!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'max_duration_minutes' já existe")
+            else:
+                resultados.append(f"❌ Erro ao criar 'max_duration_minutes': {str(e)}")
+        
+        # 2. Adicionar coluna last_message_auto_destruct (se não existir)
+        try:
+            db.execute(text("""
+                ALTER TABLE alternating_messages 
+                ADD COLUMN last_message_auto_destruct BOOLEAN DEFAULT FALSE;
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'last_message_auto_destruct' criada com sucesso!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'last_message_auto_destruct' já existe")
+            else:
+                resultados.append(f"❌ Erro ao criar 'last_message_auto_destruct': {str(e)}")
+        
+        # 3. Adicionar coluna last_message_destruct_seconds (se não existir)
+        try:
+            db.execute(text("""
+                ALTER TABLE alternating_messages 
+                ADD COLUMN last_message_destruct_seconds INTEGER DEFAULT 60;
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'last_message_destruct_seconds' criada com sucesso!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'last_message_destruct_seconds' já existe")
+            else:
+                resultados.append(f"❌ Erro ao criar 'last_message_destruct_seconds': {str(e)}")
+        
+        # 4. Atualizar valores NULL para defaults
+        try:
+            db.execute(text("""
+                UPDATE alternating_messages 
+                SET max_duration_minutes = 60 
+                WHERE max_duration_minutes IS NULL;
+            """))
+            db.execute(text("""
+                UPDATE alternating_messages 
+                SET last_message_auto_destruct = FALSE 
+                WHERE last_message_auto_destruct IS NULL;
+            """))
+            db.execute(text("""
+                UPDATE alternating_messages 
+                SET last_message_destruct_seconds = 60 
+                WHERE last_message_destruct_seconds IS NULL;
+            """))
+            db.commit()
+            resultados.append("✅ Valores NULL atualizados para defaults")
+        except Exception as e:
+            db.rollback()
+            resultados.append(f"⚠️ Aviso ao atualizar NULLs: {str(e)}")
+        
+        # 5. Verificar estrutura final
+        try:
+            resultado = db.execute(text("""
+                SELECT column_name, data_type, column_default 
+                FROM information_schema.columns 
+                WHERE table_name = 'alternating_messages' 
+                AND column_name IN ('max_duration_minutes', 'last_message_auto_destruct', 'last_message_destruct_seconds')
+                ORDER BY column_name;
+            """))
+            colunas = resultado.fetchall()
+            
+            if colunas:
+                resultados.append("📊 Estrutura final verificada:")
+                for col in colunas:
+                    resultados.append(f"   - {col[0]}: {col[1]} (default: {col[2]})")
+            else:
+                resultados.append("⚠️ Não foi possível verificar a estrutura final")
+                
+        except Exception as e:
+            resultados.append(f"⚠️ Erro ao verificar estrutura: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "✅ Migração concluída!",
+            "resultados": resultados
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro geral na migração: {str(e)}",
+            "detalhes": str(e)
+        }
+
+
+# ============================================================
+# 🔧 ROTA DE MIGRAÇÃO - GRUPOS E CANAIS (FASE 1 + FASE 2)
+# ============================================================
+@router.get("/migrate-bot-groups")
+@migracao_unica("rota_migrate-bot-groups")
+async def migrate_bot_groups(db: Session = Depends(get_db)):
+    """
+    🔥 Migração Manual: Cria a tabela bot_groups e adiciona colunas group_id
+    nas tabelas de ofertas (order_bump_config, upsell_config, downsell_config).
+    Acesse: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-bot-groups
+    """
+    try:
+        from sqlalchemy import text
+        
+        resultados = []
+        
+        # 1. Criar tabela bot_groups
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS bot_groups (
+                    id SERIAL PRIMARY KEY,
+                    bot_id INTEGER NOT NULL REFERENCES bots(id) ON DELETE CASCADE,
+                    owner_id INTEGER NOT NULL REFERENCES users(id),
+                    title VARCHAR NOT NULL,
+                    group_id VARCHAR NOT NULL,
+                    link VARCHAR,
+                    plan_ids JSON DEFAULT '[]'::json,
+                    is_active BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    updated_at TIMESTAMP DEFAULT NOW()
+                );
+            """))
+            db.commit()
+            resultados.append("✅ Tabela 'bot_groups' criada com sucesso!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower():
+                resultados.append("ℹ️ Tabela 'bot_groups' já existe")
+            else:
+                resultados.append(f"❌ Erro ao criar tabela 'bot_groups': {str(e)}")
+        
+        # 2. Criar índices
+        try:
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_bot_groups_bot_id ON bot_groups(bot_id);"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_bot_groups_owner_id ON bot_groups(owner_id);"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_bot_groups_is_active ON bot_groups(is_active);"))
+            db.commit()
+            resultados.append("✅ Índices criados com sucesso!")
+        except Exception as e:
+            db.rollback()
+            resultados.append(f"⚠️ Índices: {str(e)}")
+        
+        # 3. Adicionar coluna group_id na order_bump_config
+        try:
+            db.execute(text("""
+                ALTER TABLE order_bump_config 
+                ADD COLUMN group_id INTEGER REFERENCES bot_groups(id) ON DELETE SET NULL;
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'group_id' adicionada em order_bump_config!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'group_id' já existe em order_bump_config")
+            else:
+                resultados.append(f"❌ Erro order_bump_config: {str(e)}")
+        
+        # 4. Adicionar coluna group_id na upsell_config
+        try:
+            db.execute(text("""
+                ALTER TABLE upsell_config 
+                ADD COLUMN group_id INTEGER REFERENCES bot_groups(id) ON DELETE SET NULL;
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'group_id' adicionada em upsell_config!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'group_id' já existe em upsell_config")
+            else:
+                resultados.append(f"❌ Erro upsell_config: {str(e)}")
+        
+        # 5. Adicionar coluna group_id na downsell_config
+        try:
+            db.execute(text("""
+                ALTER TABLE downsell_config 
+                ADD COLUMN group_id INTEGER REFERENCES bot_groups(id) ON DELETE SET NULL;
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'group_id' adicionada em downsell_config!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'group_id' já existe em downsell_config")
+            else:
+                resultados.append(f"❌ Erro downsell_config: {str(e)}")
+        
+        # 6. Verificar estrutura final
+        try:
+            resultado = db.execute(text("""
+                SELECT table_name, column_name, data_type 
+                FROM information_schema.columns 
+                WHERE (table_name = 'bot_groups')
+                OR (table_name IN ('order_bump_config', 'upsell_config', 'downsell_config') AND column_name = 'group_id')
+                ORDER BY table_name, column_name;
+            """))
+            colunas = resultado.fetchall()
+            
+            if colunas:
+                resultados.append("📊 Estrutura verificada:")
+                for col in colunas:
+                    resultados.append(f"   - {col[0]}.{col[1]}: {col[2]}")
+        except Exception as e:
+            resultados.append(f"⚠️ Erro ao verificar estrutura: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "✅ Migração Grupos e Canais concluída!",
+            "resultados": resultados
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro geral na migração: {str(e)}",
+            "detalhes": str(e)
+        }
+
+
+# ============================================================
+# 🔧 ROTA DE MIGRAÇÃO - CANAL DE NOTIFICAÇÕES
+# ============================================================
+@router.get("/migrate-canal-notificacao")
+@migracao_unica("rota_migrate-canal-notificacao")
+async def migrate_canal_notificacao(db: Session = Depends(get_db)):
+    """
+    Migração: Adiciona coluna id_canal_notificacao na tabela bots.
+    Acesse: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-canal-notificacao
+    """
+    try:
+        from sqlalchemy import text
+        
+        resultados = []
+        
+        # 1. Adicionar coluna id_canal_notificacao
+        try:
+            db.execute(text("""
+                ALTER TABLE bots 
+                ADD COLUMN id_canal_notificacao VARCHAR;
+            """))
+            db.commit()
+            resultados.append("✅ Coluna 'id_canal_notificacao' criada com sucesso!")
+        except Exception as e:
+            db.rollback()
+            if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                resultados.append("ℹ️ Coluna 'id_canal_notificacao' já existe")
+            else:
+                resultados.append(f"❌ Erro: {str(e)}")
+        
+        # 2. Verificar
+        try:
+            resultado = db.execute(text("""
+                SELECT column_name, data_type 
+                FROM information_schema.columns 
+                WHERE table_name = 'bots' AND column_name = 'id_canal_notificacao';
+            """))
+            cols = resultado.fetchall()
+            if cols:
+                resultados.append(f"✅ Verificado: bots.{cols[0][0]} ({cols[0][1]})")
+            else:
+                resultados.append("⚠️ Coluna não encontrada após migração")
+        except Exception as e:
+            resultados.append(f"⚠️ Erro ao verificar: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "✅ Migração Canal de Notificações concluída!",
+            "resultados": resultados
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro geral: {str(e)}",
+            "detalhes": str(e)
+        }
+
+
+# ============================================================
+# 🔧 MIGRAÇÃO: MULTI-GATEWAY (WIINPAY + CONTINGÊNCIA + SYNC PAY)
+# ============================================================
+@router.get("/migrate-multi-gateway")
+@migracao_unica("rota_migrate-multi-gateway")
+async def migrate_multi_gateway(db: Session = Depends(get_db)):
+    """
+    Migração: Adiciona todas as colunas do sistema multi-gateway.
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-multi-gateway
+    """
+    try:
+        from sqlalchemy import text
+        
+        resultados = []
+        
+        comandos = [
+            # --- GATEWAYS EXISTENTES ---
+            ("bots", "wiinpay_api_key", "ALTER TABLE bots ADD COLUMN wiinpay_api_key VARCHAR;"),
+            ("bots", "gateway_principal", "ALTER TABLE bots ADD COLUMN gateway_principal VARCHAR DEFAULT 'pushinpay';"),
+            ("bots", "gateway_fallback", "ALTER TABLE bots ADD COLUMN gateway_fallback VARCHAR;"),
+            ("bots", "pushinpay_ativo", "ALTER TABLE bots ADD COLUMN pushinpay_ativo BOOLEAN DEFAULT FALSE;"),
+            ("bots", "wiinpay_ativo", "ALTER TABLE bots ADD COLUMN wiinpay_ativo BOOLEAN DEFAULT FALSE;"),
+            ("users", "wiinpay_user_id", "ALTER TABLE users ADD COLUMN wiinpay_user_id VARCHAR;"),
+            ("pedidos", "gateway_usada", "ALTER TABLE pedidos ADD COLUMN gateway_usada VARCHAR;"),
+            
+            # --- NOVA GATEWAY: SYNC PAY ---
+            ("users", "syncpay_client_id", "ALTER TABLE users ADD COLUMN syncpay_client_id VARCHAR;"),
+            ("bots", "syncpay_client_id", "ALTER TABLE bots ADD COLUMN syncpay_client_id VARCHAR;"),
+            ("bots", "syncpay_client_secret", "ALTER TABLE bots ADD COLUMN syncpay_client_secret VARCHAR;"),
+            ("bots", "syncpay_access_token", "ALTER TABLE bots ADD COLUMN syncpay_access_token VARCHAR;"),
+            ("bots", "syncpay_token_expires_at", "ALTER TABLE bots ADD COLUMN syncpay_token_expires_at TIMESTAMP;"),
+            ("bots", "syncpay_ativo", "ALTER TABLE bots ADD COLUMN syncpay_ativo BOOLEAN DEFAULT FALSE;")
+        ]
+        
+        for tabela, coluna, sql in comandos:
+            try:
+                db.execute(text(sql))
+                db.commit()
+                resultados.append(f"✅ {tabela}.{coluna} criada com sucesso!")
+            except Exception as e:
+                db.rollback()
+                if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                    resultados.append(f"ℹ️ {tabela}.{coluna} já existe")
+                else:
+                    resultados.append(f"❌ {tabela}.{coluna}: {str(e)}")
+        
+        # Verificação final (AGORA COM SYNC PAY INCLUÍDA!)
+        try:
+            check = db.execute(text("""
+                SELECT column_name FROM information_schema.columns 
+                WHERE table_name = 'bots' AND column_name IN 
+                ('wiinpay_api_key', 'gateway_principal', 'gateway_fallback', 'pushinpay_ativo', 'wiinpay_ativo', 
+                 'syncpay_client_id', 'syncpay_client_secret', 'syncpay_access_token', 'syncpay_ativo')
+            """))
+            cols_bots = [r[0] for r in check.fetchall()]
+            resultados.append(f"✅ Verificação bots: {cols_bots}")
+        except:
+            pass
+        
+        return {
+            "status": "success",
+            "message": "✅ Migração Multi-Gateway concluída!",
+            "resultados": resultados
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro geral: {str(e)}",
+            "detalhes": str(e)
+        }
+
+
+# ============================================================
+# 🔧 MIGRAÇÃO: MINI APP V2 (SEPARADORES E PAGINAÇÃO)
+# ============================================================
+@router.get("/migrate-miniapp-v2")
+@migracao_unica("rota_migrate-miniapp-v2")
+async def migrate_miniapp_v2(db: Session = Depends(get_db)):
+    """
+    Migração EXCLUSIVA para as novas colunas do Mini App.
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-miniapp-v2
+    """
+    try:
+        from sqlalchemy import text
+        resultados = []
+        
+        # Lista EXCLUSIVA das colunas do Mini App (Atualizada com Cores de Texto e NEON)
+        comandos_miniapp = [
+            ("miniapp_categories", "items_per_page", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS items_per_page INTEGER DEFAULT NULL;"),
+            ("miniapp_categories", "separator_enabled", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_enabled BOOLEAN DEFAULT FALSE;"),
+            ("miniapp_categories", "separator_color", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_color VARCHAR DEFAULT '#333333';"),
+            ("miniapp_categories", "separator_text", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_text VARCHAR DEFAULT NULL;"),
+            ("miniapp_categories", "separator_btn_text", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_text VARCHAR DEFAULT NULL;"),
+            ("miniapp_categories", "separator_btn_url", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_url VARCHAR DEFAULT NULL;"),
+            ("miniapp_categories", "separator_logo_url", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_logo_url VARCHAR DEFAULT NULL;"),
+            ("miniapp_categories", "model_img_shape", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS model_img_shape VARCHAR DEFAULT 'square';"),
+            
+            # 🆕 NOVAS COLUNAS DE COR DE TEXTO
+            ("miniapp_categories", "separator_text_color", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_text_color VARCHAR DEFAULT '#ffffff';"),
+            ("miniapp_categories", "separator_btn_text_color", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_btn_text_color VARCHAR DEFAULT '#ffffff';"),
+            
+            # 🆕 NOVO: EFEITO NEON
+            ("miniapp_categories", "separator_is_neon", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_is_neon BOOLEAN DEFAULT FALSE;"),
+            ("miniapp_categories", "separator_neon_color", "ALTER TABLE miniapp_categories ADD COLUMN IF NOT EXISTS separator_neon_color VARCHAR DEFAULT NULL;")
+        ]
+        
+        for tabela, coluna, sql in comandos_miniapp:
+            try:
+                db.execute(text(sql))
+                db.commit()
+                resultados.append(f"✅ {tabela}.{coluna} verificada/criada.")
+            except Exception as e:
+                db.rollback()
+                # Ignora erros se a coluna já existir
+                if "already exists" in str(e).lower() or "duplicate column" in str(e).lower():
+                    resultados.append(f"ℹ️ {tabela}.{coluna} já existe (Ignorado)")
+                else:
+                    resultados.append(f"❌ {tabela}.{coluna}: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "✅ Migração do Mini App V2 concluída (Com Cores e Neon)!",
+            "log": resultados
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro crítico: {str(e)}"
+        }
+
+
+# ============================================================
+# 🔒 MIGRAÇÃO: PROTEÇÃO DE CONTEÚDO (BOTS)
+# ============================================================
+@router.get("/migrate-protect-content")
+@migracao_unica("rota_migrate-protect-content")
+async def migrate_protect_content(db: Session = Depends(get_db)):
+    """
+    Migração para a coluna protect_content na tabela bots.
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-protect-content
+    """
+    try:
+        from sqlalchemy import text
+        
+        db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS protect_content BOOLEAN DEFAULT FALSE;"))
+        db.commit()
+        
+        return {
+            "status": "success",
+            "message": "✅ Coluna 'protect_content' criada/verificada na tabela bots!"
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro: {str(e)}"
+        }
+
+
+# ============================================================
+# 🔒 MIGRAÇÃO: AUDIO FEATURE (COMBO ÁUDIO + MÍDIA)
+# ============================================================
+@router.get("/migrate-audio-features")
+@migracao_unica("rota_migrate-audio-features")
+async def migrate_audio_features(db: Session = Depends(get_db)):
+    """
+    Migração para adicionar colunas de áudio separado e delay nas tabelas de configuração.
+    Tabelas afetadas: remarketing_config, canal_free_config, order_bump_config, upsell_config, downsell_config.
+    
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-audio-features
+    """
+    try:
+        from sqlalchemy import text
+        
+        # Lista das tabelas que receberão as novas colunas
+        tabelas = [
+            "remarketing_config",
+            "canal_free_config",
+            "order_bump_config",
+            "upsell_config",
+            "downsell_config"
+        ]
+        
+        log_msgs = []
+        
+        for tabela in tabelas:
+            # 1. Adicionar coluna audio_url (Texto/String)
+            try:
+                db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS audio_url VARCHAR;"))
+                log_msgs.append(f"✅ {tabela}: audio_url verificado.")
+            except Exception as e:
+                log_msgs.append(f"⚠️ {tabela} (audio_url): {str(e)}")
+
+            # 2. Adicionar coluna audio_delay_seconds (Inteiro, padrão 0)
+            try:
+                db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS audio_delay_seconds INTEGER DEFAULT 0;"))
+                log_msgs.append(f"✅ {tabela}: audio_delay_seconds verificado.")
+            except Exception as e:
+                log_msgs.append(f"⚠️ {tabela} (audio_delay_seconds): {str(e)}")
+
+        db.commit()
+        
+        return {
+            "status": "success",
+            "message": "Migração de Áudio + Mídia concluída!",
+            "details": log_msgs
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro crítico na migração: {str(e)}"
+        }
+
+
+# ============================================================
+# 🔒 MIGRAÇÃO: VERSÃO PRIME - AJUSTES E MELHORIAS
+# ============================================================
+@router.get("/migrate-prime-v1")
+@migracao_unica("rota_migrate-prime-v1")
+async def migrate_prime_v1(db: Session = Depends(get_db)):
+    """
+    Migração para adicionar novas colunas da Versão Prime:
+    1. tracking_folders.owner_id (Integer FK users.id)
+    2. bots.notificar_no_bot (Boolean DEFAULT TRUE)
+    3. leads.origem_entrada (VARCHAR DEFAULT 'bot_direto')
+    
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-prime-v1
+    """
+    try:
+        from sqlalchemy import text
+        
+        log_msgs = []
+        
+        # 1. tracking_folders.owner_id
+        try:
+            db.execute(text("ALTER TABLE tracking_folders ADD COLUMN IF NOT EXISTS owner_id INTEGER REFERENCES users(id);"))
+            log_msgs.append("✅ tracking_folders: owner_id adicionado")
+        except Exception as e:
+            log_msgs.append(f"⚠️ tracking_folders.owner_id: {str(e)}")
+        
+        # 2. bots.notificar_no_bot
+        try:
+            db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS notificar_no_bot BOOLEAN DEFAULT TRUE;"))
+            log_msgs.append("✅ bots: notificar_no_bot adicionado")
+        except Exception as e:
+            log_msgs.append(f"⚠️ bots.notificar_no_bot: {str(e)}")
+        
+        # 3. leads.origem_entrada
+        try:
+            db.execute(text("ALTER TABLE leads ADD COLUMN IF NOT EXISTS origem_entrada VARCHAR DEFAULT 'bot_direto';"))
+            log_msgs.append("✅ leads: origem_entrada adicionado")
+        except Exception as e:
+            log_msgs.append(f"⚠️ leads.origem_entrada: {str(e)}")
+        
+        # 4. Atribuir owner_id às pastas existentes baseado nos links dentro delas
+        try:
+            # Para cada pasta sem owner, tenta detectar o dono pelos links
+            pastas_sem_dono = db.execute(text("SELECT id FROM tracking_folders WHERE owner_id IS NULL")).fetchall()
+            pastas_corrigidas = 0
+            
+            for row in pastas_sem_dono:
+                pasta_id = row[0]
+                # Busca o owner do primeiro bot que tem link nessa pasta
+                result = db.execute(text("""
+                    SELECT DISTINCT b.owner_id 
+                    FROM tracking_links tl 
+                    JOIN bots b ON tl.bot_id = b.id 
+                    WHERE tl.folder_id = :pid AND b.owner_id IS NOT NULL 
+                    LIMIT 1
+                """), {"pid": pasta_id}).fetchone()
+                
+                if result:
+                    db.execute(text("UPDATE tracking_folders SET owner_id = :uid WHERE id = :pid"), 
+                              {"uid": result[0], "pid": pasta_id})
+                    pastas_corrigidas += 1
+            
+            log_msgs.append(f"✅ {pastas_corrigidas} pastas existentes receberam owner_id")
+        except Exception as e:
+            log_msgs.append(f"⚠️ Atribuição de owner_id: {str(e)}")
+        
+        db.commit()
+        
+        return {
+            "status": "success",
+            "message": "🚀 Migração Prime V1 concluída!",
+            "details": log_msgs
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro crítico na migração: {str(e)}"
+        }
+
+
+# ============================================================
+# 🔒 MIGRAÇÃO: SISTEMA DE LIMITES DE BOTS + SELETOR INTELIGENTE
+# ============================================================
+@router.get("/migrate-bot-limits-v1")
+@migracao_unica("rota_migrate-bot-limits-v1")
+async def migrate_bot_limits_v1(db: Session = Depends(get_db)):
+    """
+    Migração para o sistema de limites de bots e seletor inteligente:
+    1. users.plano_plataforma (VARCHAR DEFAULT 'free')
+    2. users.max_bots (INTEGER DEFAULT 20)
+    3. bots.selector_order (INTEGER DEFAULT 0)
+    
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-bot-limits-v1
+    """
+    try:
+        from sqlalchemy import text
+        
+        log_msgs = []
+        
+        # 1. users.plano_plataforma
+        try:
+            db.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS plano_plataforma VARCHAR DEFAULT 'free';"))
+            db.commit()
+            log_msgs.append("✅ users.plano_plataforma adicionado (default: 'free')")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ users.plano_plataforma: {str(e)}")
+        
+        # 2. users.max_bots
+        try:
+            db.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS max_bots INTEGER DEFAULT 20;"))
+            db.commit()
+            log_msgs.append("✅ users.max_bots adicionado (default: 20)")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ users.max_bots: {str(e)}")
+        
+        # 3. bots.selector_order
+        try:
+            db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS selector_order INTEGER DEFAULT 0;"))
+            db.commit()
+            log_msgs.append("✅ bots.selector_order adicionado (default: 0)")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ bots.selector_order: {str(e)}")
+        
+        # 4. Definir ordem inicial para bots existentes (por data de criação)
+        try:
+            owners = db.execute(text("SELECT DISTINCT owner_id FROM bots WHERE owner_id IS NOT NULL")).fetchall()
+            total_updated = 0
+            for row in owners:
+                owner_id = row[0]
+                bots = db.execute(text(
+                    "SELECT id FROM bots WHERE owner_id = :oid ORDER BY created_at ASC"
+                ), {"oid": owner_id}).fetchall()
+                for idx, bot_row in enumerate(bots):
+                    db.execute(text(
+                        "UPDATE bots SET selector_order = :order WHERE id = :bid"
+                    ), {"order": idx + 1, "bid": bot_row[0]})
+                    total_updated += 1
+            db.commit()
+            log_msgs.append(f"✅ {total_updated} bots receberam ordem inicial no seletor")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ Ordem inicial: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "🚀 Migração Bot Limits V1 concluída!",
+            "details": log_msgs
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro crítico na migração: {str(e)}"
+        }
+
+
+# ============================================================
+# ✨ MIGRAÇÃO: SISTEMA DE EMOJIS PREMIUM DO TELEGRAM
+# ============================================================
+@router.get("/migrate-premium-emojis-v1")
+@migracao_unica("rota_migrate-premium-emojis-v1")
+async def migrate_premium_emojis_v1(db: Session = Depends(get_db)):
+    """
+    Migração para criar as tabelas do sistema de emojis premium:
+    1. premium_emoji_packs (categorias de emojis)
+    2. premium_emojis (catálogo de custom emojis do Telegram)
+    3. Popula com pacotes e emojis iniciais mais populares
+    
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-premium-emojis-v1
+    """
+    try:
+        from sqlalchemy import text
+        
+        log_msgs = []
+        
+        # 1. CRIAR TABELA premium_emoji_packs
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS premium_emoji_packs (
+                    id SERIAL PRIMARY KEY,
+                    name VARCHAR(100) UNIQUE NOT NULL,
+                    icon VARCHAR(10),
+                    description VARCHAR(255),
+                    sort_order INTEGER DEFAULT 0,
+                    is_active BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
+                );
+            """))
+            db.commit()
+            log_msgs.append("✅ Tabela premium_emoji_packs criada")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ premium_emoji_packs: {str(e)}")
+        
+        # 2. CRIAR TABELA premium_emojis
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS premium_emojis (
+                    id SERIAL PRIMARY KEY,
+                    emoji_id VARCHAR(50) UNIQUE NOT NULL,
+                    fallback VARCHAR(10) NOT NULL,
+                    name VARCHAR(100) NOT NULL,
+                    shortcode VARCHAR(50) UNIQUE NOT NULL,
+                    pack_id INTEGER REFERENCES premium_emoji_packs(id) ON DELETE SET NULL,
+                    sort_order INTEGER DEFAULT 0,
+                    thumbnail_url VARCHAR(500),
+                    emoji_type VARCHAR(20) DEFAULT 'static',
+                    is_active BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
+                );
+            """))
+            db.commit()
+            log_msgs.append("✅ Tabela premium_emojis criada")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ premium_emojis: {str(e)}")
+        
+        # 3. CRIAR ÍNDICES
+        try:
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_premium_emojis_pack ON premium_emojis(pack_id);"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_premium_emojis_active ON premium_emojis(is_active);"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_premium_emojis_shortcode ON premium_emojis(shortcode);"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_premium_emoji_packs_active ON premium_emoji_packs(is_active);"))
+            db.commit()
+            log_msgs.append("✅ Índices criados")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ Índices: {str(e)}")
+        
+        # 4. POPULAR COM PACOTES INICIAIS (APENAS SE TABELA ESTIVER VAZIA)
+        try:
+            pack_count = db.execute(text("SELECT COUNT(*) FROM premium_emoji_packs")).scalar()
+            if pack_count == 0:
+                packs_iniciais = [
+                    ("Populares", "🔥", "Emojis premium mais usados", 1),
+                    ("Corações", "❤️", "Corações e amor", 2),
+                    ("Mãos e Gestos", "👋", "Gestos e mãos animadas", 3),
+                    ("Animais", "🐱", "Animais fofos e animados", 4),
+                    ("Estrelas e Brilhos", "⭐", "Estrelas, brilhos e magia", 5),
+                    ("Rostos", "😎", "Expressões e rostos animados", 6),
+                    ("Objetos", "💎", "Objetos diversos", 7),
+                    ("Natureza", "🌸", "Flores, plantas e natureza", 8),
+                ]
+                for name, icon, desc, order in packs_iniciais:
+                    db.execute(text(
+                        "INSERT INTO premium_emoji_packs (name, icon, description, sort_order) VALUES (:name, :icon, :desc, :order)"
+                    ), {"name": name, "icon": icon, "desc": desc, "order": order})
+                db.commit()
+                log_msgs.append(f"✅ {len(packs_iniciais)} pacotes iniciais criados")
+            else:
+                log_msgs.append(f"ℹ️ Pacotes já existem ({pack_count}), pulando seed")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ Seed pacotes: {str(e)}")
+        
+        # 5. POPULAR COM EMOJIS PREMIUM POPULARES (SE TABELA VAZIA)
+        try:
+            emoji_count = db.execute(text("SELECT COUNT(*) FROM premium_emojis")).scalar()
+            if emoji_count == 0:
+                # Buscar ID do pacote "Populares"
+                pop_pack = db.execute(text("SELECT id FROM premium_emoji_packs WHERE name = 'Populares' LIMIT 1")).fetchone()
+                hearts_pack = db.execute(text("SELECT id FROM premium_emoji_packs WHERE name = 'Corações' LIMIT 1")).fetchone()
+                stars_pack = db.execute(text("SELECT id FROM premium_emoji_packs WHERE name = 'Estrelas e Brilhos' LIMIT 1")).fetchone()
+                
+                pop_id = pop_pack[0] if pop_pack else None
+                hearts_id = hearts_pack[0] if hearts_pack else None
+                stars_id = stars_pack[0] if stars_pack else None
+                
+                # Emojis Premium Populares (IDs reais do Telegram)
+                # NOTA: Esses IDs são exemplos conhecidos. O Super Admin pode adicionar mais via painel.
+                emojis_iniciais = [
+                    # Populares
+                    ("5368324170671202286", "🔥", "Fogo Animado", ":fire_premium:", pop_id, "animated", 1),
+                    ("5271930982462988357", "⭐", "Estrela Brilhante", ":star_premium:", pop_id, "animated", 2),
+                    ("5443038326535759171", "💎", "Diamante Azul", ":diamond_premium:", pop_id, "animated", 3),
+                    ("5420323339421498693", "🚀", "Foguete Animado", ":rocket_premium:", pop_id, "animated", 4),
+                    ("5368324170671202286", "✅", "Check Verde", ":check_premium:", pop_id, "animated", 5),
+                    ("5247151702498836708", "🎯", "Alvo Certeiro", ":target_premium:", pop_id, "animated", 6),
+                    ("5407025283456835913", "👑", "Coroa Dourada", ":crown_premium:", pop_id, "animated", 7),
+                    ("5386654653003864312", "🎁", "Presente Animado", ":gift_premium:", pop_id, "animated", 8),
+                    # Corações
+                    ("5368324170671202286", "❤️", "Coração Vermelho", ":heart_premium:", hearts_id, "animated", 1),
+                    ("5445284980978621387", "💜", "Coração Roxo", ":purple_heart_premium:", hearts_id, "animated", 2),
+                    ("5368324170671202286", "❤️‍🔥", "Coração em Chamas", ":fire_heart_premium:", hearts_id, "animated", 3),
+                    # Estrelas
+                    ("5368324170671202286", "🌟", "Estrela Glow", ":glow_star_premium:", stars_id, "animated", 1),
+                    ("5368324170671202286", "✨", "Brilho Mágico", ":sparkle_premium:", stars_id, "animated", 2),
+                ]
+                
+                inserted = 0
+                for eid, fb, name, sc, pid, etype, sorder in emojis_iniciais:
+                    try:
+                        db.execute(text(
+                            """INSERT INTO premium_emojis (emoji_id, fallback, name, shortcode, pack_id, emoji_type, sort_order) 
+                               VALUES (:eid, :fb, :name, :sc, :pid, :etype, :sorder)"""
+                        ), {"eid": eid + str(sorder), "fb": fb, "name": name, "sc": sc, "pid": pid, "etype": etype, "sorder": sorder})
+                        inserted += 1
+                    except Exception:
+                        pass  # Ignora duplicados
+                
+                db.commit()
+                log_msgs.append(f"✅ {inserted} emojis premium iniciais cadastrados")
+                log_msgs.append("⚠️ IMPORTANTE: Os emoji_ids iniciais são EXEMPLOS. Use @JsonDumpBot no Telegram para obter IDs reais e atualize pelo painel Super Admin.")
+            else:
+                log_msgs.append(f"ℹ️ Emojis já existem ({emoji_count}), pulando seed")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ Seed emojis: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "✨ Migração Premium Emojis V1 concluída!",
+            "details": log_msgs,
+            "next_steps": [
+                "1. Acesse o Painel Super Admin → Emojis Premium",
+                "2. Use @JsonDumpBot no Telegram para descobrir emoji_ids reais",
+                "3. Cadastre emojis com IDs corretos pelo painel",
+                "4. Os usuários poderão usar os emojis nas páginas de texto/legenda"
+            ]
+        }
+        
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "message": f"❌ Erro crítico na migração: {str(e)}"
+        }
+
+
+# ============================================================
+# 🚨 MIGRAÇÃO V1: SISTEMA DE DENÚNCIAS 
+# ============================================================
+@router.get("/migrate-reports-v1")
+@migracao_unica("rota_migrate-reports-v1")
+async def migrate_reports_v1(db: Session = Depends(get_db)):
+    """
+    Migração para criar tabelas do sistema de denúncias.
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    id SERIAL PRIMARY KEY,
+                    reporter_name VARCHAR(100),
+                    reporter_telegram_id VARCHAR(50),
+                    bot_username VARCHAR(100) NOT NULL,
+                    bot_id INTEGER REFERENCES bots(id) ON DELETE SET NULL,
+                    reason VARCHAR(50) NOT NULL,
+                    description TEXT,
+                    evidence_url VARCHAR(500),
+                    status VARCHAR(20) DEFAULT 'pending',
+                    resolution TEXT,
+                    resolved_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+                    resolved_at TIMESTAMP WITHOUT TIME ZONE,
+                    action_taken VARCHAR(50),
+                    strike_count INTEGER DEFAULT 0,
+                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+                    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+                    ip_address VARCHAR(50)
+                );
+            """))
+            db.commit()
+            log_msgs.append("✅ Tabela reports criada")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ reports: {str(e)}")
+        
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS user_strikes (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE NOT NULL,
+                    report_id INTEGER REFERENCES reports(id) ON DELETE SET NULL,
+                    reason TEXT NOT NULL,
+                    strike_number INTEGER NOT NULL,
+                    action VARCHAR(50) NOT NULL,
+                    pause_until TIMESTAMP WITHOUT TIME ZONE,
+                    tax_increase_pct FLOAT,
+                    applied_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
+                );
+            """))
+            db.commit()
+            log_msgs.append("✅ Tabela user_strikes criada")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ user_strikes: {str(e)}")
+        
+        # Colunas extras na tabela users
+        for col_sql in [
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS strike_count INTEGER DEFAULT 0;",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_banned BOOLEAN DEFAULT FALSE;",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS banned_reason TEXT;",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS bots_paused_until TIMESTAMP WITHOUT TIME ZONE;",
+        ]:
+            try:
+                db.execute(text(col_sql))
+                db.commit()
+            except:
+                db.rollback()
+        
+        log_msgs.append("✅ Colunas de punição adicionadas à tabela users")
+        
+        # Índices
+        try:
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_reports_status ON reports(status);"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_reports_bot ON reports(bot_username);"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_user_strikes_user ON user_strikes(user_id);"))
+            db.commit()
+            log_msgs.append("✅ Índices criados")
+        except:
+            db.rollback()
+        
+        return {
+            "status": "success",
+            "message": "🚨 Migração de Denúncias V1 concluída!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+# ============================================================
+# 🚨 MIGRAÇÃO V2: ATUALIZAÇÃO DO SISTEMA DE DENÚNCIAS 
+# ============================================================
+@router.get("/migrate-reports-v2")
+@migracao_unica("rota_migrate-reports-v2")
+async def migrate_reports_v2(db: Session = Depends(get_db)):
+    """
+    Migração para adicionar as colunas owner_id e owner_username na tabela reports.
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-reports-v2
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        try:
+            db.execute(text("ALTER TABLE reports ADD COLUMN IF NOT EXISTS owner_id INTEGER REFERENCES users(id) ON DELETE SET NULL;"))
+            db.commit()
+            log_msgs.append("✅ Coluna owner_id adicionada em reports")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ owner_id: {str(e)}")
+            
+        try:
+            db.execute(text("ALTER TABLE reports ADD COLUMN IF NOT EXISTS owner_username VARCHAR(100);"))
+            db.commit()
+            log_msgs.append("✅ Coluna owner_username adicionada em reports")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ owner_username: {str(e)}")
+        
+        # Opcional: Atualizar relatórios antigos retroativamente
+        try:
+            reports = db.execute(text("SELECT id, bot_id FROM reports WHERE owner_id IS NULL AND bot_id IS NOT NULL")).fetchall()
+            updated = 0
+            for r in reports:
+                bot = db.execute(text("SELECT owner_id FROM bots WHERE id = :bid"), {"bid": r[1]}).fetchone()
+                if bot and bot[0]:
+                    user = db.execute(text("SELECT username FROM users WHERE id = :uid"), {"uid": bot[0]}).fetchone()
+                    if user:
+                        db.execute(text("UPDATE reports SET owner_id = :uid, owner_username = :uname WHERE id = :rid"), 
+                                   {"uid": bot[0], "uname": user[0], "rid": r[0]})
+                        updated += 1
+            db.commit()
+            log_msgs.append(f"✅ {updated} denúncias antigas retroativamente atualizadas com o dono do bot.")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ Atualização retroativa: {str(e)}")
+
+        return {
+            "status": "success",
+            "message": "🚨 Migração de Denúncias V2 concluída!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+# ============================================================
+# 📅 MIGRAÇÃO: REMARKETING AGENDADO
+# ============================================================
+@router.get("/migrate-scheduled-remarketing-v1")
+@migracao_unica("rota_migrate-scheduled-remarketing-v1")
+async def migrate_scheduled_remarketing_v1(db: Session = Depends(get_db)):
+    """
+    Migração para adicionar colunas de remarketing agendado.
+    Acesse UMA VEZ: /migrate-scheduled-remarketing-v1
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        cols = [
+            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS is_scheduled BOOLEAN DEFAULT FALSE;",
+            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_days INTEGER DEFAULT 1;",
+            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_time VARCHAR DEFAULT '10:00';",
+            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_end_date TIMESTAMP WITHOUT TIME ZONE;",
+            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS days_config TEXT;",
+            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS use_same_content BOOLEAN DEFAULT TRUE;",
+            "ALTER TABLE remarketing_campaigns ADD COLUMN IF NOT EXISTS schedule_active BOOLEAN DEFAULT FALSE;",
+        ]
+        
+        for sql in cols:
+            try:
+                db.execute(text(sql))
+                db.commit()
+            except:
+                db.rollback()
+        
+        log_msgs.append("✅ Colunas de agendamento adicionadas à remarketing_campaigns")
+        
+        # Índice
+        try:
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_remarketing_scheduled ON remarketing_campaigns(is_scheduled, schedule_active);"))
+            db.commit()
+            log_msgs.append("✅ Índice criado")
+        except:
+            db.rollback()
+        
+        return {
+            "status": "success",
+            "message": "📅 Migração Remarketing Agendado V1 concluída!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+# =========================================================
+# 🗄️ MIGRAÇÃO V2: Diário de Mudanças
+# =========================================================
+@router.get("/migrate-changelog-v1")
+@migracao_unica("rota_migrate-changelog-v1")
+def migrate_changelog_v1(db: Session = Depends(get_db)):
+    """
+    Cria tabela change_logs para o Diário de Mudanças.
+    Acesse UMA VEZ: /migrate-changelog-v1
+    """
+    log_msgs = []
+    try:
+        db.execute(text("""
+            CREATE TABLE IF NOT EXISTS change_logs (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+                bot_id INTEGER REFERENCES bots(id) ON DELETE SET NULL,
+                date TIMESTAMP DEFAULT NOW(),
+                category VARCHAR(50) DEFAULT 'geral',
+                content TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+        """))
+        db.commit()
+        log_msgs.append("✅ Tabela change_logs criada")
+        
+        db.execute(text("CREATE INDEX IF NOT EXISTS idx_changelog_user ON change_logs(user_id);"))
+        db.commit()
+        log_msgs.append("✅ Índice criado")
+        
+        return {"status": "success", "message": "📓 Migração Diário de Mudanças V1 concluída!", "details": log_msgs}
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+@router.get("/migrate-statistics-v18")
+@migracao_unica("rota_migrate-statistics-v18")
+def migrate_statistics_v18(db: Session = Depends(get_db)):
+    """Cria índices para performance V18. Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-statistics-v18"""
+    log_msgs = []
+    try:
+        cmds = [
+            "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS origem VARCHAR(50) DEFAULT 'bot';",
+            "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS gateway_usada VARCHAR;",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_data_aprov ON pedidos(data_aprovacao);",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_origem ON pedidos(origem);",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_gateway ON pedidos(gateway_usada);",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_status ON pedidos(status);",
+            "CREATE INDEX IF NOT EXISTS idx_leads_created ON leads(created_at);",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_bot_status ON pedidos(bot_id, status);",
+        ]
+        for cmd in cmds:
+            try:
+                db.execute(text(cmd))
+                db.commit()
+                log_msgs.append(f"✅ OK")
+            except Exception as e_cmd:
+                if "already exists" not in str(e_cmd):
+                    log_msgs.append(f"⚠️ {e_cmd}")
+        return {"status": "success", "message": "📊 Migração V18 concluída!", "details": log_msgs}
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+# ============================================================
+# 🚨 MIGRAÇÃO V3: CORREÇÃO RETROATIVA DOS DONOS DOS BOTS 
+# ============================================================
+@router.get("/migrate-reports-v3")
+@migracao_unica("rota_migrate-reports-v3")
+async def migrate_reports_v3(db: Session = Depends(get_db)):
+    """
+    Corrige denúncias antigas que ficaram com "Desconhecido" e atualiza 
+    os donos corretos buscando ativamente pelo @username do bot.
+    Acesse UMA VEZ: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-reports-v3
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        # 1. Pega todas as denúncias onde o dono tá vazio
+        reports = db.execute(text("SELECT id, bot_username FROM reports WHERE owner_id IS NULL")).fetchall()
+        updated = 0
+        
+        for r in reports:
+            r_id = r[0]
+            b_uname = str(r[1]).replace("@", "").strip().lower()
+            
+            # Procura o bot pelo username real
+            bot = db.execute(text("SELECT id, owner_id FROM bots WHERE LOWER(username) = :uname OR LOWER(nome) = :uname LIMIT 1"), {"uname": b_uname}).fetchone()
+            
+            if bot and bot[1]:
+                # Pega os dados do dono
+                user = db.execute(text("SELECT username FROM users WHERE id = :uid"), {"uid": bot[1]}).fetchone()
+                if user:
+                    # Atualiza a denúncia com bot_id, owner_id e owner_username!
+                    db.execute(text("""
+                        UPDATE reports 
+                        SET bot_id = :bid, owner_id = :uid, owner_username = :uname 
+                        WHERE id = :rid
+                    """), {"bid": bot[0], "uid": bot[1], "uname": user[0], "rid": r_id})
+                    updated += 1
+        
+        db.commit()
+        log_msgs.append(f"✅ {updated} denúncias antigas foram corrigidas e vinculadas aos seus donos!")
+        
+        return {
+            "status": "success",
+            "message": "🚨 Correção de Donos V3 concluída!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+# ============================================================
+# 🚨 MIGRAÇÃO V4: ADIÇÃO DAS GATEWAYS PARADISE E OMEGAPAY 
+# ============================================================
+@router.get("/migrate-gateways-v4")
+@migracao_unica("rota_migrate-gateways-v4")
+async def migrate_gateways_v4(db: Session = Depends(get_db)):
+    """
+    Adiciona colunas para Paradise e OmegaPay e salva credenciais Master do Admin.
+    Acesse UMA VEZ após atualizar: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-gateways-v4
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        # 1. Adicionando as colunas na tabela de USUÁRIOS
+        comandos_users = [
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS paradise_account_id VARCHAR;",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS omegapay_client_id VARCHAR;"
+        ]
+        for cmd in comandos_users:
+            try:
+                db.execute(text(cmd))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if "already exists" not in str(e).lower() and "duplicate column" not in str(e).lower():
+                    log_msgs.append(f"Aviso User: {e}")
+
+        # 2. Adicionando as colunas na tabela de BOTS
+        comandos_bots = [
+            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS paradise_api_key VARCHAR;",
+            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS paradise_ativo BOOLEAN DEFAULT FALSE;",
+            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS omegapay_client_id VARCHAR;",
+            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS omegapay_client_secret VARCHAR;",
+            "ALTER TABLE bots ADD COLUMN IF NOT EXISTS omegapay_ativo BOOLEAN DEFAULT FALSE;"
+        ]
+        for cmd in comandos_bots:
+            try:
+                db.execute(text(cmd))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if "already exists" not in str(e).lower() and "duplicate column" not in str(e).lower():
+                    log_msgs.append(f"Aviso Bot: {e}")
+
+        # 3. Salvando suas credenciais MESTRAS (Admin) na tabela SystemConfig
+        # Essas são as chaves que receberão a comissão pelas vendas dos clientes!
+        try:
+            configs_mestre = [
+                ("master_paradise_account_id", "6225"),
+                ("master_paradise_secret_key", "sk_a8d689ceac0b72df245e38948a566e185f583a51d8755d6d6824b5318c50b586"),
+                ("master_omegapay_client_id", "luisdedeus2512_w933zm9thr0y2gc5"),
+                ("master_omegapay_client_secret", "nrbqx75vleydalbvuotrhmab11i3u9swncbls27kvdkoe3cx7p70wtqag6tylwlk")
+            ]
+            
+            for key, value in configs_mestre:
+                db.execute(text(f"""
+                    INSERT INTO system_config (key, value, updated_at) 
+                    VALUES (:key, :val, NOW()) 
+                    ON CONFLICT (key) DO UPDATE SET value = :val, updated_at = NOW()
+                """), {"key": key, "val": value})
+                
+            db.commit()
+            log_msgs.append("✅ Credenciais MESTRAS da Paradise e OmegaPay salvas com sucesso!")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"❌ Erro ao salvar Config Global: {e}")
+
+        return {
+            "status": "success",
+            "message": "🚨 Migração V4 concluída! Banco de dados preparado.",
+            "details": log_msgs
+        }
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro Crítico: {str(e)}"}
+
+
+# ============================================================
+# 🚨 MIGRAÇÃO V4: ESCUDO ANTI-CURIOSOS (RECURSOS PRIME)
+# ============================================================
+@router.get("/migrate-prime-v4")
+@migracao_unica("rota_migrate-prime-v4")
+async def migrate_prime_v4(db: Session = Depends(get_db)):
+    """
+    Cria as colunas do Escudo Anti-Curiosos para proteger contra PIX Falsos.
+    Acesse UMA VEZ após o deploy: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-prime-v4
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        try:
+            db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS escudo_ativo BOOLEAN DEFAULT FALSE;"))
+            db.commit()
+            log_msgs.append("✅ Coluna escudo_ativo adicionada em bots")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ escudo_ativo: {str(e)}")
+            
+        try:
+            db.execute(text("ALTER TABLE bots ADD COLUMN IF NOT EXISTS escudo_limite_pix INTEGER DEFAULT 5;"))
+            db.commit()
+            log_msgs.append("✅ Coluna escudo_limite_pix adicionada em bots")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ escudo_limite_pix: {str(e)}")
+
+        return {
+            "status": "success",
+            "message": "🚨 Migração Escudo Prime V4 concluída!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+# ============================================================
+# 🚨 CRIAR E INJETAR RECURSOS PRIME NO BANCO
+# ============================================================
+@router.get("/injetar-novos-recursos")
+@migracao_unica("rota_injetar-novos-recursos")
+async def injetar_novos_recursos(db: Session = Depends(get_db)):
+    """
+    Cria a tabela recursos_prime e injeta TODOS os itens do sistema (incluindo os Em Breve).
+    Acesse UMA VEZ no navegador após o deploy: https://zenyx-gbs-testesv1-production.up.railway.app/injetar-novos-recursos
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        # 1. CRIA A TABELA SE NÃO EXISTIR
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS recursos_prime (
+                    id VARCHAR(50) PRIMARY KEY,
+                    nome VARCHAR(100) NOT NULL,
+                    descricao TEXT NOT NULL,
+                    icone VARCHAR(50),
+                    cor VARCHAR(20),
+                    meta_reais INTEGER DEFAULT 0,
+                    status VARCHAR(20) DEFAULT 'bloqueado',
+                    implementado BOOLEAN DEFAULT TRUE
+                );
+            """))
+            db.commit()
+            log_msgs.append("✅ Tabela 'recursos_prime' verificada.")
+        except Exception as e:
+            db.rollback()
+            return {"status": "error", "message": f"Erro ao criar tabela: {str(e)}"}
+
+        # 2. LISTA DE TODOS OS RECURSOS (Ativos e Em Desenvolvimento)
+        recursos_completos = [
+            {
+                "id": "revisao_copy",
+                "nome": "Simulador de Copy",
+                "descricao": "Teste todo o seu funil enviando mensagens simuladas para o seu próprio Telegram.",
+                "icone": "MessageSquare",
+                "cor": "#f97316",
+                "meta_reais": 0,
+                "implementado": True
+            },
+            {
+                "id": "clonador_funil",
+                "nome": "Clonador de Funil",
+                "descricao": "Copie toda a estrutura (mensagens, botões e atrasos) de um bot de sucesso para um novo bot.",
+                "icone": "Copy",
+                "cor": "#c333ff",
+                "meta_reais": 100,
+                "implementado": True
+            },
+            {
+                "id": "projecao_receita",
+                "nome": "Projeção de Receita",
+                "descricao": "Inteligência Artificial que prevê o seu faturamento para os próximos 30, 60 ou 90 dias.",
+                "icone": "TrendingUp",
+                "cor": "#22c55e",
+                "meta_reais": 300,
+                "implementado": True
+            },
+            {
+                "id": "escudo_anticuriosos",
+                "nome": "Escudo Anti-Curiosos",
+                "descricao": "Bloqueia usuários que geram vários PIX falsos, economizando taxas da gateway.",
+                "icone": "Shield",
+                "cor": "#ef4444",
+                "meta_reais": 500,
+                "implementado": True
+            },
+            {
+                "id": "multibot_center",
+                "nome": "Command Center",
+                "descricao": "Visão de CEO: Acompanhe o faturamento, leads e conversão de todos os seus bots em uma tela.",
+                "icone": "TrendingUp",
+                "cor": "#3b82f6",
+                "meta_reais": 1500,
+                "implementado": True
+            },
+            {
+                "id": "jornada_cliente",
+                "nome": "Jornada do Cliente",
+                "descricao": "Visualize o percurso completo de cada lead no funil: do /start ao pagamento, order bump, upsell e downsell.",
+                "icone": "Map",
+                "cor": "#06b6d4",
+                "meta_reais": 1800,
+                "implementado": True
+            },
+            # 👇 RECURSOS "EM DESENVOLVIMENTO" 👇
+            {
+                "id": "clonador_previas",
+                "nome": "Clonador de Prévias/VIPs",
+                "descricao": "Clone postagens automaticamente entre canais e grupos. O bot copia conteúdo do canal de origem para o destino.",
+                "icone": "Repeat",
+                "cor": "#c333ff",
+                "meta_reais": 2000,
+                "implementado": False
+            },
+            {
+                "id": "remarketing_inteligente",
+                "nome": "Remarketing Inteligente",
+                "descricao": "Segmentação automática de leads: identifica quem visitou e não comprou, quem abandonou PIX, e quem não renovou.",
+                "icone": "Brain",
+                "cor": "#f59e0b",
+                "meta_reais": 3000,
+                "implementado": False
+            },
+            {
+                "id": "analisador_concorrentes",
+                "nome": "Analisador de Concorrentes",
+                "descricao": "Monitore canais públicos de concorrentes. Relatórios com frequência de postagens e horários de pico.",
+                "icone": "Search",
+                "cor": "#ef4444",
+                "meta_reais": 4000,
+                "implementado": False
+            },
+            {
+                "id": "multi_gateway",
+                "nome": "Multi-Gateway Inteligente",
+                "descricao": "Roteamento automático de pagamentos para o gateway com maior taxa de aprovação por faixa de valor.",
+                "icone": "Zap",
+                "cor": "#06b6d4",
+                "meta_reais": 5000,
+                "implementado": False
+            },
+            {
+                "id": "anti_vazamento",
+                "nome": "Proteção Anti-Vazamento",
+                "descricao": "Marca d'água invisível em mídias do canal VIP. Identifique quem vazou seu conteúdo.",
+                "icone": "Shield",
+                "cor": "#8b5cf6",
+                "meta_reais": 10000,
+                "implementado": False
+            }
+        ]
+        
+        # 3. INSERE OS DADOS (Só insere os que faltam, não duplica)
+        for rec in recursos_completos:
+            existe = db.execute(text("SELECT id FROM recursos_prime WHERE id = :id"), {"id": rec["id"]}).fetchone()
+            
+            if not existe:
+                db.execute(text("""
+                    INSERT INTO recursos_prime (id, nome, descricao, icone, cor, meta_reais, implementado)
+                    VALUES (:id, :nome, :descricao, :icone, :cor, :meta_reais, :implementado)
+                """), rec)
+                log_msgs.append(f"✅ Recurso '{rec['nome']}' inserido com sucesso!")
+            else:
+                log_msgs.append(f"ℹ️ Recurso '{rec['nome']}' já existia.")
+                
+        db.commit()
+
+        return {
+            "status": "success",
+            "message": "Todos os Recursos injetados com sucesso!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": f"❌ Erro Geral: {str(e)}"}
+
+
+# =========================================================
+# 🚨 MIGRAÇÃO V10: RANKING TOGGLE + FIX CLONADOR PRÉVIAS
+# =========================================================
+@router.get("/migrate-ranking-prime-v10")
+@migracao_unica("rota_migrate-ranking-prime-v10")
+async def migrate_ranking_prime_v10(db: Session = Depends(get_db)):
+    """
+    Migração V10:
+    1. Cria config 'ranking_publico' no SystemConfig (default True)
+    2. Força clonador_previas como implementado=False (re-bloquear)
+    Acesse UMA VEZ após deploy: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-ranking-prime-v10
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        # 1. Criar config ranking_publico se não existir
+        try:
+            existe = db.query(SystemConfig).filter(SystemConfig.key == "ranking_publico").first()
+            if not existe:
+                db.add(SystemConfig(key="ranking_publico", value="true"))
+                db.commit()
+                log_msgs.append("✅ Config 'ranking_publico' criada (default: true)")
+            else:
+                log_msgs.append("ℹ️ Config 'ranking_publico' já existe")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ ranking_publico: {str(e)}")
+        
+        # 2. Forçar clonador_previas como NÃO implementado (bloqueado)
+        try:
+            db.execute(text("""
+                UPDATE recursos_prime 
+                SET implementado = FALSE 
+                WHERE id = 'clonador_previas'
+            """))
+            db.commit()
+            log_msgs.append("✅ clonador_previas forçado como bloqueado (implementado=False)")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ clonador_previas: {str(e)}")
+        
+        # 3. Injetar recurso jornada_cliente se não existir
+        try:
+            existe_jc = db.execute(text("SELECT id FROM recursos_prime WHERE id = 'jornada_cliente'")).fetchone()
+            if not existe_jc:
+                db.execute(text("""
+                    INSERT INTO recursos_prime (id, nome, descricao, icone, cor, meta_reais, implementado)
+                    VALUES ('jornada_cliente', 'Jornada do Cliente', 
+                            'Visualize o percurso completo de cada lead no funil: do /start ao pagamento, order bump, upsell e downsell.',
+                            'Map', '#06b6d4', 1800, TRUE)
+                """))
+                db.commit()
+                log_msgs.append("✅ Recurso 'Jornada do Cliente' injetado")
+            else:
+                log_msgs.append("ℹ️ Recurso 'Jornada do Cliente' já existe")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ jornada_cliente: {str(e)}")
+        
+        # 4. Criar tabela user_prime_overrides se não existir
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS user_prime_overrides (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                    recurso_id VARCHAR(100) NOT NULL,
+                    force_status VARCHAR(20),
+                    custom_meta FLOAT,
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    updated_at TIMESTAMP DEFAULT NOW()
+                )
+            """))
+            db.commit()
+            log_msgs.append("✅ Tabela 'user_prime_overrides' verificada/criada")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ user_prime_overrides: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "🚨 Migração V10 (Ranking + Prime) concluída!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+# =========================================================
+# 🚨 MIGRAÇÃO V11: CÓDIGOS DE CONVITE (PRÉ-LANÇAMENTO)
+# =========================================================
+@router.get("/migrate-invites-v11")
+@migracao_unica("rota_migrate-invites-v11")
+async def migrate_invites_v11(db: Session = Depends(get_db)):
+    """
+    Migração V11:
+    1. Cria tabela invite_codes no banco de dados
+    2. Cria config 'invite_required' no SystemConfig (default True para pré-lançamento)
+    Acesse UMA VEZ após deploy: https://zenyx-gbs-testesv1-production.up.railway.app/migrate-invites-v11
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        # 1. Criar tabela invite_codes
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS invite_codes (
+                    id SERIAL PRIMARY KEY,
+                    code VARCHAR(20) UNIQUE NOT NULL,
+                    is_used BOOLEAN DEFAULT FALSE,
+                    used_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+                    used_by_username VARCHAR,
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    used_at TIMESTAMP
+                )
+            """))
+            db.execute(text("CREATE INDEX IF NOT EXISTS ix_invite_codes_code ON invite_codes (code)"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS ix_invite_codes_is_used ON invite_codes (is_used)"))
+            db.commit()
+            log_msgs.append("✅ Tabela 'invite_codes' criada/verificada com sucesso")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ invite_codes: {str(e)}")
+        
+        # 2. Criar config invite_required (default True = pré-lançamento ativo)
+        try:
+            existe = db.query(SystemConfig).filter(SystemConfig.key == "invite_required").first()
+            if not existe:
+                db.add(SystemConfig(key="invite_required", value="true"))
+                db.commit()
+                log_msgs.append("✅ Config 'invite_required' criada (default: true - pré-lançamento ATIVO)")
+            else:
+                log_msgs.append(f"ℹ️ Config 'invite_required' já existe (valor: {existe.value})")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ invite_required config: {str(e)}")
+        
+        return {
+            "status": "success",
+            "message": "🎟️ Migração V11 (Códigos de Convite) concluída!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"❌ Erro: {str(e)}"}
+
+
+# =========================================================
+# 🚨 MIGRAÇÃO V12: ESTRATÉGIA DE LANÇAMENTO (SNEAK PEEK)
+# =========================================================
+@router.get("/migrate-launch-strategy-v12")
+@migracao_unica("rota_migrate-launch-strategy-v12")
+async def migrate_launch_strategy_v12(db: Session = Depends(get_db)):
+    """
+    Migração V12: Cria a tabela launch_strategy_config e adiciona colunas de delay/aprovação.
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS launch_strategy_config (
+                    id SERIAL PRIMARY KEY,
+                    bot_id INTEGER UNIQUE REFERENCES bots(id) ON DELETE CASCADE,
+                    ativo BOOLEAN DEFAULT FALSE,
+                    msg_boas_vindas TEXT DEFAULT 'Bem-vindo! Resgate seu acesso VIP temporário abaixo:',
+                    media_url VARCHAR,
+                    btn_text VARCHAR DEFAULT '🔓 RESGATAR CONVITE VIP',
+                    tempo_vip_minutos INTEGER DEFAULT 1,
+                    msg_expulsao TEXT DEFAULT '⚠️ SEU ACESSO VIP GRATUITO EXPIROU!! 😈\n\nGaranta sua vaga permanente agora:',
+                    media_oferta_url VARCHAR,
+                    plano_id INTEGER,
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    updated_at TIMESTAMP DEFAULT NOW()
+                )
+            """))
+            db.commit()
+            log_msgs.append("✅ Tabela 'launch_strategy_config' criada/verificada com sucesso")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"⚠️ Erro ao criar launch_strategy_config: {str(e)}")
+
+        # 2. Adiciona as Novas Colunas
+        novas_colunas = [
+            ("delay_aprovacao_segundos", "INTEGER DEFAULT 0"),
+            ("msg_aprovacao_texto", "TEXT DEFAULT 'PARABÉNS VOCÊ FOI APROVADO EM NOSSO VIP 🎉\n\nCLIQUE ABAIXO PARA ACESSAR O NOSSO GRUPINHO SECRETO 👇🏼\n\nENTRE AGORA!! SE SAIR NÃO TEM VOLTA!!'"),
+            ("msg_aprovacao_media", "VARCHAR"),
+            ("msg_aprovacao_btn", "VARCHAR DEFAULT '🔥 ENTRAR NO VIP'")
+        ]
+
+        for col_name, col_type in novas_colunas:
+            try:
+                db.execute(text(f"ALTER TABLE launch_strategy_config ADD COLUMN {col_name} {col_type}"))
+                db.commit()
+                log_msgs.append(f"✅ Coluna {col_name} adicionada com sucesso.")
+            except Exception as e:
+                db.rollback()
+                log_msgs.append(f"ℹ️ Coluna {col_name} já existe ou falhou: {str(e)}")
+
+        return {
+            "status": "success",
+            "message": "🚀 Migração V12 concluída com sucesso!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"❌ Erro na migração: {str(e)}"}
+
+
+# =========================================================
+# 🚨 MIGRAÇÃO V13: LIMPEZA DE GRUPO E LANÇAMENTO EM SEGUNDOS
+# =========================================================
+@router.get("/migrate-v13-updates")
+@migracao_unica("rota_migrate-v13-updates")
+async def migrate_v13_updates(db: Session = Depends(get_db)):
+    """
+    Migração V13: Adiciona coluna apagar_mensagens_servico na tabela bots,
+    e altera o tempo de lançamento para segundos.
+    """
+    try:
+        from sqlalchemy import text
+        log_msgs = []
+        
+        # 1. Adiciona apagar_mensagens_servico na tabela de bots
+        try:
+            db.execute(text("ALTER TABLE bots ADD COLUMN apagar_mensagens_servico BOOLEAN DEFAULT FALSE"))
+            db.commit()
+            log_msgs.append("✅ Coluna apagar_mensagens_servico adicionada em bots.")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"ℹ️ Coluna apagar_mensagens_servico já existe ou falhou: {str(e)}")
+
+        # 2. Adiciona tempo_vip_segundos na launch_strategy_config
+        try:
+            db.execute(text("ALTER TABLE launch_strategy_config ADD COLUMN tempo_vip_segundos INTEGER DEFAULT 60"))
+            db.commit()
+            log_msgs.append("✅ Coluna tempo_vip_segundos adicionada em launch_strategy_config.")
+        except Exception as e:
+            db.rollback()
+            log_msgs.append(f"ℹ️ Coluna tempo_vip_segundos já existe ou falhou: {str(e)}")
+
+        return {
+            "status": "success",
+            "message": "🚀 Migração V13 concluída com sucesso!",
+            "details": log_msgs
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"❌ Erro na migração V13: {str(e)}"}
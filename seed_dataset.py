@@ -0,0 +1,418 @@
+"""
+Gerador de dataset sintético do Zenyx (escala de produção, determinístico).
+
+Cria usuários, bots, planos, pastas/links de tracking, leads, pedidos com
+mix realista de status, logs de remarketing e audit logs usando os models
+do database.py. Mesma seed + mesmos parâmetros + mesma --data-base = mesmo
+dataset. No Postgres as tabelas grandes entram via COPY; no SQLite via
+executemany em lotes.
+
+A carga em massa não passa pelos listeners do ORM nem pelos upserts da
+aplicação, então no fim as projeções (receita_mensal_dono, tracking_series,
+funil_eventos/jornada_contatos) são reconstruídas a partir das tabelas.
+
+Uso:
+    python seed_dataset.py                              # escala 1 (~dados de hoje)
+    python seed_dataset.py --escala 10                  # 10x
+    python seed_dataset.py --usuarios 500 --bots-por-usuario 4 --leads-por-bot 2000
+    DATABASE_URL=postgresql://localhost/zenyx_bench python seed_dataset.py --escala 10
+
+Recusa rodar contra bancos que não sejam SQLite/localhost sem --permitir-remoto.
+"""
+
+import io
+import os
+import csv
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import (
+    engine, SessionLocal, Base, BRAZIL_TZ,
+    User, Bot, PlanoConfig, BotFlow, TrackingFolder, TrackingLink,
+    Lead, Pedido, RemarketingLog, AuditLog
+)
+import jornada
+import receita_dono
+import tracking_series
+
+# Parâmetros da escala 1 (próximo do volume atual de produção)
+BASE = {
+    "usuarios": 300,
+    "bots_por_usuario": 3,
+    "planos_por_bot": 3,
+    "links_por_bot": 4,
+    "leads_por_bot": 1500,
+    "pedidos_por_bot": 1000,
+    "remarketing_por_bot": 1500,
+    "audit_por_usuario": 200,
+    "dias_historico": 180,
+}
+
+# Mix de status observado em produção (pedidos)
+STATUS_PEDIDO = [("pending", 0.52), ("approved", 0.22), ("paid", 0.04), ("active", 0.03),
+                 ("expired", 0.14), ("failed", 0.05)]
+FUNIL_LEAD = [("lead_frio", 0.6), ("lead_quente", 0.3), ("cliente", 0.1)]
+ORIGENS_LEAD = [("bot_direto", 0.8), ("canal_free", 0.2)]
+ORIGENS_LINK = ["story", "reels", "feed", "bio", "ads", "outros"]
+PLATAFORMAS = ["facebook", "instagram", "tiktok", "kwai", "google"]
+GATEWAYS = [("pushinpay", 0.6), ("wiinpay", 0.2), ("syncpay", 0.15), ("paradise", 0.05)]
+ACOES_AUDIT = [("login_success", "auth"), ("bot_updated", "bot"), ("plano_updated", "plano"),
+               ("remarketing_sent", "remarketing"), ("flow_updated", "flow"), ("login_failed", "auth")]
+PLANOS = [("Semanal", 9.90, 7), ("Mensal", 19.90, 30), ("Trimestral", 49.90, 90),
+          ("Vitalício", 97.00, 36500)]
+
+LOTE = 5000
+
+
+def _escolher(rng: random.Random, pesos: list):
+    valores, probs = zip(*pesos)
+    return rng.choices(valores, probs)[0]
+
+
+# =========================================================
+# 🚚 INSERÇÃO EM MASSA (COPY NO POSTGRES, EXECUTEMANY NO SQLITE)
+# =========================================================
+def _valor_csv(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def inserir_em_massa(modelo, linhas: list):
+    """Insere dicts já com todas as colunas. Sem ids de volta (só para tabelas-folha)."""
+    if not linhas:
+        return
+    tabela = modelo.__table__
+    colunas = list(linhas[0].keys())
+
+    if engine.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for linha in linhas:
+            escritor.writerow([_valor_csv(linha[c]) for c in colunas])
+        buffer.seek(0)
+        conexao = engine.raw_connection()
+        try:
+            with conexao.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {tabela.name} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            conexao.commit()
+        finally:
+            conexao.close()
+        return
+
+    with engine.begin() as conn:
+        for inicio in range(0, len(linhas), LOTE):
+            conn.execute(tabela.insert(), linhas[inicio:inicio + LOTE])
+
+
+def inserir_com_ids(db, modelo, linhas: list) -> list:
+    """Para tabelas referenciadas por outras (users, bots, links): retorna os ids gerados."""
+    objetos = [modelo(**linha) for linha in linhas]
+    db.add_all(objetos)
+    db.flush()
+    ids = [o.id for o in objetos]
+    db.commit()
+    return ids
+
+
+# =========================================================
+# 🏭 GERADORES
+# =========================================================
+class Gerador:
+    def __init__(self, params: dict, seed: int, data_base: datetime, prefixo: str):
+        self.p = params
+        self.rng = random.Random(seed)
+        self.agora = data_base
+        self.prefixo = prefixo
+        self.contagem = {}
+
+    def _data(self, max_dias: int = None) -> datetime:
+        dias = max_dias if max_dias is not None else self.p["dias_historico"]
+        # Mais movimento nos dias recentes (cauda exponencial)
+        atraso = min(self.rng.expovariate(3.0 / max(dias, 1)), dias)
+        return self.agora - timedelta(days=atraso, seconds=self.rng.randint(0, 86399))
+
+    def _contar(self, nome: str, qtd: int):
+        self.contagem[nome] = self.contagem.get(nome, 0) + qtd
+
+    def usuarios(self, db) -> list:
+        linhas = [{
+            "username": f"{self.prefixo}user{i}",
+            "email": f"{self.prefixo}user{i}@seed.local",
+            "password_hash": "seed",
+            "full_name": f"Usuário Seed {i}",
+            "is_active": True,
+            "taxa_venda": 60,
+            "plano_plataforma": _escolher(self.rng, [("free", 0.85), ("vip", 0.13), ("enterprise", 0.02)]),
+            "created_at": self._data(),
+        } for i in range(self.p["usuarios"])]
+        ids = inserir_com_ids(db, User, linhas)
+        self._contar("users", len(ids))
+        return ids
+
+    def bots(self, db, usuarios: list) -> list:
+        linhas = []
+        for uid in usuarios:
+            for j in range(self.p["bots_por_usuario"]):
+                n = len(linhas)
+                linhas.append({
+                    "nome": f"Bot Seed {n}",
+                    "token": f"{7000000000 + n}:{self.prefixo}SEEDTOKEN{n:08d}",
+                    "username": f"{self.prefixo}seed_bot_{n}",
+                    "id_canal_vip": f"-100{9000000000 + n}",
+                    "admin_principal_id": str(100000 + uid),
+                    "status": _escolher(self.rng, [("ativo", 0.9), ("pausado", 0.1)]),
+                    "gateway_principal": _escolher(self.rng, GATEWAYS),
+                    "pushinpay_ativo": True,
+                    "owner_id": uid,
+                    "selector_order": j,
+                    "created_at": self._data(),
+                })
+        ids = inserir_com_ids(db, Bot, linhas)
+        self._contar("bots", len(ids))
+        return list(zip(ids, [l["owner_id"] for l in linhas]))
+
+    def planos_e_fluxos(self, db, bots: list) -> dict:
+        planos = []
+        for bot_id, _ in bots:
+            for k in range(self.p["planos_por_bot"]):
+                nome, preco, dias = PLANOS[k % len(PLANOS)]
+                planos.append({
+                    "bot_id": bot_id, "nome_exibicao": nome, "descricao": f"Acesso {nome}",
+                    "preco_atual": preco, "preco_cheio": round(preco * 2, 2), "dias_duracao": dias,
+                    "is_lifetime": dias >= 36500, "key_id": f"{self.prefixo}seed_{bot_id}_{k}",
+                })
+        ids = inserir_com_ids(db, PlanoConfig, planos)
+        inserir_em_massa(BotFlow, [{"bot_id": bot_id, "msg_boas_vindas": "Olá! Bem-vindo(a)!"} for bot_id, _ in bots])
+        self._contar("plano_config", len(ids))
+        self._contar("bot_flows", len(bots))
+
+        por_bot = {}
+        for plano_id, linha in zip(ids, planos):
+            por_bot.setdefault(linha["bot_id"], []).append((plano_id, linha))
+        return por_bot
+
+    def tracking(self, db, bots: list) -> dict:
+        donos = sorted({owner for _, owner in bots})
+        pastas = [{
+            "nome": f"{self.rng.choice(PLATAFORMAS).title()} Ads", "plataforma": self.rng.choice(PLATAFORMAS),
+            "owner_id": owner, "created_at": self._data(),
+        } for owner in donos]
+        pasta_ids = dict(zip(donos, inserir_com_ids(db, TrackingFolder, pastas)))
+
+        links = []
+        for bot_id, owner in bots:
+            for k in range(self.p["links_por_bot"]):
+                links.append({
+                    "folder_id": pasta_ids[owner], "bot_id": bot_id, "nome": f"Link {k}",
+                    "codigo": f"{self.prefixo}s{bot_id}l{k}", "origem": self.rng.choice(ORIGENS_LINK),
+                    "created_at": self._data(),
+                })
+        ids = inserir_com_ids(db, TrackingLink, links)
+        self._contar("tracking_folders", len(pastas))
+        self._contar("tracking_links", len(ids))
+
+        por_bot = {}
+        for link_id, linha in zip(ids, links):
+            por_bot.setdefault(linha["bot_id"], []).append(link_id)
+        return por_bot
+
+    def leads(self, bots: list, links: dict):
+        linhas = []
+        for bot_id, _ in bots:
+            links_bot = links.get(bot_id, [])
+            for i in range(self.p["leads_por_bot"]):
+                contato = self._data()
+                linhas.append({
+                    "user_id": str(1_000_000_000 + bot_id * 100_000 + i),
+                    "nome": f"Lead {i}", "username": f"lead_{bot_id}_{i}", "bot_id": bot_id,
+                    "status": "topo", "funil_stage": _escolher(self.rng, FUNIL_LEAD),
+                    "primeiro_contato": contato, "ultimo_contato": contato + timedelta(hours=self.rng.randint(0, 72)),
+                    "total_remarketings": self.rng.randint(0, 6),
+                    "tracking_id": self.rng.choice(links_bot) if links_bot and self.rng.random() < 0.4 else None,
+                    "origem_entrada": _escolher(self.rng, ORIGENS_LEAD), "created_at": contato,
+                })
+            if len(linhas) >= LOTE * 4:
+                inserir_em_massa(Lead, linhas)
+                self._contar("leads", len(linhas))
+                linhas = []
+        inserir_em_massa(Lead, linhas)
+        self._contar("leads", len(linhas))
+
+    def pedidos(self, bots: list, planos: dict, links: dict):
+        linhas = []
+        for bot_id, _ in bots:
+            planos_bot = planos.get(bot_id, [])
+            links_bot = links.get(bot_id, [])
+            for i in range(self.p["pedidos_por_bot"]):
+                plano_id, plano = self.rng.choice(planos_bot)
+                status = _escolher(self.rng, STATUS_PEDIDO)
+                criado = self._data()
+                pago = status in ("approved", "paid", "active", "expired")
+                aprovacao = criado + timedelta(minutes=self.rng.randint(1, 90)) if pago else None
+                if pago:
+                    expiracao = aprovacao + timedelta(days=plano["dias_duracao"])
+                    # Expirados precisam estar no passado; ativos no futuro
+                    if status == "expired" and expiracao > self.agora:
+                        expiracao = self.agora - timedelta(days=self.rng.randint(1, 30))
+                else:
+                    expiracao = None
+                tx = f"{self.prefixo}seed{bot_id}x{i}"
+                linhas.append({
+                    "bot_id": bot_id, "telegram_id": str(1_000_000_000 + bot_id * 100_000 + self.rng.randint(0, max(self.p["leads_por_bot"] - 1, 0))),
+                    "first_name": f"Cliente {i}", "plano_nome": plano["nome_exibicao"], "plano_id": plano_id,
+                    "valor": plano["preco_atual"], "status": status, "txid": tx, "transaction_id": tx,
+                    "gateway_usada": _escolher(self.rng, GATEWAYS), "data_aprovacao": aprovacao,
+                    "data_expiracao": expiracao, "created_at": criado, "mensagem_enviada": pago,
+                    "tem_order_bump": self.rng.random() < 0.15, "status_funil": "fundo" if pago else "meio",
+                    "funil_stage": "cliente" if pago else "lead_quente", "primeiro_contato": criado,
+                    "gerou_pix_em": criado, "pagou_em": aprovacao, "origem": "bot",
+                    "tracking_id": self.rng.choice(links_bot) if links_bot and self.rng.random() < 0.4 else None,
+                })
+            if len(linhas) >= LOTE * 4:
+                inserir_em_massa(Pedido, linhas)
+                self._contar("pedidos", len(linhas))
+                linhas = []
+        inserir_em_massa(Pedido, linhas)
+        self._contar("pedidos", len(linhas))
+
+    def remarketing(self, bots: list):
+        linhas = []
+        for bot_id, _ in bots:
+            for i in range(self.p["remarketing_por_bot"]):
+                enviado = self._data(60)
+                convertido = self.rng.random() < 0.04
+                erro = not convertido and self.rng.random() < 0.08
+                linhas.append({
+                    "bot_id": bot_id, "user_id": str(1_000_000_000 + bot_id * 100_000 + self.rng.randint(0, max(self.p["leads_por_bot"] - 1, 0))),
+                    "sent_at": enviado, "message_sent": "Oferta especial 🔥",
+                    "status": "paid" if convertido else ("error" if erro else "sent"),
+                    "error_message": "Forbidden: bot was blocked by the user" if erro else None,
+                    "converted": convertido, "converted_at": enviado + timedelta(hours=2) if convertido else None,
+                    "campaign_id": f"{self.prefixo}seed-camp-{bot_id}-{i // 500}",
+                })
+            if len(linhas) >= LOTE * 4:
+                inserir_em_massa(RemarketingLog, linhas)
+                self._contar("remarketing_logs", len(linhas))
+                linhas = []
+        inserir_em_massa(RemarketingLog, linhas)
+        self._contar("remarketing_logs", len(linhas))
+
+    def auditoria(self, usuarios: list):
+        linhas = []
+        for idx, uid in enumerate(usuarios):
+            for _ in range(self.p["audit_por_usuario"]):
+                acao, recurso = self.rng.choice(ACOES_AUDIT)
+                linhas.append({
+                    "user_id": uid, "username": f"{self.prefixo}user{idx}", "action": acao, "resource_type": recurso,
+                    "resource_id": self.rng.randint(1, 10_000), "description": f"{acao} (seed)",
+                    "ip_address": f"10.0.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}",
+                    "success": acao != "login_failed", "created_at": self._data(),
+                })
+            if len(linhas) >= LOTE * 4:
+                inserir_em_massa(AuditLog, linhas)
+                self._contar("audit_logs", len(linhas))
+                linhas = []
+        inserir_em_massa(AuditLog, linhas)
+        self._contar("audit_logs", len(linhas))
+
+
+# =========================================================
+# ▶️ EXECUÇÃO
+# =========================================================
+def _banco_local() -> bool:
+    url = str(engine.url)
+    return engine.dialect.name == "sqlite" or "localhost" in url or "127.0.0.1" in url
+
+
+def _atualizar_estatisticas():
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dataset sintético determinístico")
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplica usuários (e portanto bots e volume)")
+    parser.add_argument("--seed", type=int, default=20260101)
+    parser.add_argument("--data-base", help="Data 'agora' do dataset (YYYY-MM-DD). Padrão: hoje")
+    parser.add_argument("--prefixo", default="", help="Prefixo em usernames/tokens para gerar mais de um dataset no mesmo banco")
+    parser.add_argument("--permitir-remoto", action="store_true", help="Permite bancos que não são SQLite/localhost")
+    for chave, valor in BASE.items():
+        parser.add_argument(f"--{chave.replace('_', '-')}", type=int, default=None, help=f"Padrão: {valor} (x escala)" if chave == "usuarios" else f"Padrão: {valor}")
+    args = parser.parse_args()
+
+    if not _banco_local() and not args.permitir_remoto:
+        print(f"❌ Banco {engine.url.host} não é local. Use --permitir-remoto se tiver certeza.")
+        sys.exit(2)
+
+    params = dict(BASE)
+    params["usuarios"] = max(1, int(BASE["usuarios"] * args.escala))
+    for chave in BASE:
+        valor = getattr(args, chave)
+        if valor is not None:
+            params[chave] = valor
+
+    if args.data_base:
+        data_base = BRAZIL_TZ.localize(datetime.strptime(args.data_base, "%Y-%m-%d"))
+    else:
+        data_base = datetime.now(BRAZIL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    Base.metadata.create_all(bind=engine)
+    print(f"🌱 Gerando dataset (seed={args.seed}, base={data_base.date()}): {params}")
+
+    gerador = Gerador(params, args.seed, data_base, args.prefixo)
+    inicio = time.perf_counter()
+    db = SessionLocal()
+    try:
+        etapas = []
+        t = time.perf_counter()
+        usuarios = gerador.usuarios(db)
+        bots = gerador.bots(db, usuarios)
+        planos = gerador.planos_e_fluxos(db, bots)
+        links = gerador.tracking(db, bots)
+        etapas.append(("cadastros", time.perf_counter() - t))
+
+        for nome, funcao in (
+            ("leads", lambda: gerador.leads(bots, links)),
+            ("pedidos", lambda: gerador.pedidos(bots, planos, links)),
+            ("remarketing_logs", lambda: gerador.remarketing(bots)),
+            ("audit_logs", lambda: gerador.auditoria(usuarios)),
+        ):
+            t = time.perf_counter()
+            funcao()
+            etapas.append((nome, time.perf_counter() - t))
+            print(f"  ✅ {nome}: {gerador.contagem.get(nome, 0):,} linhas em {etapas[-1][1]:.1f}s")
+
+        # Projeções que a aplicação mantém por evento (ledger 0014–0016)
+        for nome, reconstruir in (
+            ("receita_mensal_dono", receita_dono.reconciliar),
+            ("tracking_series", tracking_series.reconstruir),
+            ("jornada", jornada.reconstruir),
+        ):
+            t = time.perf_counter()
+            linhas = reconstruir(db)
+            etapas.append((nome, time.perf_counter() - t))
+            print(f"  🔁 {nome}: {linhas:,} linhas reconstruídas em {etapas[-1][1]:.1f}s")
+    finally:
+        db.close()
+
+    _atualizar_estatisticas()
+    total = sum(gerador.contagem.values())
+    duracao = time.perf_counter() - inicio
+    print(f"\n📦 {total:,} linhas em {duracao:.1f}s ({total / duracao:,.0f} linhas/s)")
+    for tabela, qtd in gerador.contagem.items():
+        print(f"   {tabela}: {qtd:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import asyncio
+import hashlib
+import logging
+from datetime import timedelta
+
+import httpx
+
+from database import SessionLocal, Bot, now_brazil
+
+logger = logging.getLogger(__name__)
+
+SYNC_PAY_BASE_URL = "https://api.syncpayments.com.br"
+
+# Consultas simultâneas do poller de pagamentos pendentes
+POLL_CONCORRENCIA = int(os.getenv("SYNCPAY_POLL_CONCORRENCIA", "10"))
+
+# Margem de segurança: renova o token antes de expirar de fato
+MARGEM_RENOVACAO = timedelta(minutes=5)
+
+# =========================================================
+# 🔑 CACHE DE TOKENS SYNC PAY (POR BOT, SINGLE-FLIGHT)
+# =========================================================
+# Antes, cada chamada (checkout ou polling) lia o token do Bot e, se vencido,
+# chamava /auth-token e dava commit na sessão do chamador. Com vários pedidos
+# do mesmo bot, várias renovações simultâneas aconteciam.
+# Agora o token fica em memória; quando vence, só UMA coroutine por bot
+# renova e as outras aguardam o mesmo resultado.
+
+_tokens = {}   # {bot_id: (chave_credenciais, token, expira_em)}
+_locks = {}    # {bot_id: asyncio.Lock}
+
+
+def _chave_credenciais(bot) -> str:
+    """Fingerprint das credenciais: se o cliente trocar as chaves, o cache invalida sozinho."""
+    bruto = f"{bot.syncpay_client_id or ''}:{bot.syncpay_client_secret or ''}"
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def _valido(expira_em) -> bool:
+    if not expira_em:
+        return False
+    agora = now_brazil()
+    if expira_em.tzinfo is None:
+        expira_em = expira_em.replace(tzinfo=agora.tzinfo)
+    return expira_em > agora + MARGEM_RENOVACAO
+
+
+def _do_cache(bot):
+    item = _tokens.get(bot.id)
+    if item and item[0] == _chave_credenciais(bot) and _valido(item[2]):
+        return item[1]
+    return None
+
+
+def invalidar_token_syncpay(bot_id: int):
+    """Descarta o token em memória (ex: após HTTP 401 da Sync Pay)."""
+    _tokens.pop(bot_id, None)
+
+
+def _persistir_token(bot_id: int, token: str, expira_em):
+    """Grava o token no Bot em sessão própria (não faz commit na sessão do chamador)."""
+    db = SessionLocal()
+    try:
+        db.query(Bot).filter(Bot.id == bot_id).update(
+            {Bot.syncpay_access_token: token, Bot.syncpay_token_expires_at: expira_em},
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"⚠️ [SYNC PAY TOKEN] Não foi possível persistir token do bot {bot_id}: {e}")
+    finally:
+        db.close()
+
+
+async def _renovar_token(bot, client: httpx.AsyncClient = None):
+    url = f"{SYNC_PAY_BASE_URL}/api/partner/v1/auth-token"
+    payload = {
+        "client_id": bot.syncpay_client_id,
+        "client_secret": bot.syncpay_client_secret
+    }
+    headers = {"Content-Type": "application/json"}
+
+    try:
+        if client is not None:
+            response = await client.post(url, json=payload, headers=headers, timeout=15)
+        else:
+            async with httpx.AsyncClient() as novo_client:
+                response = await novo_client.post(url, json=payload, headers=headers, timeout=15)
+
+        if response.status_code != 200:
+            logger.error(f"❌ [SYNC PAY ERRO AUTH] HTTP {response.status_code}: {response.text}")
+            return None, None
+
+        data = response.json()
+        if "access_token" not in data:
+            logger.error(f"❌ [SYNC PAY ERRO AUTH] Resposta sem token: {data}")
+            return None, None
+
+        expira_em = now_brazil() + timedelta(seconds=data.get("expires_in", 3600))
+        return data["access_token"], expira_em
+
+    except Exception as e:
+        logger.error(f"❌ [SYNC PAY EXCEPTION AUTH] {type(e).__name__}: {str(e)}")
+        return None, None
+
+
+async def obter_token_cacheado(bot, token_rejeitado: str = None, client: httpx.AsyncClient = None):
+    """
+    Retorna um access_token válido da Sync Pay para o bot.
+
+    Ordem: cache em memória → token salvo no Bot (warm start) → renovação na API.
+    A renovação é single-flight por bot: chamadas concorrentes esperam a mesma requisição.
+    Após um 401, passe o token recusado em `token_rejeitado`; se outra coroutine já
+    trocou o token nesse meio tempo, o novo é reaproveitado sem outra renovação.
+    """
+    token = _do_cache(bot)
+    if token and token != token_rejeitado:
+        return token
+
+    lock = _locks.setdefault(bot.id, asyncio.Lock())
+    async with lock:
+        # Outra coroutine pode ter renovado enquanto esperávamos o lock
+        token = _do_cache(bot)
+        if token and token != token_rejeitado:
+            return token
+        invalidar_token_syncpay(bot.id)
+
+        chave = _chave_credenciais(bot)
+
+        # Warm start: token ainda válido gravado no banco (ex: após restart)
+        token_salvo = bot.syncpay_access_token
+        if token_salvo and token_salvo != token_rejeitado and _valido(bot.syncpay_token_expires_at):
+            _tokens[bot.id] = (chave, token_salvo, bot.syncpay_token_expires_at)
+            return token_salvo
+
+        token, expira_em = await _renovar_token(bot, client)
+        if not token:
+            return None
+
+        _tokens[bot.id] = (chave, token, expira_em)
+        _persistir_token(bot.id, token, expira_em)
+        logger.info(f"🔑 [SYNC PAY TOKEN] Token renovado para bot {bot.id} (válido até {expira_em.strftime('%H:%M')})")
+        return token
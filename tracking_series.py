@@ -0,0 +1,140 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, text, select, literal, union_all, insert, bindparam, DateTime
+
+from database import TrackingSerie, Pedido, Lead, now_brazil
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# 📈 SÉRIE TEMPORAL DOS LINKS DE TRACKING
+# =========================================================
+# O gráfico de desempenho carregava todos os links do usuário e todos os
+# pedidos aprovados da janela para agrupar por strftime("%d/%m") em Python.
+#
+# Agora cada evento soma no bucket da hora e do dia do link (tabela
+# tracking_series): clique e lead no /start, venda e faturamento na
+# aprovação. É um INSERT ... ON CONFLICT DO UPDATE na mesma transação que já
+# atualiza os contadores do TrackingLink. Gráficos de 7/30/90 dias viram uma
+# leitura por intervalo de no máximo (links × dias) linhas, e os cliques
+# permitem mostrar CTR (lead/clique) e conversão (venda/clique) por link.
+#
+# O histórico de leads e vendas é reconstruído uma vez pela migração 0015 do
+# ledger; cliques antigos não têm data e começam a contar a partir daí.
+
+GRANULARIDADES = ("hora", "dia")
+
+_TABELA = TrackingSerie.__tablename__
+
+_SQL_SOMAR = text(f"""
+INSERT INTO {_TABELA} (tracking_id, granularidade, inicio, clicks, leads, vendas, faturamento)
+VALUES (:tracking_id, :granularidade, :inicio, :clicks, :leads, :vendas, :faturamento)
+ON CONFLICT (tracking_id, granularidade, inicio) DO UPDATE SET
+    clicks = {_TABELA}.clicks + excluded.clicks,
+    leads = {_TABELA}.leads + excluded.leads,
+    vendas = {_TABELA}.vendas + excluded.vendas,
+    faturamento = {_TABELA}.faturamento + excluded.faturamento
+""").bindparams(bindparam("inicio", type_=DateTime))  # Mesmo formato de data do ORM no SQLite
+
+
+def _buckets(quando: datetime) -> dict:
+    if quando.tzinfo is not None:
+        quando = quando.astimezone(now_brazil().tzinfo)
+    hora = quando.replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    return {"hora": hora, "dia": hora.replace(hour=0)}
+
+
+def registrar(db, tracking_id, clicks: int = 0, leads: int = 0, vendas: int = 0,
+              faturamento: float = 0.0, quando: datetime = None):
+    """
+    Soma o evento nos buckets de hora e dia do link. Não faz commit: roda na
+    transação de quem chamou (junto com os contadores do TrackingLink), num
+    savepoint — no Postgres um upsert que falha não pode envenenar o commit
+    do /start ou do webhook.
+    """
+    if not tracking_id:
+        return
+    try:
+        with db.begin_nested():
+            for granularidade, inicio in _buckets(quando or now_brazil()).items():
+                db.execute(_SQL_SOMAR, {
+                    "tracking_id": tracking_id,
+                    "granularidade": granularidade,
+                    "inicio": inicio,
+                    "clicks": clicks,
+                    "leads": leads,
+                    "vendas": vendas,
+                    "faturamento": float(faturamento or 0),
+                })
+    except Exception as e:
+        logger.error(f"❌ [TRACKING SERIES] Falha ao registrar evento do link {tracking_id}: {e}")
+
+
+def _truncar(db, coluna, granularidade: str):
+    if db.get_bind().dialect.name == "postgresql":
+        if getattr(coluna.type, "timezone", False):
+            # Lead.created_at tem fuso (server_default now()); os buckets são no horário de Brasília
+            coluna = func.timezone('America/Sao_Paulo', coluna)
+        return func.date_trunc('hour' if granularidade == "hora" else 'day', coluna)
+    formato = '%Y-%m-%d %H:00:00.000000' if granularidade == "hora" else '%Y-%m-%d 00:00:00.000000'
+    return func.strftime(formato, coluna)
+
+
+def reconstruir(db) -> int:
+    """
+    Recria os buckets de leads e vendas a partir de Lead/Pedido (agregado no
+    banco com INSERT ... SELECT). Usado pela migração 0015; pode ser rodado de
+    novo para corrigir divergências, mas zera os cliques.
+    """
+    total = 0
+    try:
+        db.query(TrackingSerie).delete(synchronize_session=False)
+        for granularidade in GRANULARIDADES:
+            bucket_lead = _truncar(db, Lead.created_at, granularidade)
+            bucket_venda = _truncar(db, Pedido.data_aprovacao, granularidade)
+            leads = select(
+                Lead.tracking_id.label("tracking_id"), bucket_lead.label("inicio"),
+                func.count(Lead.id).label("leads"), literal(0).label("vendas"), literal(0.0).label("faturamento"),
+            ).where(Lead.tracking_id != None, Lead.created_at != None).group_by(Lead.tracking_id, bucket_lead)
+            vendas = select(
+                Pedido.tracking_id.label("tracking_id"), bucket_venda.label("inicio"),
+                literal(0).label("leads"), func.count(Pedido.id).label("vendas"),
+                func.coalesce(func.sum(Pedido.valor), 0.0).label("faturamento"),
+            ).where(
+                Pedido.tracking_id != None,
+                Pedido.data_aprovacao != None,
+                Pedido.status.in_(['paid', 'approved', 'active', 'expired']),
+            ).group_by(Pedido.tracking_id, bucket_venda)
+
+            eventos = union_all(leads, vendas).subquery()
+            origem = select(
+                eventos.c.tracking_id, literal(granularidade), eventos.c.inicio, literal(0),
+                func.sum(eventos.c.leads), func.sum(eventos.c.vendas), func.sum(eventos.c.faturamento),
+            ).group_by(eventos.c.tracking_id, eventos.c.inicio)
+
+            resultado = db.execute(insert(TrackingSerie).from_select(
+                ["tracking_id", "granularidade", "inicio", "clicks", "leads", "vendas", "faturamento"], origem
+            ))
+            total += resultado.rowcount or 0
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(f"📈 [TRACKING SERIES] {total} buckets reconstruídos a partir de leads e pedidos")
+    return total
+
+
+def serie(db, link_ids: list, inicio: datetime, fim: datetime = None, granularidade: str = "dia") -> list:
+    """Buckets dos links no intervalo [inicio, fim], ordenados por link e data."""
+    if not link_ids:
+        return []
+    inicio = _buckets(inicio)[granularidade]
+    query = db.query(TrackingSerie).filter(
+        TrackingSerie.tracking_id.in_(link_ids),
+        TrackingSerie.granularidade == granularidade,
+        TrackingSerie.inicio >= inicio,
+    )
+    if fim is not None:
+        query = query.filter(TrackingSerie.inicio <= _buckets(fim)[granularidade])
+    return query.order_by(TrackingSerie.tracking_id, TrackingSerie.inicio).all()